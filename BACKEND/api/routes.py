@@ -1,14 +1,33 @@
 """
 API routes for the LawGPT application.
 """
-from fastapi import APIRouter
+import asyncio
+import hmac
+import json
+import os
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from config.settings import (
+    ADMIN_TOKEN, BATCH_DIR, HISTORY_MAX_TURNS_PER_SESSION, MAX_BATCH_BYTES, UPLOAD_DIR, VECTOR_INDEX_PATH
+)
 from models.question import QuestionRequest, QuestionResponse
-from services.llm_service import get_llm_response
+from services.batch_service import read_questions, run_batch
+from services.concurrency import QueueFullError
+from services.history_store import DEFAULT_SESSION_ID
+from services import container, index_versions, metrics
+from services.llm_service import aget_llm_answer, astream_llm_response
+from services.uploads import UploadExists, UploadTooLarge, save_uploads
 from utils.helpers import print_colored
 
 # Create router
 router = APIRouter()
 
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# Batch jobs running in this worker, so one output file never has two writers
+running_jobs = set()
+
 
 @router.post("/api/ask", response_model=QuestionResponse)
 async def ask_question(req: QuestionRequest):
@@ -21,16 +40,306 @@ async def ask_question(req: QuestionRequest):
     Returns:
         dict: The answer response
     """
-    from main import retriever  # Import here to avoid circular imports
-    
     # Log the question
     print_colored(f"Received question: {req.question}", "blue")
     
-    # Get answer from LLM service
-    answer = get_llm_response(req.question, retriever)
+    # Get answer from LLM service without blocking the event loop
+    try:
+        answer = await aget_llm_answer(
+            req.question, session_id=req.session_id or DEFAULT_SESSION_ID, search=req.search_params()
+        )
+    except QueueFullError as e:
+        print_colored(f"Rejected question: {e}", "yellow")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     # Return response
-    return QuestionResponse(answer=answer)
+    return QuestionResponse(answer=answer.text, sections=answer.sections)
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Encode a server-sent event
+    
+    Args:
+        event (str): Event name
+        data (dict): JSON payload
+    
+    Returns:
+        str: The encoded event
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/api/ask/stream")
+async def ask_question_stream(req: QuestionRequest):
+    """
+    Process a question and stream the answer as server-sent events
+    
+    Emits a `token` event for every formatted fragment and a final `done`
+    event once the answer is complete.
+    
+    Args:
+        req (QuestionRequest): The question request
+    
+    Returns:
+        StreamingResponse: The text/event-stream response
+    """
+    print_colored(f"Received streaming question: {req.question}", "blue")
+    
+    fragments = astream_llm_response(
+        req.question, session_id=req.session_id or DEFAULT_SESSION_ID, search=req.search_params()
+    )
+    try:
+        # The first fragment is yielded once a slot is held
+        await fragments.__anext__()
+    except QueueFullError as e:
+        print_colored(f"Rejected question: {e}", "yellow")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    async def event_stream():
+        try:
+            async for fragment in fragments:
+                if fragment:
+                    yield sse_event("token", {"text": fragment})
+            yield sse_event("done", {})
+        finally:
+            # Release the request slot even if the client disconnects early
+            await fragments.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class JobStreamingResponse(StreamingResponse):
+    """
+    Streaming response that releases its batch job when it ends
+    
+    A client that disconnects before the body is read never starts the
+    result stream, so the stream's own cleanup would not run.
+    
+    Args:
+        job_id (Optional[str]): The job reserved in running_jobs, if any
+    """
+    
+    def __init__(self, job_id: Optional[str], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job_id = job_id
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            running_jobs.discard(self.job_id)
+
+
+@router.post("/api/batch")
+async def ask_batch(request: Request, job_id: Optional[str] = None):
+    """
+    Answer a JSONL bank of questions and stream the answers back as JSONL
+    
+    The body holds one {"question": ..., "id": ...} object per line, up to
+    MAX_BATCH_BYTES. With a job_id the answers are also kept on the server,
+    and posting the same job again returns the answers already given and
+    only runs the rest.
+    
+    Args:
+        request (Request): The request, whose body is the question bank
+        job_id (Optional[str]): Name under which to keep and resume the job
+    
+    Returns:
+        StreamingResponse: One result line per question, as answers complete
+    """
+    body = bytearray()
+    # Read as it arrives, so an oversized bank is refused before it is held in memory
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Question banks are limited to {MAX_BATCH_BYTES} bytes")
+    try:
+        questions = read_questions(body.decode("utf-8").splitlines())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    output_path = None
+    if job_id is not None:
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            raise HTTPException(status_code=400, detail="job_id may only hold letters, digits, _ and -")
+        if job_id in running_jobs:
+            raise HTTPException(status_code=409, detail=f"Batch job {job_id} is already running")
+        # Reserved before the response starts, so a second request in between is refused too
+        running_jobs.add(job_id)
+        try:
+            os.makedirs(BATCH_DIR, exist_ok=True)
+        except OSError:
+            running_jobs.discard(job_id)
+            raise
+        output_path = os.path.join(BATCH_DIR, f"{job_id}.jsonl")
+    print_colored(f"Received batch of {len(questions)} questions" + (f" for job {job_id}" if job_id else ""), "blue")
+    
+    async def result_stream():
+        try:
+            async for result in run_batch(questions, output_path, replay=True):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            running_jobs.discard(job_id)
+    
+    return JobStreamingResponse(job_id, result_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/api/documents", status_code=202)
+async def upload_documents(request: Request):
+    """
+    Upload books and queue them for indexing
+    
+    The multipart/form-data body holds one or more PDF or DOCX files. Each
+    file is written to disk as it arrives and indexed by a background job;
+    questions are answered from the current index meanwhile. A file with
+    the name of an earlier upload is refused with 409.
+    
+    Args:
+        request (Request): The request, whose body is the upload, checked for the admin token
+    
+    Returns:
+        dict: The queued jobs, one per file
+    """
+    from services.ingestion import SUPPORTED_EXTENSIONS
+    require_admin(request)
+    try:
+        saved = await save_uploads(request.stream(), request.headers.get("content-type", ""), UPLOAD_DIR,
+                                   SUPPORTED_EXTENSIONS)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    queue = await asyncio.to_thread(container.get_ingestion_queue)
+    jobs = [await asyncio.to_thread(queue.submit, upload.path, upload.size) for upload in saved]
+    print_colored(f"Received {len(saved)} documents: {', '.join(upload.name for upload in saved)}", "blue")
+    return {"jobs": jobs}
+
+
+@router.get("/api/documents/jobs")
+async def list_ingestion_jobs(limit: int = 50):
+    """
+    Most recent ingestion jobs
+    
+    Args:
+        limit (int): Maximum number of jobs
+    
+    Returns:
+        dict: The jobs, newest first
+    """
+    queue = await asyncio.to_thread(container.get_ingestion_queue)
+    return {"jobs": await asyncio.to_thread(queue.jobs.recent, limit)}
+
+
+@router.get("/api/documents/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    Status and progress of an ingestion job
+    
+    Args:
+        job_id (str): Job id returned by the upload
+    
+    Returns:
+        dict: The job
+    """
+    job = None
+    if JOB_ID_PATTERN.fullmatch(job_id):
+        queue = await asyncio.to_thread(container.get_ingestion_queue)
+        job = await asyncio.to_thread(queue.jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion job {job_id}")
+    return job
+
+
+def require_admin(request: Request):
+    """
+    Reject admin requests without the ADMIN_TOKEN. Admin endpoints stay disabled until one is set.
+    
+    Args:
+        request (Request): The request, with the token in X-Admin-Token
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled until ADMIN_TOKEN is set")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def index_versions_status() -> dict:
+    """Saved index versions, the current one and the one this worker serves"""
+    return {
+        "current": index_versions.current_version(VECTOR_INDEX_PATH),
+        "served": container.index_status()["version"],
+        "versions": index_versions.list_versions(VECTOR_INDEX_PATH),
+    }
+
+
+@router.get("/api/admin/index")
+async def get_index_versions(request: Request):
+    """
+    Saved index versions
+    
+    Args:
+        request (Request): The request, checked for the admin token
+    
+    Returns:
+        dict: The versions, oldest first, the current one and the one served
+    """
+    require_admin(request)
+    return await asyncio.to_thread(index_versions_status)
+
+
+@router.post("/api/admin/index/reload")
+async def reload_index(request: Request):
+    """
+    Serve the current index version now, rather than at the next check
+    
+    The new version loads in the background while questions are answered
+    from the old one. Other workers follow within INDEX_WATCH_SECONDS.
+    
+    Args:
+        request (Request): The request, checked for the admin token
+    
+    Returns:
+        dict: The index versions after the reload
+    """
+    require_admin(request)
+    try:
+        await asyncio.to_thread(container.reload_retriever)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return await asyncio.to_thread(index_versions_status)
+
+
+@router.post("/api/admin/index/rollback")
+async def rollback_index(request: Request, version: Optional[str] = None):
+    """
+    Make an earlier index version current again and serve it
+    
+    Args:
+        request (Request): The request, checked for the admin token
+        version (Optional[str]): Version to serve, also a newer one to undo a
+            rollback; by default the one before the current version
+    
+    Returns:
+        dict: The index versions after the rollback
+    """
+    require_admin(request)
+    try:
+        version = await asyncio.to_thread(index_versions.rollback, VECTOR_INDEX_PATH, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await asyncio.to_thread(container.reload_retriever, version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return await asyncio.to_thread(index_versions_status)
 
 
 @router.get("/health")
@@ -41,4 +350,111 @@ async def health_check():
     Returns:
         dict: Status information
     """
-    return {"status": "ok", "service": "LawGPT API"}
\ No newline at end of file
+    return {"status": "ok", "service": "LawGPT API"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness check: succeeds once this worker has loaded the vector index
+    
+    Returns:
+        JSONResponse: Worker, index and state backend status, with 503 until the index is ready
+    """
+    status = container.index_status()
+    state = container.get_state_backend()
+    return JSONResponse(
+        status_code=200 if status["status"] == "ready" else 503,
+        content={
+            "service": "LawGPT API",
+            "worker": os.getpid(),
+            "index": status,
+            "state": {"backend": state.name, "reachable": await asyncio.to_thread(state.ping)}
+        }
+    )
+
+
+@router.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Answer cache counters
+    
+    Returns:
+        dict: Hit, miss and eviction counts, or a disabled marker
+    """
+    answer_cache = container.get_answer_cache()
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+def service_metrics():
+    """
+    Gauges and counters read from the services at scrape time.
+    
+    Returns:
+        list: (name, kind, help, samples) tuples for the metrics registry
+    """
+    from services import llm_service
+    limiter = llm_service.request_limiter.stats()
+    families = [
+        ("lawgpt_requests_in_flight", "gauge", "Questions being answered",
+         [("lawgpt_requests_in_flight", {}, limiter["in_flight"])]),
+        ("lawgpt_requests_queued", "gauge", "Questions waiting for a slot",
+         [("lawgpt_requests_queued", {}, limiter["queued"])]),
+    ]
+    # Reported once the cache is built; a scrape never builds it
+    answer_cache = container.built("answer_cache")
+    if answer_cache is not None:
+        stats = answer_cache.stats()
+        families += [
+            ("lawgpt_answer_cache_entries", "gauge", "Answers in the cache",
+             [("lawgpt_answer_cache_entries", {}, stats["entries"])]),
+            ("lawgpt_answer_cache_bytes", "gauge", "Approximate memory held by cached answers",
+             [("lawgpt_answer_cache_bytes", {}, stats["bytes"])]),
+            ("lawgpt_answer_cache_lookups_total", "counter", "Answer cache lookups by result",
+             [("lawgpt_answer_cache_lookups_total", {"result": result}, stats[key])
+              for result, key in (("exact", "exact_hits"), ("semantic", "semantic_hits"), ("miss", "misses"))]),
+            ("lawgpt_answer_cache_evictions_total", "counter", "Answers evicted by the entry or memory cap",
+             [("lawgpt_answer_cache_evictions_total", {}, stats["evictions"])]),
+            ("lawgpt_answer_cache_expirations_total", "counter", "Answers dropped after their TTL",
+             [("lawgpt_answer_cache_expirations_total", {}, stats["expirations"])]),
+        ]
+    return families
+
+
+metrics.REGISTRY.register_collector(service_metrics)
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """
+    Request metrics of this worker in the Prometheus text format
+    
+    Returns:
+        PlainTextResponse: Stage timings, token and retrieval counts and cache stats
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/api/history/{session_id}")
+async def get_history(session_id: str, request: Request,
+                      limit: int = Query(20, ge=1, le=HISTORY_MAX_TURNS_PER_SESSION)):
+    """
+    Most recent turns of a conversation; an admin endpoint, since anyone
+    knowing a session id could otherwise read it
+    
+    Args:
+        session_id (str): Conversation to read
+        request (Request): The request, checked for the admin token
+        limit (int): Maximum number of turns, at most the turns a session keeps
+    
+    Returns:
+        dict: The turns, oldest first
+    """
+    require_admin(request)
+    turns = await asyncio.to_thread(container.get_history_store().recent, session_id, limit)
+    return {
+        "session_id": session_id,
+        "turns": [{"question": question, "answer": answer} for question, answer in turns]
+    }
\ No newline at end of file
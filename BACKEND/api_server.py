@@ -1,20 +1,64 @@
 """
 Main API server entry point for the LawGPT application.
 This is the file that should be run to start the FastAPI server.
+
+API_WORKERS sets the number of worker processes. Each loads the vector index
+itself (memory-mapped, so they share its pages); history windows and cached
+answers are shared between them through the STATE_BACKEND.
 """
+import subprocess
+import time
 import uvicorn
+from urllib.parse import urlparse
 from utils.helpers import print_colored, print_header
-from config.settings import API_PORT, API_HOST
+from config.settings import API_PORT, API_HOST, API_WORKERS, STATE_BACKEND, STATE_URL
 import os
 import sys
 
+
+def start_state_server() -> subprocess.Popen:
+    """
+    Start the bundled state server at STATE_URL and wait until it answers.
+
+    Returns:
+        subprocess.Popen: The server process
+    """
+    from services.state_backend import RedisStateBackend
+
+    url = urlparse(STATE_URL)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "services.state_server",
+         "--host", url.hostname or "127.0.0.1", "--port", str(url.port or 6390)],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    client = RedisStateBackend(STATE_URL, timeout=1.0)
+    deadline = time.monotonic() + 10
+    while not client.ping():
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"State server did not start at {STATE_URL}")
+        time.sleep(0.05)
+    return process
+
+
 if __name__ == "__main__":
     # Add the current directory to PYTHONPATH to allow imports from modules
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
     
-    # Import the app from main.py to avoid circular imports
-    from main import app
-    
     print_header()
-    print_colored("Starting FastAPI server...", "cyan")
-    uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
+    state_server = None
+    if STATE_BACKEND == "local":
+        state_server = start_state_server()
+        print_colored(f"Started local state server at {STATE_URL}", "green")
+    elif STATE_BACKEND == "memory" and API_WORKERS > 1:
+        print_colored("STATE_BACKEND=memory keeps history windows and cached answers per worker; "
+                      "set it to local or redis to share them", "yellow")
+
+    print_colored(f"Starting FastAPI server with {API_WORKERS} worker(s)...", "cyan")
+    try:
+        # Workers import the app themselves, which also avoids circular imports here
+        uvicorn.run("main:app", host=API_HOST, port=API_PORT, workers=API_WORKERS)
+    finally:
+        if state_server is not None:
+            state_server.terminate()
+            state_server.wait()
@@ -0,0 +1,63 @@
+"""
+Script to answer a JSONL bank of questions in bulk.
+
+Each input line is {"question": ..., "id": ...}; answers are appended to the
+output file as JSONL. Running the script again with the same output file
+resumes an interrupted job.
+
+Usage:
+    python batch_ask.py questions.jsonl --output answers.jsonl
+"""
+import argparse
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from config.settings import BATCH_CONCURRENCY, BATCH_SIZE
+from services.batch_service import read_questions, run_batch
+from utils.helpers import print_colored, check_environment
+
+
+async def answer_all(questions, output_path: str, batch_size: int, concurrency: int):
+    start = time.perf_counter()
+    answered, failed = 0, 0
+    async for result in run_batch(questions, output_path, batch_size=batch_size, concurrency=concurrency):
+        if "error" in result:
+            failed += 1
+            print_colored(f"Question {result['id']} failed: {result['error']}", "red")
+        else:
+            answered += 1
+        if (answered + failed) % batch_size == 0:
+            print_colored(f"{answered + failed} questions done", "yellow")
+    elapsed = time.perf_counter() - start
+    print_colored(f"✓ Answered {answered} questions in {elapsed:.1f}s"
+                  f"{f', {failed} failed (run again to retry them)' if failed else ''}",
+                  "green" if not failed else "yellow")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("--output", help="JSONL file for the answers (default: <questions>.answers.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Questions retrieved together")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="LLM calls in flight")
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+    if not check_environment(["GOOGLE_API_KEY"]):
+        return
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        try:
+            questions = read_questions(f)
+        except ValueError as e:
+            print_colored(f"Invalid question file: {str(e)}", "red")
+            return
+    output_path = args.output or f"{os.path.splitext(args.questions)[0]}.answers.jsonl"
+    print_colored(f"Answering {len(questions)} questions into {output_path}...", "yellow")
+    asyncio.run(answer_all(questions, output_path, args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the LawGPT backend.
+
+Run them from the BACKEND directory, e.g. ``python -m benchmarks.bench_async_ask``.
+"""
@@ -0,0 +1,61 @@
+"""
+Answer cache benchmark with offline hashing embeddings.
+
+Replays a stream of paraphrased questions through SemanticAnswerCache and
+reports the hit rate and lookup latency.
+
+Usage:
+    python -m benchmarks.bench_answer_cache --questions 5000
+"""
+import argparse
+import random
+import time
+from services.answer_cache import SemanticAnswerCache
+from services.embeddings import HashingEmbeddings
+from services.response_formatter import FormattedAnswer
+from utils.helpers import print_colored
+
+TOPICS = [
+    "punishment for murder under section 103",
+    "right to life under article 21",
+    "bail provisions for non-bailable offences",
+    "admissibility of electronic records as evidence",
+    "definition of theft in the sanhita",
+    "procedure for filing an FIR",
+    "powers of the magistrate to order investigation",
+    "defamation and its exceptions",
+]
+PREFIXES = ["What is the", "Explain the", "Tell me about the", "what is the", "Can you explain the"]
+SUFFIXES = ["?", "", " please?", ".", "??"]
+
+
+def paraphrase(topic: str) -> str:
+    return f"{random.choice(PREFIXES)} {topic}{random.choice(SUFFIXES)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    random.seed(0)
+    cache = SemanticAnswerCache(HashingEmbeddings(), similarity_threshold=args.threshold)
+
+    start = time.perf_counter()
+    for _ in range(args.questions):
+        question = paraphrase(random.choice(TOPICS))
+        answer, vector = cache.lookup(question)
+        if answer is None:
+            cache.put(question, FormattedAnswer(f"Answer to: {question}"), vector)
+    elapsed = time.perf_counter() - start
+
+    stats = cache.stats()
+    print_colored(f"{args.questions} questions in {elapsed:.3f}s "
+                  f"({elapsed / args.questions * 1e6:.1f} us per lookup)", "cyan")
+    print_colored(f"exact hits {stats['exact_hits']}, semantic hits {stats['semantic_hits']}, "
+                  f"misses {stats['misses']}, hit rate {stats['hit_rate']:.1%}", "green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Batch question answering against one question at a time.
+
+Indexes the books (structural chunks, FAISS flat index) with offline
+embeddings that charge a round trip per embedding call, like the Google
+embedding API, and a fake LLM with a fixed delay. Then:
+- Retrieval: the labelled questions of legal_questions.jsonl, repeated to
+  --questions, retrieved one by one with the hybrid retriever and with
+  retrieve_batch. Reports time, embedding calls and whether the results agree.
+- Answers: the same questions answered one call at a time through
+  aget_llm_response (what a client looping over /api/ask gets) and with
+  run_batch, including resuming a job interrupted half-way.
+
+Usage:
+    python -m benchmarks.bench_batch --questions 144 --delay 0.3 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextlib import aclosing
+from benchmarks.bench_hybrid_retrieval import QUESTIONS_FILE, load_chunks
+from benchmarks.fakes import FakeLLM
+from config.settings import BOOKS_DIR
+from services import container, llm_service
+from services.batch_retrieval import retrieve_batch
+from services.batch_service import run_batch
+from services.embeddings import HashingEmbeddings
+from services.history_store import HistoryStore
+from services.hybrid_retriever import HybridRetriever
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+from services.vector_db_service import create_retriever
+from utils.helpers import print_colored
+
+
+class RoundTripEmbeddings(HashingEmbeddings):
+    """
+    Offline embeddings that wait a round trip per call of up to `batch_size` texts.
+
+    Args:
+        latency (float): Seconds per embedding call
+    """
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def embed_documents(self, texts, *, batch_size: int = 100, task_type=None):
+        for start in range(0, len(texts), batch_size):
+            self.calls += 1
+            time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def ids_of(results):
+    return [[(doc.metadata.get("book"), doc.page_content[:80]) for doc in docs] for docs in results]
+
+
+def compare_retrieval(retriever, embeddings, questions):
+    embeddings.calls = 0
+    start = time.perf_counter()
+    single = [retriever.invoke(question) for question in questions]
+    single_time, single_calls = time.perf_counter() - start, embeddings.calls
+
+    embeddings.calls = 0
+    start = time.perf_counter()
+    batched = retrieve_batch(retriever, questions)
+    batch_time, batch_calls = time.perf_counter() - start, embeddings.calls
+
+    agree = sum(a == b for a, b in zip(ids_of(single), ids_of(batched)))
+    print_colored(f"Retrieval of {len(questions)} questions: one by one {single_time:6.2f}s "
+                  f"({single_calls} embedding calls), batched {batch_time:6.2f}s ({batch_calls} embedding calls), "
+                  f"same chunks for {agree}/{len(questions)}", "green")
+
+
+async def answer_one_by_one(questions):
+    start = time.perf_counter()
+    for item in questions:
+        await llm_service.aget_llm_response(item["question"], session_id="bench")
+    return time.perf_counter() - start
+
+
+async def answer_batch(questions, output_path, concurrency, stop_after=None):
+    start = time.perf_counter()
+    answered = 0
+    async with aclosing(run_batch(questions, output_path, concurrency=concurrency)) as results:
+        async for result in results:
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            answered += 1
+            if answered == stop_after:
+                break
+    return time.perf_counter() - start, answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", default=BOOKS_DIR)
+    parser.add_argument("--questions", type=int, default=144)
+    parser.add_argument("--delay", type=float, default=0.3, help="Fake LLM seconds per call")
+    parser.add_argument("--embedding-latency", type=float, default=0.08, help="Seconds per embedding call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        labelled = [json.loads(line)["question"] for line in f if line.strip()]
+    texts = [labelled[i % len(labelled)] for i in range(args.questions)]
+    questions = [{"id": i, "question": text} for i, text in enumerate(texts)]
+
+    docs, ids = load_chunks(args.books, "structural")
+    embeddings = RoundTripEmbeddings(args.embedding_latency)
+    backend = get_backend("faiss")
+    with tempfile.TemporaryDirectory() as db_path:
+        embeddings.latency, latency = 0.0, embeddings.latency
+        backend.save(backend.create(docs, embeddings, ids=ids, path=db_path), db_path)
+        embeddings.latency = latency
+        vector_retriever = create_retriever(backend.load(db_path, embeddings))
+    sparse_index = BM25Index()
+    sparse_index.add_documents(docs, ids=ids)
+    retriever = HybridRetriever(vector_retriever=vector_retriever, sparse_index=sparse_index)
+    print_colored(f"{len(docs)} chunks, {len(questions)} questions, embedding call {args.embedding_latency:.2f}s, "
+                  f"fake LLM {args.delay:.2f}s, batch concurrency {args.concurrency}", "cyan")
+
+    compare_retrieval(retriever, embeddings, texts)
+
+    container.override("llm", FakeLLM(delay=args.delay))
+    container.override("retriever", retriever)
+    container.override("history_store", HistoryStore(os.path.join(tempfile.mkdtemp(), "history.sqlite")))
+    container.override("answer_cache", None)
+    llm_service.print_colored = lambda *args, **kwargs: None
+
+    single = asyncio.run(answer_one_by_one(questions))
+    print_colored(f"One call at a time: {single:6.2f}s, {len(questions) / single:6.1f} questions/s", "green")
+
+    with tempfile.TemporaryDirectory() as path:
+        output_path = os.path.join(path, "answers.jsonl")
+        batch, _ = asyncio.run(answer_batch(questions, output_path, args.concurrency))
+        print_colored(f"Batch             : {batch:6.2f}s, {len(questions) / batch:6.1f} questions/s", "green")
+
+        os.remove(output_path)
+        first, answered = asyncio.run(answer_batch(questions, output_path, args.concurrency,
+                                                   stop_after=len(questions) // 2))
+        rest, resumed = asyncio.run(answer_batch(questions, output_path, args.concurrency))
+        with open(output_path, "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        print_colored(f"Interrupted after {answered} answers ({first:.2f}s), resumed with {resumed} more "
+                      f"({rest:.2f}s); output holds {len(lines)} lines for "
+                      f"{len({line['id'] for line in lines})} questions", "green")
+
+
+if __name__ == "__main__":
+    main()
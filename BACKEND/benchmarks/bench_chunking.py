@@ -0,0 +1,136 @@
+"""
+Chunker comparison on the books corpus.
+
+Chunks every PDF in the books directory with the recursive character splitter
+and with the structural legal chunker, and reports:
+- chunk count and indexed characters against the raw page text;
+- chunk boundaries that fall inside a section or mid-sentence;
+- BM25 recall@k on the labelled questions for each chunker;
+- how many cited questions the citation lookup table resolves, and its
+  latency next to a BM25 search.
+
+Usage:
+    python -m benchmarks.bench_chunking
+"""
+import argparse
+import json
+import os
+import time
+from typing import List
+from langchain_core.documents import Document
+from pypdf import PdfReader
+from config.settings import BOOKS_DIR, RETRIEVER_SEARCH_K
+from benchmarks.bench_hybrid_retrieval import QUESTIONS_FILE, first_relevant_rank
+from services.citation_index import CitationIndex
+from services.legal_chunker import CHAPTER_PATTERN, PART_PATTERN, SECTION_PATTERN
+from services.pdf_service import chunk_pages
+from services.sparse_index import BM25Index
+from utils.helpers import print_colored
+
+SENTENCE_ENDINGS = (".", ":", ";", "—", "–", "-")
+
+
+def load_pages(books_dir: str) -> List[List[Document]]:
+    books = []
+    for name in sorted(os.listdir(books_dir)):
+        if name.lower().endswith(".pdf"):
+            reader = PdfReader(os.path.join(books_dir, name))
+            books.append([
+                Document(page_content=page.extract_text() or "", metadata={"book": name, "page": i})
+                for i, page in enumerate(reader.pages)
+            ])
+    return books
+
+
+def body(chunk: Document) -> str:
+    # Structural chunks start with a header line that is not part of the act's text
+    text = chunk.page_content
+    return text.split("\n", 1)[1] if "sections" in chunk.metadata and "\n" in text else text
+
+
+def boundary_stats(chunks: List[Document]):
+    inside_section = mid_sentence = 0
+    for previous, following in zip(chunks, chunks[1:]):
+        if previous.metadata["book"] != following.metadata["book"]:
+            continue
+        first_line = body(following).lstrip().split("\n", 1)[0].strip()
+        if not (SECTION_PATTERN.match(first_line) or CHAPTER_PATTERN.match(first_line)
+                or PART_PATTERN.match(first_line)):
+            inside_section += 1
+        if not body(previous).rstrip().endswith(SENTENCE_ENDINGS):
+            mid_sentence += 1
+    return inside_section, mid_sentence
+
+
+def bm25_recall(chunks: List[Document], labels: List[dict], k: int) -> float:
+    index = BM25Index()
+    index.add_documents(chunks)
+    hits = 0
+    for label in labels:
+        docs = [doc for doc, _ in index.search(label["question"], k)]
+        hits += 1 if first_relevant_rank(docs, label) else 0
+    return hits / len(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", default=BOOKS_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--k", type=int, default=RETRIEVER_SEARCH_K)
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    books = load_pages(args.books)
+    raw = sum(len(page.page_content) for pages in books for page in pages)
+    print_colored(f"{len(books)} books, {sum(len(pages) for pages in books)} pages, {raw:,} characters", "cyan")
+
+    chunked = {}
+    for chunker in ("recursive", "structural"):
+        start = time.perf_counter()
+        chunks = [chunk for pages in books for chunk in chunk_pages(pages, chunker)]
+        elapsed = time.perf_counter() - start
+        chunked[chunker] = chunks
+        size = sum(len(chunk.page_content) for chunk in chunks)
+        inside_section, mid_sentence = boundary_stats(chunks)
+        print_colored(
+            f"{chunker:>10}: {len(chunks)} chunks in {elapsed:.2f}s, {size:,} characters "
+            f"({size / raw - 1:+.1%} vs raw), {inside_section} boundaries inside a section, "
+            f"{mid_sentence} mid-sentence, BM25 recall@{args.k} "
+            f"{bm25_recall(chunks, labels, args.k):.1%}", "green"
+        )
+
+    recursive, structural = chunked["recursive"], chunked["structural"]
+    recursive_size = sum(len(chunk.page_content) for chunk in recursive)
+    structural_size = sum(len(chunk.page_content) for chunk in structural)
+    print_colored(
+        f"Structural index: {1 - len(structural) / len(recursive):.1%} fewer vectors, "
+        f"{1 - structural_size / recursive_size:.1%} fewer characters", "cyan"
+    )
+
+    ids = [str(i) for i in range(len(structural))]
+    citations = CitationIndex.build(ids, [chunk.metadata for chunk in structural])
+    sparse_index = BM25Index()
+    sparse_index.add_documents(structural, ids=ids)
+    sparse_index.search("warm up")
+
+    resolved = 0
+    lookup_seconds = search_seconds = 0.0
+    for label in labels:
+        start = time.perf_counter()
+        docs = sparse_index.get_by_ids(citations.lookup(label["question"])[:args.k])
+        lookup_seconds += time.perf_counter() - start
+        resolved += 1 if first_relevant_rank(docs, label) else 0
+
+        start = time.perf_counter()
+        sparse_index.search(label["question"], args.k)
+        search_seconds += time.perf_counter() - start
+    print_colored(
+        f"Citation lookup: {len(citations)} keys, resolved {resolved}/{len(labels)} cited questions, "
+        f"{lookup_seconds / len(labels) * 1e6:.1f}us per question vs "
+        f"{search_seconds / len(labels) * 1e6:.1f}us for a BM25 search", "green"
+    )
+
+
+if __name__ == "__main__":
+    main()
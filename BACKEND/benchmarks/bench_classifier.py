@@ -0,0 +1,153 @@
+"""
+Cost and agreement of the compiled question classifier against the old keyword scans.
+
+The old classifier lowercased its input and ran `keyword in text` for every
+keyword, and a request ran it three times on the question (retrieval, prompt
+and response style) and once on the whole answer. The new one classifies the
+question once and checks the answer with a single regex search. Reports time
+per call on inputs of several sizes, time per request, and the questions the
+two disagree on.
+
+Usage:
+    python -m benchmarks.bench_classifier --repeat 2000
+"""
+import argparse
+import json
+import time
+from benchmarks.bench_hybrid_retrieval import QUESTIONS_FILE
+from benchmarks.fakes import FAKE_ANSWER
+from services.query_classifier import classify, mentions_legal_terms
+from utils.helpers import print_colored
+
+OLD_LEGAL_KEYWORDS = [
+    "law", "legal", "court", "judge", "case", "ruling", "judgment",
+    "section", "article", "clause", "provision", "statute", "act",
+    "constitution", "rights", "duty", "obligation", "contract",
+    "agreement", "property", "criminal", "civil", "jurisdiction",
+    "appeal", "petition", "writ", "order", "decree", "verdict"
+]
+OLD_STYLE_RULES = [
+    ("summary", ["summarize", "summary", "overview", "brief"]),
+    ("list", ["list", "enumerate", "what are", "what is"]),
+    ("comparison", ["compare", "difference", "versus", "vs"]),
+    ("explanation", ["explain", "how does", "why does"]),
+    ("definition", ["define", "what is the meaning", "what does"]),
+    ("case_ruling", ["case", "ruling", "judgment", "verdict"]),
+    ("legal_reference", ["section", "article", "clause", "provision"]),
+    ("court_composition", ["court", "judge", "bench", "judicial"]),
+]
+
+EXTRA_QUESTIONS = [
+    "Tell me a fact about canvas painting",
+    "Can you give me an overview of the best pizza places?",
+    "In what order should I read these novels?",
+    "What is the difference between a lawyer and an advocate?",
+    "Is it unlawful to record a phone call?",
+    "List the fundamental duties of citizens",
+    "Why does my showcase window fog up?",
+    "Explain the appellate jurisdiction of the Supreme Court",
+]
+
+# Prose without a legal keyword as a whole word, so a search has to read all of it
+NON_LEGAL = ("The painter stretched a fresh canvas and, as a matter of fact, reacted to the light of the "
+             "border town before ordering coffee in the showcase café. ")
+
+
+def old_is_legal(text: str) -> bool:
+    text = text.lower()
+    return any(keyword in text for keyword in OLD_LEGAL_KEYWORDS)
+
+
+def old_style(question: str) -> str:
+    if not old_is_legal(question):
+        return "general"
+    question = question.lower()
+    for style, words in OLD_STYLE_RULES:
+        if any(word in question for word in words):
+            return style
+    return "legal_general"
+
+
+def old_request(question: str, answer: str):
+    old_is_legal(question)
+    old_is_legal(question)
+    old_style(question)
+    old_is_legal(answer)
+
+
+def new_request(question: str, answer: str):
+    classify(question)
+    mentions_legal_terms(answer)
+
+
+def per_call(function, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()] + EXTRA_QUESTIONS
+
+    inputs = [
+        ("question", questions[0]),
+        ("2 KB answer", (FAKE_ANSWER * 4)[:2048]),
+        ("2 KB non-legal", (NON_LEGAL * 20)[:2048]),
+        ("40 KB non-legal", (NON_LEGAL * 400)[:40960]),
+    ]
+    for label, text in inputs:
+        repeat = max(10, args.repeat * 60 // len(text))
+        old = per_call(old_is_legal, text, repeat)
+        old_classify = per_call(old_style, text, repeat)
+        new = per_call(classify, text, repeat)
+        search = per_call(mentions_legal_terms, text, repeat)
+        print_colored(f"{label:>16}: old keyword scan {old * 1e6:8.1f}us, old classify {old_classify * 1e6:8.1f}us, "
+                      f"classify {new * 1e6:8.1f}us, legal search {search * 1e6:8.1f}us", "green")
+
+    answer = FAKE_ANSWER * 3
+    long_question = FAKE_ANSWER.replace("\n", " ") + " Summarize how this applies to my case."
+    repeat = args.repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            old_style(question)
+    old = (time.perf_counter() - start) / (repeat * len(questions))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            classify(question)
+    new = (time.perf_counter() - start) / (repeat * len(questions))
+    print_colored(f"Classifying the {len(questions)} questions: old keyword scans {old * 1e6:.1f}us, "
+                  f"classify {new * 1e6:.1f}us", "green")
+
+    for label, bank in (("short questions", questions), (f"{len(long_question)} character question", [long_question])):
+        repeat = args.repeat * len(questions) // len(bank)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for question in bank:
+                old_request(question, answer)
+        old = (time.perf_counter() - start) / (repeat * len(bank))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for question in bank:
+                new_request(question, answer)
+        new = (time.perf_counter() - start) / (repeat * len(bank))
+        print_colored(f"Per request, {label} and a {len(answer)} character answer: old {old * 1e6:.1f}us, "
+                      f"new {new * 1e6:.1f}us", "green")
+
+    disagreements = [(question, (old_is_legal(question), old_style(question)), tuple(classify(question)))
+                     for question in questions
+                     if (old_is_legal(question), old_style(question)) != tuple(classify(question))]
+    print_colored(f"{len(questions) - len(disagreements)}/{len(questions)} questions classified the same", "cyan")
+    for question, old_result, new_result in disagreements:
+        print_colored(f"  {question!r}: old {old_result}, new {new_result}", "cyan")
+
+
+if __name__ == "__main__":
+    main()
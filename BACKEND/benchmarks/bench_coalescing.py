@@ -0,0 +1,96 @@
+"""
+Identical questions asked at once, with and without request coalescing.
+
+Asks the same question from --requests concurrent clients, each in its own
+session, through the /api/ask pipeline (aget_llm_answer) and the streaming
+pipeline (astream_llm_response), against a fake LLM and retriever. Half of
+the streaming clients join while the answer is already streaming. Reports
+the LLM calls and retrievals made, the time until every client had its
+answer, and checks that every client got the full answer and its own
+history turn.
+
+Usage:
+    python -m benchmarks.bench_coalescing --requests 50 --delay 1.0
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from benchmarks.bench_async_ask import QUESTION
+from benchmarks.fakes import FakeLLM, FakeRetriever
+from services import container, llm_service
+from services.coalescing import RequestCoalescer
+from services.concurrency import ConcurrencyLimiter
+from services.history_store import HistoryStore
+from utils.helpers import print_colored
+
+
+async def ask_all(total: int) -> list:
+    """Ask QUESTION from `total` clients at once and return their answers"""
+    answers = await asyncio.gather(*(llm_service.aget_llm_answer(QUESTION, session_id=f"ask{i}")
+                                     for i in range(total)))
+    return [answer.text for answer in answers]
+
+
+async def stream_all(total: int, delay: float) -> list:
+    """Stream QUESTION to `total` clients, half of them joining halfway through the answer"""
+    async def client(i: int) -> str:
+        if i % 2:
+            await asyncio.sleep(delay / 2)
+        fragments = llm_service.astream_llm_response(QUESTION, session_id=f"stream{i}")
+        return "".join([fragment async for fragment in fragments])
+    return await asyncio.gather(*(client(i) for i in range(total)))
+
+
+def run(mode: str, coalescing: bool, total: int, delay: float, concurrency: int):
+    """Answer `total` identical questions in one mode; return LLM calls, retrievals, seconds, answers and history turns"""
+    llm, retriever = FakeLLM(delay=delay), FakeRetriever()
+    history = HistoryStore(os.path.join(tempfile.mkdtemp(), "history.sqlite"))
+    container.override("llm", llm)
+    container.override("retriever", retriever)
+    container.override("history_store", history)
+    container.override("request_coalescer", RequestCoalescer() if coalescing else None)
+    llm_service.request_limiter = ConcurrencyLimiter(concurrency, total)
+
+    start = time.perf_counter()
+    answers = asyncio.run(ask_all(total) if mode == "ask" else stream_all(total, delay))
+    seconds = time.perf_counter() - start
+    recorded = sum(history.count(f"{mode}{i}") for i in range(total))
+    history.close()
+    return llm.calls, retriever.calls, seconds, answers, recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Identical questions asked at once")
+    parser.add_argument("--delay", type=float, default=1.0, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests answered at the same time")
+    args = parser.parse_args()
+
+    # Every client asks the same question, so the cache would answer all but the first
+    container.override("answer_cache", None)
+    llm_service.print_colored = lambda *args, **kwargs: None
+
+    print_colored(f"{args.requests} identical questions, fake LLM delay {args.delay:.2f}s, "
+                  f"{args.concurrency} requests answered at a time", "cyan")
+    failed = False
+    for mode in ("ask", "stream"):
+        for coalescing in (False, True):
+            calls, retrievals, seconds, answers, recorded = run(
+                mode, coalescing, args.requests, args.delay, args.concurrency)
+            complete = sum(answer == answers[0] and "Murder" in answer for answer in answers)
+            label = f"{mode} {'coalesced' if coalescing else 'separate'}"
+            print_colored(f"  {label:16s}: {calls:3d} LLM calls, {retrievals:3d} retrievals, all answered in "
+                          f"{seconds:6.2f}s; {complete}/{args.requests} full answers, "
+                          f"{recorded}/{args.requests} history turns", "green")
+            failed |= complete != args.requests or recorded != args.requests
+            failed |= coalescing and (calls, retrievals) != (1, 1)
+    if failed:
+        print_colored("Coalescing did not give every client the answer of exactly one LLM call", "red")
+        raise SystemExit(1)
+    print_colored("✓ With coalescing, every client got the answer of exactly one LLM call", "cyan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Prompt size and answer latency with and without context packing.
+
+Indexes the books with the chosen chunker, retrieves the top-k chunks for
+every labelled question in legal_questions.jsonl with hybrid retrieval
+(hashing embeddings plus BM25), and builds the context either by joining the
+chunks as retrieved or with pack_context under a token budget. Reports the
+estimated context tokens, how often the labelled section is still in the
+context, and the end-to-end latency of get_llm_response against a fake LLM
+that charges a fixed delay per call plus a delay per prompt token.
+
+Usage:
+    python -m benchmarks.bench_context_packing --chunker recursive --k 5 10 --budget 3000 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from benchmarks.bench_hybrid_retrieval import QUESTIONS_FILE, is_relevant, load_chunks
+from benchmarks.fakes import FakeLLM
+from config.settings import BOOKS_DIR, CHUNKER
+from services import container, llm_service
+from services.context_packer import estimate_tokens, pack_context
+from services.embeddings import HashingEmbeddings
+from services.history_store import HistoryStore
+from services.hybrid_retriever import HybridRetriever
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+from services.vector_db_service import create_retriever
+from utils.helpers import print_colored
+
+
+class TokenPricedLLM(FakeLLM):
+    """
+    Fake LLM whose latency grows with the prompt, like prefill on a real model.
+
+    Args:
+        delay (float): Seconds per call
+        per_token (float): Seconds per estimated prompt token
+    """
+
+    def __init__(self, delay: float, per_token: float):
+        super().__init__(delay=delay)
+        self.base_delay = delay
+        self.per_token = per_token
+        self.prompt_tokens = 0
+
+    def _price(self, messages):
+        tokens = sum(estimate_tokens(message.content) for message in messages)
+        self.prompt_tokens += tokens
+        self.delay = self.base_delay + tokens * self.per_token
+
+    def invoke(self, messages):
+        self._price(messages)
+        return super().invoke(messages)
+
+    async def ainvoke(self, messages):
+        self._price(messages)
+        return await super().ainvoke(messages)
+
+
+class RecordedRetriever:
+    """Returns the chunks retrieved earlier for each question, so every run packs the same chunks"""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+
+    def get_relevant_documents(self, question):
+        return self.answers[question]
+
+    def invoke(self, question, **search):
+        return self.answers[question]
+
+    async def ainvoke(self, question, **search):
+        return self.answers[question]
+
+
+def join_unpacked(docs, budget_tokens=0):
+    """The context as built before packing: chunks joined by newlines"""
+    return SimpleNamespace(text="\n".join(doc.page_content for doc in docs))
+
+
+def mentions_label(context: str, docs, label: dict) -> bool:
+    # The labelled chunk counts as kept when its opening text made it into the context
+    return any(is_relevant(doc, label) and doc.page_content.strip()[:200] in context for doc in docs)
+
+
+def answer_all(labels, packer, llm):
+    llm_service.pack_context = packer
+    llm.prompt_tokens = 0
+    latencies = []
+    for label in labels:
+        start = time.perf_counter()
+        llm_service.get_llm_response(label["question"], session_id="bench")
+        latencies.append(time.perf_counter() - start)
+    llm_service.pack_context = pack_context
+    latencies.sort()
+    return llm.prompt_tokens / len(labels), statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", default=BOOKS_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--chunker", choices=["structural", "recursive"], default=CHUNKER)
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--budget", type=int, nargs="+", default=[3000, 1500], help="Context token budgets")
+    parser.add_argument("--delay", type=float, default=0.3, help="Fake LLM seconds per call")
+    parser.add_argument("--per-token-ms", type=float, default=0.2, help="Fake LLM milliseconds per prompt token")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    docs, ids = load_chunks(args.books, args.chunker)
+    embeddings = HashingEmbeddings()
+    backend = get_backend()
+    with tempfile.TemporaryDirectory() as db_path:
+        backend.save(backend.create(docs, embeddings, ids=ids, path=db_path), db_path)
+        vector_retriever = create_retriever(backend.load(db_path, embeddings))
+    sparse_index = BM25Index()
+    sparse_index.add_documents(docs, ids=ids)
+    print_colored(f"{len(docs)} {args.chunker} chunks, {len(labels)} labelled questions, fake LLM "
+                  f"{args.delay:.2f}s + {args.per_token_ms:.2f}ms per prompt token", "cyan")
+
+    llm = TokenPricedLLM(args.delay, args.per_token_ms / 1000)
+    container.override("llm", llm)
+    container.override("history_store", HistoryStore(os.path.join(tempfile.mkdtemp(), "history.sqlite")))
+    container.override("answer_cache", None)
+    llm_service.print_colored = lambda *args, **kwargs: None
+
+    for k in args.k:
+        retriever = HybridRetriever(vector_retriever=vector_retriever, sparse_index=sparse_index, k=k)
+        retrieved = [retriever.invoke(label["question"]) for label in labels]
+        container.override("retriever", RecordedRetriever(
+            {label["question"]: found for label, found in zip(labels, retrieved)}
+        ))
+
+        joined = [join_unpacked(found).text for found in retrieved]
+        kept = sum(mentions_label(text, found, label) for text, found, label in zip(joined, retrieved, labels))
+        prompt, p50, p95 = answer_all(labels, join_unpacked, llm)
+        print_colored(f"k={k:>2} unpacked      : context {statistics.mean(map(estimate_tokens, joined)):7.0f} "
+                      f"tokens, labelled section in {kept}/{len(labels)}, prompt {prompt:7.0f} tokens, "
+                      f"p50 {p50 * 1000:6.1f}ms, p95 {p95 * 1000:6.1f}ms", "green")
+
+        for budget in [0] + args.budget:
+            packed = [pack_context(found, budget) for found in retrieved]
+            kept = sum(mentions_label(result.text, found, label)
+                       for result, found, label in zip(packed, retrieved, labels))
+            prompt, p50, p95 = answer_all(labels, lambda found, budget_tokens=budget: pack_context(found, budget), llm)
+            print_colored(f"k={k:>2} packed {budget or 'no cap':>6}: context "
+                          f"{statistics.mean(result.packed_tokens for result in packed):7.0f} tokens, labelled "
+                          f"section in {kept}/{len(labels)}, prompt {prompt:7.0f} tokens, p50 {p50 * 1000:6.1f}ms, "
+                          f"p95 {p95 * 1000:6.1f}ms", "green")
+
+
+if __name__ == "__main__":
+    main()
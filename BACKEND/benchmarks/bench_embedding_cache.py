@@ -0,0 +1,55 @@
+"""
+Index rebuild benchmark for the persistent embedding cache.
+
+Builds embeddings for a synthetic three-book corpus, then rebuilds after one
+book changes, and reports the cache hit rate and time saved on the rebuild.
+
+Usage:
+    python -m benchmarks.bench_embedding_cache --chunks-per-book 500
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.fakes import FakeEmbeddings
+from services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from utils.helpers import print_colored
+
+
+def make_book(book: int, chunks: int, edition: int = 0):
+    return [f"Book {book} edition {edition} section {i}: the provisions of this chapter apply."
+            for i in range(chunks)]
+
+
+def build(store: EmbeddingStore, corpus) -> CachedEmbeddings:
+    embeddings = CachedEmbeddings(FakeEmbeddings(), store, "fake-embedding")
+    start = time.perf_counter()
+    embeddings.embed_documents(corpus)
+    print_colored(f"  build took {time.perf_counter() - start:.2f}s", "yellow")
+    embeddings.report()
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks-per-book", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(os.path.join(tmp, "embedding_cache.sqlite"))
+        books = [make_book(book, args.chunks_per_book) for book in range(3)]
+
+        print_colored("Initial build:", "cyan")
+        build(store, [chunk for book in books for chunk in book])
+
+        print_colored("Rebuild after one book changed:", "cyan")
+        books[1] = make_book(1, args.chunks_per_book, edition=1)
+        build(store, [chunk for book in books for chunk in book])
+
+        print_colored("Rebuild with nothing changed:", "cyan")
+        build(store, [chunk for book in books for chunk in book])
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
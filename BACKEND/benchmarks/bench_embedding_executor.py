@@ -0,0 +1,79 @@
+"""
+Embedding executor benchmark against the fake embedding server.
+
+Compares one-request-per-batch sequential embedding with BatchedEmbeddings
+under injected latency and errors, then interrupts a checkpointed build with
+a simulated outage and shows that the next run resumes from the store.
+
+Usage:
+    python -m benchmarks.bench_embedding_executor --texts 2000 --latency 0.1 --error-rate 0.1
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.fake_embedding_server import FakeEmbeddingServer, HttpEmbeddings
+from services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from services.embedding_executor import BatchedEmbeddings
+from utils.helpers import print_colored
+
+
+def make_texts(count: int):
+    return [f"Section {i}. The provisions of this section apply to offence {i}." for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rps", type=float, default=50.0)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    server = FakeEmbeddingServer(latency=args.latency, error_rate=args.error_rate).start()
+
+    for concurrency in args.concurrency:
+        executor = BatchedEmbeddings(
+            HttpEmbeddings(server.url), batch_size=args.batch_size, max_concurrency=concurrency,
+            requests_per_second=args.rps, backoff_base=0.05, backoff_max=1.0
+        )
+        start = time.perf_counter()
+        vectors = executor.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+        assert len(vectors) == len(texts)
+        print_colored(f"concurrency {concurrency:>2}: {len(texts) / elapsed:8.1f} texts/s, "
+                      f"{executor.requests} requests, {executor.retries} retries", "green")
+
+    # Interrupted build: the server goes down halfway through
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(os.path.join(tmp, "embedding_cache.sqlite"))
+        requests_per_run = -(-args.texts // args.batch_size)
+        outage = FakeEmbeddingServer(latency=args.latency, fail_after=requests_per_run // 2).start()
+
+        def build(url):
+            remote = BatchedEmbeddings(HttpEmbeddings(url), batch_size=args.batch_size,
+                                       max_concurrency=4, requests_per_second=args.rps,
+                                       max_retries=2, backoff_base=0.01)
+            return CachedEmbeddings(remote, store, "fake", checkpoint_size=args.batch_size * 4)
+
+        first = build(outage.url)
+        try:
+            first.embed_documents(texts)
+        except Exception as e:
+            print_colored(f"first build interrupted: {e}", "yellow")
+        outage.shutdown()
+
+        second = build(server.url)
+        second.embed_documents(texts)
+        stats = second.stats()
+        print_colored(f"resumed build: {stats['hits']} texts restored from checkpoint, "
+                      f"{stats['misses']} embedded", "green")
+        store.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput of the single-pass response formatter against the old one.
+
+The old formatter (copied below) replaced bold markers, split the whole
+answer on blank lines, built the text by repeated concatenation, and split it
+on sentences twice for the summary-style layouts. The new one splits once and
+also returns the answer as sections. Answers of 2k to 20k characters are
+formatted in the legal section layout, a summary layout and the general
+layout; reports MB/s for both and checks that their text is identical, also
+on a few thousand random answers.
+
+Usage:
+    python -m benchmarks.bench_formatter --repeat 2000
+"""
+import argparse
+import random
+import re
+import time
+from benchmarks.fakes import FAKE_ANSWER
+from services.query_classifier import mentions_legal_terms
+from services.response_formatter import STYLE_HEADINGS, format_response
+from utils.helpers import print_colored
+
+SIZES = (2000, 5000, 10000, 20000)
+STYLES = ("general", "legal_general") + tuple(STYLE_HEADINGS)
+
+# An answer without legal keywords, so legal styles get the summary-style layout
+PLAIN_ANSWER = ("The **first step** is to gather the documents. Then compare the dates on each page. "
+                "Keep a copy of everything you send.\n- Write down the names\n- Note the deadlines\n\n")
+
+
+def old_format_legal_sections(response_text):
+    sections = response_text.split("\n\n")
+    formatted_sections = {
+        "title": "📌 Title", "section": "📜 Legal Section", "analyze": "🔍 Analysis",
+        "description": "📝 Description", "implications": "⚖️ Legal Implications",
+        "references": "📚 References", "conclusion": "🎯 Conclusion",
+    }
+    for i, section in enumerate(sections):
+        if i < len(formatted_sections):
+            key = list(formatted_sections)[i]
+            formatted_sections[key] = f"{formatted_sections[key]}\n{section}"
+    return formatted_sections
+
+
+def old_format(response_text, style):
+    response_text = re.sub(r'\*\*(.*?)\*\*', r'🔹\1🔹', response_text)
+    if style == "general":
+        return f"\n👋 Response 👋\n{response_text}\n"
+    if mentions_legal_terms(response_text):
+        separator = "═" * 50 + "\n"
+        formatted_response = "\n" + separator
+        for section_content in old_format_legal_sections(response_text).values():
+            if section_content != "📌 Title":
+                formatted_response += f"{section_content}\n{separator}"
+        return formatted_response
+
+    main, points_heading = STYLE_HEADINGS.get(style, STYLE_HEADINGS["summary"])
+    main_content = f"{main}\n{{content}}\n".format(content=response_text)
+    if style == "list":
+        items = [item.strip() for item in response_text.split("\n") if item.strip()]
+        points = "• " + "\n• ".join(items[1:])
+    else:
+        points = "• " + "\n• ".join(response_text.split(". ")[:3])
+    points_content = f"{points_heading}\n{points}\n"
+    conclusion = "• " + "\n• ".join(response_text.split(". ")[-3:])
+    conclusion_content = f"🎯 Conclusion\n{conclusion}\n"
+    separator = "═" * 50 + "\n"
+    return f"\n{separator}{main_content}{separator}{points_content}{separator}{conclusion_content}{separator}"
+
+
+def sized(text: str, size: int) -> str:
+    return (text * (size // len(text) + 1))[:size]
+
+
+def random_answer(rng: random.Random) -> str:
+    pieces = ["**", "*", "\n", "\n\n", ". ", " court ", "law", " - item", "{x}", "🔹", " the fact ", "word", " "]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 120)))
+
+
+def throughput(function, text: str, style: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(text, style)
+    return len(text) * repeat / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    samples = [(random_answer(rng), style) for _ in range(5000) for style in (rng.choice(STYLES),)]
+    samples += [(sized(text, size), style) for text in (FAKE_ANSWER, PLAIN_ANSWER)
+                for size in SIZES for style in STYLES]
+    same = sum(old_format(text, style) == format_response(text, style).text for text, style in samples)
+    print_colored(f"Identical text for {same}/{len(samples)} answers", "cyan")
+
+    layouts = (("legal sections", FAKE_ANSWER, "case_ruling"), ("summary layout", PLAIN_ANSWER, "summary"),
+               ("list layout", PLAIN_ANSWER, "list"), ("general", FAKE_ANSWER, "general"))
+    for label, text, style in layouts:
+        for size in SIZES:
+            answer = sized(text, size)
+            repeat = max(10, args.repeat * 2000 // size)
+            old = throughput(old_format, answer, style, repeat)
+            new = throughput(lambda text, style: format_response(text, style), answer, style, repeat)
+            print_colored(f"{label:>15} {size:6d} chars: old {old:7.1f} MB/s, new {new:7.1f} MB/s "
+                          f"({new / old:.2f}x)", "green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-request history write cost as the history grows.
+
+Compares rewriting the whole history with pickle on every answer (the old
+behaviour) with HistoryStore.append, at history sizes up to 1M turns.
+
+Usage:
+    python -m benchmarks.bench_history_store --max-turns 1000000
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from services.history_store import HistoryStore
+from utils.helpers import print_colored
+
+ANSWER = "📌 Title\nSection 103 of the Bharatiya Nyaya Sanhita deals with murder. " * 4
+SAMPLES = 200
+
+
+def pickle_cost(path: str, history: list) -> float:
+    """Seconds for one save_history-style rewrite of the whole history"""
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        pickle.dump(history, f)
+    return time.perf_counter() - start
+
+
+def append_cost(store: HistoryStore, turn: int) -> float:
+    """Mean seconds per append, measured over SAMPLES appends"""
+    start = time.perf_counter()
+    for i in range(SAMPLES):
+        store.append(f"Question {turn + i}?", ANSWER, session_id=f"session-{(turn + i) % 500}")
+    return (time.perf_counter() - start) / SAMPLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-turns", type=int, default=1000000)
+    parser.add_argument("--max-pickle-turns", type=int, default=100000,
+                        help="Largest history the pickle path is timed at")
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (1000, 10000, 100000, 1000000, 10000000) if n <= args.max_turns]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.sqlite"), batch_size=1024,
+                             max_turns_per_session=0)
+        pickle_path = os.path.join(tmp, "history.pkl")
+        history = []
+        turns = 0
+
+        for checkpoint in checkpoints:
+            fill_start = time.perf_counter()
+            filled = checkpoint - turns
+            while turns < checkpoint:
+                store.append(f"Question {turns}?", ANSWER, session_id=f"session-{turns % 500}")
+                if checkpoint <= args.max_pickle_turns:
+                    history.append((f"Question {turns}?", ANSWER))
+                turns += 1
+            store.flush()
+            fill_rate = filled / (time.perf_counter() - fill_start)
+
+            store_cost = append_cost(store, turns)
+            store.flush()
+            line = f"{checkpoint:>9} turns: append {store_cost * 1e6:8.1f} us"
+            if checkpoint <= args.max_pickle_turns:
+                line += f", pickle rewrite {pickle_cost(pickle_path, history) * 1e3:9.1f} ms"
+            print_colored(f"{line}  (store sustained {fill_rate:,.0f} turns/s)", "green")
+
+        print_colored(f"history database: {os.path.getsize(os.path.join(tmp, 'history.sqlite')) / 1e6:.1f} MB", "cyan")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
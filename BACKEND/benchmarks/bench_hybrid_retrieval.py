@@ -0,0 +1,140 @@
+"""
+Retrieval recall benchmark on the books corpus.
+
+Indexes every PDF in the books directory, then asks the labelled questions in
+legal_questions.jsonl with vector, BM25 and hybrid retrieval. A question
+counts as recalled when any of the top-k chunks holds its labelled section
+(or, for chunks without section metadata, comes from a labelled page).
+Reports recall@k, mean reciprocal rank and query latency.
+
+Dense vectors come from the offline hashing embeddings unless --google is
+given, in which case the document and query embeddings of the real index are
+used (GOOGLE_API_KEY required).
+
+Usage:
+    python -m benchmarks.bench_hybrid_retrieval
+    python -m benchmarks.bench_hybrid_retrieval --google
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+from langchain_core.documents import Document
+from config.settings import BOOKS_DIR, CHUNKER, RETRIEVER_SEARCH_K
+from services.embeddings import HashingEmbeddings
+from services.hybrid_retriever import HybridRetriever
+from services.ingestion import chunk_ids_for, scan_books
+from services.pdf_service import iter_pdf_chunks
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+from services.vector_db_service import create_retriever
+from utils.helpers import print_colored
+
+QUESTIONS_FILE = os.path.join(os.path.dirname(__file__), "legal_questions.jsonl")
+
+
+def load_chunks(books_dir: str, chunker: str = CHUNKER):
+    books = scan_books(books_dir)
+    names = {os.path.join(books_dir, name): name for name in books}
+    docs, ids = [], []
+    for result in sorted(iter_pdf_chunks(list(names), chunker=chunker), key=lambda r: (r.shard.path, r.shard.start)):
+        name = names[result.shard.path]
+        for doc in result.docs:
+            doc.metadata["book"] = name
+        docs.extend(result.docs)
+        ids.extend(chunk_ids_for(name, books[name], result.docs))
+    return docs, ids
+
+
+def is_relevant(doc: Document, label: dict) -> bool:
+    if doc.metadata.get("book") != label["book"]:
+        return False
+    sections = doc.metadata.get("sections")
+    if sections is not None:
+        return label["section"] in sections.split(",")
+    return doc.metadata.get("page") in label["pages"]
+
+
+def first_relevant_rank(docs: List[Document], label: dict) -> int:
+    for rank, doc in enumerate(docs, start=1):
+        if is_relevant(doc, label):
+            return rank
+    return 0
+
+
+def evaluate(name: str, retriever, labels: List[dict], k: int):
+    latencies, ranks = [], []
+    for label in labels:
+        start = time.perf_counter()
+        docs = retriever.invoke(label["question"])[:k]
+        latencies.append(time.perf_counter() - start)
+        ranks.append(first_relevant_rank(docs, label))
+    recall = sum(1 for rank in ranks if rank) / len(labels)
+    mrr = sum(1.0 / rank for rank in ranks if rank) / len(labels)
+    latencies.sort()
+    print_colored(
+        f"{name:>7}: recall@{k} {recall:.1%}, MRR {mrr:.3f}, "
+        f"p50 {statistics.median(latencies) * 1000:.2f}ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f}ms", "green"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", default=BOOKS_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--k", type=int, default=RETRIEVER_SEARCH_K)
+    parser.add_argument("--google", action="store_true", help="use the Google embedding models")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    docs, ids = load_chunks(args.books)
+    print_colored(f"Extracted {len(docs)} chunks in {time.perf_counter() - start:.2f}s", "cyan")
+
+    if args.google:
+        from services.container import get_query_embeddings
+        from services.vector_db_service import create_document_embeddings
+        document_embeddings, query_embeddings = create_document_embeddings(), get_query_embeddings()
+    else:
+        document_embeddings = query_embeddings = HashingEmbeddings()
+
+    backend = get_backend()
+    with tempfile.TemporaryDirectory() as db_path:
+        start = time.perf_counter()
+        backend.save(backend.create(docs, document_embeddings, ids=ids, path=db_path), db_path)
+        vector_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sparse_index = BM25Index()
+        sparse_index.add_documents(docs, ids=ids)
+        sparse_index.save(db_path)
+        sparse_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sparse_index = BM25Index.load(db_path, read_only=True)
+        sparse_load = time.perf_counter() - start
+        vector_retriever = create_retriever(backend.load(db_path, query_embeddings))
+        postings_path = os.path.join(db_path, BM25Index.POSTINGS_DIR)
+        sparse_bytes = os.path.getsize(os.path.join(db_path, BM25Index.DOCS_FILE)) + sum(
+            os.path.getsize(os.path.join(postings_path, name)) for name in os.listdir(postings_path))
+
+    print_colored(
+        f"{backend.name} index built in {vector_build:.2f}s; BM25 index built in {sparse_build:.2f}s, "
+        f"loaded in {sparse_load * 1000:.1f}ms, {sparse_bytes / 2 ** 20:.1f} MiB on disk", "cyan"
+    )
+    print_colored(f"{len(labels)} labelled questions, "
+                  f"{'Google' if args.google else 'hashing'} embeddings", "cyan")
+    evaluate("vector", vector_retriever, labels, args.k)
+    evaluate("bm25", HybridRetriever(sparse_index=sparse_index, k=args.k), labels, args.k)
+    evaluate("hybrid", HybridRetriever(vector_retriever=vector_retriever, sparse_index=sparse_index, k=args.k),
+             labels, args.k)
+
+
+if __name__ == "__main__":
+    main()
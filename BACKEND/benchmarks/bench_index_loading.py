@@ -0,0 +1,124 @@
+"""
+Index loading benchmark for several server workers.
+
+Saves the same synthetic FAISS index in the pickled FAISS.save_local format
+and in the current format (index.faiss plus the SQLite chunk store), then
+starts several fresh worker processes per format, each of which loads the
+index and answers a few queries. Reports load time per worker and the
+proportional set size (PSS) of the workers, which counts shared pages once
+across them, so it is the memory the workers really cost together.
+
+Usage:
+    python -m benchmarks.bench_index_loading --chunks 20000 100000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from services.embeddings import HashingEmbeddings
+from utils.helpers import print_colored
+
+CHUNK_TEXT = "Whoever commits the offence described in this section shall be punished with imprisonment. " * 12
+QUERIES = 20
+
+
+def pss_bytes() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def build(path: str, chunks: int, dim: int, legacy: bool):
+    from services.vector_backends import get_backend
+
+    vectors = np.random.default_rng(0).random((chunks, dim), dtype=np.float32)
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    ids = [str(i) for i in range(chunks)]
+    docs = [Document(page_content=f"{CHUNK_TEXT}{i}", metadata={"page": i, "book": "synthetic.pdf"})
+            for i in range(chunks)]
+    store = FAISS(HashingEmbeddings(dim), index, InMemoryDocstore(dict(zip(ids, docs))), dict(enumerate(ids)))
+    if legacy:
+        store.save_local(path)
+    else:
+        get_backend("faiss").save(store, path)
+
+
+def worker(path: str, dim: int, legacy: bool, ready, done, results):
+    from services.vector_backends import get_backend
+
+    start = time.perf_counter()
+    if legacy:
+        store = FAISS.load_local(path, HashingEmbeddings(dim), allow_dangerous_deserialization=True)
+    else:
+        store = get_backend("faiss").load(path, HashingEmbeddings(dim), read_only=True)
+    load = time.perf_counter() - start
+
+    rng = np.random.default_rng(os.getpid())
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        store.similarity_search_by_vector(rng.random(dim).tolist(), k=5)
+    query = (time.perf_counter() - start) / QUERIES
+
+    # Measure only once every worker has loaded, so shared pages are split between all of them
+    ready.wait()
+    results.append({"load": load, "query": query, "pss": pss_bytes()})
+    done.wait()
+
+
+def run_workers(path: str, dim: int, legacy: bool, workers: int):
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    results = manager.list()
+    ready, done = context.Barrier(workers + 1), context.Barrier(workers + 1)
+    processes = [context.Process(target=worker, args=(path, dim, legacy, ready, done, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    ready.wait()
+    while len(results) < workers:
+        time.sleep(0.01)
+    done.wait()
+    for process in processes:
+        process.join()
+    return list(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for chunks in args.chunks:
+        print_colored(f"{chunks:,} chunks of {len(CHUNK_TEXT)} characters, {args.dim}-d vectors "
+                      f"({chunks * args.dim * 4 / 2 ** 20:.0f} MiB), {args.workers} workers", "cyan")
+        for legacy in (True, False):
+            with tempfile.TemporaryDirectory() as path:
+                builder = context.Process(target=build, args=(path, chunks, args.dim, legacy))
+                builder.start()
+                builder.join()
+                results = run_workers(path, args.dim, legacy, args.workers)
+            loads = [r["load"] for r in results]
+            print_colored(
+                f"{'pickled docstore' if legacy else 'mmap + sqlite':>17}: load p50 "
+                f"{statistics.median(loads) * 1000:8.1f}ms, max {max(loads) * 1000:8.1f}ms, query "
+                f"{statistics.median(r['query'] for r in results) * 1000:6.2f}ms, PSS per worker "
+                f"{statistics.mean(r['pss'] for r in results) / 2 ** 20:6.0f} MiB, all workers "
+                f"{sum(r['pss'] for r in results) / 2 ** 20:6.0f} MiB", "green"
+            )
+
+
+if __name__ == "__main__":
+    main()
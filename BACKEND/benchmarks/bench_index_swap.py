@@ -0,0 +1,195 @@
+"""
+Latency of /api/ask while the server swaps between index versions.
+
+Builds two versions of an index of --chunks chunks (the books' chunks,
+repeated) with a random static local embedding model, starts the API under
+uvicorn with a fake LLM, and keeps --clients clients asking questions from
+legal_questions.jsonl. After --seconds of steady answering, the versions
+are swapped every --swap-interval seconds for another --seconds through
+POST /api/admin/index/rollback, which loads the other version in the
+background and swaps it in. Reports latency in both phases, the time each
+version took to load and any request that failed.
+
+Usage:
+    python -m benchmarks.bench_index_swap --chunks 20000 --swap-interval 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from utils.helpers import print_colored
+
+QUESTIONS_FILE = os.path.join(os.path.dirname(__file__), "legal_questions.jsonl")
+ADMIN_TOKEN = "benchmark-admin-token"
+
+
+def create_app():
+    """App factory for the uvicorn server; settings come from BENCH_* variables"""
+    os.environ["INITIALIZE_APP"] = "false"
+    from benchmarks.fakes import FakeLLM
+    from services import container, llm_service
+    from main import app
+
+    container.override("llm", FakeLLM(delay=float(os.environ["BENCH_LLM_DELAY"])))
+    # Questions repeat, so caching or coalescing would hide the retrieval cost
+    container.override("answer_cache", None)
+    container.override("request_coalescer", None)
+    container.get_retriever()
+    llm_service.print_colored = lambda *args, **kwargs: None
+    return app
+
+
+def build_versions(books_dir: str, root: str, model_dir: str, chunks: int) -> list:
+    """Publish two index versions of `chunks` chunks; the second has every chunk under new ids"""
+    from langchain_core.documents import Document
+    from benchmarks.bench_hybrid_retrieval import load_chunks
+    from benchmarks.bench_local_embeddings import build_static_model
+    from services.citation_index import CitationIndex
+    from services.index_versions import create_version, index_lock, publish_version
+    from services.local_embeddings import LocalEmbeddings, load_local_model
+    from services.sparse_index import BM25Index
+    from services.vector_backends import get_backend
+
+    book_docs, book_ids = load_chunks(books_dir)
+    build_static_model(model_dir, [doc.page_content for doc in book_docs])
+    embeddings = LocalEmbeddings(load_local_model(model_dir))
+    backend = get_backend("faiss")
+    versions = []
+    for copy in ("a", "b"):
+        docs = [Document(page_content=book_docs[i % len(book_docs)].page_content,
+                         metadata=dict(book_docs[i % len(book_docs)].metadata)) for i in range(chunks)]
+        ids = [f"{copy}{i // len(book_ids)}:{book_ids[i % len(book_ids)]}" for i in range(chunks)]
+        with index_lock(root):
+            version, path = create_version(root)
+            backend.save(backend.train(backend.create(docs, embeddings, ids=ids, path=path)), path)
+            sparse_index = BM25Index()
+            sparse_index.add_documents(docs, ids=ids)
+            sparse_index.save(path)
+            CitationIndex.build(ids, [doc.metadata for doc in docs]).save(path)
+            publish_version(root, version)
+        versions.append(version)
+    return versions
+
+
+def request_json(port: int, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method,
+                                     headers={"X-Admin-Token": ADMIN_TOKEN})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+def wait_ready(port: int, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request_json(port, "/ready")["index"]["status"] == "ready":
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("The server did not become ready")
+
+
+async def ask_loop(port: int, questions: list, stop: asyncio.Event, times: list, failures: list):
+    """Ask questions over one keep-alive connection until stopped, recording (start, seconds)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while not stop.is_set():
+            body = json.dumps({"question": questions[i % len(questions)]}).encode()
+            i += 1
+            start = time.perf_counter()
+            writer.write(b"POST /api/ask HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+            await reader.readexactly(length)
+            if not head.startswith(b"HTTP/1.1 200"):
+                failures.append(head.splitlines()[0].decode())
+            times.append((start, time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+async def run(port: int, questions: list, versions: list, clients: int, seconds: float, swap_interval: float):
+    stop = asyncio.Event()
+    times, failures, loads = [], [], []
+    askers = [asyncio.create_task(ask_loop(port, questions, stop, times, failures)) for _ in range(clients)]
+    await asyncio.sleep(seconds)
+
+    swap_start = time.perf_counter()
+    swaps = 0
+    while time.perf_counter() - swap_start < seconds:
+        version = versions[swaps % 2]
+        await asyncio.to_thread(request_json, port, f"/api/admin/index/rollback?version={version}", "POST")
+        status = await asyncio.to_thread(request_json, port, "/ready")
+        loads.append(status["index"]["load_seconds"])
+        swaps += 1
+        await asyncio.sleep(swap_interval)
+    stop.set()
+    await asyncio.gather(*askers)
+    steady = [seconds for start, seconds in times if start < swap_start]
+    swapping = [seconds for start, seconds in times if start >= swap_start]
+    return steady, swapping, loads, failures
+
+
+def report(phase: str, latencies: list):
+    latencies.sort()
+    print_colored(f"  /api/ask {phase:9s}: {len(latencies):5d} answers, p50 "
+                  f"{statistics.median(latencies) * 1000:6.1f}ms, p99 "
+                  f"{latencies[int(len(latencies) * 0.99)] * 1000:6.1f}ms, max {latencies[-1] * 1000:6.1f}ms",
+                  "green")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books-dir", default=os.path.join("..", "books"))
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05, help="Fake LLM latency in seconds")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Length of each phase")
+    parser.add_argument("--swap-interval", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8893)
+    args = parser.parse_args()
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    with tempfile.TemporaryDirectory() as path:
+        root, model_dir = os.path.join(path, "db", "faiss_index"), os.path.join(path, "model")
+        os.makedirs(model_dir)
+        versions = build_versions(args.books_dir, root, model_dir, args.chunks)
+        env = dict(os.environ, DB_DIR=os.path.join(path, "db"), VECTOR_BACKEND="faiss", VECTOR_INDEX_PATH=root,
+                   EMBEDDING_PROVIDER="local", LOCAL_EMBEDDING_MODEL_DIR=model_dir,
+                   GOOGLE_API_KEY="benchmark-fake-key", BENCH_LLM_DELAY=str(args.delay),
+                   ADMIN_TOKEN=ADMIN_TOKEN)
+        print_colored(f"{os.cpu_count()} CPU(s), 2 index versions of {args.chunks} chunks, {args.clients} clients "
+                      f"asking, fake LLM delay {args.delay:.3f}s, swapping every {args.swap_interval:.1f}s", "cyan")
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.bench_index_swap:create_app", "--factory",
+             "--port", str(args.port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(args.port)
+            steady, swapping, loads, failures = asyncio.run(
+                run(args.port, questions, versions, args.clients, args.seconds, args.swap_interval))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_colored(f"{len(loads)} swaps, each version loaded in {statistics.mean(loads) * 1000:.0f}ms on average "
+                  f"(max {max(loads) * 1000:.0f}ms); {len(failures)} failed requests", "cyan")
+    report("steady", steady)
+    report("swapping", swapping)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Local CPU embeddings against the remote embedding API.
+
+The remote provider is faked by offline embeddings that wait a round trip per
+call (--latency). For index builds it goes through BatchedEmbeddings with the
+configured batch size, concurrency and request rate, as create_vector_db
+does. The local provider is the model in --model-dir. Without a directory, a
+static model (as in model2vec) with random weights and a vocabulary built
+from the books is generated, so the timings are real but retrieval quality is
+not measured. Reports:
+- Question latency, one question at a time
+- Questions per second with --clients threads asking at once, and the
+  model calls the dynamic batching needed for them
+- Index build throughput over the chunks of the books, with and without
+  sorting the chunks by length before batching
+
+Usage:
+    python -m benchmarks.bench_local_embeddings --latency 0.08 --clients 16
+    python -m benchmarks.bench_local_embeddings --model-dir embedding_model
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks.bench_batch import RoundTripEmbeddings
+from benchmarks.bench_hybrid_retrieval import QUESTIONS_FILE, load_chunks
+from config.settings import (
+    BOOKS_DIR, EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY, EMBEDDING_REQUESTS_PER_SECOND,
+    LOCAL_EMBEDDING_BATCH_SIZE, LOCAL_EMBEDDING_THREADS
+)
+from services.embedding_executor import BatchedEmbeddings
+from services.local_embeddings import STATIC_FILE, VOCAB_FILE, LocalEmbeddingModel, LocalEmbeddings
+from utils.helpers import print_colored
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def build_static_model(path: str, texts, vocab_size: int = 30000, dim: int = 256):
+    """Write a random static model whose vocabulary holds the most frequent words of `texts`"""
+    counts = Counter(word for text in texts for word in re.findall(r"\w+", text.lower()))
+    words = [word for word, _ in counts.most_common(vocab_size) if word not in CHARACTERS]
+    vocab = SPECIAL_TOKENS + list(CHARACTERS) + ["##" + char for char in CHARACTERS] + list("().,;:-'\"/") + words
+    with open(os.path.join(path, VOCAB_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    rng = np.random.default_rng(0)
+    np.save(os.path.join(path, STATIC_FILE), rng.standard_normal((len(vocab), dim)).astype(np.float32))
+
+
+def latencies(function, questions):
+    times = []
+    for question in questions:
+        start = time.perf_counter()
+        function(question)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, sorted(times)[int(len(times) * 0.95)] * 1000
+
+
+def concurrent_rate(function, questions, clients: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(function, questions))
+    return len(questions) / (time.perf_counter() - start)
+
+
+def unsorted_build(model: LocalEmbeddingModel, texts, batch_size: int) -> float:
+    start = time.perf_counter()
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    # Converted to lists like embed_documents, so only the batching differs
+    [vector for vectors in model.pool.map(model.embed_batch, batches) for vector in vectors.tolist()]
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", default=BOOKS_DIR)
+    parser.add_argument("--model-dir", help="Local model directory (default: a generated static model)")
+    parser.add_argument("--latency", type=float, default=0.08, help="Seconds per remote embedding call")
+    parser.add_argument("--clients", type=int, default=16, help="Threads asking questions at once")
+    parser.add_argument("--questions", type=int, default=576)
+    args = parser.parse_args()
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        labelled = [json.loads(line)["question"] for line in f if line.strip()]
+    questions = [labelled[i % len(labelled)] for i in range(args.questions)]
+    docs, _ = load_chunks(args.books, "structural")
+    texts = [doc.page_content for doc in docs]
+
+    with tempfile.TemporaryDirectory() as path:
+        model_dir = args.model_dir
+        if model_dir is None:
+            model_dir = os.path.join(path, "static-random")
+            os.makedirs(model_dir)
+            build_static_model(model_dir, texts)
+        start = time.perf_counter()
+        model = LocalEmbeddingModel(model_dir, threads=LOCAL_EMBEDDING_THREADS, batch_size=LOCAL_EMBEDDING_BATCH_SIZE)
+        local = LocalEmbeddings(model)
+        print_colored(f"Local model {model.name} loaded in {time.perf_counter() - start:.2f}s, "
+                      f"{len(model.tokenizer.vocab)} tokens, {LOCAL_EMBEDDING_THREADS} threads; "
+                      f"{len(texts)} chunks, remote call {args.latency * 1000:.0f} ms", "cyan")
+
+        remote = RoundTripEmbeddings(args.latency)
+        sample = questions[:len(labelled)]
+        for label, embeddings in (("remote", remote), ("local", local)):
+            p50, p95 = latencies(embeddings.embed_query, sample)
+            print_colored(f"Question latency, {label:>6}: p50 {p50:8.2f} ms, p95 {p95:8.2f} ms", "green")
+
+        rate = concurrent_rate(remote.embed_query, questions[:args.clients * 4], args.clients)
+        print_colored(f"{args.clients} clients, remote: {rate:8.1f} questions/s (one call each)", "green")
+        rate = concurrent_rate(lambda question: model.embed_batch([question]), questions, args.clients)
+        print_colored(f"{args.clients} clients,  local, a model call per question: {rate:8.1f} questions/s", "green")
+        model.batches = model.texts = 0
+        rate = concurrent_rate(local.embed_query, questions, args.clients)
+        print_colored(f"{args.clients} clients,  local, batched: {rate:8.1f} questions/s in {model.batches} model calls "
+                      f"({model.texts / max(1, model.batches):.1f} questions per call)", "green")
+
+        remote_builder = BatchedEmbeddings(remote, batch_size=EMBEDDING_BATCH_SIZE,
+                                           max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+                                           requests_per_second=EMBEDDING_REQUESTS_PER_SECOND)
+        # Fills the tokenizer's word cache, so neither local run pays for it
+        local.embed_documents(texts)
+        for label, embeddings in (("remote", remote_builder), ("local", local)):
+            start = time.perf_counter()
+            embeddings.embed_documents(texts)
+            print_colored(f"Index build, {label:>6}: {len(texts) / (time.perf_counter() - start):8.1f} chunks/s",
+                          "green")
+        print_colored(f"Index build,  local without length sorting: "
+                      f"{unsorted_build(model, texts, LOCAL_EMBEDDING_BATCH_SIZE):8.1f} chunks/s", "green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of request logging and metrics on the answer path.
+
+Logging: a child process logs a burst of request-sized lines, either with a
+direct print to stdout (the old print_colored) or through print_colored's
+queue, while the parent drains the child's stdout slowly, like a busy
+terminal or log collector. Reports how long the logging call kept the caller
+waiting. Metrics: time per span() and per histogram observation.
+
+Usage:
+    python -m benchmarks.bench_metrics --lines 20000
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from utils.helpers import print_colored
+
+LINE = "Received question: What is the punishment for murder under section 103 of the Bharatiya Nyaya Sanhita?"
+
+
+def log_burst(mode: str, lines: int):
+    from utils import helpers
+
+    timings = []
+    for i in range(lines):
+        start = time.perf_counter()
+        if mode == "print":
+            print(f"{helpers.COLOR_MAP['blue']}{LINE} {i}{helpers.Style.RESET_ALL}", flush=True)
+        else:
+            helpers.print_colored(f"{LINE} {i}", "blue")
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    sys.stderr.write(f"{statistics.median(timings)} {timings[int(len(timings) * 0.99) - 1]} {timings[-1]} "
+                     f"{sum(timings)}\n")
+
+
+def run_logging(mode: str, lines: int, read_delay: float):
+    process = subprocess.Popen(
+        [sys.executable, "-c", f"from benchmarks.bench_metrics import log_burst; log_burst({mode!r}, {lines})"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    # Drain slowly, so the pipe fills up whenever the child writes faster than this
+    while process.stdout.read(4096):
+        time.sleep(read_delay)
+    p50, p99, worst, total = (float(value) for value in process.stderr.read().split())
+    process.wait()
+    return p50, p99, worst, total
+
+
+def run_spans(count: int):
+    from services.metrics import Histogram, span
+
+    histogram = Histogram("bench_seconds", "benchmark", ["stage"])
+    start = time.perf_counter()
+    for _ in range(count):
+        histogram.observe(0.01, stage="llm")
+    observe = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for _ in range(count):
+        with span("bench"):
+            pass
+    return observe, (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--read-delay", type=float, default=0.001, help="Seconds the reader sleeps per 4 KiB")
+    args = parser.parse_args()
+
+    print_colored(f"{args.lines} log lines of {len(LINE)} characters, stdout drained at "
+                  f"{4 / args.read_delay / 1024:.1f} MiB/s", "cyan")
+    for mode, label in (("print", "direct print"), ("queue", "queued logging")):
+        p50, p99, worst, total = run_logging(mode, args.lines, args.read_delay)
+        print_colored(f"{label:>15}: caller waits p50 {p50 * 1e6:7.1f}us, p99 {p99 * 1e6:8.1f}us, "
+                      f"max {worst * 1000:7.2f}ms, total {total:6.2f}s", "green")
+
+    observe, timed = run_spans(200000)
+    print_colored(f"Histogram.observe {observe * 1e6:.2f}us, span() {timed * 1e6:.2f}us per call", "green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Vectorized MMR and the stages of a vector search, for fetch_k from 10 to 1000.
+
+First, MMR alone: LangChain's maximal_marginal_relevance against
+mmr_select on 768-dimensional candidates (the size of the Google
+embeddings), for k = 5 and 20, counting the questions where both pick the
+same chunks. Then whole searches of a synthetic flat FAISS index of
+--vectors chunks: LangChain's FAISS MMR search against VectorSearchRetriever,
+one question at a time as the API asks them, with the time of each stage
+read from lawgpt_stage_seconds. With --rerank-model-dir, the searches also
+rerank --rerank-candidates chunks with that cross-encoder.
+
+Usage:
+    python -m benchmarks.bench_mmr
+    python -m benchmarks.bench_mmr --vectors 100000 --rerank-model-dir rerank_model
+"""
+import argparse
+import time
+from collections import defaultdict
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from config.settings import RERANK_CANDIDATES
+from services.embeddings import HashingEmbeddings
+from services.metrics import STAGE_SECONDS
+from services.reranker import load_reranker
+from services.vector_search import VectorSearchRetriever, mmr_select
+from utils.helpers import print_colored
+
+FETCH_KS = (10, 25, 50, 100, 250, 500, 1000)
+DIM = 768
+
+
+def clustered_vectors(rng: np.random.Generator, count: int, clusters: int = 200) -> np.ndarray:
+    """Vectors around a few hundred topics, so nearest neighbours are alike as chunks of one Act are"""
+    centres = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(function, min_seconds: float = 0.5, min_runs: int = 3) -> float:
+    """Mean seconds per call, over at least min_runs calls and min_seconds"""
+    runs, start = 0, time.perf_counter()
+    while runs < min_runs or time.perf_counter() - start < min_seconds:
+        function()
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+
+def stage_totals() -> dict:
+    """Seconds and observations so far per stage of lawgpt_stage_seconds"""
+    totals = defaultdict(lambda: [0.0, 0])
+    for name, labels, value in STAGE_SECONDS.samples():
+        if name.endswith("_sum"):
+            totals[labels["stage"]][0] = value
+        elif name.endswith("_count"):
+            totals[labels["stage"]][1] = value
+    return totals
+
+
+def compare_mmr(rng: np.random.Generator, pool: np.ndarray, queries: int):
+    for k in (5, 20):
+        for fetch_k in FETCH_KS:
+            cases = []
+            for _ in range(queries):
+                query = pool[rng.integers(len(pool))] + 0.3 * rng.standard_normal(DIM).astype(np.float32)
+                nearest = np.argsort(pool @ -query)[:fetch_k]
+                cases.append((query, pool[nearest]))
+            same = sum(maximal_marginal_relevance(query, candidates, k=k) == mmr_select(query, candidates, k)
+                       for query, candidates in cases)
+            query, candidates = cases[0]
+            old = timed(lambda: maximal_marginal_relevance(query, candidates, k=k))
+            new = timed(lambda: mmr_select(query, candidates, k))
+            print_colored(f"MMR k={k:2d} fetch_k={fetch_k:4d}: LangChain {old * 1000:8.3f} ms, "
+                          f"vectorized {new * 1000:7.3f} ms ({old / new:6.1f}x), same picks {same}/{queries}",
+                          "green")
+
+
+def compare_search(store, retriever: VectorSearchRetriever, queries: np.ndarray, k: int):
+    # Warm-up, so the first row does not pay for first use of the index
+    store.max_marginal_relevance_search_by_vector(queries[0], k=k)
+    retriever.search_vectors(queries[:1], ["which section punishes murder"])
+    for fetch_k in FETCH_KS:
+        start = time.perf_counter()
+        for query in queries:
+            store.max_marginal_relevance_search_by_vector(query, k=k, fetch_k=fetch_k)
+        old = (time.perf_counter() - start) / len(queries)
+
+        before = stage_totals()
+        start = time.perf_counter()
+        for query in queries:
+            retriever.search_vectors(query[None], ["which section punishes murder"], fetch_k=fetch_k)
+        new = (time.perf_counter() - start) / len(queries)
+        after = stage_totals()
+        stages = ", ".join(f"{stage} {(after[stage][0] - before[stage][0]) / len(queries) * 1000:.2f}"
+                           for stage in ("vector_search", "rerank", "mmr") if after[stage][1] > before[stage][1])
+        print_colored(f"Search k={k} fetch_k={fetch_k:4d}: LangChain FAISS {old * 1000:8.2f} ms, "
+                      f"VectorSearchRetriever {new * 1000:7.2f} ms ({old / new:5.1f}x; ms per stage: {stages})",
+                      "green")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000, help="Chunks in the synthetic index")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank-model-dir", default="", help="Cross-encoder to rerank with (default: none)")
+    parser.add_argument("--rerank-candidates", type=int, default=RERANK_CANDIDATES)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pool = clustered_vectors(rng, args.vectors)
+    compare_mmr(rng, pool, args.questions)
+
+    texts = [f"chunk {i}" for i in range(len(pool))]
+    store = FAISS.from_embeddings(list(zip(texts, pool.tolist())), HashingEmbeddings(DIM))
+    retriever = VectorSearchRetriever(vectorstore=store, search_type="mmr", search_kwargs={"k": args.k},
+                                      reranker=load_reranker(args.rerank_model_dir),
+                                      rerank_candidates=args.rerank_candidates)
+    queries = pool[rng.integers(0, len(pool), args.questions)] + 0.3 * rng.standard_normal(
+        (args.questions, DIM)).astype(np.float32)
+    print_colored(f"Flat FAISS index of {len(pool)} chunks, {DIM} dimensions, {args.questions} questions"
+                  + (f", reranking {args.rerank_candidates} candidates" if retriever.reranker else ""), "cyan")
+    compare_search(store, retriever, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold start benchmark for the API server.
+
+Builds a synthetic FAISS index, starts uvicorn in a subprocess against it and
+reports the import time of main, the time until /health answers and the time
+until /ready reports the index as loaded.
+
+Usage:
+    python -m benchmarks.bench_startup --chunks 20000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from benchmarks.fakes import FakeEmbeddings
+from langchain_core.documents import Document
+from services.vector_backends import get_backend
+from utils.helpers import print_colored
+
+PORT = 8899
+
+
+def build_index(db_dir: str, chunks: int):
+    texts = [f"Section {i}. Whoever commits offence {i} shall be punished." for i in range(chunks)]
+    docs = [Document(page_content=text) for text in texts]
+    backend = get_backend("faiss")
+    backend.save(backend.create(docs, FakeEmbeddings(delay_per_text=0)), os.path.join(db_dir, "faiss_index"))
+
+
+def wait_for(url: str, start: float, timeout: float = 120) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        build_index(db_dir, args.chunks)
+        env = {**os.environ, "DB_DIR": db_dir, "GOOGLE_API_KEY": "benchmark-fake-key"}
+
+        import_time = subprocess.run(
+            [sys.executable, "-c", "import time; t = time.perf_counter(); import main; "
+                                   "print(time.perf_counter() - t)"],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        print_colored(f"import main:    {float(import_time) * 1000:8.0f} ms", "green")
+
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            health = wait_for(f"http://127.0.0.1:{PORT}/health", start)
+            ready = wait_for(f"http://127.0.0.1:{PORT}/ready", start)
+        finally:
+            server.terminate()
+            server.wait()
+        print_colored(f"/health ok:     {health * 1000:8.0f} ms after launch", "green")
+        print_colored(f"/ready ok:      {ready * 1000:8.0f} ms after launch ({args.chunks} chunks)", "green")
+
+
+if __name__ == "__main__":
+    main()
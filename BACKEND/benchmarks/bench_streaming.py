@@ -0,0 +1,45 @@
+"""
+Time-to-first-byte benchmark for streamed vs buffered answers.
+
+Usage:
+    python -m benchmarks.bench_streaming --delay 2.0
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.bench_async_ask import QUESTION, install_fakes
+from services import llm_service
+from utils.helpers import print_colored
+
+
+async def measure_buffered() -> float:
+    start = time.perf_counter()
+    await llm_service.aget_llm_response(QUESTION)
+    return time.perf_counter() - start
+
+
+async def measure_streamed():
+    start = time.perf_counter()
+    first = None
+    async for fragment in llm_service.astream_llm_response(QUESTION):
+        # The empty priming fragment carries no content
+        if fragment and first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=2.0, help="Fake LLM generation time in seconds")
+    args = parser.parse_args()
+
+    install_fakes(args.delay)
+
+    buffered = asyncio.run(measure_buffered())
+    first, total = asyncio.run(measure_streamed())
+    print_colored(f"buffered: first byte {buffered * 1000:8.1f} ms, complete {buffered * 1000:8.1f} ms", "yellow")
+    print_colored(f"streamed: first byte {first * 1000:8.1f} ms, complete {total * 1000:8.1f} ms", "green")
+
+
+if __name__ == "__main__":
+    main()
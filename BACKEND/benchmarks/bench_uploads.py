@@ -0,0 +1,276 @@
+"""
+Latency of /api/ask while a large book is uploaded and indexed.
+
+Builds an index of all but the last PDF in --books-dir with a random static
+local embedding model (so no API key is needed), starts the API under
+uvicorn with a fake LLM and that index, and keeps --clients clients asking
+questions from legal_questions.jsonl. It then uploads the last PDF, padded
+to --upload-mb with PDF comments, through POST /api/documents and waits for
+its ingestion job. Latency is reported while idle, during the upload and
+during the job, with jobs run in the background process pool ("process")
+and, for comparison, in a thread of the API process ("thread"). The API
+process's peak resident memory before and after the upload shows the upload
+is not held in memory.
+
+Usage:
+    python -m benchmarks.bench_uploads --upload-mb 200 --clients 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from utils.helpers import print_colored
+
+QUESTIONS_FILE = os.path.join(os.path.dirname(__file__), "legal_questions.jsonl")
+BOUNDARY = "benchmark-upload-boundary"
+# Uploads are admin only; the server started here is given this token
+ADMIN_TOKEN = "benchmark-admin-token"
+PAD_LINE = b"%" + b"x" * 1022 + b"\n"
+
+
+def create_app():
+    """App factory for the uvicorn server; settings come from BENCH_* variables"""
+    os.environ["INITIALIZE_APP"] = "false"
+    from benchmarks.fakes import FakeLLM
+    from services import container, llm_service
+    from services.ingestion_jobs import IngestionQueue
+    from main import app
+
+    class ThreadQueue(IngestionQueue):
+        """Runs jobs in a thread of the API process, as a simpler design would"""
+
+        def _executor(self):
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=1)
+                return self._pool
+
+    container.override("llm", FakeLLM(delay=float(os.environ["BENCH_LLM_DELAY"])))
+    # Questions repeat, so caching or coalescing would hide the retrieval cost
+    container.override("answer_cache", None)
+    container.override("request_coalescer", None)
+    if os.environ["BENCH_INGEST"] == "thread":
+        container.override("ingestion_queue", ThreadQueue())
+    container.get_retriever()
+    llm_service.print_colored = lambda *args, **kwargs: None
+    return app
+
+
+def padded_pdf(path: str, size: int, chunk_size: int = 1 << 16):
+    """Yield a PDF's bytes followed by comment lines up to `size` bytes, ending with its trailer again"""
+    with open(path, "rb") as f:
+        data = f.read()
+    trailer = b"\nstartxref\n" + re.findall(rb"startxref\s+(\d+)", data)[-1] + b"\n%%EOF\n"
+    yield data
+    padding = max(0, size - len(data) - len(trailer) - 1)
+    yield b"\n"
+    block = PAD_LINE * (chunk_size // len(PAD_LINE))
+    while padding >= len(block):
+        yield block
+        padding -= len(block)
+    yield b"%" * padding + trailer
+
+
+def padded_size(path: str, size: int) -> int:
+    return sum(len(part) for part in padded_pdf(path, size, chunk_size=1 << 24))
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+
+
+def request_json(port: int, path: str) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as response:
+        return json.load(response)
+
+
+def wait_ready(port: int, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request_json(port, "/ready")["index"]["status"] == "ready":
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("The server did not become ready")
+
+
+async def ask_loop(port: int, questions: list, stop: asyncio.Event, times: list):
+    """Ask questions over one keep-alive connection until stopped, recording (start, seconds)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while not stop.is_set():
+            body = json.dumps({"question": questions[i % len(questions)]}).encode()
+            i += 1
+            start = time.perf_counter()
+            writer.write(b"POST /api/ask HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"Request failed: {head.splitlines()[0].decode()}")
+            length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+            await reader.readexactly(length)
+            times.append((start, time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+async def upload(port: int, pdf_path: str, size: int) -> dict:
+    """Stream a padded PDF to POST /api/documents"""
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; "
+            f"filename=\"uploaded.pdf\"\r\nContent-Type: application/pdf\r\n\r\n").encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(b"POST /api/documents HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\nX-Admin-Token: %s\r\n"
+                     b"Content-Type: multipart/form-data; boundary=%s\r\nContent-Length: %d\r\n\r\n%s"
+                     % (ADMIN_TOKEN.encode(), BOUNDARY.encode(), len(head) + padded_size(pdf_path, size) + len(tail),
+                        head))
+        for part in padded_pdf(pdf_path, size):
+            writer.write(part)
+            await writer.drain()
+        writer.write(tail)
+        response = await reader.read()
+    finally:
+        writer.close()
+    status, body = response.split(b"\r\n\r\n", 1)
+    if b" 202 " not in status.splitlines()[0]:
+        raise RuntimeError(f"Upload failed: {response[:300]!r}")
+    return json.loads(body)["jobs"][0]
+
+
+async def run(port: int, server_pid: int, questions: list, pdf_path: str, size: int, clients: int,
+              idle_seconds: float) -> dict:
+    stop = asyncio.Event()
+    times = []
+    askers = [asyncio.create_task(ask_loop(port, questions, stop, times)) for _ in range(clients)]
+    await asyncio.sleep(idle_seconds)
+
+    rss_before = peak_rss_mb(server_pid)
+    upload_start = time.perf_counter()
+    job = await upload(port, pdf_path, size)
+    upload_end = time.perf_counter()
+    rss_after = peak_rss_mb(server_pid)
+    while job["status"] not in ("done", "failed"):
+        await asyncio.sleep(0.2)
+        job = await asyncio.to_thread(request_json, port, f"/api/documents/jobs/{job['id']}")
+    job_end = time.perf_counter()
+    rss_job = peak_rss_mb(server_pid)
+    stop.set()
+    await asyncio.gather(*askers)
+    if job["status"] != "done":
+        raise RuntimeError(f"Ingestion job failed: {job['error']}")
+
+    phases = {"idle": [], "upload": [], "ingest": []}
+    for start, seconds in times:
+        if start < upload_start:
+            phases["idle"].append(seconds)
+        elif start < upload_end:
+            phases["upload"].append(seconds)
+        elif start < job_end:
+            phases["ingest"].append(seconds)
+    return {"phases": phases, "upload_seconds": upload_end - upload_start, "job_seconds": job_end - upload_end,
+            "chunks": job["chunks"], "rss_before": rss_before, "rss_after": rss_after, "rss_job": rss_job}
+
+
+def build_index(books_dir: str, db_dir: str, model_dir: str, env: dict):
+    """Build the starting index in a child process, so this process keeps no settings"""
+    script = (
+        "import os\n"
+        "from benchmarks.bench_local_embeddings import build_static_model\n"
+        "from services.pdf_service import iter_pdf_chunks\n"
+        "from services.ingestion import sync_index\n"
+        "from config.settings import BOOKS_DIR, VECTOR_INDEX_PATH\n"
+        "books = [os.path.join(BOOKS_DIR, name) for name in sorted(os.listdir(BOOKS_DIR))]\n"
+        "texts = [doc.page_content for result in iter_pdf_chunks(books) for doc in result.docs]\n"
+        f"build_static_model({model_dir!r}, texts)\n"
+        "assert sync_index(BOOKS_DIR, VECTOR_INDEX_PATH)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def report(mode: str, result: dict, size: int):
+    print_colored(f"{mode}: upload {size / (1 << 20):.0f} MB in {result['upload_seconds']:.2f}s, "
+                  f"job {result['job_seconds']:.1f}s ({result['chunks']} chunks); API process peak RSS "
+                  f"{result['rss_before']:.0f} MB before, {result['rss_after']:.0f} MB after the upload, "
+                  f"{result['rss_job']:.0f} MB after the job", "cyan")
+    for phase, latencies in result["phases"].items():
+        if not latencies:
+            continue
+        latencies.sort()
+        print_colored(f"  /api/ask {phase:6s}: {len(latencies):5d} answers, p50 "
+                      f"{statistics.median(latencies) * 1000:7.1f}ms, p95 "
+                      f"{latencies[int(len(latencies) * 0.95)] * 1000:7.1f}ms, max {latencies[-1] * 1000:7.1f}ms",
+                      "green")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books-dir", default=os.path.join("..", "books"))
+    parser.add_argument("--upload-mb", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05, help="Fake LLM latency in seconds")
+    parser.add_argument("--idle-seconds", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", choices=["process", "thread"], default=["process", "thread"])
+    parser.add_argument("--port", type=int, default=8892)
+    args = parser.parse_args()
+
+    pdfs = sorted(name for name in os.listdir(args.books_dir) if name.lower().endswith(".pdf"))
+    if len(pdfs) < 2:
+        raise SystemExit("--books-dir needs at least two PDFs")
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    size = args.upload_mb << 20
+    upload_path = os.path.join(args.books_dir, pdfs[-1])
+
+    with tempfile.TemporaryDirectory() as path:
+        model_dir = os.path.join(path, "model")
+        os.makedirs(model_dir)
+        base = {"books": os.path.join(path, "books"), "db": os.path.join(path, "db")}
+        os.makedirs(base["books"])
+        for name in pdfs[:-1]:
+            shutil.copy(os.path.join(args.books_dir, name), base["books"])
+        env = dict(os.environ, BOOKS_DIR=base["books"], DB_DIR=base["db"], EMBEDDING_PROVIDER="local",
+                   LOCAL_EMBEDDING_MODEL_DIR=model_dir, PDF_WORKERS="1", GOOGLE_API_KEY="benchmark-fake-key",
+                   ADMIN_TOKEN=ADMIN_TOKEN)
+        print_colored(f"Indexing {len(pdfs) - 1} books...", "cyan")
+        build_index(base["books"], base["db"], model_dir, env)
+        print_colored(f"{os.cpu_count()} CPU(s), {args.clients} clients asking, fake LLM delay {args.delay:.3f}s, "
+                      f"uploading {pdfs[-1]} padded to {args.upload_mb} MB", "cyan")
+
+        for mode in args.modes:
+            # Every mode starts from the same books and index
+            books_dir, db_dir = os.path.join(path, mode, "books"), os.path.join(path, mode, "db")
+            shutil.copytree(base["books"], books_dir)
+            shutil.copytree(base["db"], db_dir)
+            mode_env = dict(env, BOOKS_DIR=books_dir, DB_DIR=db_dir, BENCH_INGEST=mode,
+                            BENCH_LLM_DELAY=str(args.delay), MAX_UPLOAD_MB=str(args.upload_mb + 1))
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "benchmarks.bench_uploads:create_app", "--factory",
+                 "--port", str(args.port), "--log-level", "warning"],
+                env=mode_env, stdout=subprocess.DEVNULL
+            )
+            try:
+                wait_ready(args.port)
+                result = asyncio.run(run(args.port, server.pid, questions, upload_path, size,
+                                         args.clients, args.idle_seconds))
+            finally:
+                server.terminate()
+                server.wait()
+            report(mode, result, size)
+
+
+if __name__ == "__main__":
+    main()
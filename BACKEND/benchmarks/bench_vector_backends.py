@@ -0,0 +1,112 @@
+"""
+Vector backend comparison with offline hashing embeddings.
+
+Builds the same synthetic corpus with every vector backend and reports build
+time, MMR query latency, resident memory added by the index and size on
+disk. Texts are embedded once up front, so build times measure the index
+and not the embedding model. Each backend runs in its own process so memory
+figures do not leak between them.
+
+Usage:
+    python -m benchmarks.bench_vector_backends --chunks 50000 --queries 200
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from services.embeddings import HashingEmbeddings
+from services.vector_backends import BACKENDS, get_backend
+from services.vector_db_service import create_retriever
+from utils.helpers import print_colored
+
+WORDS = ("murder theft bail appeal contract property writ court section article punishment "
+         "fine imprisonment magistrate evidence offence accused witness police custody").split()
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Serves embeddings computed before the timed section."""
+
+    def __init__(self, vectors: Dict[str, List[float]], fallback: Embeddings):
+        self.vectors = vectors
+        self.fallback = fallback
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.fallback.embed_query(text)
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def run_backend(name: str, chunks: int, queries: int, results):
+    random.seed(0)
+    base = HashingEmbeddings()
+    texts = [" ".join(random.choices(WORDS, k=40)) + f" {i}" for i in range(chunks)]
+    embeddings = PrecomputedEmbeddings(dict(zip(texts, base.embed_documents(texts))), base)
+    docs = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(texts)]
+    questions = [" ".join(random.choices(WORDS, k=6)) for _ in range(queries)]
+
+    backend = get_backend(name)
+    with tempfile.TemporaryDirectory() as db_path:
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        store = backend.create(docs, embeddings, ids=[str(i) for i in range(chunks)], path=db_path)
+        backend.save(store, db_path)
+        build = time.perf_counter() - start
+        memory = rss_bytes() - rss_before
+
+        retriever = create_retriever(store)
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            retriever.invoke(question)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        results[name] = {
+            "build": build,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "memory": memory,
+            "disk": dir_bytes(db_path),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    args = parser.parse_args()
+
+    results = multiprocessing.Manager().dict()
+    for name in args.backends:
+        process = multiprocessing.Process(target=run_backend, args=(name, args.chunks, args.queries, results))
+        process.start()
+        process.join()
+        if name not in results:
+            print_colored(f"{name}: failed (see error above)", "red")
+            continue
+        r = results[name]
+        print_colored(
+            f"{name:>6}: build {r['build']:.2f}s, query p50 {r['p50'] * 1000:.2f}ms "
+            f"p95 {r['p95'] * 1000:.2f}ms, +{r['memory'] / 2 ** 20:.0f} MiB RSS, "
+            f"{r['disk'] / 2 ** 20:.0f} MiB on disk", "green"
+        )
+
+
+if __name__ == "__main__":
+    main()
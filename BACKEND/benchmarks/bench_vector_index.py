@@ -0,0 +1,144 @@
+"""
+FAISS index layout comparison on synthetic vectors.
+
+Generates clustered synthetic vectors (a Gaussian mixture, which is closer to
+real embeddings than uniform noise), computes exact nearest neighbours for
+held-out queries, then builds every FAISS_INDEX_TYPE layout and reports
+training and build time, resident memory and size on disk of the index,
+and recall@k against the exact neighbours with single-query latency for a
+range of nprobe (IVF) and efSearch (HNSW) settings. Each layout runs in its
+own process so memory figures do not leak between them.
+
+Usage:
+    python -m benchmarks.bench_vector_index --vectors 1000000 --dim 128
+    python -m benchmarks.bench_vector_index --vectors 100000 --types flat ivf_pq hnsw
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import faiss
+import numpy as np
+from benchmarks.bench_vector_backends import rss_bytes
+from services.faiss_index import INDEX_TYPES, build_index, factory_string
+from utils.helpers import print_colored
+
+NPROBES = (1, 4, 16, 64)
+EF_SEARCHES = (16, 64, 256)
+BLOCK = 100000
+
+
+def make_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(0).standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, BLOCK):
+        end = min(start + BLOCK, count)
+        labels = rng.integers(0, clusters, end - start)
+        vectors[start:end] = centers[labels] + 0.5 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return vectors
+
+
+def search_settings(index: faiss.Index):
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        for nprobe in NPROBES:
+            ivf.nprobe = nprobe
+            yield f"nprobe={nprobe}"
+    elif hasattr(faiss.downcast_index(index), "hnsw"):
+        for ef_search in EF_SEARCHES:
+            faiss.downcast_index(index).hnsw.efSearch = ef_search
+            yield f"efSearch={ef_search}"
+    else:
+        yield "exact scan"
+
+
+def build_layout(kind: str, args, index_path: str, results):
+    faiss.omp_set_num_threads(1)
+    vectors = make_vectors(args.vectors, args.dim, args.clusters, seed=1)
+    start = time.perf_counter()
+    index = build_index(kind, vectors, pq_m=args.pq_m)
+    results[kind] = {"build": time.perf_counter() - start}
+    faiss.write_index(index, index_path)
+
+
+def search_layout(kind: str, args, index_path: str, truth_path: str, results):
+    # A fresh process, so the memory figure is what serving the index costs
+    faiss.omp_set_num_threads(1)
+    truth = np.load(truth_path)
+    queries = make_vectors(args.queries, args.dim, args.clusters, seed=2)
+    rss_before = rss_bytes()
+    index = faiss.read_index(index_path)
+    memory = rss_bytes() - rss_before
+
+    rows = []
+    for setting in search_settings(index):
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            _, found = index.search(query[None, :], args.k)
+            latencies.append(time.perf_counter() - start)
+            hits += len(np.intersect1d(found[0], expected))
+        latencies.sort()
+        rows.append((setting, hits / truth.size, statistics.median(latencies),
+                     latencies[int(len(latencies) * 0.95) - 1]))
+    results[kind] = dict(results[kind], memory=memory, disk=os.path.getsize(index_path), rows=rows)
+
+
+def run_process(target, *args):
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    process.join()
+    return process.exitcode == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=16, help="bytes per product-quantized vector")
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    print_colored(f"{args.vectors:,} vectors of dimension {args.dim} "
+                  f"({args.vectors * args.dim * 4 / 2 ** 20:.0f} MiB as float32), {args.queries} queries, "
+                  f"recall@{args.k} against exact search, 1 thread", "cyan")
+    start = time.perf_counter()
+    vectors = make_vectors(args.vectors, args.dim, args.clusters, seed=1)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(make_vectors(args.queries, args.dim, args.clusters, seed=2), args.k)
+    del vectors, exact
+    gc.collect()
+    print_colored(f"Exact neighbours computed in {time.perf_counter() - start:.1f}s", "cyan")
+
+    results = multiprocessing.Manager().dict()
+    with tempfile.TemporaryDirectory() as path:
+        truth_path = os.path.join(path, "truth.npy")
+        np.save(truth_path, truth)
+        for kind in args.types:
+            index_path = os.path.join(path, f"{kind}.faiss")
+            if not (run_process(build_layout, kind, args, index_path, results)
+                    and run_process(search_layout, kind, args, index_path, truth_path, results)):
+                print_colored(f"{kind}: failed (see error above)", "red")
+                continue
+            os.remove(index_path)
+            r = results[kind]
+            layout = factory_string(kind, args.dim, args.vectors, pq_m=args.pq_m)
+            print_colored(
+                f"{kind:>8} ({layout}): built in {r['build']:.1f}s, +{r['memory'] / 2 ** 20:.0f} MiB RSS, "
+                f"{r['disk'] / 2 ** 20:.0f} MiB on disk", "green"
+            )
+            for setting, recall, p50, p95 in r["rows"]:
+                print_colored(f"{'':>10}{setting:<13} recall@{args.k} {recall:.3f}, "
+                              f"p50 {p50 * 1000:.3f}ms, p95 {p95 * 1000:.3f}ms", "green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Throughput benchmark for several API worker processes against a fake LLM.
+
+Starts the API under uvicorn with 1 to N workers, each answering from a fake
+LLM and a fake retriever that spends a fixed amount of CPU per question (the
+part of a request a single event loop cannot overlap), with conversation
+history shared through the chosen state backend. Reports requests per second
+and latency for each worker count. The "local" backend starts the bundled
+state server for the run.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1 2 4 --state local --cpu-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from utils.helpers import print_colored
+
+QUESTION = "What is the punishment for murder under section 103?"
+
+
+class CPUBoundRetriever:
+    """Retriever stand-in that computes for a fixed time before returning, holding the GIL."""
+
+    def __init__(self, cpu_seconds: float):
+        from benchmarks.fakes import FakeRetriever
+        self.cpu_seconds = cpu_seconds
+        self.docs = FakeRetriever().docs
+
+    def _work(self):
+        deadline = time.thread_time() + self.cpu_seconds
+        while time.thread_time() < deadline:
+            pass
+        return self.docs
+
+    def get_relevant_documents(self, query):
+        return self._work()
+
+    def invoke(self, query):
+        return self._work()
+
+    async def ainvoke(self, query):
+        return self._work()
+
+
+def create_app():
+    """App factory for the uvicorn workers; settings come from BENCH_* variables"""
+    os.environ["INITIALIZE_APP"] = "false"
+    from benchmarks.fakes import FakeLLM
+    from services import container, llm_service
+    from services.history_store import HistoryStore
+    from main import app
+
+    container.override("llm", FakeLLM(delay=float(os.environ["BENCH_LLM_DELAY"])))
+    container.override("retriever", CPUBoundRetriever(float(os.environ["BENCH_CPU_MS"]) / 1000))
+    container.override("history_store", HistoryStore(os.environ["BENCH_HISTORY_DB"],
+                                                     state=container.get_shared_state()))
+    # Every request asks the same question, so caching or coalescing would hide the pipeline cost
+    container.override("answer_cache", None)
+    container.override("request_coalescer", None)
+    llm_service.print_colored = lambda *args, **kwargs: None
+    return app
+
+
+def wait_ready(port: int, workers: int, timeout: float = 60):
+    """Wait until /ready has answered from `workers` distinct processes"""
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while len(seen) < workers:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Only {len(seen)} of {workers} workers became ready")
+        # A new connection per probe, so the kernel hands them to different workers
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=5) as response:
+                seen.add(json.load(response)["worker"])
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.05)
+
+
+async def ask_loop(port: int, questions: asyncio.Queue, latencies: list):
+    """Post questions over one keep-alive connection until the queue is empty"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while not questions.empty():
+            i = questions.get_nowait()
+            body = json.dumps({"question": QUESTION, "session_id": f"s{i % 32}"}).encode()
+            start = time.perf_counter()
+            writer.write(b"POST /api/ask HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"Request failed: {head.splitlines()[0].decode()}")
+            length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load(port: int, total: int, concurrency: int):
+    """Send `total` questions with `concurrency` in flight; return req/s and latencies"""
+    questions = asyncio.Queue()
+    for i in range(total):
+        questions.put_nowait(i)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(ask_loop(port, questions, latencies) for _ in range(concurrency)))
+    return total / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--state", choices=["memory", "local"], default="local")
+    parser.add_argument("--delay", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--cpu-ms", type=float, default=5.0, help="CPU time per question in the retriever")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-concurrent", type=int, default=8, help="MAX_CONCURRENT_REQUESTS per worker")
+    parser.add_argument("--port", type=int, default=8891)
+    args = parser.parse_args()
+
+    state_url = "redis://127.0.0.1:6392/0"
+    state_server = None
+    if args.state == "local":
+        state_server = subprocess.Popen([sys.executable, "-m", "services.state_server", "--port", "6392"],
+                                        stdout=subprocess.DEVNULL)
+
+    print_colored(f"{os.cpu_count()} CPU(s), fake LLM delay {args.delay:.3f}s, {args.cpu_ms:.1f}ms CPU per "
+                  f"question, {args.requests} questions with {args.concurrency} in flight, "
+                  f"{args.max_concurrent} answered at once per worker, state backend {args.state}", "cyan")
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as path:
+                env = dict(os.environ, BENCH_LLM_DELAY=str(args.delay), BENCH_CPU_MS=str(args.cpu_ms),
+                           BENCH_HISTORY_DB=os.path.join(path, "history.sqlite"),
+                           MAX_CONCURRENT_REQUESTS=str(args.max_concurrent), STATE_BACKEND=args.state,
+                           STATE_URL=state_url, GOOGLE_API_KEY="benchmark-fake-key")
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "benchmarks.bench_workers:create_app", "--factory",
+                     "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"],
+                    env=env, stdout=subprocess.DEVNULL
+                )
+                try:
+                    wait_ready(args.port, workers)
+                    asyncio.run(load(args.port, args.concurrency, args.concurrency))
+                    throughput, latencies = asyncio.run(load(args.port, args.requests, args.concurrency))
+                finally:
+                    server.terminate()
+                    server.wait()
+            latencies.sort()
+            print_colored(f"{workers:>2} worker(s): {throughput:8.1f} req/s, p50 "
+                          f"{statistics.median(latencies) * 1000:7.1f}ms, p95 "
+                          f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f}ms", "green")
+    finally:
+        if state_server is not None:
+            state_server.terminate()
+            state_server.wait()
+
+
+if __name__ == "__main__":
+    main()
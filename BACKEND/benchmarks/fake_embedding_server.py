@@ -0,0 +1,120 @@
+"""
+Local HTTP embedding server that injects latency and errors.
+
+POST /embed with {"texts": [...]} returns {"embeddings": [[...], ...]}. Each
+request sleeps for the configured latency and fails with 429 or 503 at the
+configured rate, so clients can be tested against a misbehaving remote API.
+
+Usage:
+    python -m benchmarks.fake_embedding_server --port 8901 --latency 0.2 --error-rate 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from langchain_core.embeddings import Embeddings
+from services.embeddings import HashingEmbeddings
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with injectable latency and failures.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free one
+        latency (float): Seconds each request takes
+        error_rate (float): Probability that a request fails with 429 or 503
+        fail_after (int): Fail every request after this many (simulates an outage)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.1, error_rate: float = 0.0, fail_after: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_after = fail_after
+        self.embeddings = HashingEmbeddings()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/embed"
+
+    def start(self) -> "FakeEmbeddingServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server._lock:
+            server.requests += 1
+            outage = server.fail_after and server.requests > server.fail_after
+        time.sleep(server.latency)
+
+        if outage or random.random() < server.error_rate:
+            with server._lock:
+                server.errors += 1
+            self.send_response(503 if outage else random.choice([429, 503]))
+            self.end_headers()
+            return
+
+        payload = json.dumps({"embeddings": server.embeddings.embed_documents(body["texts"])}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpEmbeddings(Embeddings):
+    """
+    Embedding client for the fake server. HTTP errors surface as
+    urllib.error.HTTPError, whose `code` carries the status.
+
+    Args:
+        url (str): The server's /embed URL
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"texts": texts}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(args.port, args.latency, args.error_rate)
+    print(f"Fake embedding server on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
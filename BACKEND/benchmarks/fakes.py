@@ -0,0 +1,118 @@
+"""
+Local stand-ins for the remote services used by the benchmarks and tests.
+"""
+import asyncio
+import os
+import re
+import time
+from types import SimpleNamespace
+
+# The services read the key at import time; the fakes never use it
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-fake-key")
+
+from services.embeddings import HashingEmbeddings  # noqa: E402
+
+FAKE_ANSWER = (
+    "**Punishment for Murder**\n\n"
+    "Section 103 of the Bharatiya Nyaya Sanhita, 2023 deals with murder.\n\n"
+    "Whoever commits murder shall be punished with death or imprisonment for life. "
+    "The offender shall also be liable to fine. "
+    "Courts weigh aggravating and mitigating circumstances.\n\n"
+    "The provision replaces Section 302 of the Indian Penal Code.\n\n"
+    "Sentencing follows the rarest of rare doctrine.\n\n"
+    "Bachan Singh v. State of Punjab (1980).\n\n"
+    "Murder carries the most severe penalties known to the criminal law."
+)
+
+
+class FakeLLM:
+    """
+    Chat model stand-in that waits a fixed delay before answering.
+
+    Args:
+        delay (float): Seconds to wait per call, simulating generation time
+        answer (str): Text returned for every call
+    """
+
+    def __init__(self, delay: float = 0.2, answer: str = FAKE_ANSWER):
+        self.delay = delay
+        self.answer = answer
+        self.calls = 0
+
+    def _tokens(self):
+        # Roughly word-sized pieces, like a real token stream
+        return re.findall(r"\S+\s*|\s+", self.answer)
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(content=self.answer)
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=self.answer)
+
+    async def astream(self, messages):
+        """Spread the delay evenly over the answer's tokens"""
+        self.calls += 1
+        tokens = self._tokens()
+        per_token = self.delay / max(len(tokens), 1)
+        for token in tokens:
+            await asyncio.sleep(per_token)
+            yield SimpleNamespace(content=token)
+
+
+class FakeRetriever:
+    """
+    Retriever stand-in returning fixed documents after a small delay.
+
+    Args:
+        delay (float): Seconds to wait per retrieval
+        docs (list): Documents to return
+    """
+
+    def __init__(self, delay: float = 0.01, docs=None):
+        self.delay = delay
+        self.calls = 0
+        self.docs = docs or [
+            SimpleNamespace(page_content="103. Punishment for murder.", metadata={})
+        ]
+
+    def get_relevant_documents(self, query):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.docs
+
+    def invoke(self, query, **search):
+        return self.get_relevant_documents(query)
+
+    async def ainvoke(self, query, **search):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.docs
+
+
+class FakeEmbeddings(HashingEmbeddings):
+    """
+    Offline embeddings that charge a fixed delay per text, like a remote API.
+
+    Args:
+        delay_per_text (float): Seconds added per embedded text
+        dim (int): Embedding dimension
+    """
+
+    def __init__(self, delay_per_text: float = 0.002, dim: int = 256):
+        super().__init__(dim)
+        self.delay_per_text = delay_per_text
+        self.texts_embedded = 0
+
+    def embed_documents(self, texts):
+        self.texts_embedded += len(texts)
+        time.sleep(self.delay_per_text * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.texts_embedded += 1
+        time.sleep(self.delay_per_text)
+        return super().embed_query(text)
@@ -11,30 +11,90 @@ load_dotenv()
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# API Keys
+# API Keys; checked when a Google client is first built, not at import
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY environment variable is not set")
 
 # Default PDF path
 DEFAULT_PDF_PATH = os.path.join(BASE_DIR, "ilovepdf_merged.pdf")
 
 # Books directory
-BOOKS_DIR = os.path.join(BASE_DIR.parent, "books")
+BOOKS_DIR = os.getenv("BOOKS_DIR", os.path.join(BASE_DIR.parent, "books"))
 
 # Database directory for vector storage
-DB_DIR = os.path.join(BASE_DIR, "db")
+DB_DIR = os.getenv("DB_DIR", os.path.join(BASE_DIR, "db"))
 os.makedirs(DB_DIR, exist_ok=True)
 
-# History file path
+# Vector index backend ("faiss", "chroma" or "numpy") and its directory
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "faiss").lower()
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(DB_DIR, f"{VECTOR_BACKEND}_index"))
+
+# FAISS index layout: "flat", "sq8", "ivf_flat", "ivf_sq8", "ivf_pq", "hnsw" or "hnsw_sq8".
+# Indexes stay flat until they hold FAISS_MIN_VECTORS vectors; FAISS_NLIST=0 picks 4 * sqrt(vectors).
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_MIN_VECTORS = int(os.getenv("FAISS_MIN_VECTORS", "10000"))
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "64"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# Persistent store of chunk embeddings, reused across index rebuilds
+EMBEDDING_CACHE_PATH = os.path.join(DB_DIR, "embedding_cache.sqlite")
+
+# Legacy pickle history file, migrated into the history database on startup
 HISTORY_FILE = os.path.join(BASE_DIR, "conversation_history.pkl")
 
+# Conversation history database
+HISTORY_DB_PATH = os.path.join(DB_DIR, "history.sqlite")
+HISTORY_WINDOW_SIZE = int(os.getenv("HISTORY_WINDOW_SIZE", "50"))
+HISTORY_MAX_TURNS_PER_SESSION = int(os.getenv("HISTORY_MAX_TURNS_PER_SESSION", "10000"))
+
 # API settings
 API_PORT = 8800
 API_HOST = "0.0.0.0"
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Messages below this level (DEBUG, INFO, WARNING, ERROR) are not logged
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Shared state for history windows and cached answers: "memory" (per worker),
+# "redis" (a Redis server at STATE_URL) or "local" (api_server.py starts the
+# bundled Redis-compatible state server at STATE_URL for its workers)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_URL = os.getenv("STATE_URL", "redis://127.0.0.1:6390/0")
+# Idle seconds after which a shared history window is dropped (it reloads from the database)
+HISTORY_WINDOW_TTL_SECONDS = float(os.getenv("HISTORY_WINDOW_TTL_SECONDS", "3600"))
+
+# Concurrency settings for the answer pipeline
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "64"))
+# Identical questions asked at the same time share one retrieval and LLM call
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+
+# Embedding request settings for index builds
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_REQUESTS_PER_SECOND = float(os.getenv("EMBEDDING_REQUESTS_PER_SECOND", "5"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_CHECKPOINT_SIZE = int(os.getenv("EMBEDDING_CHECKPOINT_SIZE", "800"))
+
+# Answer cache settings
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.92"))
 
 # Model settings
 EMBEDDING_MODEL = "models/embedding-001"
+# Embeddings: "google" (EMBEDDING_MODEL over the API) or "local" (the model in
+# LOCAL_EMBEDDING_MODEL_DIR on this machine's CPU, see services/local_embeddings.py).
+# Switching provider changes the vector space, so the index has to be rebuilt.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR", os.path.join(BASE_DIR, "embedding_model"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_MAX_TOKENS = int(os.getenv("LOCAL_EMBEDDING_MAX_TOKENS", "256"))
 LLM_MODEL = "gemini-1.5-flash"
 TEMPERATURE = 0.3
 MAX_TOKENS = 2000
@@ -44,5 +104,46 @@ TOP_P = 0.95
 # Document processing settings
 CHUNK_SIZE = 2000
 CHUNK_OVERLAP = 200
-RETRIEVER_SEARCH_K = 5
-RETRIEVER_FETCH_K = 10
\ No newline at end of file
+# "structural" splits along Parts, Chapters and Sections; "recursive" every CHUNK_SIZE characters
+CHUNKER = os.getenv("CHUNKER", "structural").lower()
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_SHARD = int(os.getenv("PAGES_PER_SHARD", "16"))
+# Chunks retrieved per question, candidates MMR picks them from, and MMR's balance of
+# relevance (1) against diversity (0); requests may override all three
+RETRIEVER_SEARCH_K = int(os.getenv("RETRIEVER_SEARCH_K", "5"))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "10"))
+RETRIEVER_LAMBDA_MULT = float(os.getenv("RETRIEVER_LAMBDA_MULT", "0.5"))
+# Optional cross-encoder reranking (see services/reranker.py): an ONNX model directory
+# ("" for none), the vector candidates it scores per question, and its input length
+RERANK_MODEL_DIR = os.getenv("RERANK_MODEL_DIR", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_MAX_TOKENS = int(os.getenv("RERANK_MAX_TOKENS", "256"))
+# Estimated tokens of retrieved context sent with a question (see services/context_packer.py); 0 for no limit
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Batch question answering: questions retrieved together, LLM calls in flight, job output files,
+# and the largest question bank accepted over HTTP
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join(DB_DIR, "batches"))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_MB", "10")) * 1024 * 1024
+
+# Index versions: how many saved versions to keep for rollbacks, how often servers check
+# for a new current version (0 to only reload on request), and the token admin endpoints
+# require in an X-Admin-Token header (empty: admin endpoints are disabled)
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "3"))
+INDEX_WATCH_SECONDS = float(os.getenv("INDEX_WATCH_SECONDS", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Document uploads: where uploaded books are saved (inside BOOKS_DIR, so process_pdf.py keeps
+# them indexed), the largest upload accepted, ingestion job processes, and job status files
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(BOOKS_DIR, "uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", os.path.join(DB_DIR, "ingest_jobs"))
+
+# Retrieval settings: "vector", "sparse" (BM25 only) or "hybrid" (both, fused)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
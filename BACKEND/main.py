@@ -1,28 +1,46 @@
 """
 Main entry point for the LawGPT application.
 """
+import asyncio
 import os
-import sys
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from services.vector_db_service import load_vector_db
-from config.settings import (
-    DEFAULT_PDF_PATH, BOOKS_DIR, API_PORT, API_HOST
-)
-from utils.helpers import print_colored, print_header, check_environment
+from config.settings import INDEX_WATCH_SECONDS
+from services import container
+from services.metrics import MetricsMiddleware
+from utils.helpers import print_header, check_environment
 
 # Load environment variables
 load_dotenv()
 
-# Global variables for use across the application
-retriever = None
-docs = None
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming up the services without delaying startup"""
+    warm_up_task = watch_task = None
+    if os.environ.get("INITIALIZE_APP", "true").lower() == "true":
+        print_header()
+        check_environment(["GOOGLE_API_KEY"])
+
+        # The server answers /health right away; /ready reports when the index is loaded
+        warm_up_task = asyncio.create_task(container.warm_up())
+        # New index versions are loaded and swapped in as they are published
+        if INDEX_WATCH_SECONDS > 0:
+            watch_task = asyncio.create_task(container.watch_index())
+    yield
+    for task in (warm_up_task, watch_task):
+        if task is not None and not task.done():
+            task.cancel()
+    # Ingestion jobs already running finish in their own processes
+    ingestion_queue = container.built("ingestion_queue")
+    if ingestion_queue is not None:
+        ingestion_queue.shutdown()
 
 def init_app():
     """Initialize the FastAPI application"""
-    app = FastAPI(title="LawGPT API", description="Legal research assistant API")
-    
+    app = FastAPI(title="LawGPT API", description="Legal research assistant API", lifespan=lifespan)
+
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -31,38 +49,14 @@ def init_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    
+
+    # Time every request for /metrics
+    app.add_middleware(MetricsMiddleware)
+
     # Include API routes
     from api.routes import router
     app.include_router(router)
-    
-    return app
-
-def load_db():
-    """Load and process the PDF file"""
-    global retriever, docs
 
-    retriever, _ = load_vector_db("db/faiss_index")
-    if retriever:
-        print_colored("✓ System ready to process questions", "green")
-        return True
-    
-    print_colored("Failed to initialize system", "red")
-    return False
+    return app
 
-# Check environment variables
-if os.environ.get("INITIALIZE_APP", "true").lower() == "true":
-    print_header()
-    if not check_environment(["GOOGLE_API_KEY"]):
-        sys.exit(1)
-    
-    # Initialize the application
-    app = init_app()
-    
-    # Load PDF at startup - this needs to happen before the app starts
-    if not load_db():
-        print_colored("Error: Could not load PDF or initialize vector database", "red")
-        sys.exit(1)
-else:
-    # Just initialize the app without loading PDF (for importing)
-    app = init_app()
\ No newline at end of file
+app = init_app()
@@ -7,10 +7,22 @@ from typing import Optional, List, Dict, Any
 class QuestionRequest(BaseModel):
     """Model for question request from client."""
     question: str = Field(..., description="The legal question to be answered")
+    session_id: Optional[str] = Field(None, description="Conversation the question belongs to")
+    k: Optional[int] = Field(None, ge=1, le=50, description="Chunks to retrieve (default RETRIEVER_SEARCH_K)")
+    fetch_k: Optional[int] = Field(None, ge=1, le=1000,
+                                   description="Candidates the chunks are picked from (default RETRIEVER_FETCH_K)")
+    lambda_mult: Optional[float] = Field(None, ge=0, le=1,
+                                         description="Relevance (1) against diversity (0) of the picked chunks")
+
+    def search_params(self) -> Dict[str, Any]:
+        """Retrieval parameters the request overrides"""
+        params = {"k": self.k, "fetch_k": self.fetch_k, "lambda_mult": self.lambda_mult}
+        return {name: value for name, value in params.items() if value is not None}
 
 
 class QuestionResponse(BaseModel):
     """Model for response to client questions."""
     answer: str = Field(..., description="The answer to the question")
     sources: Optional[List[Dict[str, Any]]] = Field(None, description="Source documents used to generate the answer")
-    query_type: Optional[str] = Field(None, description="Type of question detected")
\ No newline at end of file
+    query_type: Optional[str] = Field(None, description="Type of question detected")
+    sections: Optional[List[Dict[str, Any]]] = Field(None, description="The answer split into named sections")
\ No newline at end of file
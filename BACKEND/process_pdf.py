@@ -1,37 +1,26 @@
 """
-Script to process PDF and create vector database.
+Script to process the books and keep the vector database in sync with them.
 """
 import os
 from dotenv import load_dotenv
-from services.pdf_service import process_pdf
-from services.vector_db_service import create_vector_db
-from config.settings import DEFAULT_PDF_PATH
+from services.ingestion import sync_index
+from config.settings import BOOKS_DIR, EMBEDDING_PROVIDER, VECTOR_INDEX_PATH
 from utils.helpers import print_colored, check_environment
 
 def main():
     # Load environment variables
     load_dotenv()
     
-    # Check for required environment variables
-    if not check_environment(["GOOGLE_API_KEY"]):
+    # Check for required environment variables; local embeddings need no API key
+    if EMBEDDING_PROVIDER != "local" and not check_environment(["GOOGLE_API_KEY"]):
         return
     
-    # Process the PDF
-    print_colored("Starting PDF processing...", "yellow")
-    docs, pdf_hash = process_pdf(DEFAULT_PDF_PATH)
-    
-    if not docs:
-        print_colored("Failed to process PDF", "red")
-        return
-    
-    # Create vector database
-    print_colored("Creating vector database...", "yellow")
-    retriever, _ = create_vector_db(docs, "db/faiss_index")
-    
-    if retriever:
-        print_colored("✓ Vector database created successfully!", "green")
+    # Add, update or remove the vectors of new, changed or deleted books
+    print_colored(f"Syncing vector database with {BOOKS_DIR}...", "yellow")
+    if sync_index(BOOKS_DIR, VECTOR_INDEX_PATH):
+        print_colored("✓ Vector database is up to date!", "green")
     else:
-        print_colored("Failed to create vector database", "red")
+        print_colored("Failed to update vector database", "red")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -0,0 +1,363 @@
+"""
+Semantic answer cache for LawGPT application.
+
+Answers are looked up first by exact normalized question, then by cosine
+similarity between the question embedding and the embeddings of cached
+questions. Entries expire after a TTL, the least recently used entries are
+evicted past the entry or memory cap, and the whole cache is dropped whenever
+the vector index it was answered from changes.
+
+With a shared state backend, every answer cached by one worker is also
+appended to a log in the backend, and the other workers copy new log entries
+into their own caches on their next lookup, so matching stays in process.
+"""
+import base64
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+import numpy as np
+from services.response_formatter import FormattedAnswer
+from services.state_backend import StateBackend
+from utils.helpers import print_colored
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TRAILING_PUNCTUATION = "?!.;:,"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact-match lookups.
+
+    Args:
+        question (str): The raw question
+
+    Returns:
+        str: Lowercased question with collapsed whitespace and no trailing punctuation
+    """
+    return WHITESPACE_PATTERN.sub(" ", question.lower()).strip().rstrip(TRAILING_PUNCTUATION).strip()
+
+
+def index_fingerprint(db_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Fingerprint a saved vector index so rebuilds can be detected cheaply.
+
+    Every file in the index directory is included, so the fingerprint works
+    for any vector backend.
+
+    Args:
+        db_path (str): Directory the index was saved to
+
+    Returns:
+        Optional[Tuple[int, int]]: Latest modification time and total size of
+        the index files, or None if no index exists
+    """
+    latest, total = 0, 0
+    try:
+        for root, _, files in os.walk(db_path):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                latest = max(latest, stat.st_mtime_ns)
+                total += stat.st_size
+    except OSError:
+        return None
+    if not latest:
+        return None
+    return latest, total
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class _Entry:
+    __slots__ = ("answer", "slot", "expires_at", "size")
+
+    def __init__(self, answer: FormattedAnswer, slot: int, expires_at: float, size: int):
+        self.answer = answer
+        self.slot = slot
+        self.expires_at = expires_at
+        self.size = size
+
+
+class SemanticAnswerCache:
+    """
+    LRU/TTL answer cache with nearest-neighbour matching on question embeddings.
+
+    Question embeddings live in a preallocated matrix so a semantic lookup is
+    a single matrix-vector product over the live rows.
+
+    Args:
+        embeddings: Object with an ``embed_query(text)`` method
+        max_entries (int): Maximum number of cached answers
+        max_bytes (int): Approximate memory cap for answers and embeddings
+        ttl_seconds (float): Lifetime of an entry
+        similarity_threshold (float): Minimum cosine similarity for a semantic hit
+        clock (Callable[[], float]): Time source, replaceable in tests
+        state (Optional[StateBackend]): Shared backend for answers cached by other workers
+    """
+
+    def __init__(self, embeddings, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600, similarity_threshold: float = 0.92,
+                 clock: Callable[[], float] = time.monotonic, state: Optional[StateBackend] = None):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.state = state
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._slot_keys = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._bytes = 0
+        self._fingerprint = None
+        # Shared log entries of the current index already copied into this cache
+        self._namespace = "answers:none"
+        self._seen = 0
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.synced = 0
+
+    def bind_index(self, fingerprint):
+        """
+        Drop every entry if the index fingerprint changed since the last call.
+
+        Args:
+            fingerprint: Any comparable value identifying the current index
+        """
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._fingerprint is not None:
+                    self._clear()
+                    print_colored("Vector index changed, answer cache cleared", "yellow")
+                self._fingerprint = fingerprint
+                # Answers for another index stay under their old keys until they expire
+                self._namespace = "answers:" + ("none" if fingerprint is None else
+                                                "-".join(str(part) for part in fingerprint))
+                self._seen = 0
+
+    def invalidate(self):
+        """Drop every cached answer held by this process"""
+        with self._lock:
+            self._clear()
+
+    def embed(self, question: str) -> Optional[np.ndarray]:
+        """
+        Embed a question.
+
+        Args:
+            question (str): The question to embed
+
+        Returns:
+            Optional[np.ndarray]: The float32 embedding as the model returned it,
+            or None if embedding failed
+        """
+        try:
+            return np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        except Exception as e:
+            print_colored(f"Answer cache embedding failed: {str(e)}", "yellow")
+            return None
+
+    def lookup(self, question: str) -> Tuple[Optional[FormattedAnswer], Optional[np.ndarray]]:
+        """
+        Find a cached answer for a question.
+
+        A question with no exact match is embedded. The embedding is returned
+        so a miss can pass it on to retrieval and put() instead of embedding
+        the question again.
+
+        Args:
+            question (str): The question
+
+        Returns:
+            Tuple[Optional[FormattedAnswer], Optional[np.ndarray]]: The cached answer (or None)
+            and the question embedding if one was computed
+        """
+        self._sync()
+        key = normalize_question(question)
+        with self._lock:
+            answer = self._get_exact(key)
+            if answer is not None:
+                self.exact_hits += 1
+                return answer, None
+
+        # Embed outside the lock; it may be a network call
+        vector = self.embed(question)
+        with self._lock:
+            answer = self._get_nearest(_unit(vector)) if vector is not None and self._entries else None
+            if answer is not None:
+                self.semantic_hits += 1
+            else:
+                self.misses += 1
+        return answer, vector
+
+    def put(self, question: str, answer: FormattedAnswer, vector: Optional[np.ndarray] = None):
+        """
+        Cache an answer.
+
+        Args:
+            question (str): The question
+            answer (FormattedAnswer): The formatted answer and its sections
+            vector (Optional[np.ndarray]): The question embedding from lookup(), if any
+        """
+        if vector is None:
+            vector = self.embed(question)
+        if vector is None:
+            return
+
+        key = normalize_question(question)
+        vector = _unit(vector)
+        with self._lock:
+            stored = self._insert(key, answer, vector, self.ttl_seconds)
+        if stored and self.state is not None:
+            self._publish(key, answer, vector)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hit, miss and eviction counts plus current size
+        """
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "synced": self.synced,
+            }
+
+    def _insert(self, key: str, answer: FormattedAnswer, vector: np.ndarray, ttl: float) -> bool:
+        # Sections repeat the text of the answer, so they are counted as a second copy of it
+        size = 2 * len(answer.text.encode("utf-8")) + len(key) + vector.nbytes
+        if size > self.max_bytes:
+            return False
+        if self._vectors is not None and vector.shape[0] != self._vectors.shape[1]:
+            return False
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and (not self._free_slots or self._bytes + size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+        slot = self._free_slots.pop()
+        self._vectors[slot] = vector
+        self._live[slot] = True
+        self._slot_keys[slot] = key
+        self._entries[key] = _Entry(answer, slot, self.clock() + ttl, size)
+        self._bytes += size
+        return True
+
+    def _publish(self, key: str, answer: FormattedAnswer, vector: np.ndarray):
+        # The log is appended before the counter moves, so a reader never counts an entry it cannot see
+        entry = json.dumps({
+            "key": key,
+            "answer": answer.text,
+            "sections": answer.sections,
+            "vector": base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii"),
+            "expires_at": time.time() + self.ttl_seconds,
+        })
+        namespace = self._namespace
+        try:
+            self.state.push(f"{namespace}:log", [entry], self.max_entries, ttl=self.ttl_seconds)
+            count = self.state.incr(f"{namespace}:count")
+        except Exception as e:
+            print_colored(f"Error sharing cached answer: {e}", "yellow")
+            return
+        with self._lock:
+            if namespace == self._namespace and count == self._seen + 1:
+                self._seen = count
+
+    def _sync(self):
+        if self.state is None:
+            return
+        namespace = self._namespace
+        try:
+            count = int(self.state.get(f"{namespace}:count") or 0)
+            new = count - self._seen
+            if new <= 0:
+                return
+            items = self.state.tail(f"{namespace}:log", min(new, self.max_entries)) or []
+        except Exception as e:
+            print_colored(f"Error reading shared answer cache: {e}", "yellow")
+            return
+
+        now = time.time()
+        with self._lock:
+            if namespace != self._namespace:
+                return
+            self._seen = count
+            for item in items:
+                entry = json.loads(item)
+                ttl = entry["expires_at"] - now
+                if ttl <= 0:
+                    continue
+                vector = np.frombuffer(base64.b64decode(entry["vector"]), dtype=np.float32)
+                answer = FormattedAnswer(entry["answer"], entry.get("sections"))
+                if self._insert(entry["key"], answer, vector, ttl):
+                    self.synced += 1
+
+    def _get_exact(self, key: str) -> Optional[FormattedAnswer]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry.answer
+
+    def _get_nearest(self, vector: np.ndarray) -> Optional[FormattedAnswer]:
+        if self._vectors is None or vector.shape[0] != self._vectors.shape[1]:
+            return None
+        scores = self._vectors @ vector
+        scores[~self._live] = -np.inf
+
+        # Skip over expired neighbours until a live one is found
+        while True:
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.similarity_threshold:
+                return None
+            answer = self._get_exact(self._slot_keys[slot])
+            if answer is not None:
+                return answer
+            scores[slot] = -np.inf
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._live[entry.slot] = False
+        self._slot_keys[entry.slot] = None
+        self._free_slots.append(entry.slot)
+        self._bytes -= entry.size
+
+    def _clear(self):
+        self._entries.clear()
+        self._live[:] = False
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._bytes = 0
+        self.invalidations += 1
@@ -0,0 +1,95 @@
+"""
+Batch retrieval for LawGPT application.
+
+Retrieves the chunks of many questions at once: the questions are embedded in
+batched embedding calls, the vector index is searched once for the whole
+query matrix, and MMR picks each row's chunks. Retrievers that know how to batch
+(HybridRetriever, CitationRetriever) expose retrieve_batch; any other
+retriever is asked one question at a time.
+"""
+import inspect
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from config.settings import EMBEDDING_BATCH_SIZE
+from services.vector_search import SEARCH_PARAMS, search_store
+
+
+def embed_queries(embeddings: Embeddings, queries: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """
+    Embed questions for search, in as few embedding calls as possible.
+
+    Args:
+        embeddings (Embeddings): The query embeddings
+        queries (List[str]): Questions to embed
+        batch_size (int): Texts per embedding call
+
+    Returns:
+        np.ndarray: One float32 row per question
+    """
+    if not queries:
+        return np.zeros((0, 0), dtype=np.float32)
+    # Google and local embeddings embed a whole batch in one call; embed_query is a batch of one
+    if "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+        task_type = getattr(embeddings, "task_type", None) or "RETRIEVAL_QUERY"
+        vectors = embeddings.embed_documents(queries, batch_size=batch_size, task_type=task_type)
+    else:
+        vectors = [embeddings.embed_query(query) for query in queries]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def search_vectors(vector_retriever: Any, vectors: np.ndarray,
+                   queries: Optional[List[str]] = None) -> List[List[Document]]:
+    """
+    Search a vector retriever's store for a matrix of query vectors.
+
+    A FAISS store is searched once for every row; see services/vector_search.py.
+
+    Args:
+        vector_retriever: A VectorStoreRetriever, as built by create_retriever
+        vectors (np.ndarray): One query vector per row
+        queries (Optional[List[str]]): The questions, needed for reranking
+
+    Returns:
+        List[List[Document]]: Chunks for each row, best first
+    """
+    if hasattr(vector_retriever, "search_vectors"):
+        return vector_retriever.search_vectors(vectors, queries)
+    kwargs = {name: value for name, value in vector_retriever.search_kwargs.items() if name in SEARCH_PARAMS}
+    return search_store(vector_retriever.vectorstore, vectors, queries, vector_retriever.search_type, **kwargs)
+
+
+def retrieve_vectors_batch(vector_retriever: Any, queries: List[str]) -> List[List[Document]]:
+    """
+    Embed and search many questions with a vector retriever.
+
+    Args:
+        vector_retriever: A VectorStoreRetriever, as built by create_retriever
+        queries (List[str]): Questions
+
+    Returns:
+        List[List[Document]]: Chunks for each question, best first
+    """
+    if not queries:
+        return []
+    vectors = embed_queries(vector_retriever.vectorstore.embeddings, queries)
+    return search_vectors(vector_retriever, vectors, queries)
+
+
+def retrieve_batch(retriever: Any, queries: List[str]) -> List[List[Document]]:
+    """
+    Retrieve chunks for many questions with whatever retriever is being served.
+
+    Args:
+        retriever: The retriever from the service container
+        queries (List[str]): Questions
+
+    Returns:
+        List[List[Document]]: Chunks for each question, best first
+    """
+    if hasattr(retriever, "retrieve_batch"):
+        return retriever.retrieve_batch(queries)
+    if hasattr(retriever, "vectorstore") and hasattr(retriever, "search_kwargs"):
+        return retrieve_vectors_batch(retriever, queries)
+    return [retriever.invoke(query) for query in queries]
@@ -0,0 +1,232 @@
+"""
+Batch question answering for LawGPT application.
+
+Runs a bank of questions through the answer pipeline. Questions are prepared
+BATCH_SIZE at a time: the legal questions of a batch are retrieved together
+(batched query embeddings and one vector search, see batch_retrieval), and
+their context is packed as for single questions. BATCH_CONCURRENCY LLM calls
+run at once, and the next batch is retrieved while the current one is being
+generated. Each result is written as a JSONL line as soon as it is ready.
+
+Results are appended to an output file. Running a job again with the same
+file skips the questions already answered there, so an interrupted job
+resumes where it stopped; questions that failed are tried again. Batch
+answers bypass the answer cache and the conversation history.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from config.settings import BATCH_CONCURRENCY, BATCH_SIZE
+from services.batch_retrieval import retrieve_batch
+from services.concurrency import request_limiter
+from services.container import get_llm, get_retriever
+from services.context_packer import pack_context
+from services.llm_service import build_prompt, format_answer, record_llm_usage
+from services.metrics import ANSWERS, RETRIEVED_DOCUMENTS, span
+from services.query_classifier import classify
+from utils.helpers import print_colored
+
+
+def read_questions(lines: Iterable[str]) -> List[dict]:
+    """
+    Parse a JSONL question bank.
+
+    Each line is an object with a "question" and an optional "id"; lines
+    without an id are numbered from 1.
+
+    Args:
+        lines (Iterable[str]): JSONL lines
+
+    Returns:
+        List[dict]: Questions with "id" and "question"
+
+    Raises:
+        ValueError: If a line is not a question object or an id repeats
+    """
+    questions, seen = [], set()
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {str(e)}")
+        if not isinstance(record, dict) or not isinstance(record.get("question"), str) \
+                or not record["question"].strip():
+            raise ValueError(f"Line {number} has no question")
+        question_id = record.get("id", number)
+        if str(question_id) in seen:
+            raise ValueError(f"Line {number} repeats id {question_id}")
+        seen.add(str(question_id))
+        questions.append({"id": question_id, "question": record["question"].strip()})
+    return questions
+
+
+def load_completed(path: str) -> Dict[str, dict]:
+    """
+    Read the answered questions of an earlier run.
+
+    A line cut short by an interruption is removed from the file, so that
+    new results start on a line of their own.
+
+    Args:
+        path (str): Output file of the job
+
+    Returns:
+        Dict[str, dict]: Results without an error, by question id
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    completed = {}
+    for line in data[:end].decode("utf-8", errors="replace").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and "id" in record and "error" not in record:
+            completed[str(record["id"])] = record
+    return completed
+
+
+def prepare_batch(questions: List[dict]) -> List[dict]:
+    """
+    Classify, retrieve and build the prompts of a batch of questions.
+
+    Args:
+        questions (List[dict]): Questions with "id" and "question"
+
+    Returns:
+        List[dict]: The questions with their prompt "messages" and context
+            sizes, or an "error" if retrieval failed
+    """
+    items = [dict(item, **classify(item["question"])._asdict()) for item in questions]
+    legal = [item for item in items if item["legal"]]
+    try:
+        retriever = get_retriever() if legal else None
+        if retriever is not None:
+            with span("batch_retrieval"):
+                found = retrieve_batch(retriever, [item["question"] for item in legal])
+            for item, docs in zip(legal, found):
+                RETRIEVED_DOCUMENTS.observe(len(docs))
+                with span("pack"):
+                    packed = pack_context(docs)
+                item.update(context=packed.text, chunks=len(docs), context_tokens=packed.packed_tokens)
+    except Exception as e:
+        print_colored(f"Batch retrieval failed: {str(e)}", "red")
+        return [{"id": item["id"], "question": item["question"], "error": str(e)} for item in items]
+
+    for item in items:
+        item["messages"] = build_prompt(item["question"], item.pop("context", None), item["legal"]).format_messages()
+    return items
+
+
+async def answer_prepared(item: dict) -> dict:
+    """
+    Generate and format the answer of a prepared question.
+
+    Args:
+        item (dict): A question from prepare_batch
+
+    Returns:
+        dict: The result line: id, question, answer and sections, or an error
+    """
+    if "error" in item:
+        ANSWERS.inc(source="error")
+        return item
+    result = {"id": item["id"], "question": item["question"]}
+    start = time.perf_counter()
+    try:
+        # Batch calls share the server's LLM slots with single questions
+        async with request_limiter:
+            with span("llm"):
+                response = await get_llm().ainvoke(item["messages"])
+        record_llm_usage(item["messages"], response.content, getattr(response, "usage_metadata", None))
+        answer = format_answer(item["question"], response.content, item["style"])
+    except Exception as e:
+        ANSWERS.inc(source="error")
+        result["error"] = str(e)
+        return result
+    ANSWERS.inc(source="batch")
+    result.update(answer=answer.text, sections=answer.sections, legal=item["legal"],
+                  chunks=item.get("chunks", 0), context_tokens=item.get("context_tokens", 0),
+                  seconds=round(time.perf_counter() - start, 3))
+    return result
+
+
+async def run_batch(questions: List[dict], output_path: Optional[str] = None, batch_size: int = BATCH_SIZE,
+                    concurrency: int = BATCH_CONCURRENCY, replay: bool = False) -> AsyncIterator[dict]:
+    """
+    Answer a bank of questions, yielding each result as it is ready.
+
+    Args:
+        questions (List[dict]): Questions from read_questions
+        output_path (Optional[str]): File results are appended to, and resumed from
+        batch_size (int): Questions retrieved together
+        concurrency (int): LLM calls in flight
+        replay (bool): Whether to yield the results of an earlier run first
+
+    Yields:
+        dict: Result lines, in completion order
+    """
+    completed = load_completed(output_path) if output_path else {}
+    pending = [item for item in questions if str(item["id"]) not in completed]
+    if replay:
+        for item in questions:
+            if str(item["id"]) in completed:
+                yield completed[str(item["id"])]
+    if completed:
+        print_colored(f"Resuming batch: {len(questions) - len(pending)} of {len(questions)} already answered",
+                      "yellow")
+    if not pending:
+        return
+
+    prepared = asyncio.Queue(maxsize=batch_size)
+    results = asyncio.Queue()
+    concurrency = max(1, concurrency)
+
+    async def produce():
+        try:
+            for start in range(0, len(pending), batch_size):
+                # Retrieval is blocking, so it runs in a thread while earlier answers are generated
+                for item in await asyncio.to_thread(prepare_batch, pending[start:start + batch_size]):
+                    await prepared.put(item)
+        finally:
+            for _ in range(concurrency):
+                await prepared.put(None)
+
+    async def generate():
+        try:
+            while True:
+                item = await prepared.get()
+                if item is None:
+                    break
+                await results.put(await answer_prepared(item))
+        finally:
+            await results.put(None)
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(generate()) for _ in range(concurrency)]
+    output = open(output_path, "a", encoding="utf-8") if output_path else None
+    try:
+        running = concurrency
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+                continue
+            if output is not None:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if output is not None:
+            output.close()
@@ -0,0 +1,200 @@
+"""
+SQLite chunk store for LawGPT application.
+
+Holds the text and metadata of every indexed chunk, keyed by chunk id and by
+position in the index it serves, in place of the pickled docstore written by
+FAISS.save_local and of the keyword index's JSON docstore. Opening the store reads nothing up front, and SQLite
+memory-maps the file, so server workers share its pages through the OS page
+cache instead of each holding a copy of the corpus.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Iterator, List, Sequence, Tuple, Union
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+# SQLite maps up to this many bytes of the file instead of reading it into its cache
+MMAP_SIZE = 1 << 40
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """Raised when a store loaded read-only is asked to change"""
+
+
+class ChunkStore(Docstore):
+    """
+    Read-only docstore over a chunk database.
+
+    Args:
+        path (str): SQLite database file written by ChunkStore.write
+    """
+
+    FILE = "docstore.sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self.positions = PositionMap(self)
+
+    def __len__(self) -> int:
+        # Positions run from 0 without gaps, and MAX on the primary key is a single lookup
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM chunks").fetchone()[0]
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Look up a chunk by id.
+
+        Args:
+            search (str): Chunk id
+
+        Returns:
+            Union[str, Document]: The chunk, or an error message if the id is unknown
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT text, metadata FROM chunks WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def delete(self, ids: List) -> None:
+        raise ReadOnlyStoreError("ChunkStore is read-only; load the index writable to change it")
+
+    def id_at(self, position: int) -> str:
+        """
+        Chunk id at a position of the vector index.
+
+        Args:
+            position (int): Position in the vector index
+
+        Returns:
+            str: The chunk id
+
+        Raises:
+            KeyError: If no chunk is stored at that position
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM chunks WHERE position = ?", (int(position),)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def _select(self, column: str, keys: Sequence) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = list(keys[start:start + LOOKUP_BATCH_SIZE])
+                rows = self._conn.execute(
+                    f"SELECT {column}, text, metadata FROM chunks "
+                    f"WHERE {column} IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, text, metadata in rows:
+                    found[key] = Document(page_content=text, metadata=json.loads(metadata))
+        return found
+
+    def documents_at(self, positions: Sequence[int]) -> List[Document]:
+        """
+        Fetch chunks by position.
+
+        Args:
+            positions (Sequence[int]): Positions in the index the store serves
+
+        Returns:
+            List[Document]: The chunks that exist, in the order given
+        """
+        positions = [int(position) for position in positions]
+        found = self._select("position", positions)
+        return [found[position] for position in positions if position in found]
+
+    def get_by_ids(self, ids: Sequence[str]) -> List[Document]:
+        """
+        Fetch chunks by id.
+
+        Args:
+            ids (Sequence[str]): Chunk ids
+
+        Returns:
+            List[Document]: The chunks that exist, in the order given
+        """
+        found = self._select("id", ids)
+        return [found[chunk_id] for chunk_id in ids if chunk_id in found]
+
+    def read_all(self) -> Tuple[List[str], List[Document]]:
+        """
+        Every chunk, in vector index order.
+
+        Returns:
+            Tuple[List[str], List[Document]]: Chunk ids and documents
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, text, metadata FROM chunks ORDER BY position").fetchall()
+        return ([chunk_id for chunk_id, _, _ in rows],
+                [Document(page_content=text, metadata=json.loads(metadata)) for _, text, metadata in rows])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def write(path: str, ids: List[str], docs: List[Document]):
+        """
+        Write a chunk database, replacing any existing one atomically.
+
+        Processes that already opened the old file keep reading it until they
+        reopen, so a running server never sees a half-written store.
+
+        Args:
+            path (str): SQLite database file
+            ids (List[str]): Chunk ids, in vector index order
+            docs (List[Document]): The chunks, in the same order
+        """
+        temp_path = f"{path}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute(
+                """CREATE TABLE chunks (
+                    position INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )"""
+            )
+            conn.executemany(
+                "INSERT INTO chunks (position, id, text, metadata) VALUES (?, ?, ?, ?)",
+                ((position, chunk_id, doc.page_content, json.dumps(doc.metadata))
+                 for position, (chunk_id, doc) in enumerate(zip(ids, docs)))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(temp_path, path)
+
+
+class PositionMap(Mapping):
+    """
+    Vector index position to chunk id mapping, read from a ChunkStore on demand.
+
+    Stands in for the index_to_docstore_id dict of a FAISS vector store.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def __getitem__(self, position: int) -> str:
+        return self._store.id_at(position)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self._store)
@@ -0,0 +1,230 @@
+"""
+Citation lookup for LawGPT application.
+
+Maps section and article identifiers to the chunks that hold them, so a
+question such as "What does Section 103 of the BNS say?" is answered from a
+dictionary lookup instead of a vector search. The table is derived from the
+"sections" metadata written by the structural chunker.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from config.settings import RETRIEVER_SEARCH_K
+
+CITATION_PATTERN = re.compile(
+    r"\b(sections?|secs?\.?|s\.|articles?|arts?\.?)\s*"
+    r"(\d{1,3}[A-Z]?(?:\s*(?:,|and|&|or)\s*\d{1,3}[A-Z]?)*)\b",
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(r"\d{1,3}[A-Z]?")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# Words shared by act titles that say nothing about which act is meant
+GENERIC_TITLE_WORDS = frozenset("the of and act code sanhita adhiniyam india indian bharatiya".split())
+
+
+def parse_citations(question: str) -> List[str]:
+    """
+    Extract cited sections and articles from a question.
+
+    Args:
+        question (str): The question
+
+    Returns:
+        List[str]: Keys such as "section:103" or "article:21", in order of mention
+    """
+    keys = []
+    for kind, numbers in CITATION_PATTERN.findall(question):
+        kind = "article" if kind.lower().startswith("art") else "section"
+        for number in NUMBER_PATTERN.findall(numbers):
+            key = f"{kind}:{number.upper()}"
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+def _abbreviation(title: str) -> str:
+    words = [word for word in WORD_PATTERN.findall(title.lower()) if word not in ("the", "of", "and")]
+    return "".join(word[0] for word in words)
+
+
+class CitationIndex:
+    """
+    Lookup table from section or article identifiers to chunk ids.
+
+    When a question names an act by its abbreviation ("BNS") or a distinctive
+    word of its title ("Nyaya"), only that act's chunks are returned.
+    """
+
+    FILE = "citations.json"
+
+    def __init__(self, entries: Optional[Dict[str, List[List[str]]]] = None,
+                 acts: Optional[Dict[str, dict]] = None):
+        self.entries = entries or {}
+        self.acts = acts or {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, ids: List[str], metadatas: List[dict]) -> "CitationIndex":
+        """
+        Build the table from chunk metadata.
+
+        Args:
+            ids (List[str]): Chunk ids
+            metadatas (List[dict]): Chunk metadata, in the same order
+
+        Returns:
+            CitationIndex: The table
+        """
+        entries: Dict[str, List[List[str]]] = {}
+        titles = set()
+        for chunk_id, metadata in zip(ids, metadatas):
+            sections = metadata.get("sections")
+            if not sections:
+                continue
+            act = metadata.get("act", "")
+            titles.add(act)
+            kind = metadata.get("citation_kind", "section")
+            for number in sections.split(","):
+                entries.setdefault(f"{kind}:{number}", []).append([act, chunk_id])
+
+        # An act is recognised by its abbreviation or by title words no other act uses
+        words = {title: set(WORD_PATTERN.findall(title.lower())) - GENERIC_TITLE_WORDS for title in titles if title}
+        acts = {}
+        for title, own in words.items():
+            others = set().union(*(other for name, other in words.items() if name != title))
+            acts[title] = {"abbreviation": _abbreviation(title.split(",")[0]), "keywords": sorted(own - others)}
+        return cls(entries, acts)
+
+    def named_acts(self, question: str) -> List[str]:
+        """
+        Acts a question refers to by name or abbreviation.
+
+        Args:
+            question (str): The question
+
+        Returns:
+            List[str]: Act titles
+        """
+        question_words = set(WORD_PATTERN.findall(question.lower()))
+        return [
+            title for title, aliases in self.acts.items()
+            if aliases["abbreviation"] in question_words or question_words & set(aliases["keywords"])
+        ]
+
+    def lookup(self, question: str) -> List[str]:
+        """
+        Find the chunks holding the sections or articles a question cites.
+
+        Args:
+            question (str): The question
+
+        Returns:
+            List[str]: Chunk ids in order of citation; empty if nothing is cited
+            or the cited sections are unknown. When several acts match, their
+            chunks are interleaved so a long section of one act does not
+            crowd out the others.
+        """
+        citations = parse_citations(question)
+        if not citations:
+            return []
+        acts = self.named_acts(question)
+        by_act: Dict[str, List[str]] = {}
+        for key in citations:
+            for act, chunk_id in self.entries.get(key, []):
+                if not acts or act in acts:
+                    chunk_ids = by_act.setdefault(act, [])
+                    if chunk_id not in chunk_ids:
+                        chunk_ids.append(chunk_id)
+        interleaved = []
+        groups = list(by_act.values())
+        for position in range(max(map(len, groups), default=0)):
+            interleaved.extend(group[position] for group in groups if position < len(group))
+        return interleaved
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Whether a saved table exists in directory `path`"""
+        return os.path.exists(os.path.join(path, cls.FILE))
+
+    def save(self, path: str):
+        """
+        Save the table to a directory.
+
+        Args:
+            path (str): Directory to write to, usually the vector index directory
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, self.FILE), "w", encoding="utf-8") as f:
+            json.dump({"acts": self.acts, "entries": self.entries}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "CitationIndex":
+        """
+        Load a table saved with save.
+
+        Args:
+            path (str): Directory to read from
+
+        Returns:
+            CitationIndex: The table
+        """
+        with open(os.path.join(path, cls.FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["entries"], data["acts"])
+
+
+class CitationRetriever(BaseRetriever):
+    """
+    Retriever that answers cited sections from the lookup table.
+
+    Questions that cite no known section go to the wrapped retriever.
+    """
+
+    citation_index: Any
+    docstore: Any
+    retriever: Optional[BaseRetriever] = None
+    k: int = RETRIEVER_SEARCH_K
+
+    def _lookup(self, query: str, k: Optional[int] = None) -> List[Document]:
+        chunk_ids = self.citation_index.lookup(query)
+        return self.docstore.get_by_ids(chunk_ids[:k or self.k]) if chunk_ids else []
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                **kwargs: Any) -> List[Document]:
+        docs = self._lookup(query, kwargs.get("k"))
+        if docs or self.retriever is None:
+            return docs
+        return self.retriever.invoke(query, **kwargs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       **kwargs: Any) -> List[Document]:
+        docs = self._lookup(query, kwargs.get("k"))
+        if docs or self.retriever is None:
+            return docs
+        return await self.retriever.ainvoke(query, **kwargs)
+
+    def retrieve_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve chunks for many questions; those citing no known section are searched together.
+
+        Args:
+            queries (List[str]): Questions
+
+        Returns:
+            List[List[Document]]: Chunks for each question, best first
+        """
+        from services.batch_retrieval import retrieve_batch
+
+        results = [self._lookup(query) for query in queries]
+        pending = [i for i, docs in enumerate(results) if not docs]
+        if pending and self.retriever is not None:
+            for i, docs in zip(pending, retrieve_batch(self.retriever, [queries[i] for i in pending])):
+                results[i] = docs
+        return results
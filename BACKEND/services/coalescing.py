@@ -0,0 +1,202 @@
+"""
+Request coalescing for the LawGPT answer pipeline.
+
+When many clients ask the same question at once, e.g. a question shared with
+a class, only the first request retrieves and calls the LLM. The others wait
+for its answer instead of repeating the work. Streamed answers are shared
+the same way: a client asking while the answer streams gets the fragments
+already produced, then the rest as they arrive. A stream is stopped once
+its last reader leaves before the end.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from services.answer_cache import normalize_question
+
+
+def request_key(question: str, context: Optional[str] = None,
+                search: Optional[Dict[str, Any]] = None) -> Tuple:
+    """
+    Key under which identical requests are coalesced.
+
+    Args:
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        search (Optional[Dict[str, Any]]): Retrieval parameters overridden by the request
+
+    Returns:
+        Tuple: The normalized question, the context and the retrieval parameters
+    """
+    return normalize_question(question), context, tuple(sorted((search or {}).items()))
+
+
+class SharedStream:
+    """
+    Fragments of one streamed answer, replayed to every subscriber.
+
+    The producer publishes fragments and finishes the stream; subscribers
+    read from the first fragment, however late they join. When the last
+    subscriber leaves before the stream is done, the producer task is
+    cancelled, since nobody is left to read the rest.
+    """
+
+    def __init__(self):
+        self.fragments: List[str] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.cancelled = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, fragment: str):
+        """
+        Add a fragment and wake the subscribers.
+
+        Args:
+            fragment (str): The fragment
+        """
+        self.fragments.append(fragment)
+        self._notify()
+
+    def finish(self, result: Any = None, error: Optional[BaseException] = None):
+        """
+        End the stream.
+
+        Args:
+            result (Any): What the producer returned
+            error (Optional[BaseException]): Raised to the subscribers once they
+                have read every fragment, if the producer failed
+        """
+        self.result = result
+        self.error = error
+        self.done = True
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """
+        Read the stream from its first fragment.
+
+        Yields:
+            str: Every fragment, in order
+
+        Raises:
+            BaseException: The error the producer failed with
+        """
+        self.subscribers += 1
+        try:
+            position = 0
+            while True:
+                changed = self._changed
+                while position < len(self.fragments):
+                    yield self.fragments[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                self.cancelled = True
+                self.task.cancel()
+
+
+def start_stream(produce: Callable[[SharedStream], Awaitable[Any]]) -> SharedStream:
+    """
+    Run a producer in its own task, publishing to a new stream.
+
+    Args:
+        produce (Callable[[SharedStream], Awaitable[Any]]): Publishes the
+            fragments to the stream it is given; its return value becomes
+            the stream's result
+
+    Returns:
+        SharedStream: The stream; cancel its task to stop the producer
+    """
+    shared = SharedStream()
+
+    async def run():
+        try:
+            result = await produce(shared)
+        except BaseException as e:
+            shared.finish(error=e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            shared.finish(result)
+    # Held by the stream, since the event loop only keeps weak references to tasks
+    shared.task = asyncio.ensure_future(run())
+    return shared
+
+
+class RequestCoalescer:
+    """
+    Share one in-progress computation among identical concurrent requests.
+
+    Work runs in its own task, so a client that disconnects does not cancel
+    it for the others still waiting; a stream is stopped once all of its
+    readers have left. A request arriving after the work has finished starts
+    it again (the answer cache serves repeated questions).
+    """
+
+    def __init__(self):
+        self._answers: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, SharedStream] = {}
+
+    def _forget(self, flights: Dict[Hashable, Any], key: Hashable, flight: Any):
+        if flights.get(key) is flight:
+            del flights[key]
+
+    async def answer(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await the result of `compute`, joining a call already running for `key`.
+
+        Args:
+            key (Hashable): Requests with equal keys share one call
+            compute (Callable[[], Awaitable[Any]]): Starts the work
+
+        Returns:
+            Tuple[Any, bool]: The result, and whether this request started the work
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        task = self._answers.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(compute())
+            self._answers[key] = task
+
+            def done(finished: asyncio.Task):
+                self._forget(self._answers, key, finished)
+                # Marks the error as retrieved even if every waiter went away
+                if not finished.cancelled():
+                    finished.exception()
+            task.add_done_callback(done)
+        return await asyncio.shield(task), leader
+
+    def stream(self, key: Hashable, produce: Callable[[SharedStream], Awaitable[Any]]) -> Tuple[SharedStream, bool]:
+        """
+        Get the stream for `key`, starting `produce` if none is running.
+
+        Args:
+            key (Hashable): Requests with equal keys share one stream
+            produce (Callable[[SharedStream], Awaitable[Any]]): Producer, as
+                for start_stream
+
+        Returns:
+            Tuple[SharedStream, bool]: The stream, and whether this request started it
+        """
+        shared = self._streams.get(key)
+        # A stream whose readers all left is stopping; a new request starts over
+        if shared is not None and not shared.cancelled:
+            return shared, False
+        shared = self._streams[key] = start_stream(produce)
+        shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+        return shared, True
@@ -0,0 +1,78 @@
+"""
+Concurrency control for the LawGPT answer pipeline.
+"""
+import asyncio
+import weakref
+from config.settings import MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the request queue is full and a new request is rejected."""
+
+
+class ConcurrencyLimiter:
+    """
+    Bound the number of in-flight requests and the number waiting for a slot.
+
+    Requests beyond ``max_in_flight`` wait in FIFO order; once ``max_queued``
+    requests are already waiting, new ones are rejected with QueueFullError so
+    the server sheds load instead of piling up unbounded work.
+
+    A semaphore only works on the event loop it first waited on, so each
+    loop gets its own; code that calls asyncio.run for every answer (the
+    sync get_llm_response) would otherwise fail on its second loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+        self.queued = 0
+
+    @property
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return semaphore
+
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            raise QueueFullError(
+                f"Too many pending requests ({self.queued} queued, "
+                f"{self.in_flight} in flight)"
+            )
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+        return False
+
+    def stats(self) -> dict:
+        """
+        Get the current limiter state.
+
+        Returns:
+            dict: In-flight and queued request counts with their limits
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+        }
+
+
+# Shared limiter for /api/ask
+request_limiter = ConcurrencyLimiter(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS)
@@ -0,0 +1,370 @@
+"""
+Lazy service container for LawGPT application.
+
+The LLM, embeddings, vector index, state backend, history store, answer cache
+and request coalescer are each built once, on first use or by the background
+warm-up task, and shared by every module that needs them. Nothing heavy
+happens at import time, so the API starts serving /health immediately.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from config.settings import (
+    GOOGLE_API_KEY, LLM_MODEL, TEMPERATURE, MAX_TOKENS, EMBEDDING_MODEL, EMBEDDING_PROVIDER, VECTOR_INDEX_PATH,
+    RETRIEVAL_MODE,
+    HISTORY_FILE, HISTORY_DB_PATH, HISTORY_WINDOW_SIZE, HISTORY_MAX_TURNS_PER_SESSION, HISTORY_WINDOW_TTL_SECONDS,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY_THRESHOLD, INDEX_WATCH_SECONDS, REQUEST_COALESCING_ENABLED
+)
+from utils.helpers import print_colored
+
+_instances: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+# Readiness of the vector index, reported by /ready; "version" is the index version served, and
+# "fingerprint" identifies the files of an unversioned index when it was loaded
+index_state = {"status": "not_loaded", "mode": None, "error": None, "load_seconds": None, "version": None,
+               "fingerprint": None}
+
+
+def _singleton(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Build a shared instance once, even under concurrent first use.
+
+    Each instance has its own lock, so a slow index load does not hold up
+    building the LLM client.
+
+    Args:
+        name (str): Instance name
+        factory (Callable[[], Any]): Builds the instance
+
+    Returns:
+        Any: The shared instance
+    """
+    if name in _instances:
+        return _instances[name]
+    with _locks_guard:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def override(name: str, instance: Any):
+    """
+    Replace a shared instance, e.g. with a fake in benchmarks.
+
+    Args:
+        name (str): Instance name ("llm", "query_embeddings", "retriever",
+            "state_backend", "history_store", "answer_cache", "request_coalescer"
+            or "ingestion_queue")
+        instance (Any): The replacement
+    """
+    _instances[name] = instance
+    if name == "retriever":
+        index_state.update(status="ready", error=None)
+
+
+def built(name: str) -> Any:
+    """
+    Get a shared instance without building it.
+
+    Args:
+        name (str): Instance name
+
+    Returns:
+        Any: The instance, or None if it has not been built yet
+    """
+    return _instances.get(name)
+
+
+def _require_api_key():
+    if not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY environment variable is not set")
+
+
+def get_llm():
+    """Get the shared chat model"""
+    def build():
+        _require_api_key()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=LLM_MODEL,
+            temperature=TEMPERATURE,
+            max_output_tokens=MAX_TOKENS,
+            google_api_key=GOOGLE_API_KEY
+        )
+    return _singleton("llm", build)
+
+
+def get_query_embeddings():
+    """Get the shared embeddings used for questions"""
+    def build():
+        if EMBEDDING_PROVIDER == "local":
+            from services.local_embeddings import LocalEmbeddings
+            return LocalEmbeddings()
+        _require_api_key()
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            google_api_key=GOOGLE_API_KEY
+        )
+    return _singleton("query_embeddings", build)
+
+
+def _load_retriever(version: Optional[str] = None):
+    """
+    Load the retriever over a saved index version (by default the current one).
+
+    Returns:
+        The retriever (or None), its mode, any load error, the version loaded and,
+        for an unversioned index, the fingerprint of its files
+    """
+    from services.answer_cache import index_fingerprint
+    from services.citation_index import CitationIndex, CitationRetriever
+    from services.hybrid_retriever import HybridRetriever, combine_retrievers
+    from services.index_versions import current_version, version_path
+    from services.sparse_index import BM25Index
+    from services.vector_db_service import load_vector_db
+    version = version or current_version(VECTOR_INDEX_PATH)
+    db_path = version_path(VECTOR_INDEX_PATH, version) if version else VECTOR_INDEX_PATH
+    vector_retriever, sparse_index, error = None, None, None
+    if RETRIEVAL_MODE != "sparse":
+        try:
+            vector_retriever, _ = load_vector_db(db_path, get_query_embeddings())
+        except Exception as e:
+            error = str(e)
+    # The keyword index is also the docstore for citation lookups, so it loads in every mode;
+    # read-only, its postings are memory-mapped and its chunks read on demand
+    if BM25Index.exists(db_path):
+        try:
+            sparse_index = BM25Index.load(db_path, read_only=True)
+        except Exception as e:
+            print_colored(f"Error loading keyword index: {str(e)}", "red")
+    retriever = combine_retrievers(vector_retriever, sparse_index)
+    mode = None
+    if retriever is not None:
+        if not isinstance(retriever, HybridRetriever):
+            mode = "vector"
+        else:
+            mode = "hybrid" if retriever.vector_retriever is not None else "sparse"
+    if sparse_index is not None and CitationIndex.exists(db_path):
+        try:
+            retriever = CitationRetriever(
+                citation_index=CitationIndex.load(db_path),
+                docstore=sparse_index,
+                retriever=retriever
+            )
+            mode = mode or "citation"
+        except Exception as e:
+            print_colored(f"Error loading citation index: {str(e)}", "red")
+    # Taken once here: walking the index directory for every cached answer would cost more than the lookup
+    fingerprint = index_fingerprint(db_path) if version is None and retriever is not None else None
+    return retriever, mode, error, version, fingerprint
+
+
+def get_retriever():
+    """
+    Get the shared retriever over the vector and keyword indexes.
+
+    In hybrid mode, if the vector index cannot be loaded (for example without
+    an API key) the keyword index alone is served. Questions citing a known
+    section are answered from the citation lookup table.
+
+    Returns:
+        The retriever, or None if no index could be loaded
+    """
+    def build():
+        index_state.update(status="loading", error=None)
+        start = time.perf_counter()
+        retriever, mode, error, version, fingerprint = _load_retriever()
+        index_state.update(load_seconds=time.perf_counter() - start, version=version, fingerprint=fingerprint)
+        if retriever is None:
+            index_state["status"] = "failed"
+            index_state["error"] = error or f"Could not load index from {VECTOR_INDEX_PATH}"
+        else:
+            index_state.update(status="ready", mode=mode, error=error)
+        return retriever
+    return _singleton("retriever", build)
+
+
+_reload_lock = threading.Lock()
+
+
+def reload_retriever(version: Optional[str] = None) -> Optional[str]:
+    """
+    Load a saved index version and serve it in place of the current one.
+
+    The new retriever is loaded while questions are answered from the old
+    one, then swapped in with a single assignment. Requests already running
+    finish with the retriever they started with, so none is dropped and
+    /ready never reports a gap. If nothing can be loaded, the old retriever
+    stays.
+
+    Args:
+        version (Optional[str]): Version to serve; by default the one CURRENT
+            names. A version already served is not loaded again.
+
+    Returns:
+        Optional[str]: The version served, None for an unversioned index
+
+    Raises:
+        RuntimeError: If the index could not be loaded
+    """
+    from services.index_versions import current_version
+    with _reload_lock:
+        version = version or current_version(VECTOR_INDEX_PATH)
+        if version is not None and version == index_state["version"] and built("retriever") is not None:
+            return version
+        start = time.perf_counter()
+        retriever, mode, error, version, fingerprint = _load_retriever(version)
+        if retriever is None:
+            raise RuntimeError(error or f"Could not load index version {version} from {VECTOR_INDEX_PATH}")
+        override("retriever", retriever)
+        index_state.update(status="ready", mode=mode, error=error, load_seconds=time.perf_counter() - start,
+                           version=version, fingerprint=fingerprint)
+        print_colored(f"Serving index version {version} (loaded in {time.perf_counter() - start:.2f}s)", "green")
+        return version
+
+
+async def watch_index(interval: float = INDEX_WATCH_SECONDS):
+    """
+    Serve each new current index version, checking every `interval` seconds.
+
+    Versions are only loaded once the first index has been, so the watcher
+    never competes with the warm-up. A version that fails to load is not
+    retried until CURRENT changes again.
+
+    Args:
+        interval (float): Seconds between checks
+    """
+    from services.index_versions import current_version
+    failed = None
+    while True:
+        await asyncio.sleep(interval)
+        version = await asyncio.to_thread(current_version, VECTOR_INDEX_PATH)
+        if version is None or version in (index_state["version"], failed) or index_state["status"] != "ready":
+            continue
+        try:
+            await asyncio.to_thread(reload_retriever, version)
+            failed = None
+        except Exception as e:
+            failed = version
+            print_colored(f"Could not load index version {version}: {str(e)}", "red")
+
+
+def get_ingestion_queue():
+    """Get the queue running document ingestion jobs in background processes"""
+    def build():
+        from services.ingestion_jobs import IngestionQueue
+        return IngestionQueue()
+    return _singleton("ingestion_queue", build)
+
+
+def get_state_backend():
+    """Get the state backend selected by STATE_BACKEND"""
+    def build():
+        from services.state_backend import get_state_backend as build_state_backend
+        return build_state_backend()
+    return _singleton("state_backend", build)
+
+
+def get_shared_state():
+    """
+    Get the state backend if other workers share it.
+
+    Returns:
+        The backend, or None for in-process state, which the history store
+        and answer cache then keep themselves
+    """
+    state = get_state_backend()
+    return state if state.shared else None
+
+
+def get_history_store():
+    """Get the shared conversation history store"""
+    def build():
+        from services.history_store import HistoryStore
+        store = HistoryStore(
+            HISTORY_DB_PATH,
+            window_size=HISTORY_WINDOW_SIZE,
+            max_turns_per_session=HISTORY_MAX_TURNS_PER_SESSION,
+            state=get_shared_state(),
+            window_ttl=HISTORY_WINDOW_TTL_SECONDS
+        )
+        # Turns from the old pickle file are moved into the store once
+        store.import_pickle(HISTORY_FILE)
+        return store
+    return _singleton("history_store", build)
+
+
+def get_answer_cache():
+    """
+    Get the shared answer cache.
+
+    Returns:
+        The cache, or None if ANSWER_CACHE_ENABLED is false
+    """
+    def build():
+        if not ANSWER_CACHE_ENABLED:
+            return None
+        from services.answer_cache import SemanticAnswerCache
+        return SemanticAnswerCache(
+            get_query_embeddings(),
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=ANSWER_CACHE_MAX_BYTES,
+            ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+            similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            state=get_shared_state()
+        )
+    return _singleton("answer_cache", build)
+
+
+def get_request_coalescer():
+    """
+    Get the coalescer sharing answers among identical concurrent questions.
+
+    Returns:
+        The coalescer, or None if REQUEST_COALESCING_ENABLED is false
+    """
+    def build():
+        if not REQUEST_COALESCING_ENABLED:
+            return None
+        from services.coalescing import RequestCoalescer
+        return RequestCoalescer()
+    return _singleton("request_coalescer", build)
+
+
+def index_status() -> dict:
+    """
+    Get the readiness of the vector index.
+
+    Returns:
+        dict: Status ("not_loaded", "loading", "ready" or "failed"), error, load time,
+        the index version served and the fingerprint of an unversioned index
+    """
+    return dict(index_state)
+
+
+async def warm_up():
+    """Build every shared service in worker threads, index first"""
+    print_colored("Warming up services in the background...", "yellow")
+    start = time.perf_counter()
+    for name, getter in (
+        ("index", get_retriever),
+        ("llm", get_llm),
+        ("history", get_history_store),
+        ("answer cache", get_answer_cache),
+    ):
+        try:
+            await asyncio.to_thread(getter)
+        except Exception as e:
+            print_colored(f"Warm-up of {name} failed: {str(e)}", "red")
+
+    if index_state["status"] == "ready":
+        print_colored(f"✓ System ready to process questions ({time.perf_counter() - start:.2f}s)", "green")
+    else:
+        print_colored(f"Vector index not available: {index_state['error']}", "red")
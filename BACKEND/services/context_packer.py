@@ -0,0 +1,183 @@
+"""
+Context packing for LawGPT application.
+
+Turns the retrieved chunks of a question into the context of its prompt:
+1. Chunks with the same text, or whose text is contained in another chunk
+   (as a cited section often is), are kept once.
+2. Chunks from the same page are merged into one passage. Where one chunk
+   starts with the end of another, as consecutive recursive chunks do by
+   CHUNK_OVERLAP characters, the repeated text is kept once. Chunks without
+   book (or source) and page metadata stay passages of their own.
+3. Passages are ranked by the best retrieval rank among their chunks.
+4. Passages are added best first until CONTEXT_TOKEN_BUDGET is reached. The
+   passage crossing the budget is cut at a line or sentence boundary.
+
+Tokens are estimated from characters, like the token metrics.
+"""
+import math
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+from config.settings import CONTEXT_TOKEN_BUDGET
+from services.metrics import CHARS_PER_TOKEN, CONTEXT_TOKENS
+
+# Shortest repeated text treated as chunk overlap rather than coincidence
+MIN_OVERLAP = 32
+# A passage is only cut to fit if at least this many tokens of it would be kept
+MIN_PASSAGE_TOKENS = 50
+PASSAGE_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the tokens of a text.
+
+    Args:
+        text (str): The text
+
+    Returns:
+        int: Characters divided by CHARS_PER_TOKEN, rounded up
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def overlap_length(first: str, second: str) -> int:
+    """
+    Length of the longest end of `first` that `second` starts with.
+
+    Args:
+        first (str): Earlier text
+        second (str): Later text
+
+    Returns:
+        int: Characters shared, or 0 if fewer than MIN_OVERLAP
+    """
+    if len(second) < MIN_OVERLAP:
+        return 0
+    probe = second[:MIN_OVERLAP]
+    position = first.find(probe, max(0, len(first) - len(second)))
+    # The first match that runs to the end of `first` is the longest overlap
+    while position != -1:
+        if second.startswith(first[position:]):
+            return len(first) - position
+        position = first.find(probe, position + 1)
+    return 0
+
+
+def _merge_page(texts: List[str]) -> str:
+    # Chain overlapping chunks together; chunks that overlap nothing keep their rank order
+    pieces = list(texts)
+    merged = True
+    while merged and len(pieces) > 1:
+        merged = False
+        for i, first in enumerate(pieces):
+            for j, second in enumerate(pieces):
+                if i == j:
+                    continue
+                shared = overlap_length(first, second)
+                if shared:
+                    pieces[min(i, j)] = first + second[shared:]
+                    del pieces[max(i, j)]
+                    merged = True
+                    break
+            if merged:
+                break
+    return "\n".join(pieces)
+
+
+def _page_key(doc: Document, position: int) -> Tuple:
+    metadata = doc.metadata
+    source, page = metadata.get("book") or metadata.get("source"), metadata.get("page")
+    if source is None or page is None:
+        # Without a known page, a chunk is only merged with itself
+        return "chunk", position
+    return source, page
+
+
+def _cut(text: str, max_chars: int) -> str:
+    # Prefer ending on a line, then on a sentence, then on a word
+    head = text[:max_chars]
+    for boundary in ("\n", ". ", " "):
+        position = head.rfind(boundary)
+        if position > max_chars // 2:
+            return head[:position + (1 if boundary == ". " else 0)].rstrip()
+    return head
+
+
+class PackedContext:
+    """
+    Context built from retrieved chunks.
+
+    Attributes:
+        text (str): The context for the prompt
+        retrieved_tokens (int): Estimated tokens of the chunks joined as retrieved
+        packed_tokens (int): Estimated tokens of the packed context
+        chunks (int): Chunks retrieved
+        passages (int): Passages in the context
+        truncated (bool): Whether the budget cut or left out a passage
+    """
+
+    def __init__(self, text: str, retrieved_tokens: int, chunks: int, passages: int, truncated: bool):
+        self.text = text
+        self.retrieved_tokens = retrieved_tokens
+        self.packed_tokens = estimate_tokens(text)
+        self.chunks = chunks
+        self.passages = passages
+        self.truncated = truncated
+
+    @property
+    def saved_tokens(self) -> int:
+        """Estimated prompt tokens saved by packing"""
+        return self.retrieved_tokens - self.packed_tokens
+
+
+def pack_context(docs: List[Document], budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> PackedContext:
+    """
+    Build the prompt context from retrieved chunks.
+
+    Args:
+        docs (List[Document]): Retrieved chunks, best first
+        budget_tokens (int): Maximum estimated tokens of context; 0 for no limit
+
+    Returns:
+        PackedContext: The context and its token accounting
+    """
+    retrieved_tokens = estimate_tokens("\n".join(doc.page_content for doc in docs))
+
+    # Identical and contained chunks are kept once, at their best rank; a chunk
+    # containing kept ones takes the place of the best of them
+    texts = []
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or any(text in kept for kept, _ in texts):
+            continue
+        contained = [i for i, (kept, _) in enumerate(texts) if kept in text]
+        if contained:
+            texts[contained[0]] = (text, doc)
+            texts = [entry for i, entry in enumerate(texts) if i not in contained[1:]]
+        else:
+            texts.append((text, doc))
+
+    pages: Dict[Tuple, List[str]] = {}
+    for position, (text, doc) in enumerate(texts):
+        pages.setdefault(_page_key(doc, position), []).append(text)
+    # Dicts keep insertion order, so pages are ranked by their best chunk
+    passages = [_merge_page(page_texts) for page_texts in pages.values()]
+
+    selected, used, truncated = [], 0, False
+    separator_tokens = estimate_tokens(PASSAGE_SEPARATOR)
+    for passage in passages:
+        cost = estimate_tokens(passage) + (separator_tokens if selected else 0)
+        if not budget_tokens or used + cost <= budget_tokens:
+            selected.append(passage)
+            used += cost
+            continue
+        truncated = True
+        remaining = budget_tokens - used - (separator_tokens if selected else 0)
+        if remaining >= MIN_PASSAGE_TOKENS:
+            selected.append(_cut(passage, remaining * CHARS_PER_TOKEN))
+        break
+
+    packed = PackedContext(PASSAGE_SEPARATOR.join(selected), retrieved_tokens, len(docs), len(selected), truncated)
+    CONTEXT_TOKENS.inc(packed.retrieved_tokens, stage="retrieved")
+    CONTEXT_TOKENS.inc(packed.packed_tokens, stage="packed")
+    return packed
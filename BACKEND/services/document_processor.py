@@ -4,11 +4,37 @@ Handles loading and processing of various document formats.
 """
 import os
 from typing import List
-from langchain.document_loaders import PyPDFLoader, Docx2txtLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+from langchain_community.document_loaders import Docx2txtLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, CHUNKER
+from services.pdf_service import PageShard, ShardResult, chunk_pages, iter_pdf_chunks
 from utils.helpers import print_colored
 
+
+def extract_docx(file_path: str, chunker: str = CHUNKER) -> ShardResult:
+    """
+    Extract and chunk a Word document, as a PDF book is extracted.
+    
+    The document has no pages, so it is read as a single page 0. Loading
+    needs the optional docx2txt package.
+    
+    Args:
+        file_path (str): Path to the .docx file
+        chunker (str): "structural" or "recursive"
+        
+    Returns:
+        ShardResult: The chunks, or the error message
+    """
+    shard = PageShard(file_path, 0, 1)
+    try:
+        pages = [Document(page_content=doc.page_content, metadata={"source": file_path, "page": 0})
+                 for doc in Docx2txtLoader(file_path).load()]
+        return ShardResult(shard, chunk_pages(pages, chunker), None)
+    except Exception as e:
+        return ShardResult(shard, [], str(e))
+
+
 def process_file(file_path: str) -> List[str]:
     """
     Process a document file and return chunks of text.
@@ -26,10 +52,18 @@ def process_file(file_path: str) -> List[str]:
         # Determine file type
         file_ext = os.path.splitext(file_path)[1].lower()
         
-        # Load document based on type
+        # PDFs are extracted page range by page range across worker processes
         if file_ext == '.pdf':
-            loader = PyPDFLoader(file_path)
-        elif file_ext in ['.doc', '.docx']:
+            results = sorted(iter_pdf_chunks([file_path]), key=lambda result: result.shard.start)
+            for result in results:
+                if result.error:
+                    raise ValueError(f"Could not extract pages {result.shard.start}-{result.shard.end}: {result.error}")
+            chunks = [chunk for result in results for chunk in result.docs]
+            print_colored(f"Created {len(chunks)} chunks from document", "green")
+            return [chunk.page_content for chunk in chunks]
+        
+        # Load document based on type
+        if file_ext in ['.doc', '.docx']:
             loader = Docx2txtLoader(file_path)
         else:
             raise ValueError(f"Unsupported file type: {file_ext}")
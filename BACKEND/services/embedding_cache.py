@@ -0,0 +1,237 @@
+"""
+Persistent embedding cache for LawGPT application.
+
+Chunk embeddings are stored in SQLite, keyed by the embedding model name and
+a SHA-256 hash of the chunk text, so rebuilding the index only sends chunks
+that have never been embedded to the embedding API.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.helpers import print_colored
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    """
+    Content address of a chunk of text.
+
+    Args:
+        text (str): The chunk text
+
+    Returns:
+        str: Hex SHA-256 digest of the UTF-8 text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk store of float32 embeddings keyed by (model, text hash).
+
+    Args:
+        path (str): SQLite database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embed_timing (
+                model TEXT PRIMARY KEY,
+                seconds REAL NOT NULL,
+                count INTEGER NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Fetch the stored embeddings for a list of text hashes.
+
+        Args:
+            model (str): Embedding model name
+            hashes (List[str]): Text hashes to look up
+
+        Returns:
+            Dict[str, np.ndarray]: Embeddings found, keyed by text hash
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                )
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """
+        Store embeddings.
+
+        Args:
+            model (str): Embedding model name
+            items (Dict[str, List[float]]): Embeddings keyed by text hash
+        """
+        rows = [
+            (model, digest, np.asarray(vector, dtype=np.float32).tobytes())
+            for digest, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def record_timing(self, model: str, seconds: float, count: int):
+        """
+        Accumulate how long the model took to embed `count` texts.
+
+        Args:
+            model (str): Embedding model name
+            seconds (float): Wall time spent embedding
+            count (int): Number of texts embedded
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO embed_timing (model, seconds, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(model) DO UPDATE SET seconds = seconds + excluded.seconds, "
+                "count = count + excluded.count",
+                (model, seconds, count)
+            )
+            self._conn.commit()
+
+    def seconds_per_embedding(self, model: str) -> float:
+        """
+        Average embedding time per text measured across all past builds.
+
+        Args:
+            model (str): Embedding model name
+
+        Returns:
+            float: Seconds per text, or 0.0 if nothing was ever embedded
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seconds, count FROM embed_timing WHERE model = ?", (model,)
+            ).fetchone()
+        return row[0] / row[1] if row and row[1] else 0.0
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves document embeddings from an EmbeddingStore.
+
+    Only texts missing from the store are passed to the wrapped model. They
+    are sent in slices of `checkpoint_size` texts and each slice is written to
+    the store as soon as it is embedded, so an interrupted build resumes from
+    the last finished slice. Query embeddings are not cached.
+
+    Args:
+        embeddings (Embeddings): The model to wrap
+        store (EmbeddingStore): Where embeddings are persisted
+        model_name (str): Key namespacing this model's vectors in the store
+        checkpoint_size (int): Texts embedded between writes to the store
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore, model_name: str,
+                 checkpoint_size: int = 800):
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name
+        self.checkpoint_size = checkpoint_size
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self.store.get_many(self.model_name, list(set(hashes)))
+
+        # Embed each missing text once, even if it repeats
+        missing: Dict[str, str] = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in found and digest not in missing:
+                missing[digest] = text
+
+        self.hits += len(texts) - sum(1 for digest in hashes if digest in missing)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        for start_index in range(0, len(pending), self.checkpoint_size):
+            batch = pending[start_index:start_index + self.checkpoint_size]
+            start = time.perf_counter()
+            vectors = self.embeddings.embed_documents([text for _, text in batch])
+            elapsed = time.perf_counter() - start
+            self.embed_seconds += elapsed
+            self.store.record_timing(self.model_name, elapsed, len(batch))
+
+            new_items = {digest: vector for (digest, _), vector in zip(batch, vectors)}
+            self.store.put_many(self.model_name, new_items)
+            for digest, vector in new_items.items():
+                found[digest] = np.asarray(vector, dtype=np.float32)
+
+        return [found[digest].tolist() for digest in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def stats(self, seconds_per_embedding: Optional[float] = None) -> dict:
+        """
+        Get hit/miss counters and an estimate of the embedding time saved.
+
+        Args:
+            seconds_per_embedding (Optional[float]): Cost of one remote embedding;
+                defaults to the average measured across past builds
+
+        Returns:
+            dict: Hit and miss counts, hit rate and estimated seconds saved
+        """
+        if seconds_per_embedding is None:
+            seconds_per_embedding = self.store.seconds_per_embedding(self.model_name)
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "embed_seconds": self.embed_seconds,
+            "seconds_saved": self.hits * seconds_per_embedding,
+        }
+
+    def report(self):
+        """Print the cache hit rate and estimated time saved"""
+        stats = self.stats()
+        print_colored(
+            f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate), embedded in {stats['embed_seconds']:.1f}s, "
+            f"~{stats['seconds_saved']:.1f}s saved",
+            "cyan"
+        )
@@ -0,0 +1,137 @@
+"""
+Batched, rate-limited embedding executor for LawGPT application.
+
+Splits large embedding jobs into batches, sends a bounded number of them in
+parallel under a token-bucket request rate, and retries rate-limit and server
+errors with exponential backoff.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from langchain_core.embeddings import Embeddings
+from utils.helpers import print_colored
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_MESSAGES = ("429", "resource has been exhausted", "rate limit", "quota", "503", "unavailable")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum burst size
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Block until `tokens` are available, then take them.
+
+        Args:
+            tokens (float): Tokens to take
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether an embedding error is transient.
+
+    Args:
+        error (Exception): The error raised by the embedding client
+
+    Returns:
+        bool: True for rate-limit (429) and server (5xx) errors
+    """
+    for attr in ("status_code", "code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status in RETRYABLE_STATUS_CODES
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MESSAGES)
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that batches, parallelizes, throttles and retries.
+
+    Args:
+        embeddings (Embeddings): The remote model to wrap
+        batch_size (int): Texts per request
+        max_concurrency (int): Requests in flight at once
+        requests_per_second (float): Sustained request rate
+        max_retries (int): Retries per batch before giving up
+        backoff_base (float): First retry delay in seconds, doubled each retry
+        backoff_max (float): Cap on a single retry delay
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_size: int = 100, max_concurrency: int = 4,
+                 requests_per_second: float = 5.0, max_retries: int = 6,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.requests = 0
+        self.retries = 0
+        self._counter_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            return [vector for batch in batches for vector in self._embed_batch(batch)]
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            results = pool.map(self._embed_batch, batches)
+            return [vector for batch_vectors in results for vector in batch_vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self.embeddings.embed_query, text)
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        return self._call(self.embeddings.embed_documents, batch)
+
+    def _call(self, fn, payload):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            with self._counter_lock:
+                self.requests += 1
+            try:
+                return fn(payload)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                # Full jitter keeps parallel workers from retrying in lockstep
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                with self._counter_lock:
+                    self.retries += 1
+                print_colored(f"Embedding request failed ({str(e)}), retry {attempt} in {delay:.1f}s", "yellow")
+                time.sleep(delay)
@@ -0,0 +1,50 @@
+"""
+Embedding models for LawGPT application.
+"""
+import hashlib
+import re
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic offline embeddings using the hashing trick.
+
+    Each lowercase word and word bigram is hashed into one of `dim` buckets
+    and the counts are L2-normalized. Texts that share most of their words get
+    a high cosine similarity, which is enough to exercise caches and indexes
+    without network access or model weights.
+
+    Args:
+        dim (int): Embedding dimension
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dim
+
+    def _embed(self, text: str) -> List[float]:
+        # Texts without words share one bucket, so every vector has unit length
+        words = TOKEN_PATTERN.findall(text.lower()) or [""]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in words:
+            vector[self._bucket(word)] += 1.0
+        for first, second in zip(words, words[1:]):
+            vector[self._bucket(f"{first} {second}")] += 0.5
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
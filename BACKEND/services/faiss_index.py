@@ -0,0 +1,298 @@
+"""
+FAISS index layouts for LawGPT application.
+
+FAISS_INDEX_TYPE selects how the faiss backend stores and searches vectors:
+- "flat": exact search over float32 vectors (the default)
+- "sq8": exact scan over 8-bit scalar-quantized vectors, 4x smaller
+- "ivf_flat", "ivf_sq8", "ivf_pq": vectors partitioned into FAISS_NLIST
+  k-means cells, of which FAISS_NPROBE are scanned per query; stored as
+  float32, 8-bit or FAISS_PQ_M-byte product-quantized codes
+- "hnsw", "hnsw_sq8": HNSW graph explored with FAISS_EF_SEARCH candidates
+
+Ingestion adds chunks to a flat index and calls compress_index at the end,
+which trains the configured layout on the stored vectors and moves them into
+it. Small indexes stay flat, since exact search is fast at that size and
+IVF and PQ training needs thousands of vectors.
+"""
+import math
+import os
+from typing import Iterable
+import faiss
+import numpy as np
+from config.settings import (
+    FAISS_INDEX_TYPE, FAISS_MIN_VECTORS, FAISS_NLIST, FAISS_NPROBE, FAISS_PQ_M,
+    FAISS_HNSW_M, FAISS_EF_CONSTRUCTION, FAISS_EF_SEARCH
+)
+from utils.helpers import print_colored
+
+INDEX_TYPES = ("flat", "sq8", "ivf_flat", "ivf_sq8", "ivf_pq", "hnsw", "hnsw_sq8")
+
+# FAISS class names, as returned by downcast_index, for each layout
+_CLASS_TYPES = {
+    "IndexFlat": "flat",
+    "IndexFlatL2": "flat",
+    "IndexScalarQuantizer": "sq8",
+    "IndexIVFFlat": "ivf_flat",
+    "IndexIVFScalarQuantizer": "ivf_sq8",
+    "IndexIVFPQ": "ivf_pq",
+    "IndexHNSWFlat": "hnsw",
+    "IndexHNSWSQ": "hnsw_sq8",
+}
+
+# Training points per IVF cell; FAISS warns below 39
+TRAIN_POINTS_PER_LIST = 64
+MIN_TRAIN_POINTS = 65536
+
+
+def index_type(index: faiss.Index) -> str:
+    """
+    Name the layout of a FAISS index.
+
+    Args:
+        index (faiss.Index): The index
+
+    Returns:
+        str: One of INDEX_TYPES, or the FAISS class name for other indexes
+    """
+    name = type(faiss.downcast_index(index)).__name__
+    return _CLASS_TYPES.get(name, name)
+
+
+def _nlist(count: int, nlist: int) -> int:
+    # Every cell needs enough vectors to train its centroid
+    return max(1, min(nlist or int(4 * math.sqrt(count)), count // 39))
+
+
+def _pq_m(dim: int, m: int) -> int:
+    # Product quantization needs the dimension to split evenly into sub-vectors
+    return max(divisor for divisor in range(1, min(m, dim) + 1) if dim % divisor == 0)
+
+
+def factory_string(kind: str, dim: int, count: int, nlist: int = FAISS_NLIST, pq_m: int = FAISS_PQ_M,
+                   hnsw_m: int = FAISS_HNSW_M) -> str:
+    """
+    FAISS index_factory description of a layout.
+
+    Args:
+        kind (str): One of INDEX_TYPES
+        dim (int): Vector dimension
+        count (int): Number of vectors the index is trained for
+        nlist (int): IVF cells; 0 picks 4 * sqrt(count)
+        pq_m (int): Bytes per product-quantized vector, rounded down to a divisor of dim
+        hnsw_m (int): HNSW graph degree
+
+    Returns:
+        str: The factory string, e.g. "IVF1024,PQ64"
+
+    Raises:
+        ValueError: If the layout is unknown
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{kind}'; choose one of {', '.join(INDEX_TYPES)}")
+    ivf = f"IVF{_nlist(count, nlist)}"
+    return {
+        "flat": "Flat",
+        "sq8": "SQ8",
+        "ivf_flat": f"{ivf},Flat",
+        "ivf_sq8": f"{ivf},SQ8",
+        "ivf_pq": f"{ivf},PQ{_pq_m(dim, pq_m)}",
+        "hnsw": f"HNSW{hnsw_m}",
+        "hnsw_sq8": f"HNSW{hnsw_m}_SQ8",
+    }[kind]
+
+
+def configure_search(index: faiss.Index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH) -> faiss.Index:
+    """
+    Apply the query-time settings of an index.
+
+    These are not part of the trained index, so they can be tuned without a
+    rebuild. IVF indexes also get an id lookup table, which MMR needs to
+    fetch the stored vectors of its candidates; it is saved with the index.
+
+    Args:
+        index (faiss.Index): The index
+        nprobe (int): IVF cells scanned per query
+        ef_search (int): HNSW candidate list size
+
+    Returns:
+        faiss.Index: The same index
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+        if ivf.direct_map.type != faiss.DirectMap.Array:
+            ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+            ivf.set_direct_map_type(faiss.DirectMap.Array)
+    hnsw = faiss.downcast_index(index)
+    if hasattr(hnsw, "hnsw"):
+        hnsw.hnsw.efSearch = ef_search
+    return index
+
+
+def read_index(path: str, kind: str = "flat", mmap: bool = False) -> faiss.Index:
+    """
+    Load an index written by write_index.
+
+    Memory-mapped indexes are read from the file on demand, so loading takes
+    the same time at any size and processes serving the same file share its
+    pages. They cannot be modified. IVF indexes map their inverted lists and
+    the others their stored vectors; HNSW graph links are still read in.
+    FAISS releases without IO_FLAG_MMAP_IFC (before 1.8) only map inverted
+    lists, so there the other layouts are read into memory.
+
+    Args:
+        path (str): Index file
+        kind (str): Layout of the index, one of INDEX_TYPES
+        mmap (bool): Memory-map the file instead of reading it
+
+    Returns:
+        faiss.Index: The index, with its query-time settings applied
+    """
+    flags = 0
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP
+        if not kind.startswith("ivf"):
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", flags)
+    return configure_search(faiss.read_index(path, flags))
+
+
+def write_index(index: faiss.Index, path: str):
+    """
+    Write an index, replacing any existing file atomically.
+
+    Processes that memory-mapped the old file keep reading it; writing over
+    it in place would change the pages under them.
+
+    Args:
+        index (faiss.Index): The index
+        path (str): Index file
+    """
+    temp_path = f"{path}.tmp"
+    faiss.write_index(index, temp_path)
+    os.replace(temp_path, path)
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """
+    Stored vectors of an index, in insertion order.
+
+    Exact for flat, IVF-flat and HNSW indexes; quantized layouts return their
+    decoded approximations.
+
+    Args:
+        index (faiss.Index): The index
+
+    Returns:
+        np.ndarray: Matrix with one row per vector
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def build_index(kind: str, vectors: np.ndarray, nlist: int = FAISS_NLIST, pq_m: int = FAISS_PQ_M,
+                hnsw_m: int = FAISS_HNSW_M, ef_construction: int = FAISS_EF_CONSTRUCTION,
+                seed: int = 0) -> faiss.Index:
+    """
+    Train an index of the given layout and add vectors to it.
+
+    Args:
+        kind (str): One of INDEX_TYPES
+        vectors (np.ndarray): float32 matrix, one row per vector
+        nlist (int): IVF cells; 0 picks 4 * sqrt(vectors)
+        pq_m (int): Bytes per product-quantized vector
+        hnsw_m (int): HNSW graph degree
+        ef_construction (int): HNSW candidate list size while inserting
+        seed (int): Seed for the training sample
+
+    Returns:
+        faiss.Index: The trained index holding every vector
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(kind, dim, count, nlist, pq_m, hnsw_m), faiss.METRIC_L2)
+    if not index.is_trained:
+        # k-means cost grows with the sample, and a few dozen points per cell is plenty
+        ivf = faiss.try_extract_index_ivf(index)
+        sample_size = max(TRAIN_POINTS_PER_LIST * (ivf.nlist if ivf is not None else 1), MIN_TRAIN_POINTS)
+        sample = vectors
+        if count > sample_size:
+            rows = np.random.default_rng(seed).choice(count, sample_size, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    hnsw = faiss.downcast_index(index)
+    if hasattr(hnsw, "hnsw"):
+        hnsw.hnsw.efConstruction = ef_construction
+    index.add(vectors)
+    return configure_search(index)
+
+
+def compress_index(index: faiss.Index, kind: str = FAISS_INDEX_TYPE,
+                   min_vectors: int = FAISS_MIN_VECTORS) -> faiss.Index:
+    """
+    Move an index into the configured layout, training it if needed.
+
+    Args:
+        index (faiss.Index): The current index, usually flat
+        kind (str): Target layout, one of INDEX_TYPES
+        min_vectors (int): Flat indexes smaller than this are left as they are
+
+    Returns:
+        faiss.Index: The index in the target layout, or the input unchanged
+    """
+    current = index_type(index)
+    if current == kind or (current == "flat" and index.ntotal < min_vectors):
+        return index
+    if current != "flat":
+        print_colored(f"Converting {current} index to {kind} from its stored vectors; quantized "
+                      f"vectors are not exact, delete the index directory for a clean rebuild", "yellow")
+    print_colored(f"Training {kind} index on {index.ntotal} vectors...", "yellow")
+    return build_index(kind, reconstruct_all(index))
+
+
+def needs_compression(current: str, count: int, kind: str = FAISS_INDEX_TYPE,
+                      min_vectors: int = FAISS_MIN_VECTORS) -> bool:
+    """
+    Whether compress_index would change an index.
+
+    Args:
+        current (str): Layout of the index
+        count (int): Vectors in the index
+        kind (str): Target layout
+        min_vectors (int): Threshold below which flat indexes stay flat
+
+    Returns:
+        bool: True if the index is not in its target layout yet
+    """
+    return current != kind and not (current == "flat" and count < min_vectors)
+
+
+def remove_positions(index: faiss.Index, positions: Iterable[int]) -> faiss.Index:
+    """
+    Remove vectors by position and renumber the rest contiguously.
+
+    Flat indexes shift their vectors down on removal. IVF indexes keep the
+    old ids of the remaining vectors and HNSW graphs cannot remove at all,
+    so those are refilled from their stored vectors, keeping their training.
+
+    Args:
+        index (faiss.Index): The index
+        positions (Iterable[int]): Positions to remove
+
+    Returns:
+        faiss.Index: An index holding the remaining vectors in order
+    """
+    drop = np.fromiter(sorted(set(positions)), dtype=np.int64)
+    if len(drop) == 0:
+        return index
+    if index_type(index) in ("flat", "sq8"):
+        index.remove_ids(drop)
+        return index
+
+    keep = np.ones(index.ntotal, dtype=bool)
+    keep[drop] = False
+    vectors = reconstruct_all(index)[keep]
+    refilled = faiss.clone_index(index)
+    refilled.reset()
+    refilled.add(vectors)
+    return configure_search(refilled)
@@ -0,0 +1,319 @@
+"""
+Conversation history store for LawGPT application.
+
+Turns are appended to an SQLite table keyed by session id. Writes are queued
+and committed in batches by a background thread, so recording a turn costs
+the same whether the history holds ten turns or ten million. The most recent
+turns of active sessions are also kept in bounded windows: in memory, or in a
+shared state backend when several workers serve the same sessions.
+"""
+import json
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+from services.state_backend import StateBackend
+from utils.helpers import print_colored
+
+DEFAULT_SESSION_ID = "default"
+
+# Sentinel telling the writer thread to flush and exit
+_STOP = object()
+
+
+class _CompactRequest:
+    """Queue item asking the writer thread to run a compaction pass."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class HistoryStore:
+    """
+    Append-only, per-session conversation history.
+
+    Args:
+        path (str): SQLite database file
+        window_size (int): Recent turns kept in memory per session
+        max_sessions_in_memory (int): Sessions whose windows are kept in memory
+        max_turns_per_session (int): Turns retained per session by compaction; 0 keeps all
+        batch_size (int): Maximum turns committed per transaction
+        flush_interval (float): Maximum seconds a queued turn waits before commit
+        compact_every (int): Turns written between compaction passes
+        state (Optional[StateBackend]): Shared backend holding the windows
+            instead of this process; a worker that misses a window reloads it
+            from the database, so a turn another worker has not committed yet
+            (at most flush_interval old) can be missing from it until it expires
+        window_ttl (float): Idle seconds before a shared window expires
+    """
+
+    def __init__(self, path: str, window_size: int = 50, max_sessions_in_memory: int = 1000,
+                 max_turns_per_session: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 0.5, compact_every: int = 10000,
+                 state: Optional[StateBackend] = None, window_ttl: float = 3600):
+        self.path = path
+        self.window_size = window_size
+        self.max_sessions_in_memory = max_sessions_in_memory
+        self.max_turns_per_session = max_turns_per_session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.state = state
+        self.window_ttl = window_ttl
+
+        self._windows: "OrderedDict[str, deque]" = OrderedDict()
+        self._windows_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._dirty_sessions = set()
+        self._written_since_compaction = 0
+
+        self._conn = self._connect()
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        self._conn.commit()
+
+        # The writer thread owns _conn; readers share a second connection
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        # WAL lets several workers append concurrently; NORMAL fsyncs at checkpoints, not per commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, question: str, answer: str, session_id: str = DEFAULT_SESSION_ID):
+        """
+        Record a turn. Returns immediately; the write happens in the background.
+
+        Args:
+            question (str): User's question
+            answer (str): The formatted answer
+            session_id (str): Conversation the turn belongs to
+        """
+        self._window_append(session_id, (question, answer))
+        self._queue.put((session_id, time.time(), question, answer))
+
+    def recent(self, session_id: str = DEFAULT_SESSION_ID, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Get the most recent turns of a session, oldest first.
+
+        Args:
+            session_id (str): Conversation to read
+            limit (Optional[int]): Maximum turns; defaults to the window size
+
+        Returns:
+            List[Tuple[str, str]]: (question, answer) pairs
+        """
+        limit = self.window_size if limit is None else limit
+        if limit <= self.window_size:
+            window = self._window_get(session_id, limit)
+            if window is not None:
+                return window
+
+        # Read through to disk; queued turns must land first to be visible
+        self.flush()
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, max(limit, self.window_size))
+            ).fetchall()
+        rows.reverse()
+        self._window_fill(session_id, rows[-self.window_size:])
+        return rows[-limit:] if limit else []
+
+    def _window_key(self, session_id: str) -> str:
+        return f"history:{session_id}"
+
+    def _window_append(self, session_id: str, turn: Tuple[str, str]):
+        # Only windows already loaded are extended; a missing one is read from disk when needed
+        if self.state is not None:
+            try:
+                self.state.push(self._window_key(session_id), [json.dumps(turn)], self.window_size,
+                                only_if_exists=True, ttl=self.window_ttl)
+            except Exception as e:
+                print_colored(f"Error updating shared history window: {e}", "yellow")
+            return
+        with self._windows_lock:
+            window = self._windows.get(session_id)
+            if window is not None:
+                window.append(turn)
+                self._windows.move_to_end(session_id)
+
+    def _window_get(self, session_id: str, limit: int) -> Optional[List[Tuple[str, str]]]:
+        if self.state is not None:
+            try:
+                items = self.state.tail(self._window_key(session_id), limit)
+            except Exception as e:
+                print_colored(f"Error reading shared history window: {e}", "yellow")
+                return None
+            return None if items is None else [tuple(json.loads(item)) for item in items]
+        with self._windows_lock:
+            window = self._windows.get(session_id)
+            if window is None:
+                return None
+            self._windows.move_to_end(session_id)
+            return list(window)[-limit:] if limit else []
+
+    def _window_fill(self, session_id: str, rows: List[Tuple[str, str]]):
+        if self.state is not None:
+            try:
+                self.state.replace_list(self._window_key(session_id), [json.dumps(row) for row in rows],
+                                        ttl=self.window_ttl)
+            except Exception as e:
+                print_colored(f"Error filling shared history window: {e}", "yellow")
+            return
+        with self._windows_lock:
+            self._windows[session_id] = deque(rows, maxlen=self.window_size)
+            while len(self._windows) > self.max_sessions_in_memory:
+                self._windows.popitem(last=False)
+
+    def count(self, session_id: Optional[str] = None) -> int:
+        """
+        Count stored turns.
+
+        Args:
+            session_id (Optional[str]): Restrict to one session
+
+        Returns:
+            int: Number of turns on disk
+        """
+        self.flush()
+        with self._read_lock:
+            if session_id is None:
+                return self._read_conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+            return self._read_conn.execute(
+                "SELECT COUNT(*) FROM turns WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def flush(self):
+        """Block until every queued turn is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def compact(self):
+        """Delete turns beyond max_turns_per_session for sessions written since the last pass"""
+        request = _CompactRequest()
+        self._queue.put(request)
+        request.done.wait()
+
+    def import_pickle(self, pickle_path: str, session_id: str = DEFAULT_SESSION_ID):
+        """
+        Migrate a legacy conversation_history.pkl into the store once.
+
+        The pickle is renamed afterwards so it is never read again.
+
+        Args:
+            pickle_path (str): Path of the legacy history file
+            session_id (str): Session to file the legacy turns under
+        """
+        if not os.path.exists(pickle_path):
+            return
+        try:
+            with open(pickle_path, "rb") as f:
+                turns = pickle.load(f)
+            for question, answer in turns:
+                self.append(question, answer, session_id)
+            self.flush()
+            os.replace(pickle_path, f"{pickle_path}.migrated")
+            print_colored(f"Migrated {len(turns)} turns from {pickle_path}", "green")
+        except Exception as e:
+            print_colored(f"Error migrating history: {e}", "red")
+
+    def close(self):
+        """Flush queued turns and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            waiters = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather a batch until it is full, the interval passes or a flush is requested
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif isinstance(item, _CompactRequest):
+                    self._write_batch(batch)
+                    batch = []
+                    self._compact()
+                    waiters.append(item.done)
+                else:
+                    batch.append(item)
+
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+            if self.compact_every and self._written_since_compaction >= self.compact_every:
+                self._compact()
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        try:
+            self._conn.executemany(
+                "INSERT INTO turns (session_id, created_at, question, answer) VALUES (?, ?, ?, ?)",
+                batch
+            )
+            self._conn.commit()
+            self._dirty_sessions.update(row[0] for row in batch)
+            self._written_since_compaction += len(batch)
+        except Exception as e:
+            print_colored(f"Error saving history: {e}", "red")
+
+    def _compact(self):
+        self._written_since_compaction = 0
+        if not self.max_turns_per_session:
+            self._dirty_sessions.clear()
+            return
+        try:
+            for session_id in self._dirty_sessions:
+                self._conn.execute(
+                    """DELETE FROM turns WHERE session_id = ? AND id <= (
+                        SELECT id FROM turns WHERE session_id = ?
+                        ORDER BY id DESC LIMIT 1 OFFSET ?
+                    )""",
+                    (session_id, session_id, self.max_turns_per_session)
+                )
+            self._conn.commit()
+            self._dirty_sessions.clear()
+        except Exception as e:
+            print_colored(f"Error compacting history: {e}", "red")
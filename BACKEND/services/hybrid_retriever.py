@@ -0,0 +1,151 @@
+"""
+Hybrid retriever for LawGPT application.
+
+Combines the vector retriever with the BM25 index using reciprocal rank
+fusion: each chunk scores 1 / (RRF_K + rank) in every result list it
+appears in, and the summed scores decide the final order. Rank fusion needs
+no calibration between cosine distances and BM25 scores.
+"""
+import asyncio
+from typing import Any, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from config.settings import RETRIEVAL_MODE, RETRIEVER_SEARCH_K, RETRIEVER_FETCH_K, RRF_K
+from services.metrics import span
+from utils.helpers import print_colored
+
+
+def _document_key(doc: Document) -> tuple:
+    return doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Args:
+        result_lists (List[List[Document]]): Result lists, each best first
+        k (int): Maximum chunks to return
+        rrf_k (int): Rank offset; larger values flatten the weight of top ranks
+
+    Returns:
+        List[Document]: Fused results, best first
+    """
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _document_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+def _vector_kwargs(query_vector: Any) -> dict:
+    # Only passed when known, so any vector retriever works without it
+    return {} if query_vector is None else {"query_vector": query_vector}
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing vector and BM25 results.
+
+    Without a vector retriever, or when a vector search fails (for example
+    when the embedding API is unreachable), results come from BM25 alone.
+    Keyword arguments k, fetch_k and lambda_mult given to invoke or ainvoke
+    override the defaults for that call and are passed to the vector retriever,
+    as is query_vector, the question's embedding if the caller already has it.
+    """
+
+    vector_retriever: Optional[BaseRetriever] = None
+    sparse_index: Any = None
+    k: int = RETRIEVER_SEARCH_K
+    fetch_k: int = RETRIEVER_FETCH_K
+    rrf_k: int = RRF_K
+
+    def _sparse_search(self, query: str, fetch_k: Optional[int] = None) -> List[Document]:
+        with span("sparse_search"):
+            return [doc for doc, _ in self.sparse_index.search(query, fetch_k or self.fetch_k)]
+
+    def _fuse(self, vector_docs: Optional[List[Document]], sparse_docs: List[Document],
+              k: Optional[int] = None) -> List[Document]:
+        k = k or self.k
+        if vector_docs is None:
+            return sparse_docs[:k]
+        with span("fuse"):
+            return reciprocal_rank_fusion([vector_docs, sparse_docs], k, self.rrf_k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                k: Optional[int] = None, fetch_k: Optional[int] = None,
+                                lambda_mult: Optional[float] = None, query_vector: Any = None) -> List[Document]:
+        vector_docs = None
+        if self.vector_retriever is not None:
+            try:
+                vector_docs = self.vector_retriever.invoke(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+                                                           **_vector_kwargs(query_vector))
+            except Exception as e:
+                print_colored(f"Vector search failed, using keyword search only: {str(e)}", "yellow")
+        return self._fuse(vector_docs, self._sparse_search(query, fetch_k), k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       k: Optional[int] = None, fetch_k: Optional[int] = None,
+                                       lambda_mult: Optional[float] = None, query_vector: Any = None) -> List[Document]:
+        sparse_task = asyncio.to_thread(self._sparse_search, query, fetch_k)
+        if self.vector_retriever is None:
+            return self._fuse(None, await sparse_task, k)
+
+        # The embedding call and the BM25 scan run concurrently
+        vector_docs, sparse_docs = await asyncio.gather(
+            self.vector_retriever.ainvoke(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+                                          **_vector_kwargs(query_vector)), sparse_task,
+            return_exceptions=True
+        )
+        if isinstance(sparse_docs, BaseException):
+            raise sparse_docs
+        if isinstance(vector_docs, BaseException):
+            print_colored(f"Vector search failed, using keyword search only: {str(vector_docs)}", "yellow")
+            vector_docs = None
+        return self._fuse(vector_docs, sparse_docs, k)
+
+    def retrieve_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve chunks for many questions, with one vector search for all of them.
+
+        Args:
+            queries (List[str]): Questions
+
+        Returns:
+            List[List[Document]]: Fused chunks for each question, best first
+        """
+        from services.batch_retrieval import retrieve_batch
+
+        vector_results = [None] * len(queries)
+        if self.vector_retriever is not None:
+            try:
+                vector_results = retrieve_batch(self.vector_retriever, queries)
+            except Exception as e:
+                print_colored(f"Vector search failed, using keyword search only: {str(e)}", "yellow")
+        return [self._fuse(vector_docs, self._sparse_search(query))
+                for query, vector_docs in zip(queries, vector_results)]
+
+
+def combine_retrievers(vector_retriever: Optional[BaseRetriever], sparse_index: Any,
+                       mode: str = RETRIEVAL_MODE) -> Optional[BaseRetriever]:
+    """
+    Build the retriever for a retrieval mode from whatever indexes loaded.
+
+    Args:
+        vector_retriever (Optional[BaseRetriever]): Retriever over the vector index
+        sparse_index (Any): BM25Index over the same chunks
+        mode (str): "vector", "sparse" or "hybrid"
+
+    Returns:
+        Optional[BaseRetriever]: The retriever, or None if neither index is usable
+    """
+    if mode == "vector" or sparse_index is None:
+        return vector_retriever
+    if mode == "sparse":
+        return HybridRetriever(sparse_index=sparse_index)
+    return HybridRetriever(vector_retriever=vector_retriever, sparse_index=sparse_index)
@@ -0,0 +1,260 @@
+"""
+Versioned index directories for LawGPT application.
+
+Every write of the index produces a new version in its own directory, and a
+CURRENT file names the version to serve:
+
+    db/faiss_index/
+        CURRENT                  e.g. "20261018T214100123456Z"
+        versions/<version>/      vector index, keyword index, citations, manifest
+
+A writer copies the current version into a hidden staging directory,
+changes the copy, moves it into place and then replaces CURRENT atomically,
+so a server never reads a half-written index. Servers
+load the version CURRENT names and swap it in when it changes. Old versions
+are removed, keeping the INDEX_KEEP_VERSIONS newest so recent ones can be
+rolled back to. An index saved before versions existed (files directly in
+the index directory) is served until the first versioned write.
+"""
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from config.settings import INDEX_KEEP_VERSIONS
+from utils.helpers import print_colored
+
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+
+
+@contextmanager
+def index_lock(root: str):
+    """
+    Hold the write lock of an index, waiting for any other writer to finish.
+
+    Args:
+        root (str): Index directory
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(root)), exist_ok=True)
+    with open(f"{os.path.abspath(root)}.lock", "a") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # No advisory locks on this platform; writers are not serialized
+            yield
+            return
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def version_path(root: str, version: str) -> str:
+    """
+    Directory of a version.
+
+    Args:
+        root (str): Index directory
+        version (str): Version name
+
+    Returns:
+        str: The version's directory
+    """
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def current_version(root: str) -> Optional[str]:
+    """
+    The version CURRENT names.
+
+    Args:
+        root (str): Index directory
+
+    Returns:
+        Optional[str]: The version, or None if the index is not versioned yet
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def list_versions(root: str) -> List[str]:
+    """
+    Every saved version, oldest first.
+
+    Args:
+        root (str): Index directory
+
+    Returns:
+        List[str]: Version names; names sort in order of creation
+    """
+    try:
+        names = os.listdir(os.path.join(root, VERSIONS_DIR))
+    except OSError:
+        return []
+    return sorted(name for name in names if not name.startswith("."))
+
+
+def resolve_index_path(root: str) -> str:
+    """
+    Directory of the index to read.
+
+    Args:
+        root (str): Index directory
+
+    Returns:
+        str: The current version's directory, or root itself for an index
+        saved before versions existed
+    """
+    version = current_version(root)
+    return version_path(root, version) if version else root
+
+
+def staging_path(root: str, version: str) -> str:
+    """
+    Directory a version is written to before it is published.
+
+    Args:
+        root (str): Index directory
+        version (str): Version name
+
+    Returns:
+        str: A hidden directory next to the published versions
+    """
+    return os.path.join(root, VERSIONS_DIR, f".{version}")
+
+
+def create_version(root: str, copy_from: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Start a new version in a staging directory, where servers never look.
+
+    Call while holding index_lock.
+
+    Args:
+        root (str): Index directory
+        copy_from (Optional[str]): Index directory whose files the new
+            version starts from, usually resolve_index_path(root)
+
+    Returns:
+        Tuple[str, str]: The new version's name and its staging directory
+    """
+    # Writers hold the lock, so a timestamp is unique, and names sort by age
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = staging_path(root, version)
+    if copy_from is not None and os.path.isdir(copy_from):
+        # An unversioned index shares its directory with the versions
+        shutil.copytree(copy_from, path, ignore=shutil.ignore_patterns(VERSIONS_DIR, CURRENT_FILE))
+    else:
+        os.makedirs(path)
+    return version, path
+
+
+def set_current(root: str, version: str):
+    """
+    Atomically point CURRENT at a version.
+
+    Args:
+        root (str): Index directory
+        version (str): Version to serve
+    """
+    if not os.path.isdir(version_path(root, version)):
+        raise ValueError(f"No index version {version}")
+    path = os.path.join(root, CURRENT_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def publish_version(root: str, version: str, keep: int = INDEX_KEEP_VERSIONS):
+    """
+    Move a finished version out of staging, serve it and remove old ones.
+
+    Call while holding index_lock.
+
+    Args:
+        root (str): Index directory
+        version (str): The finished version
+        keep (int): Versions to keep, counting the new one
+    """
+    os.rename(staging_path(root, version), version_path(root, version))
+    set_current(root, version)
+    print_colored(f"✓ Index version {version} is now current", "green")
+    collect_garbage(root, keep)
+
+
+def discard_version(root: str, version: str):
+    """
+    Remove a version that was not published.
+
+    Args:
+        root (str): Index directory
+        version (str): The version
+    """
+    shutil.rmtree(staging_path(root, version), ignore_errors=True)
+
+
+def collect_garbage(root: str, keep: int = INDEX_KEEP_VERSIONS) -> List[str]:
+    """
+    Remove all but the newest versions; the current version is always kept.
+
+    Servers still answering from a removed version keep reading it, since
+    its open and memory-mapped files stay readable until they are closed.
+    Staging directories left by writers that died are removed too, so call
+    while holding index_lock.
+
+    Args:
+        root (str): Index directory
+        keep (int): Versions to keep
+
+    Returns:
+        List[str]: The removed versions
+    """
+    current = current_version(root)
+    versions = list_versions(root)
+    kept = set(versions[-max(keep, 1):]) | {current}
+    removed = [version for version in versions if version not in kept]
+    for version in removed:
+        shutil.rmtree(version_path(root, version), ignore_errors=True)
+    for name in os.listdir(os.path.join(root, VERSIONS_DIR)):
+        if name.startswith("."):
+            shutil.rmtree(os.path.join(root, VERSIONS_DIR, name), ignore_errors=True)
+    if removed:
+        print_colored(f"Removed {len(removed)} old index version(s)", "blue")
+    return removed
+
+
+def rollback(root: str, version: Optional[str] = None) -> str:
+    """
+    Serve an earlier version again.
+
+    Args:
+        root (str): Index directory
+        version (Optional[str]): Version to serve; by default the newest one
+            older than the current version
+
+    Returns:
+        str: The version now current
+
+    Raises:
+        ValueError: If there is no such version to roll back to
+    """
+    with index_lock(root):
+        versions = list_versions(root)
+        if version is None:
+            current = current_version(root)
+            older = [name for name in versions if current is not None and name < current]
+            if not older:
+                raise ValueError("No earlier index version to roll back to")
+            version = older[-1]
+        elif version not in versions:
+            raise ValueError(f"No index version {version}")
+        set_current(root, version)
+    print_colored(f"Rolled the index back to version {version}", "yellow")
+    return version
@@ -0,0 +1,292 @@
+"""
+Incremental ingestion service for LawGPT application.
+
+Keeps the vector index, the BM25 keyword index and the citation lookup table
+in sync with the books directory. A manifest stored next to the index records each book's hash and
+the ids of the chunks it produced, so only new, changed or deleted books touch
+the indexes. Each sync that changes anything writes a new index version and
+makes it current (see index_versions), so servers never read an index being
+written. Syncs hold a lock file next to the index, so process_pdf.py and
+upload jobs (see ingestion_jobs) never write the index at the same time.
+"""
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from langchain_core.documents import Document
+from config.settings import CHUNKER
+from services.citation_index import CitationIndex
+from services.document_processor import extract_docx
+from services.index_versions import create_version, discard_version, index_lock, publish_version, resolve_index_path
+from services.pdf_service import ShardResult, iter_pdf_chunks
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+from services.vector_db_service import create_document_embeddings
+from utils.helpers import print_colored, get_pdf_hash
+
+MANIFEST_FILE = "manifest.json"
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+# Chunks embedded and added per call, so progress is reported while a large book is embedded
+ADD_BATCH_SIZE = 256
+
+
+def scan_books(books_dir: str) -> Dict[str, str]:
+    """
+    Hash every supported book in a directory tree.
+
+    Args:
+        books_dir (str): Directory to scan
+
+    Returns:
+        Dict[str, str]: File hash keyed by path relative to books_dir
+    """
+    books = {}
+    for root, _, files in os.walk(books_dir):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.join(root, name)
+                books[os.path.relpath(path, books_dir)] = get_pdf_hash(path)
+    return books
+
+
+def load_manifest(db_path: str) -> Dict[str, dict]:
+    """
+    Load the ingestion manifest for an index.
+
+    Args:
+        db_path (str): Index directory
+
+    Returns:
+        Dict[str, dict]: Entries with "hash", "chunker" and "chunk_ids", keyed by book path
+    """
+    path = os.path.join(db_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["books"]
+
+
+def save_manifest(db_path: str, manifest: Dict[str, dict]):
+    """
+    Atomically write the ingestion manifest for an index.
+
+    Args:
+        db_path (str): Index directory
+        manifest (Dict[str, dict]): Entries keyed by book path
+    """
+    path = os.path.join(db_path, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "books": manifest}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def iter_book_chunks(paths: List[str]) -> Iterator[ShardResult]:
+    """
+    Extract and chunk books of every supported type.
+
+    Args:
+        paths (List[str]): Book files
+
+    Yields:
+        ShardResult: Chunks of a PDF shard or of a whole Word document
+    """
+    for path in paths:
+        if path.lower().endswith(".docx"):
+            yield extract_docx(path)
+    yield from iter_pdf_chunks([path for path in paths if not path.lower().endswith(".docx")])
+
+
+def chunk_ids_for(name: str, book_hash: str, docs: List[Document]) -> List[str]:
+    """
+    Deterministic ids for chunks of a book.
+
+    Ids are numbered per page, so they do not depend on how the book was
+    sharded across extraction workers.
+
+    Args:
+        name (str): Book path relative to the books directory
+        book_hash (str): Hash of the book file
+        docs (List[Document]): Chunks of whole pages, in page order
+
+    Returns:
+        List[str]: One id per chunk
+    """
+    ids = []
+    position = 0
+    previous_page = None
+    for doc in docs:
+        page = doc.metadata.get("page")
+        position = position + 1 if page == previous_page else 0
+        previous_page = page
+        ids.append(f"{name}:{book_hash}:{page}:{position}")
+    return ids
+
+
+def sync_index(books_dir: str, db_path: str, only: Optional[List[str]] = None,
+               progress: Optional[Callable[[str, int, int], None]] = None) -> bool:
+    """
+    Bring the vector and BM25 indexes up to date with the books directory.
+
+    Books whose hash matches the manifest are skipped without loading the
+    index. Otherwise the current version is copied to a new one, where
+    deleted and changed books have their chunks removed, and new and
+    changed books are chunked, embedded and added. Books chunked with a
+    different CHUNKER count as changed. A missing BM25 index is rebuilt from
+    the chunks already in the vector index. Once every chunk is added, the
+    vector index is trained into its configured layout (see FAISS_INDEX_TYPE),
+    and the new version is published.
+
+    Args:
+        books_dir (str): Directory containing the books
+        db_path (str): Index directory, holding the versions
+        only (Optional[List[str]]): Sync just these books (paths relative to
+            books_dir), leaving the others as they are indexed
+        progress (Optional[Callable[[str, int, int], None]]): Called with a
+            stage ("extracting", "embedding" or "saving") and the pages or
+            chunks done and expected (0 while unknown)
+
+    Returns:
+        bool: True if the index is up to date, False on failure
+    """
+    with index_lock(db_path):
+        return _sync_index(books_dir, db_path, only, progress or (lambda stage, done, total: None))
+
+
+def _sync_index(books_dir: str, root: str, only: Optional[List[str]],
+                progress: Callable[[str, int, int], None]) -> bool:
+    start = time.perf_counter()
+    source = resolve_index_path(root)
+    manifest = load_manifest(source)
+    backend = get_backend()
+    index_exists = backend.exists(source)
+    if only is not None and manifest and index_exists:
+        books = {name: get_pdf_hash(os.path.join(books_dir, name)) for name in only
+                 if os.path.isfile(os.path.join(books_dir, name))}
+    else:
+        # An index that is rebuilt gets every book, not just the requested ones
+        only = None
+        books = scan_books(books_dir)
+
+    if index_exists and not manifest:
+        # An index built before manifests existed cannot be diffed
+        print_colored("Index has no manifest, rebuilding from all books", "yellow")
+        index_exists = False
+    if not index_exists:
+        manifest = {}
+
+    removed = [name for name in manifest if name not in books and (only is None or name in only)]
+    changed = [name for name, digest in books.items()
+               if name in manifest and (manifest[name]["hash"] != digest
+                                        or manifest[name].get("chunker", "recursive") != CHUNKER)]
+    added = [name for name in books if name not in manifest]
+
+    sparse_missing = index_exists and not BM25Index.exists(source)
+    index_stale = index_exists and backend.needs_upgrade(source)
+
+    if index_exists and not (removed or changed or added or sparse_missing or index_stale):
+        print_colored(
+            f"✓ Index up to date ({len(books)} books checked in "
+            f"{time.perf_counter() - start:.2f}s)", "green"
+        )
+        return True
+
+    print_colored(
+        f"Syncing index: {len(added)} new, {len(changed)} changed, {len(removed)} removed", "yellow"
+    )
+
+    version, db_path = create_version(root, copy_from=source if index_exists else None)
+    try:
+        embeddings = create_document_embeddings()
+        vectorstore = None
+        sparse_index = BM25Index()
+        if index_exists:
+            vectorstore = backend.load(db_path, embeddings)
+            if sparse_missing:
+                print_colored("Building keyword index from the existing chunks...", "yellow")
+                ids, docs = backend.documents(vectorstore)
+                sparse_index.add_documents(docs, ids=ids)
+            else:
+                sparse_index = BM25Index.load(db_path)
+
+        # Drop the chunks of books that are gone or about to be re-added
+        stale_ids = [chunk_id for name in removed + changed for chunk_id in manifest[name]["chunk_ids"]]
+        if stale_ids:
+            backend.delete(vectorstore, stale_ids)
+            sparse_index.delete(stale_ids)
+        for name in removed:
+            del manifest[name]
+
+        # Chunks are embedded and added shard by shard as workers finish them
+        to_index = changed + added
+        names = {os.path.join(books_dir, name): name for name in to_index}
+        new_ids: Dict[str, List[str]] = {name: [] for name in to_index}
+        failed = set()
+        pages = chunks = 0
+        extract_start = time.perf_counter()
+        progress("extracting", 0, 0)
+        for result in iter_book_chunks(list(names)):
+            name = names[result.shard.path]
+            pages += result.shard.end - result.shard.start
+            progress("extracting", pages, 0)
+            if result.error:
+                print_colored(f"Error processing {name} pages {result.shard.start}-"
+                              f"{result.shard.end}: {result.error}", "red")
+                failed.add(name)
+                continue
+            if not result.docs:
+                continue
+            for doc in result.docs:
+                doc.metadata["book"] = name
+
+            ids = chunk_ids_for(name, books[name], result.docs)
+            for batch in range(0, len(ids), ADD_BATCH_SIZE):
+                docs, batch_ids = result.docs[batch:batch + ADD_BATCH_SIZE], ids[batch:batch + ADD_BATCH_SIZE]
+                if vectorstore is None:
+                    vectorstore = backend.create(docs, embeddings, ids=batch_ids, path=db_path)
+                else:
+                    vectorstore.add_documents(docs, ids=batch_ids)
+                progress("embedding", chunks + batch + len(docs), chunks + len(ids))
+            chunks += len(ids)
+            sparse_index.add_documents(result.docs, ids=ids)
+            new_ids[name].extend(ids)
+
+        if pages:
+            elapsed = time.perf_counter() - extract_start
+            print_colored(f"✓ Processed {pages} pages in {elapsed:.2f}s "
+                          f"({pages / elapsed:.1f} pages/s)", "green")
+
+        for name in to_index:
+            if name in failed:
+                # A partly indexed book is worse than none; retry on the next run
+                print_colored(f"Skipping {name}: could not be processed", "red")
+                if new_ids[name] and vectorstore is not None:
+                    backend.delete(vectorstore, new_ids[name])
+                    sparse_index.delete(new_ids[name])
+                manifest.pop(name, None)
+            else:
+                manifest[name] = {"hash": books[name], "chunker": CHUNKER, "chunk_ids": new_ids[name]}
+
+        if vectorstore is None:
+            print_colored("No books to index", "red")
+            discard_version(root, version)
+            return False
+
+        progress("saving", 0, 0)
+        vectorstore = backend.train(vectorstore)
+        backend.save(vectorstore, db_path)
+        sparse_index.save(db_path)
+        CitationIndex.build(sparse_index.ids, sparse_index.metadatas).save(db_path)
+        save_manifest(db_path, manifest)
+        publish_version(root, version)
+        embeddings.report()
+        print_colored(
+            f"✓ Index synced in {time.perf_counter() - start:.2f}s "
+            f"({backend.count(vectorstore)} {backend.name} vectors, {len(sparse_index)} keyword-indexed chunks)", "green"
+        )
+        return True
+
+    except Exception as e:
+        print_colored(f"Error syncing index: {str(e)}", "red")
+        discard_version(root, version)
+        return False
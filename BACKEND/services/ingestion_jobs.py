@@ -0,0 +1,246 @@
+"""
+Background ingestion jobs for LawGPT application.
+
+Each uploaded book becomes a job: it is extracted, chunked, embedded and
+added to the index by sync_index in a separate process, while the API keeps
+answering from the index it has loaded. When the job has published a new
+index version, this worker swaps it in at once (see
+container.reload_retriever); other workers within INDEX_WATCH_SECONDS.
+
+Jobs run in INGEST_WORKERS processes at a lower CPU priority than the API,
+so extraction and chunking never hold the API's interpreter lock or delay
+its requests on a busy machine. Writes to the index are serialized by its
+lock file, also against process_pdf.py.
+
+A job's state is a small JSON file in INGEST_JOBS_DIR, written as the job
+moves through its stages, so any API worker can report it:
+queued -> extracting -> embedding -> saving -> loading -> done (or failed),
+with "done"/"total" counts of pages or chunks in "progress".
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+from config.settings import BOOKS_DIR, INGEST_JOBS_DIR, INGEST_WORKERS, VECTOR_INDEX_PATH
+from utils.helpers import print_colored
+
+# Niceness added to job processes, so the API's own threads get the CPU first
+JOB_NICENESS = 10
+
+
+class JobStore:
+    """
+    Ingestion job records, one JSON file per job.
+
+    Args:
+        directory (str): Where the job files are kept
+    """
+
+    def __init__(self, directory: str = INGEST_JOBS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _write(self, job: dict):
+        path = self._path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def create(self, book: str, size: int) -> dict:
+        """
+        Record a new queued job.
+
+        Args:
+            book (str): Book path relative to the books directory
+            size (int): Size of the uploaded file in bytes
+
+        Returns:
+            dict: The job
+        """
+        job = {
+            "id": uuid.uuid4().hex, "book": book, "size": size, "status": "queued",
+            "progress": {"done": 0, "total": 0}, "chunks": None, "error": None,
+            "created": time.time(), "started": None, "finished": None,
+        }
+        self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Read a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            Optional[dict]: The job, or None if there is no such job
+        """
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields) -> Optional[dict]:
+        """
+        Change fields of a job; only the process running a job's current stage writes it.
+
+        Args:
+            job_id (str): Job id
+            **fields: Fields to set
+
+        Returns:
+            Optional[dict]: The updated job
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.update(fields)
+            self._write(job)
+        return job
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        """
+        The most recently created jobs.
+
+        Args:
+            limit (int): Maximum number of jobs
+
+        Returns:
+            List[dict]: Jobs, newest first
+        """
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                job = self.get(name[:-len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        jobs.sort(key=lambda job: job["created"], reverse=True)
+        return jobs[:limit]
+
+
+def _lower_priority():
+    try:
+        os.nice(JOB_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def run_job(job_id: str, book: str, jobs_dir: str, books_dir: str, db_path: str) -> int:
+    """
+    Index one book into the saved index; runs in a job process.
+
+    Args:
+        job_id (str): Job id
+        book (str): Book path relative to books_dir
+        jobs_dir (str): Directory of the job files
+        books_dir (str): Directory containing the books
+        db_path (str): Index directory
+
+    Returns:
+        int: Chunks the book was split into
+
+    Raises:
+        RuntimeError: If the book could not be indexed
+    """
+    from services.index_versions import resolve_index_path
+    from services.ingestion import load_manifest, sync_index
+
+    store = JobStore(jobs_dir)
+    store.update(job_id, status="extracting", started=time.time())
+    last_write = [0.0]
+
+    def progress(stage: str, done: int, total: int):
+        # A few status writes per second are enough for anyone polling
+        now = time.monotonic()
+        if stage != "embedding" or done == total or now - last_write[0] > 0.25:
+            last_write[0] = now
+            store.update(job_id, status=stage, progress={"done": done, "total": total})
+
+    if not sync_index(books_dir, db_path, only=[book], progress=progress):
+        raise RuntimeError("Indexing failed; see the server log")
+    entry = load_manifest(resolve_index_path(db_path)).get(book)
+    if entry is None:
+        raise RuntimeError(f"{book} could not be extracted; see the server log")
+    return len(entry["chunk_ids"])
+
+
+class IngestionQueue:
+    """
+    Runs ingestion jobs in a pool of background processes.
+
+    Args:
+        workers (int): Job processes; each extracts with its own PDF workers
+        jobs_dir (str): Directory of the job files
+        books_dir (str): Directory containing the books
+        db_path (str): Index directory
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, jobs_dir: str = INGEST_JOBS_DIR,
+                 books_dir: str = BOOKS_DIR, db_path: str = VECTOR_INDEX_PATH):
+        self.jobs = JobStore(jobs_dir)
+        self.workers = workers
+        self.books_dir = books_dir
+        self.db_path = db_path
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the API process has threads and loaded indexes
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_lower_priority)
+            return self._pool
+
+    def submit(self, path: str, size: int) -> dict:
+        """
+        Queue a book for indexing.
+
+        Args:
+            path (str): The saved book, inside the books directory
+            size (int): Its size in bytes
+
+        Returns:
+            dict: The queued job
+        """
+        book = os.path.relpath(path, self.books_dir)
+        job = self.jobs.create(book, size)
+        future = self._executor().submit(run_job, job["id"], book, self.jobs.directory, self.books_dir, self.db_path)
+        future.add_done_callback(lambda done: threading.Thread(
+            target=self._finish, args=(job["id"], done), daemon=True
+        ).start())
+        print_colored(f"Queued ingestion job {job['id']} for {book}", "blue")
+        return job
+
+    def _finish(self, job_id: str, future: Future):
+        from services import container
+
+        if future.cancelled():
+            self.jobs.update(job_id, status="failed", error="The server stopped before the job ran",
+                             finished=time.time())
+            return
+        try:
+            chunks = future.result()
+            self.jobs.update(job_id, status="loading", chunks=chunks)
+            container.reload_retriever()
+            self.jobs.update(job_id, status="done", finished=time.time())
+            print_colored(f"Ingestion job {job_id} done: {chunks} chunks added", "green")
+        except Exception as e:
+            self.jobs.update(job_id, status="failed", error=str(e), finished=time.time())
+            print_colored(f"Ingestion job {job_id} failed: {str(e)}", "red")
+
+    def shutdown(self):
+        """Stop the job processes once their current jobs finish"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,202 @@
+"""
+Structural chunker for legal texts in LawGPT application.
+
+Statutes are split at Part, Chapter and Section (or Article) boundaries
+instead of every CHUNK_SIZE characters:
+- Consecutive short sections of the same chapter are packed into one chunk.
+- A section longer than CHUNK_SIZE is split at its sub-section and clause
+  boundaries, so no section is cut mid-sentence.
+- Chunks do not overlap.
+
+Each chunk starts with a one-line header naming the act and the sections it
+holds. Its metadata records the chapter and lists those sections for the
+citation lookup table.
+"""
+import re
+from typing import List, Optional
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config.settings import CHUNK_SIZE
+
+SECTION_PATTERN = re.compile(r"^(\d{1,3})([A-Z]?)\.\s*(?=[\(A-Z“\"‘])")
+CHAPTER_PATTERN = re.compile(r"^CHAPTER\s+([IVXLC]+[A-Z]?)$")
+PART_PATTERN = re.compile(r"^PART\s+([IVXLC]+[A-Z]?)$")
+CLAUSE_PATTERN = re.compile(r"^\((\d{1,3}[A-Z]?|[a-z]{1,4})\)")
+TITLE_PATTERN = re.compile(r"may be called the (.+?),?\s+(\d{4})")
+
+# Section numbers may skip a few (repealed or omitted sections) but never go back
+MAX_SECTION_GAP = 10
+
+
+class _Unit:
+    """A run of lines belonging to one section, or to the text before the first section."""
+
+    def __init__(self, number: Optional[str], page: int, part: Optional[str], chapter: Optional[str]):
+        self.number = number
+        self.part = part
+        self.chapter = chapter
+        self.lines: List[tuple] = []
+        self.first_page = page
+
+    def text(self) -> str:
+        return "\n".join(line for _, line in self.lines)
+
+
+def find_act_title(pages: List[Document]) -> Optional[str]:
+    """
+    Find the short title of an act, e.g. "Bharatiya Nyaya Sanhita, 2023".
+
+    Args:
+        pages (List[Document]): Pages of the act
+
+    Returns:
+        Optional[str]: The short title, or None if none is declared
+    """
+    for page in pages[:5]:
+        match = TITLE_PATTERN.search(" ".join(page.page_content.split()))
+        if match:
+            return f"{match.group(1)}, {match.group(2)}"
+    return None
+
+
+def _split_units(pages: List[Document]) -> List[_Unit]:
+    units = []
+    part = chapter = None
+    current = _Unit(None, pages[0].metadata.get("page", 0), None, None)
+    heading_only = False
+    expect_chapter_title = False
+    last_section = 0
+
+    for page in pages:
+        page_number = page.metadata.get("page", 0)
+        for line in page.page_content.split("\n"):
+            stripped = line.strip()
+            chapter_match = CHAPTER_PATTERN.match(stripped)
+            part_match = PART_PATTERN.match(stripped)
+            section_match = SECTION_PATTERN.match(stripped)
+
+            if chapter_match or part_match:
+                if chapter_match:
+                    chapter = f"CHAPTER {chapter_match.group(1)}"
+                    expect_chapter_title = True
+                else:
+                    part = f"PART {part_match.group(1)}"
+                # Headings open a new unit that the next section takes over
+                if not heading_only:
+                    units.append(current)
+                    current = _Unit(None, page_number, part, chapter)
+                    heading_only = True
+                current.part, current.chapter = part, chapter
+                current.lines.append((page_number, line))
+                continue
+
+            if expect_chapter_title and stripped:
+                expect_chapter_title = False
+                if stripped.isupper():
+                    chapter = f"{chapter} {' '.join(stripped.split())}"
+                    current.chapter = chapter
+                    current.lines.append((page_number, line))
+                    continue
+
+            if section_match:
+                number = int(section_match.group(1))
+                suffix = section_match.group(2)
+                if last_section < number <= last_section + MAX_SECTION_GAP or (number == last_section and suffix):
+                    last_section = number
+                    if heading_only:
+                        current.number = f"{number}{suffix}"
+                    else:
+                        units.append(current)
+                        current = _Unit(f"{number}{suffix}", page_number, part, chapter)
+                    heading_only = False
+
+            current.lines.append((page_number, line))
+
+    units.append(current)
+    return [unit for unit in units if unit.text().strip()]
+
+
+def _split_long_unit(unit: _Unit, chunk_size: int) -> List[tuple]:
+    # Blocks start at sub-section and clause markers such as "(2)" or "(b)"
+    blocks = []
+    for page, line in unit.lines:
+        if not blocks or CLAUSE_PATTERN.match(line.strip()):
+            blocks.append([page, [line]])
+        else:
+            blocks[-1][1].append(line)
+
+    pieces = []
+    fallback = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    for page, lines in blocks:
+        text = "\n".join(lines)
+        if len(text) > chunk_size:
+            pieces.extend((page, part) for part in fallback.split_text(text))
+        elif pieces and len(pieces[-1][1]) + len(text) + 1 <= chunk_size:
+            pieces[-1] = (pieces[-1][0], f"{pieces[-1][1]}\n{text}")
+        else:
+            pieces.append((page, text))
+    return pieces
+
+
+def _header(title: Optional[str], label: str, sections: List[str]) -> str:
+    if not sections:
+        return title or ""
+    name = label if len(sections) == 1 else f"{label}s"
+    span = sections[0] if len(sections) == 1 else f"{sections[0]}-{sections[-1]}"
+    return f"{title} | {name} {span}" if title else f"{name} {span}"
+
+
+def split_legal_text(pages: List[Document], chunk_size: int = CHUNK_SIZE) -> List[Document]:
+    """
+    Chunk the pages of one act along its structure.
+
+    Args:
+        pages (List[Document]): Every page of the act, in order
+        chunk_size (int): Maximum characters per chunk, excluding the header
+
+    Returns:
+        List[Document]: Chunks in document order, with "page" set to the page
+        each chunk starts on and "sections" to a comma-separated section list
+    """
+    if not pages:
+        return []
+    title = find_act_title(pages)
+    kind = "article" if title and "constitution" in title.lower() else "section"
+    label = kind.capitalize()
+    base_metadata = {key: value for key, value in pages[0].metadata.items() if key != "page"}
+
+    chunks = []
+    # Pieces waiting to be packed: (page, text, section number, chapter)
+    packed: List[tuple] = []
+
+    def flush():
+        if not packed:
+            return
+        sections = list(dict.fromkeys(number for _, _, number, _ in packed if number))
+        chapter = packed[0][3]
+        metadata = dict(base_metadata, page=packed[0][0], act=title or "", citation_kind=kind,
+                        chapter=chapter or "", sections=",".join(sections))
+        text = "\n".join(piece for _, piece, _, _ in packed)
+        chunks.append(Document(page_content=f"{_header(title, label, sections)}\n{text}", metadata=metadata))
+        packed.clear()
+
+    def add(page: int, text: str, number: Optional[str], chapter: Optional[str]):
+        packed_size = sum(len(piece) + 1 for _, piece, _, _ in packed)
+        if packed and (packed[-1][3] != chapter or packed_size + len(text) > chunk_size):
+            flush()
+        packed.append((page, text, number, chapter))
+
+    for unit in _split_units(pages):
+        text = unit.text()
+        if len(text) <= chunk_size:
+            add(unit.first_page, text, unit.number, unit.chapter)
+            continue
+        # Full pieces of a long section stand alone; its tail may share a chunk with what follows
+        flush()
+        pieces = _split_long_unit(unit, chunk_size)
+        for page, piece in pieces[:-1]:
+            add(page, piece, unit.number, unit.chapter)
+            flush()
+        add(pieces[-1][0], pieces[-1][1], unit.number, unit.chapter)
+    flush()
+    return chunks
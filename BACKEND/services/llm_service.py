@@ -1,339 +1,487 @@
 """
 LLM service for LawGPT application.
 """
-import pickle
-import os
-import re
-from typing import Dict, List, Optional, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage, SystemMessage
-from config.settings import (
-    GOOGLE_API_KEY, LLM_MODEL, TEMPERATURE, MAX_TOKENS,
-    CHUNK_SIZE, CHUNK_OVERLAP, HISTORY_FILE
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from services.coalescing import SharedStream, request_key, start_stream
+from services.concurrency import request_limiter
+from services.context_packer import pack_context
+from services.container import (
+    get_answer_cache, get_history_store, get_llm, get_request_coalescer, get_retriever, index_status
 )
-from services.vector_store import get_retriever
+from services.history_store import DEFAULT_SESSION_ID
+from services.metrics import ANSWERS, RETRIEVED_DOCUMENTS, STAGE_SECONDS, record_tokens, span
+from services.query_classifier import classify
+from services.response_formatter import FormattedAnswer, format_response
+from services.stream_formatter import StreamingFormatter
 from utils.helpers import print_colored
 
 
-# Global variable to store conversation history
-conversation_history = []
+def is_legal_question(question: str) -> bool:
+    """
+    Determine if the question is legal-related.
+    
+    Args:
+        question (str): The user's question
+        
+    Returns:
+        bool: True if the question is legal-related, False otherwise
+    """
+    return classify(question).legal
 
 
-def save_history():
-    """Save conversation history to file"""
-    with open(HISTORY_FILE, "wb") as f:
-        pickle.dump(conversation_history, f)
+def determine_response_style(question: str) -> str:
+    """
+    Determine the style of response based on the question type.
+    
+    Args:
+        question (str): The user's question
+        
+    Returns:
+        str: The determined response style
+    """
+    return classify(question).style
 
 
-def load_history():
-    """Load conversation history from file"""
-    global conversation_history
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "rb") as f:
-                conversation_history = pickle.load(f)
-        except Exception as e:
-            print_colored(f"Error loading history: {e}", "red")
-            conversation_history = []
+LEGAL_SYSTEM_PROMPT = """You are a legal expert assistant. Provide detailed, accurate, and well-structured responses.
+                Format your response in the following sections:
+                1. Title: A clear title for the response
+                2. Legal Section: Relevant legal provisions or sections
+                3. Analysis: Detailed analysis of the legal aspects
+                4. Description: Comprehensive description of the legal concept
+                5. Legal Implications: Key implications and consequences
+                6. References: Relevant legal references and citations
+                7. Conclusion: A concise summary of key points and final thoughts
+                
+                Use bullet points for lists and key points.
+                Include relevant legal references and citations where applicable.
+                Maintain a professional and authoritative tone.
+                Make your responses engaging and easy to understand.
+                Use **bold text** for important legal terms and concepts.
+                In the conclusion, summarize the main points and provide a clear final statement."""
+
+GENERAL_SYSTEM_PROMPT = """You are a helpful assistant. Provide clear and concise responses.
+                Keep your answers brief and friendly.
+                Use **bold text** for emphasis when needed."""
 
 
-# Load history at module initialization
-load_history()
+def build_prompt(question: str, context: Optional[str] = None, legal: Optional[bool] = None):
+    """
+    Build the chat prompt for a question.
+    
+    Args:
+        question (str): User's question
+        context (Optional[str]): Retrieved context for legal questions
+        legal (Optional[bool]): Whether the question is legal, if already classified
+        
+    Returns:
+        ChatPromptTemplate: The prompt to send to the LLM
+    """
+    # Imported on first use; langchain_core is slow to import
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.messages import HumanMessage, SystemMessage
+    
+    if legal is None:
+        legal = is_legal_question(question)
+    if not legal:
+        return ChatPromptTemplate.from_messages([
+            SystemMessage(content=GENERAL_SYSTEM_PROMPT),
+            HumanMessage(content=question)
+        ])
+    
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=LEGAL_SYSTEM_PROMPT),
+        HumanMessage(content=f"Context: {context}\n\nQuestion: {question}")
+    ])
 
 
-# Initialize LLM
-llm = ChatGoogleGenerativeAI(
-    model=LLM_MODEL,
-    temperature=TEMPERATURE,
-    max_output_tokens=MAX_TOKENS,
-    google_api_key=GOOGLE_API_KEY
-)
+def record_history(question: str, formatted_response: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Append an answered question to the conversation history.
+    
+    The write is queued and committed in the background, so this never
+    blocks on disk I/O.
+    
+    Args:
+        question (str): User's question
+        formatted_response (str): The formatted answer
+        session_id (str): Conversation the question belongs to
+    """
+    get_history_store().append(question, formatted_response, session_id)
 
 
-def is_legal_question(question: str) -> bool:
+def get_cached_answer(question: str):
     """
-    Determine if the question is legal-related.
+    Look up a previously generated answer for a question.
     
     Args:
-        question (str): The user's question
+        question (str): User's question
         
     Returns:
-        bool: True if the question is legal-related, False otherwise
+        tuple: The cached FormattedAnswer (or None) and the question embedding, if computed
     """
-    legal_keywords = [
-        "law", "legal", "court", "judge", "case", "ruling", "judgment",
-        "section", "article", "clause", "provision", "statute", "act",
-        "constitution", "rights", "duty", "obligation", "contract",
-        "agreement", "property", "criminal", "civil", "jurisdiction",
-        "appeal", "petition", "writ", "order", "decree", "verdict"
-    ]
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return None, None
     
-    question_lower = question.lower()
-    return any(keyword in question_lower for keyword in legal_keywords)
+    # Answers are only valid for the index they were retrieved from: the
+    # version served, or the saved files of an unversioned index when it was loaded
+    status = index_status()
+    answer_cache.bind_index((status["version"],) if status["version"] else status.get("fingerprint"))
+    return answer_cache.lookup(question)
 
 
-def format_bold_text(text: str) -> str:
+def cache_answer(question: str, answer: FormattedAnswer, vector=None):
     """
-    Format text with ** markers as bold text.
+    Store a generated answer in the answer cache.
     
     Args:
-        text (str): Text containing ** markers
-        
-    Returns:
-        str: Formatted text with bold markers
+        question (str): User's question
+        answer (FormattedAnswer): The formatted answer and its sections
+        vector: Question embedding returned by get_cached_answer, if any
     """
-    return re.sub(r'\*\*(.*?)\*\*', r'🔹\1🔹', text)
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.put(question, answer, vector)
 
 
-def determine_response_style(question: str) -> str:
+def format_answer(question: str, response_text: str, style: Optional[str] = None) -> FormattedAnswer:
     """
-    Determine the style of response based on the question type.
+    Format a raw LLM answer in the style the question calls for.
     
     Args:
-        question (str): The user's question
+        question (str): User's question
+        response_text (str): Raw LLM output
+        style (Optional[str]): Response style, if the question is already classified
         
     Returns:
-        str: The determined response style
+        FormattedAnswer: Formatted response with sections and styling, and its sections
     """
-    if not is_legal_question(question):
-        return "general"
-        
-    question = question.lower()
+    with span("format"):
+        return format_response(response_text, style or determine_response_style(question))
+
+
+def record_llm_usage(messages: List[Any], response_text: str, usage=None):
+    """
+    Count the tokens of an LLM call in the metrics.
     
-    if any(word in question for word in ["summarize", "summary", "overview", "brief"]):
-        return "summary"
-    elif any(word in question for word in ["list", "enumerate", "what are", "what is"]):
-        return "list"
-    elif any(word in question for word in ["compare", "difference", "versus", "vs"]):
-        return "comparison"
-    elif any(word in question for word in ["explain", "how does", "why does"]):
-        return "explanation"
-    elif any(word in question for word in ["define", "what is the meaning", "what does"]):
-        return "definition"
-    elif any(word in question for word in ["case", "ruling", "judgment", "verdict"]):
-        return "case_ruling"
-    elif any(word in question for word in ["section", "article", "clause", "provision"]):
-        return "legal_reference"
-    elif any(word in question for word in ["court", "judge", "bench", "judicial"]):
-        return "court_composition"
-    else:
-        return "legal_general"
+    Args:
+        messages (List[Any]): Messages sent to the LLM
+        response_text (str): Text it returned
+        usage: Token usage reported by the model, if any
+    """
+    prompt_chars = sum(len(message.content) for message in messages)
+    record_tokens(usage, prompt_chars, len(response_text))
 
 
-def format_legal_sections(response_text: str) -> Dict[str, str]:
+async def aretrieve_context(question: str, context: Optional[str] = None, legal: Optional[bool] = None,
+                            search: Optional[Dict[str, Any]] = None, query_vector=None) -> Optional[str]:
     """
-    Format the response text into structured legal sections.
+    Retrieve context for a legal question without blocking the event loop.
     
     Args:
-        response_text (str): The raw response text
+        question (str): User's question
+        context (Optional[str]): Context to use if the question is not legal
+        legal (Optional[bool]): Whether the question is legal, if already classified
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override
+        query_vector: The question's embedding from the answer cache lookup, if any
         
     Returns:
-        Dict[str, str]: Dictionary containing formatted sections
+        Optional[str]: Retrieved chunks packed into the context budget, or the given context
     """
-    # Split the response into sections
-    sections = response_text.split("\n\n")
-    
-    # Initialize sections dictionary
-    formatted_sections = {
-        "title": "📌 Title",
-        "section": "📜 Legal Section",
-        "analyze": "🔍 Analysis",
-        "description": "📝 Description",
-        "implications": "⚖️ Legal Implications",
-        "references": "📚 References",
-        "conclusion": "🎯 Conclusion"
-    }
+    if legal is None:
+        with span("classify"):
+            legal = is_legal_question(question)
+    if not legal:
+        return context
     
-    # Map sections to their content
-    for i, section in enumerate(sections):
-        if i == 0:
-            formatted_sections["title"] = f"📌 Title\n{section}"
-        elif i == 1:
-            formatted_sections["section"] = f"📜 Legal Section\n{section}"
-        elif i == 2:
-            formatted_sections["analyze"] = f"🔍 Analysis\n{section}"
-        elif i == 3:
-            formatted_sections["description"] = f"📝 Description\n{section}"
-        elif i == 4:
-            formatted_sections["implications"] = f"⚖️ Legal Implications\n{section}"
-        elif i == 5:
-            formatted_sections["references"] = f"📚 References\n{section}"
-        elif i == 6:
-            formatted_sections["conclusion"] = f"🎯 Conclusion\n{section}"
-    
-    return formatted_sections
+    with span("retrieval"):
+        # Loading the store may touch disk, so keep it off the loop
+        retriever = await asyncio.to_thread(get_retriever)
+        if not retriever:
+            return context
+        search = dict(search or {})
+        if query_vector is not None:
+            # A cache miss already embedded the question
+            search["query_vector"] = query_vector
+        docs = await retriever.ainvoke(question, **search)
+    RETRIEVED_DOCUMENTS.observe(len(docs))
+    with span("pack"):
+        return pack_context(docs).text
 
 
-def format_response_with_sections(response_text: str, style: str) -> str:
+def get_llm_response(question: str, context: Optional[str] = None,
+                     session_id: str = DEFAULT_SESSION_ID, search: Optional[Dict[str, Any]] = None) -> str:
     """
-    Format the response text into sections with enhanced visual styling.
+    Blocking variant of aget_llm_response, for scripts with no event loop running.
     
     Args:
-        response_text (str): The raw response text
-        style (str): The response style
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        session_id (str): Conversation the question belongs to
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override
         
     Returns:
-        str: Formatted response with sections
+        str: Formatted response with sections and styling
     """
-    # Format any bold text in the response
-    response_text = format_bold_text(response_text)
-    
-    # For general (non-legal) responses
-    if style == "general":
-        return f"\n👋 Response 👋\n{response_text}\n"
+    return asyncio.run(aget_llm_response(question, context, session_id, search))
+
+
+async def aget_llm_response(question: str, context: Optional[str] = None,
+                            session_id: str = DEFAULT_SESSION_ID, search: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Async variant of get_llm_response that never blocks the event loop.
     
-    # For legal responses, use structured sections
-    if is_legal_question(response_text):
-        sections = format_legal_sections(response_text)
-        
-        # Create the formatted response
-        separator = "═" * 50 + "\n"
-        formatted_response = "\n" + separator
+    Args:
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        session_id (str): Conversation the question belongs to
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override
         
-        # Add each section with proper formatting
-        for section_name, section_content in sections.items():
-            if section_content != f"📌 Title":  # Skip empty sections
-                formatted_response += f"{section_content}\n{separator}"
+    Returns:
+        str: Formatted response with sections and styling
         
-        return formatted_response
-    
-    # For other styles, use the existing templates
-    section_templates = {
-        "summary": {
-            "main": "✨ Legal Summary ✨\n{content}\n",
-            "points": "🌟 Key Legal Points 🌟\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "list": {
-            "main": "📋 Legal Overview 📋\n{content}\n",
-            "points": "📝 Legal Breakdown 📝\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "comparison": {
-            "main": "🔄 Legal Comparison 🔄\n{content}\n",
-            "points": "📊 Legal Analysis 📊\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "explanation": {
-            "main": "💡 Legal Explanation 💡\n{content}\n",
-            "points": "🔑 Legal Implications 🔑\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "definition": {
-            "main": "📚 Legal Definition 📚\n{content}\n",
-            "points": "📖 Legal Context 📖\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "case_ruling": {
-            "main": "⚖️ Case Analysis ⚖️\n{content}\n",
-            "points": "📋 Legal Implications 📋\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "legal_reference": {
-            "main": "📜 Legal Reference 📜\n{content}\n",
-            "points": "📝 Legal Interpretation 📝\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        },
-        "court_composition": {
-            "main": "🏛️ Court Information 🏛️\n{content}\n",
-            "points": "👥 Legal Details 👥\n{points}\n",
-            "conclusion": "🎯 Conclusion\n{conclusion}\n"
-        }
-    }
-    
-    template = section_templates.get(style, section_templates["summary"])
-    
-    # Format the main content
-    main_content = template["main"].format(content=response_text)
-    
-    # Format the points section
-    if style == "list":
-        items = [item.strip() for item in response_text.split("\n") if item.strip()]
-        points = "• " + "\n• ".join(items[1:])
-    else:
-        points = "• " + "\n• ".join(response_text.split(". ")[:3])
-    
-    points_content = template["points"].format(points=points)
-    
-    # Format the conclusion
-    conclusion = "• " + "\n• ".join(response_text.split(". ")[-3:])
-    conclusion_content = template["conclusion"].format(conclusion=conclusion)
+    Raises:
+        QueueFullError: If too many requests are already waiting
+    """
+    return (await aget_llm_answer(question, context, session_id, search)).text
+
+
+# Logged once per request, by where its answer came from
+ANSWER_MESSAGES = {
+    "cache": "Served response from answer cache",
+    "llm": "Generated response with enhanced formatting",
+    "coalesced": "Shared the answer to an identical question in progress",
+}
+
+
+def record_answer(question: str, formatted_response: str, session_id: str, source: str):
+    """
+    Record an answered request in its conversation history and the metrics.
     
-    # Add decorative separators
-    separator = "═" * 50 + "\n"
+    Args:
+        question (str): User's question
+        formatted_response (str): The formatted answer
+        session_id (str): Conversation the question belongs to
+        source (str): Where the answer came from ("cache", "llm", "coalesced" or "error")
+    """
+    if source != "error":
+        with span("history"):
+            record_history(question, formatted_response, session_id)
+        print_colored(ANSWER_MESSAGES[source], "green")
+    ANSWERS.inc(source=source)
+
+
+async def agenerate_answer(question: str, context: Optional[str] = None,
+                           search: Optional[Dict[str, Any]] = None) -> Tuple[FormattedAnswer, str]:
+    """
+    Look up or generate the formatted answer to a question, without recording it.
     
-    # Combine all sections with proper spacing and separators
-    formatted_response = f"\n{separator}{main_content}{separator}{points_content}{separator}{conclusion_content}{separator}"
+    Holds a slot of the shared request limiter while it runs.
     
-    return formatted_response
+    Args:
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override;
+            such answers bypass the answer cache
+        
+    Returns:
+        Tuple[FormattedAnswer, str]: The answer (an error message if answering failed) and where it
+        came from ("cache", "llm" or "error")
+        
+    Raises:
+        QueueFullError: If too many requests are already waiting
+    """
+    async with request_limiter:
+        try:
+            with span("cache_lookup"):
+                cached, vector = (None, None) if search else await asyncio.to_thread(get_cached_answer, question)
+            if cached is not None:
+                return cached, "cache"
+            
+            with span("classify"):
+                query = classify(question)
+            context = await aretrieve_context(question, context, query.legal, search, vector)
+            
+            with span("prompt"):
+                messages = build_prompt(question, context, query.legal).format_messages()
+            
+            # Get response from LLM
+            with span("llm"):
+                response = await get_llm().ainvoke(messages)
+            record_llm_usage(messages, response.content, getattr(response, "usage_metadata", None))
+            answer = format_answer(question, response.content, query.style)
+            if not search:
+                with span("cache_store"):
+                    await asyncio.to_thread(cache_answer, question, answer, vector)
+            return answer, "llm"
+            
+        except Exception as e:
+            error_message = f"❌ Error: {str(e)}"
+            print_colored(error_message, "red")
+            return FormattedAnswer(error_message), "error"
 
 
-def get_llm_response(question: str, context: Optional[str] = None) -> str:
+async def aget_llm_answer(question: str, context: Optional[str] = None, session_id: str = DEFAULT_SESSION_ID,
+                          search: Optional[Dict[str, Any]] = None) -> FormattedAnswer:
     """
-    Get response from LLM with enhanced formatting and styling.
+    Answer a question with its formatted text and sections, without blocking the event loop.
+    
+    Retrieval and generation are awaited, the history write is queued to a
+    background writer, and the number of concurrent requests is bounded by the shared
+    request limiter. Identical questions asked while one is being answered
+    wait for its answer instead of taking a slot of their own.
     
     Args:
         question (str): User's question
         context (Optional[str]): Additional context for the question
+        session_id (str): Conversation the question belongs to
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override;
+            such answers bypass the answer cache
         
     Returns:
-        str: Formatted response with sections and styling
+        FormattedAnswer: Formatted response and its sections (None for an error message)
+        
+    Raises:
+        QueueFullError: If too many requests are already waiting
     """
-    try:
-        # For general questions, use a simpler prompt
-        if not is_legal_question(question):
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""You are a helpful assistant. Provide clear and concise responses.
-                Keep your answers brief and friendly.
-                Use **bold text** for emphasis when needed."""),
-                HumanMessage(content=question)
-            ])
-        else:
-            # Get relevant context from vector store for legal questions
-            retriever = get_retriever()
-            if retriever:
-                docs = retriever.get_relevant_documents(question)
-                context = "\n".join([doc.page_content for doc in docs])
-            
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessage(content="""You are a legal expert assistant. Provide detailed, accurate, and well-structured responses.
-                Format your response in the following sections:
-                1. Title: A clear title for the response
-                2. Legal Section: Relevant legal provisions or sections
-                3. Analysis: Detailed analysis of the legal aspects
-                4. Description: Comprehensive description of the legal concept
-                5. Legal Implications: Key implications and consequences
-                6. References: Relevant legal references and citations
-                7. Conclusion: A concise summary of key points and final thoughts
-                
-                Use bullet points for lists and key points.
-                Include relevant legal references and citations where applicable.
-                Maintain a professional and authoritative tone.
-                Make your responses engaging and easy to understand.
-                Use **bold text** for important legal terms and concepts.
-                In the conclusion, summarize the main points and provide a clear final statement."""),
-                HumanMessage(content=f"Context: {context}\n\nQuestion: {question}")
-            ])
+    coalescer = get_request_coalescer()
+    if coalescer is None:
+        answer, source = await agenerate_answer(question, context, search)
+    else:
+        (answer, source), leader = await coalescer.answer(
+            request_key(question, context, search), lambda: agenerate_answer(question, context, search)
+        )
+        if not leader and source != "error":
+            source = "coalesced"
+    record_answer(question, answer.text, session_id, source)
+    return answer
+
+
+async def astream_answer(question: str, context: Optional[str], search: Optional[Dict[str, Any]],
+                         shared: SharedStream) -> str:
+    """
+    Publish a formatted answer to a stream as the LLM produces it.
+    
+    An empty first fragment is published once a request slot is held, before
+    retrieval and generation start.
+    
+    Args:
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override;
+            such answers bypass the answer cache
+        shared (SharedStream): Stream the fragments are published to
         
-        # Get response from LLM
-        response = llm.invoke(prompt.format_messages())
-        response_text = response.content
+    Returns:
+        str: Where the answer came from ("cache", "llm" or "error")
         
-        # Determine response style and format
-        style = determine_response_style(question)
-        formatted_response = format_response_with_sections(response_text, style)
+    Raises:
+        QueueFullError: If too many requests are already waiting
+    """
+    async with request_limiter:
+        with span("classify"):
+            query = classify(question)
+        formatter = StreamingFormatter(query.style)
+        emitted = []
+        shared.publish("")
         
-        # Store in conversation history
-        conversation_history.append((question, formatted_response))
-        save_history()
+        try:
+            with span("cache_lookup"):
+                cached, vector = (None, None) if search else await asyncio.to_thread(get_cached_answer, question)
+            if cached is not None:
+                shared.publish(cached.text)
+                return "cache"
+            
+            context = await aretrieve_context(question, context, query.legal, search, vector)
+            
+            with span("prompt"):
+                messages = build_prompt(question, context, query.legal).format_messages()
+            
+            # Time to the first token and to the last are recorded separately;
+            # formatting is summed over the chunks and recorded once
+            start = time.perf_counter()
+            first_token = None
+            format_seconds = 0.0
+            raw, usage = [], None
+            async for chunk in get_llm().astream(messages):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                    STAGE_SECONDS.observe(first_token, stage="llm_first_token")
+                raw.append(chunk.content)
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                format_start = time.perf_counter()
+                fragment = formatter.feed(chunk.content)
+                format_seconds += time.perf_counter() - format_start
+                if fragment:
+                    emitted.append(fragment)
+                    shared.publish(fragment)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm")
+            raw_text = "".join(raw)
+            record_llm_usage(messages, raw_text, usage)
+            
+            format_start = time.perf_counter()
+            fragment = formatter.finish()
+            STAGE_SECONDS.observe(format_seconds + time.perf_counter() - format_start, stage="format")
+            emitted.append(fragment)
+            shared.publish(fragment)
+            
+            if not search:
+                with span("cache_store"):
+                    # The stream always uses the section layout; its sections are kept for /api/ask cache hits
+                    sections = format_response(raw_text, query.style, legal_layout=True).sections
+                    await asyncio.to_thread(cache_answer, question, FormattedAnswer("".join(emitted), sections),
+                                            vector)
+            return "llm"
+            
+        except Exception as e:
+            error_message = f"❌ Error: {str(e)}"
+            print_colored(error_message, "red")
+            shared.publish(error_message)
+            return "error"
+
+
+async def astream_llm_response(question: str, context: Optional[str] = None, session_id: str = DEFAULT_SESSION_ID,
+                               search: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """
+    Stream a formatted answer as the LLM produces it.
+    
+    The first item is yielded once a request slot is held, before retrieval
+    and generation start, so callers can await it to surface QueueFullError
+    before committing to a streaming response. An identical question asked
+    while one is streaming attaches to that stream: it gets the fragments
+    already produced, then the rest as they arrive. The answer stops once
+    every client reading it has left.
+    
+    Args:
+        question (str): User's question
+        context (Optional[str]): Additional context for the question
+        session_id (str): Conversation the question belongs to
+        search (Optional[Dict[str, Any]]): Retrieval parameters (k, fetch_k, lambda_mult) to override;
+            such answers bypass the answer cache
         
-        print_colored("Generated response with enhanced formatting", "green")
-        return formatted_response
+    Yields:
+        str: Formatted answer fragments
         
-    except Exception as e:
-        error_message = f"❌ Error: {str(e)}"
-        print_colored(error_message, "red")
-        return error_message
\ No newline at end of file
+    Raises:
+        QueueFullError: If too many requests are already waiting
+    """
+    def produce(shared: SharedStream):
+        return astream_answer(question, context, search, shared)
+    
+    coalescer = get_request_coalescer()
+    if coalescer is None:
+        shared, leader = start_stream(produce), True
+    else:
+        shared, leader = coalescer.stream(request_key(question, context, search), produce)
+    # Closed with this generator, so a client that leaves stops the LLM unless
+    # an identical request is still reading the stream
+    async with aclosing(shared.subscribe()) as fragments:
+        async for fragment in fragments:
+            yield fragment
+    source = shared.result
+    if not leader and source != "error":
+        source = "coalesced"
+    record_answer(question, "".join(shared.fragments), session_id, source)
@@ -0,0 +1,359 @@
+"""
+Local CPU embeddings for LawGPT application.
+
+Embeds text with a small sentence-embedding model on this machine instead of
+the Google embedding API, so a question is embedded without a network round
+trip and index builds are not held to API quotas. A model directory holds a
+WordPiece vocabulary (vocab.txt) and either:
+- model.onnx: a transformer encoder such as all-MiniLM-L6-v2 exported to
+  ONNX, run with onnxruntime (pip install onnxruntime), or
+- embeddings.npy: a static token embedding matrix, as in model2vec models,
+  run with NumPy alone.
+Token vectors are mean-pooled over the attention mask and L2-normalized.
+
+Each model is loaded once per directory and shared. Inference runs on a
+thread pool of LOCAL_EMBEDDING_THREADS workers. Documents are sorted by
+length before they are cut into batches, so a batch carries little padding.
+Questions are batched dynamically: each one joins a queue, and whichever
+worker frees up next embeds everything queued as one batch, so concurrent
+questions share a model call instead of waiting for each other's.
+"""
+import asyncio
+import os
+import queue
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.settings import (
+    LOCAL_EMBEDDING_BATCH_SIZE, LOCAL_EMBEDDING_MAX_TOKENS, LOCAL_EMBEDDING_MODEL_DIR, LOCAL_EMBEDDING_THREADS
+)
+from utils.helpers import print_colored
+
+VOCAB_FILE = "vocab.txt"
+ONNX_FILE = "model.onnx"
+STATIC_FILE = "embeddings.npy"
+
+# Runs of word characters, and every other non-space character on its own
+BASIC_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+MAX_WORD_CHARS = 100
+WORD_CACHE_SIZE = 100000
+
+
+class WordPieceTokenizer:
+    """
+    BERT-style WordPiece tokenizer over a vocab.txt file.
+
+    Text is lowercased and stripped of accents, split into words and
+    punctuation marks, and each word is broken into the longest vocabulary
+    pieces from the left ("##" marks a piece that continues a word).
+
+    Args:
+        vocab_path (str): One token per line; the line number is its id
+        max_tokens (int): Longest sequence, including [CLS] and [SEP]
+    """
+
+    def __init__(self, vocab_path: str, max_tokens: int = 256):
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            self.vocab = {line.rstrip("\n"): i for i, line in enumerate(f)}
+        self.max_tokens = max_tokens
+        self.pad_id = self.vocab.get("[PAD]", 0)
+        self.unk_id = self.vocab["[UNK]"]
+        self.cls_id = self.vocab["[CLS]"]
+        self.sep_id = self.vocab["[SEP]"]
+        self._pieces: Dict[str, List[int]] = {}
+
+    def tokenize(self, text: str) -> List[int]:
+        """
+        Convert a text to token ids.
+
+        Args:
+            text (str): The text
+
+        Returns:
+            List[int]: Token ids between [CLS] and [SEP], cut to max_tokens
+        """
+        return [self.cls_id] + self._piece_ids(text, self.max_tokens - 2) + [self.sep_id]
+
+    def encode_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tokenize texts into padded model inputs.
+
+        Args:
+            texts (List[str]): The texts
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Token ids and attention mask, one row per text
+        """
+        input_ids, attention_mask, _ = self._pad([self.tokenize(text) for text in texts])
+        return input_ids, attention_mask
+
+    def encode_pairs(self, first: str, seconds: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tokenize a text paired with each of several others, as cross-encoders take them.
+
+        Each row is [CLS] first [SEP] second [SEP]; the second text is cut to
+        fit max_tokens, and the first to half of it.
+
+        Args:
+            first (str): The text every pair starts with, such as a question
+            seconds (List[str]): The texts paired with it, such as passages
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Token ids, attention mask
+            and token type ids, one row per pair
+        """
+        head = [self.cls_id] + self._piece_ids(first, self.max_tokens // 2) + [self.sep_id]
+        sequences = [head + self._piece_ids(second, self.max_tokens - len(head) - 1) + [self.sep_id]
+                     for second in seconds]
+        return self._pad(sequences, len(head))
+
+    def _piece_ids(self, text: str, limit: int) -> List[int]:
+        text = text.lower()
+        if not text.isascii():
+            text = "".join(char for char in unicodedata.normalize("NFD", text)
+                           if unicodedata.category(char) != "Mn")
+        ids = []
+        for word in BASIC_TOKEN_PATTERN.findall(text):
+            pieces = self._pieces.get(word)
+            ids.extend(pieces if pieces is not None else self._word_pieces(word))
+            if len(ids) >= limit:
+                del ids[limit:]
+                break
+        return ids
+
+    def _pad(self, sequences: List[List[int]], first_length: Optional[int] = None):
+        width = max(len(sequence) for sequence in sequences)
+        input_ids = np.full((len(sequences), width), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(sequences), width), dtype=np.int64)
+        for row, sequence in enumerate(sequences):
+            input_ids[row, :len(sequence)] = sequence
+            attention_mask[row, :len(sequence)] = 1
+        # Tokens after the first text belong to the second
+        token_type_ids = np.zeros_like(input_ids)
+        if first_length is not None:
+            token_type_ids[:, first_length:] = attention_mask[:, first_length:]
+        return input_ids, attention_mask, token_type_ids
+
+    def _word_pieces(self, word: str) -> List[int]:
+        if len(word) > MAX_WORD_CHARS:
+            return [self.unk_id]
+        pieces = []
+        start = 0
+        while start < len(word):
+            end = len(word)
+            while end > start:
+                piece = word[start:end] if start == 0 else "##" + word[start:end]
+                if piece in self.vocab:
+                    break
+                end -= 1
+            if end == start:
+                # A word with no vocabulary split is unknown as a whole
+                pieces = [self.unk_id]
+                break
+            pieces.append(self.vocab[piece])
+            start = end
+        if len(self._pieces) < WORD_CACHE_SIZE:
+            self._pieces[word] = pieces
+        return pieces
+
+
+def onnx_session(path: str, threads: int = 1):
+    """
+    Open an ONNX model for CPU inference.
+
+    Args:
+        path (str): The .onnx file
+        threads (int): Threads one run may use
+
+    Returns:
+        onnxruntime.InferenceSession: The session
+    """
+    try:
+        import onnxruntime
+    except ImportError:
+        raise ImportError("Local ONNX models need the onnxruntime package: pip install onnxruntime")
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+class _OnnxEncoder:
+    """Transformer encoder exported to ONNX, returning token vectors"""
+
+    def __init__(self, path: str):
+        # Cores are used by running batches on several pool threads at once
+        self.session = onnx_session(path)
+        self.inputs = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.inputs:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+        return self.session.run(None, feed)[0]
+
+
+class _StaticEncoder:
+    """Static token embedding matrix, returning token vectors"""
+
+    def __init__(self, path: str):
+        self.vectors = np.load(path).astype(np.float32, copy=False)
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.vectors[input_ids]
+
+
+class LocalEmbeddingModel:
+    """
+    A local model with its tokenizer, worker pool and question queue.
+
+    Use load_local_model() to share one instance per model directory.
+
+    Args:
+        model_dir (str): Directory with vocab.txt and model.onnx or embeddings.npy
+        max_tokens (int): Longest token sequence embedded
+        threads (int): Worker threads running the model
+        batch_size (int): Most questions embedded in one model call
+    """
+
+    def __init__(self, model_dir: str, max_tokens: int = 256, threads: int = 1, batch_size: int = 32):
+        self.name = os.path.basename(os.path.normpath(model_dir))
+        self.tokenizer = WordPieceTokenizer(os.path.join(model_dir, VOCAB_FILE), max_tokens)
+        if os.path.exists(os.path.join(model_dir, ONNX_FILE)):
+            self.encoder = _OnnxEncoder(os.path.join(model_dir, ONNX_FILE))
+        elif os.path.exists(os.path.join(model_dir, STATIC_FILE)):
+            self.encoder = _StaticEncoder(os.path.join(model_dir, STATIC_FILE))
+        else:
+            raise FileNotFoundError(f"No {ONNX_FILE} or {STATIC_FILE} found in {model_dir}")
+        self.batch_size = max(1, batch_size)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="local-embeddings")
+        self._queries: "queue.SimpleQueue[Tuple[str, Future]]" = queue.SimpleQueue()
+        self.batches = 0
+        self.texts = 0
+        self._counter_lock = threading.Lock()
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts in one model call.
+
+        Args:
+            texts (List[str]): The texts
+
+        Returns:
+            np.ndarray: One unit-length float32 row per text
+        """
+        input_ids, attention_mask = self.tokenizer.encode_batch(texts)
+        hidden = self.encoder.encode(input_ids, attention_mask)
+        mask = attention_mask.astype(np.float32)
+        # Mean over the real tokens, as one batched matrix product
+        pooled = np.matmul(mask[:, None, :], hidden)[:, 0] / np.maximum(mask.sum(axis=1, keepdims=True), 1.0)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        with self._counter_lock:
+            self.batches += 1
+            self.texts += len(texts)
+        return pooled
+
+    def submit_query(self, text: str) -> Future:
+        """
+        Queue a question for the next free worker.
+
+        Args:
+            text (str): The question
+
+        Returns:
+            Future: Resolves to the question's embedding
+        """
+        future = Future()
+        self._queries.put((text, future))
+        self.pool.submit(self._drain)
+        return future
+
+    def _drain(self):
+        # One drain runs per queued question, so the queue always empties; a
+        # drain that finds it empty had its question taken by an earlier batch
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queries.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        try:
+            vectors = self.embed_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+_models: Dict[tuple, LocalEmbeddingModel] = {}
+_models_lock = threading.Lock()
+
+
+def load_local_model(model_dir: str = LOCAL_EMBEDDING_MODEL_DIR, max_tokens: int = LOCAL_EMBEDDING_MAX_TOKENS,
+                     threads: int = LOCAL_EMBEDDING_THREADS,
+                     batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE) -> LocalEmbeddingModel:
+    """
+    Load a local model, or get the instance already loaded with these settings.
+
+    Args:
+        model_dir (str): Directory with vocab.txt and model.onnx or embeddings.npy
+        max_tokens (int): Longest token sequence embedded
+        threads (int): Worker threads running the model
+        batch_size (int): Most texts embedded in one model call
+
+    Returns:
+        LocalEmbeddingModel: The shared model
+    """
+    key = (os.path.abspath(model_dir), max_tokens, threads, batch_size)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = LocalEmbeddingModel(model_dir, max_tokens, threads, batch_size)
+            print_colored(f"✓ Local embedding model loaded from {model_dir}", "green")
+        return _models[key]
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeddings computed on this machine with a shared local model.
+
+    Questions and passages are embedded the same way, so the task type the
+    Google embeddings take is accepted and ignored.
+
+    Args:
+        model (Optional[LocalEmbeddingModel]): The model; by default the one in LOCAL_EMBEDDING_MODEL_DIR
+    """
+
+    def __init__(self, model: Optional[LocalEmbeddingModel] = None):
+        self.model = model or load_local_model()
+        self.model_name = f"local:{self.model.name}"
+
+    def embed_documents(self, texts: List[str], *, batch_size: Optional[int] = None,
+                        task_type: Optional[str] = None) -> List[List[float]]:
+        if not texts:
+            return []
+        batch_size = batch_size or self.model.batch_size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+        results = self.model.pool.map(lambda rows: self.model.embed_batch([texts[i] for i in rows]), batches)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for rows, batch_vectors in zip(batches, results):
+            for i, vector in zip(rows, batch_vectors.tolist()):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.submit_query(text).result().tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await asyncio.wrap_future(self.model.submit_query(text))).tolist()
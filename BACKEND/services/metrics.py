@@ -0,0 +1,273 @@
+"""
+Request metrics for LawGPT application.
+
+Counters and histograms kept in process and rendered in the Prometheus text
+format by GET /metrics. Every answer records how long each pipeline stage
+took (classification, cache lookup, retrieval, prompt build, LLM call,
+formatting, history write), how many chunks retrieval returned and how many
+tokens the LLM used. With several API workers each worker keeps its own
+metrics, and a scrape sees the worker that served it.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds, from a cache hit to a long generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Samples = Iterable[Tuple[str, Dict[str, str], float]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Samples:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+
+    Args:
+        name (str): Metric name, ending in _total
+        documentation (str): Help text
+        labelnames (Sequence[str]): Label names
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """Add to the count for a label set"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets.
+
+    Args:
+        name (str): Metric name
+        documentation (str): Help text
+        labelnames (Sequence[str]): Label names
+        buckets (Sequence[float]): Upper bounds of the buckets, ascending
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count in each bucket (not cumulative), then sum
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        """Record one value for a label set"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, counts[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """Metrics rendered together, plus callbacks that report values computed at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        """
+        Add a callback run on every scrape.
+
+        Args:
+            collector: Returns (name, kind, help, samples) tuples, where samples
+                are (name, labels, value) tuples
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Returns:
+            str: The exposition text
+        """
+        families = [(metric.name, metric.kind, metric.documentation, metric.samples()) for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}"
+                         for sample, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "lawgpt_stage_seconds", "Time spent in each stage of answering a question", ["stage"]
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "lawgpt_http_request_seconds", "Time from request to the end of the response", ["method", "route", "status"]
+))
+ANSWERS = REGISTRY.register(Counter(
+    "lawgpt_answers_total", "Questions answered, by where the answer came from", ["source"]
+))
+RETRIEVED_DOCUMENTS = REGISTRY.register(Histogram(
+    "lawgpt_retrieved_documents", "Chunks returned by retrieval per legal question", [],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 12, 16, 24, 32)
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "lawgpt_llm_tokens_total",
+    "LLM tokens by direction; 'estimated' counts are characters / 4 where the model reports no usage",
+    ["direction", "counted"]
+))
+CONTEXT_TOKENS = REGISTRY.register(Counter(
+    "lawgpt_context_tokens_total",
+    "Estimated context tokens of retrieved chunks ('retrieved') and of the packed context sent to the LLM ('packed')",
+    ["stage"]
+))
+
+# Characters per token used when the model reports no usage
+CHARS_PER_TOKEN = 4
+
+
+def span(stage: str):
+    """
+    Time a pipeline stage into lawgpt_stage_seconds.
+
+    Args:
+        stage (str): Stage name
+
+    Returns:
+        A context manager timing its block
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def record_tokens(usage, prompt_chars: int, output_chars: int):
+    """
+    Count the tokens of one LLM call.
+
+    Args:
+        usage: The message's usage_metadata, if the model reported one
+        prompt_chars (int): Characters sent, used when usage is missing
+        output_chars (int): Characters received, used when usage is missing
+    """
+    if usage:
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), direction="input", counted="reported")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), direction="output", counted="reported")
+    else:
+        LLM_TOKENS.inc(prompt_chars // CHARS_PER_TOKEN, direction="input", counted="estimated")
+        LLM_TOKENS.inc(output_chars // CHARS_PER_TOKEN, direction="output", counted="estimated")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into lawgpt_http_request_seconds.
+
+    Requests are labelled with their route template rather than the raw path,
+    so /api/history/{session_id} is one series however many sessions exist.
+    Streaming responses are timed until their last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"]
+            )
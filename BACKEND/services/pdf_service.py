@@ -3,12 +3,180 @@ PDF processing service for LawGPT application.
 """
 import os
 import hashlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, NamedTuple, Optional
 from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, DB_DIR
+from pypdf import PdfReader
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, CHUNKER, DB_DIR, PDF_WORKERS, PAGES_PER_SHARD
+from services.legal_chunker import split_legal_text
 from utils.helpers import print_colored, get_pdf_hash
 
 
+class PageShard(NamedTuple):
+    """A range of pages of one PDF, extracted by a single worker."""
+    path: str
+    start: int
+    end: int
+
+
+class ShardResult(NamedTuple):
+    """Chunks produced from a PageShard, or the error that stopped it."""
+    shard: PageShard
+    docs: List[Document]
+    error: Optional[str]
+
+
+def create_text_splitter():
+    """Create the text splitter used for all PDF chunks"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def chunk_pages(pages: List[Document], chunker: str = CHUNKER) -> List[Document]:
+    """
+    Chunk the pages of one book.
+    
+    Args:
+        pages (List[Document]): Pages in order; the structural chunker needs the whole book
+        chunker (str): "structural" or "recursive"
+    
+    Returns:
+        List[Document]: The chunks
+    """
+    if chunker == "structural":
+        return split_legal_text(pages)
+    return create_text_splitter().split_documents(pages)
+
+
+def plan_shards(pdf_paths: List[str], pages_per_shard: int = PAGES_PER_SHARD) -> List[PageShard]:
+    """
+    Split a set of PDFs into page ranges that can be extracted independently.
+    
+    Args:
+        pdf_paths (List[str]): PDFs to shard
+        pages_per_shard (int): Maximum pages per shard
+    
+    Returns:
+        List[PageShard]: Shards in book and page order
+    """
+    shards = []
+    for path in pdf_paths:
+        try:
+            page_count = len(PdfReader(path).pages)
+        except Exception as e:
+            print_colored(f"Error reading PDF {path}: {str(e)}", "red")
+            shards.append(PageShard(path, 0, 0))
+            continue
+        for start in range(0, page_count, pages_per_shard):
+            shards.append(PageShard(path, start, min(start + pages_per_shard, page_count)))
+    return shards
+
+
+def extract_shard(shard: PageShard, split: bool = True) -> ShardResult:
+    """
+    Extract and chunk the pages of one shard; runs in a worker process.
+    
+    Pages are split individually, as PyPDFLoader documents are, so the chunks
+    do not depend on how the book was sharded.
+    
+    Args:
+        shard (PageShard): Pages to extract
+        split (bool): Split pages into chunks; if False, return one document per page
+    
+    Returns:
+        ShardResult: The chunks, or the error message
+    """
+    try:
+        if shard.start == shard.end:
+            raise ValueError("PDF could not be read")
+        reader = PdfReader(shard.path)
+        pages = [
+            Document(
+                page_content=reader.pages[page].extract_text(),
+                metadata={"source": shard.path, "page": page}
+            )
+            for page in range(shard.start, shard.end)
+        ]
+        return ShardResult(shard, create_text_splitter().split_documents(pages) if split else pages, None)
+    except Exception as e:
+        return ShardResult(shard, [], str(e))
+
+
+def _iter_shards(shards: List[PageShard], workers: int, split: bool) -> Iterator[ShardResult]:
+    if workers <= 1:
+        for shard in shards:
+            yield extract_shard(shard, split)
+        return
+    
+    shards = iter(shards)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            for shard in shards:
+                pending.add(pool.submit(extract_shard, shard, split))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def iter_pdf_chunks(pdf_paths: List[str], workers: int = PDF_WORKERS,
+                    pages_per_shard: int = PAGES_PER_SHARD, chunker: str = CHUNKER) -> Iterator[ShardResult]:
+    """
+    Extract and chunk PDFs in parallel, yielding chunks shard by shard.
+    
+    At most two shards per worker are in flight, so memory stays bounded no
+    matter how large the library is. Results arrive in completion order.
+    
+    The structural chunker needs whole books, so with it pages are gathered
+    per book and each book is yielded as one result spanning all its pages.
+    
+    Args:
+        pdf_paths (List[str]): PDFs to process
+        workers (int): Worker processes; 1 extracts in the calling process
+        pages_per_shard (int): Maximum pages per shard
+        chunker (str): "structural" or "recursive"
+    
+    Yields:
+        ShardResult: Chunks of one shard, or of one book with the structural chunker
+    """
+    shards = plan_shards(pdf_paths, pages_per_shard)
+    if chunker != "structural":
+        yield from _iter_shards(shards, workers, split=True)
+        return
+    
+    remaining = {}
+    for shard in shards:
+        remaining[shard.path] = remaining.get(shard.path, 0) + 1
+    books = {path: [] for path in remaining}
+    for result in _iter_shards(shards, workers, split=False):
+        path = result.shard.path
+        books[path].append(result)
+        remaining[path] -= 1
+        if remaining[path]:
+            continue
+        
+        results = sorted(books.pop(path), key=lambda r: r.shard.start)
+        book = PageShard(path, 0, results[-1].shard.end)
+        errors = [r.error for r in results if r.error]
+        if errors:
+            yield ShardResult(book, [], errors[0])
+            continue
+        try:
+            chunks, error = chunk_pages([page for r in results for page in r.docs], chunker), None
+        except Exception as e:
+            chunks, error = [], str(e)
+        yield ShardResult(book, chunks, error)
+
+
 def process_pdf(pdf_path):
     """Process the PDF file and create document chunks"""
     print_colored(f"Processing PDF: {pdf_path}", "yellow")
@@ -24,12 +192,7 @@ def process_pdf(pdf_path):
         print_colored(f"✓ Loaded {len(documents)} pages from PDF", "green")
         
         # Split the documents into chunks optimized for embedding
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        docs = text_splitter.split_documents(documents)
+        docs = chunk_pages(documents)
         
         print_colored(f"✓ Split into {len(docs)} chunks for processing", "green")
         
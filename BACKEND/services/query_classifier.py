@@ -0,0 +1,147 @@
+"""
+Question classifier for LawGPT application.
+
+Decides in one pass over a question whether it is legal and which response
+style it calls for. The question is split into words once, and keywords are
+matched as whole words, so "act" no longer matches "fact" nor "vs" "canvas":
+single words by one set intersection, and phrases ("what is") only where
+their first word occurs. Plurals ("courts", "sections") match their keyword.
+Answers are checked for legal keywords by a single regex compiled from a
+trie of the terms, which stops at the first match.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Words that make a question legal
+LEGAL_TERMS = (
+    "law", "legal", "court", "judge", "case", "ruling", "judgment",
+    "section", "article", "clause", "provision", "statute", "act",
+    "constitution", "rights", "duty", "obligation", "contract",
+    "agreement", "property", "criminal", "civil", "jurisdiction",
+    "appeal", "petition", "writ", "order", "decree", "verdict",
+    # Forms that substring matching used to catch and a plural suffix does not
+    "lawyer", "lawful", "unlawful", "lawsuit", "illegal", "legally", "judgement", "constitutional",
+    "duties", "properties", "contractual", "statutory", "petitioner", "appellate",
+)
+
+# Response styles in order of precedence, with the words that call for them
+STYLE_RULES = (
+    ("summary", ("summarize", "summarise", "summary", "overview", "brief", "briefly")),
+    ("list", ("list", "enumerate", "what are", "what is")),
+    ("comparison", ("compare", "difference", "versus", "vs")),
+    ("explanation", ("explain", "how does", "why does")),
+    ("definition", ("define", "what is the meaning", "what does")),
+    ("case_ruling", ("case", "ruling", "judgment", "verdict")),
+    ("legal_reference", ("section", "article", "clause", "provision")),
+    ("court_composition", ("court", "judge", "bench", "judicial")),
+)
+STYLE_ORDER = tuple(style for style, _ in STYLE_RULES)
+
+
+class QueryClass(NamedTuple):
+    """Whether a question is legal, and the response style it calls for"""
+    legal: bool
+    style: str
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def _trie(terms: Iterable[str]) -> str:
+    # Terms sharing a prefix share a branch, so each position tries one path instead of every term
+    root: Dict[str, dict] = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return build(root)
+
+
+def _compile(terms: Iterable[str]) -> "re.Pattern":
+    # Matched against lowercased text; a plural "s" or "es" may follow a term
+    return re.compile(rf"\b({_trie({_normalize(term) for term in terms})})(?:e?s)?\b")
+
+
+# Signals are bit masks: bit 0 marks a legal term and bit i + 1 the i-th style
+# of STYLE_ORDER, so the lowest style bit set is the style that takes precedence
+LEGAL_SIGNAL = 1
+GENERAL = QueryClass(False, "general")
+LEGAL_CLASSES = (QueryClass(True, "legal_general"),) + tuple(QueryClass(True, style) for style in STYLE_ORDER)
+
+
+def _term_signals() -> Tuple[Dict[str, int], Dict[str, List[Tuple[str, int]]]]:
+    signals: Dict[str, int] = {}
+    for term in LEGAL_TERMS:
+        signals[_normalize(term)] = signals.get(_normalize(term), 0) | LEGAL_SIGNAL
+    for rank, (_, terms) in enumerate(STYLE_RULES, start=1):
+        for term in terms:
+            signals[_normalize(term)] = signals.get(_normalize(term), 0) | 1 << rank
+
+    # Single words are looked up with their plural forms. Phrases are keyed by
+    # their first word, so only those starting at a word of the text are searched for
+    words: Dict[str, int] = {}
+    phrases: Dict[str, List[Tuple[str, int]]] = {}
+    for term, signal in signals.items():
+        if " " in term:
+            phrases.setdefault(term.split()[0], []).append((f" {term} ", signal))
+        else:
+            for form in (term, term + "s", term + "es"):
+                words[form] = words.get(form, 0) | signal
+    return words, phrases
+
+
+WORD_SIGNALS, PHRASE_SIGNALS = _term_signals()
+# Every word that signals a category or may start a phrase
+WORDS = frozenset(WORD_SIGNALS) | frozenset(PHRASE_SIGNALS)
+WORD_PATTERN = re.compile(r"\w+")
+LEGAL_PATTERN = _compile(LEGAL_TERMS)
+
+
+def classify(text: str) -> QueryClass:
+    """
+    Classify a question in one pass.
+
+    Args:
+        text (str): The question
+
+    Returns:
+        QueryClass: Legal flag and response style ("general" for non-legal questions)
+    """
+    tokens = WORD_PATTERN.findall(text.lower())
+    found = 0
+    joined = None
+    for word in WORDS.intersection(tokens):
+        found |= WORD_SIGNALS.get(word, 0)
+        for phrase, signal in PHRASE_SIGNALS.get(word, ()):
+            if joined is None:
+                joined = f" {' '.join(tokens)} "
+            if phrase in joined:
+                found |= signal
+    if not found & LEGAL_SIGNAL:
+        return GENERAL
+    styles = found >> 1
+    return LEGAL_CLASSES[(styles & -styles).bit_length()]
+
+
+def mentions_legal_terms(text: str) -> bool:
+    """
+    Check whether a text uses any legal keyword, stopping at the first one.
+
+    Args:
+        text (str): Any text, such as a whole answer
+
+    Returns:
+        bool: True if a legal keyword occurs as a word
+    """
+    return LEGAL_PATTERN.search(text.lower()) is not None
@@ -0,0 +1,95 @@
+"""
+Cross-encoder reranking for LawGPT application.
+
+A cross-encoder reads the question and a chunk together and scores how well
+the chunk answers it: slower than comparing embeddings, but more accurate.
+With RERANK_MODEL_DIR set, the vector search fetches RERANK_CANDIDATES chunks
+per question, the reranker scores them, and MMR picks the answer chunks from
+the best fetch_k (see services/vector_search.py).
+
+The model directory holds an ONNX export of a BERT-style cross-encoder
+(model.onnx, returning one relevance logit per pair, as the ms-marco MiniLM
+rerankers do) and its vocab.txt. Scoring runs on this machine's CPU and needs
+the optional onnxruntime package.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from config.settings import RERANK_MODEL_DIR, RERANK_MAX_TOKENS
+from services.local_embeddings import ONNX_FILE, VOCAB_FILE, WordPieceTokenizer, onnx_session
+from utils.helpers import print_colored
+
+_rerankers: Dict[tuple, "CrossEncoderReranker"] = {}
+_rerankers_lock = threading.Lock()
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder scoring (question, chunk) pairs.
+
+    Args:
+        model_dir (str): Directory with model.onnx and vocab.txt
+        max_tokens (int): Tokens per pair; longer chunks are cut
+        batch_size (int): Pairs per model call
+    """
+
+    def __init__(self, model_dir: str, max_tokens: int = RERANK_MAX_TOKENS, batch_size: int = 16):
+        self.name = os.path.basename(os.path.normpath(model_dir))
+        self.tokenizer = WordPieceTokenizer(os.path.join(model_dir, VOCAB_FILE), max_tokens)
+        # One question's pairs are scored in a single run, so it may use every core
+        self.session = onnx_session(os.path.join(model_dir, ONNX_FILE), os.cpu_count() or 1)
+        self.inputs = {model_input.name for model_input in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        """
+        Score how well each text answers a question.
+
+        Args:
+            query (str): The question
+            texts (List[str]): Candidate chunks
+
+        Returns:
+            np.ndarray: One relevance logit per text; higher is more relevant
+        """
+        scores = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            input_ids, attention_mask, token_type_ids = self.tokenizer.encode_pairs(query, batch)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.inputs:
+                feeds["token_type_ids"] = token_type_ids
+            logits = self.session.run(None, feeds)[0]
+            # Two-class heads score relevance in their last column
+            scores.append(np.asarray(logits, dtype=np.float32).reshape(len(batch), -1)[:, -1])
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+
+def load_reranker(model_dir: str = RERANK_MODEL_DIR,
+                  max_tokens: int = RERANK_MAX_TOKENS) -> Optional[CrossEncoderReranker]:
+    """
+    Load the configured reranker once per process.
+
+    A reranker that fails to load is reported and left out, so retrieval
+    carries on without reranking.
+
+    Args:
+        model_dir (str): Model directory; "" for no reranking
+        max_tokens (int): Tokens per pair
+
+    Returns:
+        Optional[CrossEncoderReranker]: The reranker, or None
+    """
+    if not model_dir:
+        return None
+    key = (os.path.abspath(model_dir), max_tokens)
+    with _rerankers_lock:
+        if key not in _rerankers:
+            try:
+                _rerankers[key] = CrossEncoderReranker(model_dir, max_tokens)
+                print_colored(f"Loaded reranker {_rerankers[key].name}", "green")
+            except Exception as e:
+                print_colored(f"Reranker not loaded, retrieving without it: {str(e)}", "yellow")
+                return None
+        return _rerankers[key]
@@ -0,0 +1,112 @@
+"""
+Response formatter for LawGPT application.
+
+Formats a finished LLM answer in one pass: bold markers are replaced with a
+single regex substitution, the text is split once into the paragraphs or
+sentences its layout needs, and the output is joined from a list of parts.
+Along with the emoji/section text shown to users, the formatter returns the
+same content as a list of sections, so clients can render the answer
+without parsing the text again.
+
+Each section is a dict with a "name", the "heading" shown above it and its
+"content"; bulleted sections also carry their "items". Legal answers have
+the sections title, section, analysis, description, implications,
+references and conclusion; the other legal styles have overview, points
+and conclusion, and general answers a single response section. Content
+keeps the 🔹 bold markers of the text.
+"""
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+from services.query_classifier import mentions_legal_terms
+from services.stream_formatter import BOLD_MARKER, SECTION_HEADERS, SEPARATOR
+
+BOLD_PATTERN = re.compile(r"\*\*(.*?)\*\*")
+
+GENERAL_HEADING = "👋 Response 👋"
+
+# Names of the legal sections, in the order of SECTION_HEADERS
+SECTION_NAMES = ("title", "section", "analysis", "description", "implications", "references", "conclusion")
+
+# Overview and points headings of the other legal styles; styles not listed use "summary"
+STYLE_HEADINGS = {
+    "summary": ("✨ Legal Summary ✨", "🌟 Key Legal Points 🌟"),
+    "list": ("📋 Legal Overview 📋", "📝 Legal Breakdown 📝"),
+    "comparison": ("🔄 Legal Comparison 🔄", "📊 Legal Analysis 📊"),
+    "explanation": ("💡 Legal Explanation 💡", "🔑 Legal Implications 🔑"),
+    "definition": ("📚 Legal Definition 📚", "📖 Legal Context 📖"),
+    "case_ruling": ("⚖️ Case Analysis ⚖️", "📋 Legal Implications 📋"),
+    "legal_reference": ("📜 Legal Reference 📜", "📝 Legal Interpretation 📝"),
+    "court_composition": ("🏛️ Court Information 🏛️", "👥 Legal Details 👥"),
+}
+CONCLUSION_HEADING = "🎯 Conclusion"
+
+
+class FormattedAnswer(NamedTuple):
+    """A formatted answer and its structured sections"""
+    text: str
+    sections: Optional[List[Dict[str, Any]]] = None
+
+
+def format_response(response_text: str, style: str, legal_layout: Optional[bool] = None) -> FormattedAnswer:
+    """
+    Format a raw LLM answer into the styled text and its sections.
+
+    Args:
+        response_text (str): The raw response text
+        style (str): The response style
+        legal_layout (Optional[bool]): Whether legal styles use the seven
+            section layout; by default, when the answer mentions a legal term
+
+    Returns:
+        FormattedAnswer: The formatted text and its sections
+    """
+    text = BOLD_PATTERN.sub(BOLD_MARKER + r"\1" + BOLD_MARKER, response_text)
+
+    if style == "general":
+        return FormattedAnswer(f"\n{GENERAL_HEADING}\n{text}\n",
+                               [{"name": "response", "heading": GENERAL_HEADING, "content": text}])
+
+    if legal_layout is None:
+        legal_layout = mentions_legal_terms(text)
+    if legal_layout:
+        return _format_legal(text)
+    return _format_styled(text, style)
+
+
+def _format_legal(text: str) -> FormattedAnswer:
+    # Paragraphs beyond the last section are dropped, so they are never split apart
+    paragraphs = text.split("\n\n", len(SECTION_HEADERS))
+    parts = ["\n", SEPARATOR]
+    sections = []
+    for i, (name, heading) in enumerate(zip(SECTION_NAMES, SECTION_HEADERS)):
+        if i < len(paragraphs):
+            content = paragraphs[i]
+            parts += (heading, "\n", content, "\n", SEPARATOR)
+        else:
+            content = ""
+            parts += (heading, "\n", SEPARATOR)
+        sections.append({"name": name, "heading": heading, "content": content})
+    return FormattedAnswer("".join(parts), sections)
+
+
+def _format_styled(text: str, style: str) -> FormattedAnswer:
+    overview_heading, points_heading = STYLE_HEADINGS.get(style, STYLE_HEADINGS["summary"])
+    sentences = text.split(". ")
+    if style == "list":
+        points = [line for line in (line.strip() for line in text.split("\n")) if line][1:]
+    else:
+        points = sentences[:3]
+    conclusion = sentences[-3:]
+
+    points_text = "• " + "\n• ".join(points)
+    conclusion_text = "• " + "\n• ".join(conclusion)
+    formatted = "".join((
+        "\n", SEPARATOR, overview_heading, "\n", text, "\n",
+        SEPARATOR, points_heading, "\n", points_text, "\n",
+        SEPARATOR, CONCLUSION_HEADING, "\n", conclusion_text, "\n", SEPARATOR,
+    ))
+    return FormattedAnswer(formatted, [
+        {"name": "overview", "heading": overview_heading, "content": text},
+        {"name": "points", "heading": points_heading, "content": points_text, "items": points},
+        {"name": "conclusion", "heading": CONCLUSION_HEADING, "content": conclusion_text, "items": conclusion},
+    ])
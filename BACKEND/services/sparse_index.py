@@ -0,0 +1,316 @@
+"""
+Sparse keyword index for LawGPT application.
+
+A BM25 inverted index over the same chunks as the vector index. Exact tokens
+such as section numbers, article numbers and case names score highly here
+even when their embeddings are not close to the question's. Search needs no
+embedding model, so it also works without network access.
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from config.settings import BM25_K1, BM25_B
+from services.chunk_store import ChunkStore, ReadOnlyStoreError
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words too common to help ranking; numbers are always kept
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was "
+    "were which with what when where who whom how does do did under can shall any such".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        List[str]: Terms, with stopwords removed
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25-scored inverted index over document chunks.
+
+    Postings are kept in compressed sparse row form: the documents and term
+    frequencies of term `t` are `docs[indptr[t]:indptr[t + 1]]` and
+    `freqs[indptr[t]:indptr[t + 1]]`, with terms in sorted order. They are
+    rebuilt from the chunk texts after documents are added or deleted, on
+    the next search or save.
+
+    An index loaded read-only serves its postings from memory-mapped arrays
+    and its chunks from a ChunkStore, so loading reads nothing up front and
+    server workers share the pages. It cannot be changed, and its ids, texts
+    and metadatas lists stay empty.
+
+    Args:
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+    """
+
+    POSTINGS_DIR = "bm25_postings"
+    ARRAYS = ("terms", "idf", "indptr", "docs", "freqs", "lengths")
+    DOCS_FILE = "bm25_docs.sqlite"
+    # Formats written before the postings were memory-mapped; they load writable
+    LEGACY_POSTINGS_FILE = "bm25_postings.npz"
+    LEGACY_DOCS_FILES = ("bm25_docs.jsonl", "bm25_docs.json")
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self._terms = np.zeros(0, dtype="S1")
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._freqs = np.zeros(0, dtype=np.float32)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._average_length = 1.0
+        self._positions: Optional[dict] = None
+        self._store: Optional[ChunkStore] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._lengths) if self._store is not None else len(self.ids)
+
+    def _check_writable(self):
+        if self._store is not None:
+            raise ReadOnlyStoreError("BM25Index was loaded read-only; load it writable to change it")
+
+    def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Add chunks to the index.
+
+        Args:
+            docs (List[Document]): Chunks to add
+            ids (Optional[List[str]]): Chunk ids, matching the vector index; generated if omitted
+
+        Returns:
+            List[str]: The ids of the added chunks
+        """
+        self._check_writable()
+        ids = ids or [str(len(self.ids) + i) for i in range(len(docs))]
+        self.ids.extend(ids)
+        self.texts.extend(doc.page_content for doc in docs)
+        self.metadatas.extend(dict(doc.metadata) for doc in docs)
+        self._positions = None
+        self._dirty = True
+        return ids
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """
+        Fetch chunks by id.
+
+        Args:
+            ids (List[str]): Chunk ids
+
+        Returns:
+            List[Document]: The chunks that exist, in the order given
+        """
+        if self._store is not None:
+            return self._store.get_by_ids(ids)
+        if self._positions is None:
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        return self._documents([i for i in (self._positions.get(chunk_id) for chunk_id in ids) if i is not None])
+
+    def _documents(self, rows: List[int]) -> List[Document]:
+        if self._store is not None:
+            return self._store.documents_at(rows)
+        return [Document(page_content=self.texts[i], metadata=dict(self.metadatas[i])) for i in rows]
+
+    def delete(self, ids: List[str]) -> bool:
+        """
+        Remove chunks from the index.
+
+        Args:
+            ids (List[str]): Chunk ids to remove
+
+        Returns:
+            bool: True if any chunk was removed
+        """
+        self._check_writable()
+        drop = set(ids)
+        keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in drop]
+        if len(keep) == len(self.ids):
+            return False
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._positions = None
+        self._dirty = True
+        return True
+
+    def _compile(self):
+        if not self._dirty:
+            return
+        vocabulary = {}
+        terms, docs, freqs = [], [], []
+        lengths = np.zeros(len(self.texts), dtype=np.float32)
+        for doc, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for term, count in counts.items():
+                terms.append(vocabulary.setdefault(term, len(vocabulary)))
+                docs.append(doc)
+                freqs.append(count)
+
+        # Rows follow the sorted terms, so a term is found by binary search without a dictionary
+        words = sorted(vocabulary)
+        rank = np.zeros(len(vocabulary), dtype=np.int64)
+        rank[[vocabulary[word] for word in words]] = np.arange(len(words))
+        terms = rank[np.asarray(terms, dtype=np.int64)]
+
+        # Group postings by term; a stable sort keeps each term's documents in order
+        order = np.argsort(terms, kind="stable")
+        document_frequency = np.bincount(terms, minlength=len(vocabulary))
+        self._terms = np.asarray([word.encode("ascii") for word in words], dtype="S") if words else \
+            np.zeros(0, dtype="S1")
+        self._indptr = np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64)
+        self._docs = np.asarray(docs, dtype=np.int32)[order]
+        self._freqs = np.asarray(freqs, dtype=np.float32)[order]
+        self._lengths = lengths
+        self._average_length = float(lengths.mean()) if len(lengths) else 1.0
+        total = len(self.texts)
+        self._idf = np.log(1.0 + (total - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        self._dirty = False
+
+    def _row(self, term: str) -> Optional[int]:
+        key = term.encode("ascii")
+        row = int(np.searchsorted(self._terms, key))
+        return row if row < len(self._terms) and self._terms[row] == key else None
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """
+        Find the chunks that best match a query.
+
+        Args:
+            query (str): The query text
+            k (int): Maximum chunks to return
+
+        Returns:
+            List[Tuple[Document, float]]: Chunks with their BM25 scores, best first
+        """
+        self._compile()
+        if not len(self):
+            return []
+        scores = np.zeros(len(self), dtype=np.float32)
+        average_length = self._average_length or 1.0
+        for term in set(tokenize(query)):
+            row = self._row(term)
+            if row is None:
+                continue
+            start, end = self._indptr[row], self._indptr[row + 1]
+            docs = self._docs[start:end]
+            freqs = self._freqs[start:end]
+            norm = self.k1 * (1.0 - self.b + self.b * self._lengths[docs] / average_length)
+            # Each document appears once per term, so fancy-index += is safe
+            scores[docs] += self._idf[row] * freqs * (self.k1 + 1.0) / (freqs + norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")].tolist()
+        return list(zip(self._documents(top), (float(scores[i]) for i in top)))
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Whether a saved index exists in directory `path`"""
+        return (os.path.exists(os.path.join(path, cls.POSTINGS_DIR, "indptr.npy"))
+                or os.path.exists(os.path.join(path, cls.LEGACY_POSTINGS_FILE)))
+
+    def save(self, path: str):
+        """
+        Save the index to a directory.
+
+        Each postings array is a separate .npy file, so it can be memory-mapped;
+        the chunks go into a ChunkStore in row order.
+
+        Args:
+            path (str): Directory to write to, usually the vector index directory
+        """
+        self._check_writable()
+        self._compile()
+        postings_path = os.path.join(path, self.POSTINGS_DIR)
+        os.makedirs(postings_path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(postings_path, f"{name}.npy"), getattr(self, f"_{name}"), allow_pickle=False)
+        ChunkStore.write(
+            os.path.join(path, self.DOCS_FILE), self.ids,
+            [Document(page_content=text, metadata=metadata) for text, metadata in zip(self.texts, self.metadatas)]
+        )
+        for name in (self.LEGACY_POSTINGS_FILE, *self.LEGACY_DOCS_FILES):
+            legacy_path = os.path.join(path, name)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+    @classmethod
+    def load(cls, path: str, k1: float = BM25_K1, b: float = BM25_B, read_only: bool = False) -> "BM25Index":
+        """
+        Load an index saved with save.
+
+        k1 and b only affect scoring, so they can be tuned without a rebuild.
+        Indexes in a legacy format are loaded writable and their postings
+        rebuilt from the chunk texts.
+
+        Args:
+            path (str): Directory to read from
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+            read_only (bool): Memory-map the postings and read chunks from the
+                ChunkStore on demand, instead of reading the chunks in to change them
+
+        Returns:
+            BM25Index: The loaded index
+        """
+        index = cls(k1=k1, b=b)
+        postings_path = os.path.join(path, cls.POSTINGS_DIR)
+        if not os.path.isdir(postings_path):
+            index._load_legacy(path)
+            return index
+
+        for name in cls.ARRAYS:
+            setattr(index, f"_{name}", np.load(os.path.join(postings_path, f"{name}.npy"),
+                                               mmap_mode="r", allow_pickle=False))
+        index._average_length = float(index._lengths.mean()) if len(index._lengths) else 1.0
+        store = ChunkStore(os.path.join(path, cls.DOCS_FILE))
+        if read_only:
+            index._store = store
+            return index
+        ids, docs = store.read_all()
+        store.close()
+        index.ids = ids
+        index.texts = [doc.page_content for doc in docs]
+        index.metadatas = [doc.metadata for doc in docs]
+        return index
+
+    def _load_legacy(self, path: str):
+        docs_path = os.path.join(path, self.LEGACY_DOCS_FILES[0])
+        if os.path.exists(docs_path):
+            with open(docs_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    chunk_id, text, metadata = json.loads(line)
+                    self.ids.append(chunk_id)
+                    self.texts.append(text)
+                    self.metadatas.append(metadata)
+        else:
+            with open(os.path.join(path, self.LEGACY_DOCS_FILES[1]), "r", encoding="utf-8") as f:
+                docstore = json.load(f)
+            self.ids = docstore["ids"]
+            self.texts = docstore["texts"]
+            self.metadatas = docstore["metadatas"]
+        self._dirty = True
+        self._compile()
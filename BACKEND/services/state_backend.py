@@ -0,0 +1,327 @@
+"""
+Pluggable shared state for LawGPT application.
+
+Conversation history windows and cached answers can live outside the worker
+process, so several API workers (or several machines) see the same state:
+
+- "memory": a dict in the worker itself; nothing is shared (the default)
+- "redis": a Redis server, or anything speaking its protocol, at STATE_URL
+- "local": the bundled state server (services/state_server.py), which
+  api_server.py starts for its workers; it speaks the Redis protocol, so the
+  workers use the Redis client against it
+
+Keys and values are strings; callers encode structured values as JSON.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+from config.settings import STATE_BACKEND, STATE_URL
+
+
+class StateBackend:
+    """Key-value and list operations shared by every worker."""
+
+    name = ""
+    # Whether other processes see the same state
+    shared = False
+
+    def ping(self) -> bool:
+        """Whether the backend is reachable"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[str]:
+        """Value of a key, or None if it is missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Set a key, expiring after `ttl` seconds if given"""
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        """Remove keys"""
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Increment an integer key, starting from 0, and return the new value"""
+        raise NotImplementedError
+
+    def push(self, key: str, values: List[str], max_len: int, only_if_exists: bool = False,
+             ttl: Optional[float] = None):
+        """
+        Append to a list and keep only its last `max_len` items.
+
+        Args:
+            key (str): List key
+            values (List[str]): Items to append
+            max_len (int): Items to keep
+            only_if_exists (bool): Do nothing if the list does not exist
+            ttl (Optional[float]): Reset the list's expiry to this many seconds
+        """
+        raise NotImplementedError
+
+    def tail(self, key: str, count: int) -> Optional[List[str]]:
+        """Last `count` items of a list, oldest first, or None if the list does not exist"""
+        raise NotImplementedError
+
+    def replace_list(self, key: str, values: List[str], ttl: Optional[float] = None):
+        """Replace a list with new items"""
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    State held in the worker process.
+
+    Args:
+        max_keys (int): Least recently used keys are dropped past this count
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._expires = {}
+
+    def _live(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+        if key not in self._data:
+            return False
+        self._data.move_to_end(key)
+        return True
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+        else:
+            self._expires.pop(key, None)
+        while len(self._data) > self.max_keys:
+            oldest, _ = self._data.popitem(last=False)
+            self._expires.pop(oldest, None)
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._live(key) else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data[key]) + 1 if self._live(key) else 1
+            self._data[key] = str(value)
+            return value
+
+    def push(self, key, values, max_len, only_if_exists=False, ttl=None):
+        with self._lock:
+            if self._live(key):
+                items = self._data[key]
+            elif only_if_exists:
+                return
+            else:
+                items = []
+            items.extend(values)
+            del items[:-max_len]
+            self._store(key, items, ttl if ttl is not None else self._remaining(key))
+
+    def _remaining(self, key: str) -> Optional[float]:
+        expires_at = self._expires.get(key)
+        return None if expires_at is None else expires_at - time.monotonic()
+
+    def tail(self, key, count):
+        with self._lock:
+            if not self._live(key):
+                return None
+            return list(self._data[key][-count:]) if count else []
+
+    def replace_list(self, key, values, ttl=None):
+        with self._lock:
+            self._store(key, list(values), ttl)
+
+
+class RedisStateBackend(StateBackend):
+    """
+    State in a Redis server, spoken to over the Redis protocol (RESP).
+
+    Each thread keeps its own connection. Several commands for one operation
+    are pipelined in a single round trip.
+
+    Args:
+        url (str): Server address, e.g. "redis://:password@host:6379/0"
+        timeout (float): Socket timeout in seconds
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = STATE_URL, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(setup)
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                self._local.reader.close()
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("State server closed the connection")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode("utf-8")
+        if prefix == b"-":
+            raise RuntimeError(f"State server error: {body.decode('utf-8')}")
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2].decode("utf-8")
+        if prefix == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from state server: {line!r}")
+
+    def _send(self, commands: List[tuple]) -> list:
+        self._local.sock.sendall(b"".join(self._encode(command) for command in commands))
+        replies, error = [], None
+        for _ in commands:
+            # Read every reply so the connection stays in step, then raise the first error
+            try:
+                replies.append(self._read_reply())
+            except RuntimeError as e:
+                error = error or e
+                replies.append(None)
+        if error:
+            raise error
+        return replies
+
+    def _execute(self, *commands: tuple) -> list:
+        # One reconnect covers a server restart or an idle connection dropped by the network
+        for attempt in (1, 2):
+            try:
+                if getattr(self._local, "sock", None) is None:
+                    self._connect()
+                return self._send(list(commands))
+            except (OSError, ConnectionError):
+                self._close()
+                if attempt == 2:
+                    raise
+
+    def ping(self):
+        try:
+            return self._execute(("PING",))[0] == "PONG"
+        except Exception:
+            return False
+
+    def get(self, key):
+        return self._execute(("GET", key))[0]
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            self._execute(("SET", key, value))
+        else:
+            self._execute(("SET", key, value, "PX", max(1, int(ttl * 1000))))
+
+    def delete(self, *keys):
+        if keys:
+            self._execute(("DEL", *keys))
+
+    def incr(self, key):
+        return self._execute(("INCR", key))[0]
+
+    def push(self, key, values, max_len, only_if_exists=False, ttl=None):
+        if not values:
+            return
+        commands = [("RPUSHX" if only_if_exists else "RPUSH", key, *values), ("LTRIM", key, -max_len, -1)]
+        if ttl is not None:
+            commands.append(("PEXPIRE", key, max(1, int(ttl * 1000))))
+        self._execute(*commands)
+
+    def tail(self, key, count):
+        exists, items = self._execute(("EXISTS", key), ("LRANGE", key, -count, -1) if count else ("LRANGE", key, 1, 0))
+        return items if exists else None
+
+    def replace_list(self, key, values, ttl=None):
+        commands = [("DEL", key)]
+        if values:
+            commands.append(("RPUSH", key, *values))
+            if ttl is not None:
+                commands.append(("PEXPIRE", key, max(1, int(ttl * 1000))))
+        self._execute(*commands)
+
+
+def get_state_backend(name: Optional[str] = None, url: str = STATE_URL) -> StateBackend:
+    """
+    Build the state backend.
+
+    Args:
+        name (Optional[str]): "memory", "redis" or "local"; defaults to STATE_BACKEND
+        url (str): Server address for the "redis" and "local" backends
+
+    Returns:
+        StateBackend: The backend
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = (name or STATE_BACKEND).lower()
+    if name == "memory":
+        return MemoryStateBackend()
+    if name in ("redis", "local"):
+        return RedisStateBackend(url)
+    raise ValueError(f"Unknown state backend '{name}'; choose one of memory, redis, local")
@@ -0,0 +1,266 @@
+"""
+Local state server for LawGPT application.
+
+A small in-memory server speaking the Redis protocol (RESP), covering the
+commands RedisStateBackend uses, so several API workers on one machine can
+share history windows and cached answers without installing Redis. State is
+lost when the server stops; run a real Redis server (STATE_BACKEND=redis)
+for persistence or for workers on several machines.
+
+Usage:
+    python -m services.state_server --port 6390
+"""
+import argparse
+import asyncio
+import fnmatch
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from config.settings import STATE_URL
+from utils.helpers import print_colored
+
+
+class _Error(Exception):
+    pass
+
+
+class Keyspace:
+    """Strings and lists with optional expiry, following Redis command semantics."""
+
+    def __init__(self):
+        self._data: Dict[bytes, object] = {}
+        self._expires: Dict[bytes, float] = {}
+
+    def _lookup(self, key: bytes):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+        return self._data.get(key)
+
+    def _list(self, key: bytes) -> Optional[list]:
+        value = self._lookup(key)
+        if value is not None and not isinstance(value, list):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _string(self, key: bytes) -> Optional[bytes]:
+        value = self._lookup(key)
+        if value is not None and not isinstance(value, bytes):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _expire_at(self, key: bytes, expires_at: float) -> int:
+        if self._lookup(key) is None:
+            return 0
+        self._expires[key] = expires_at
+        return 1
+
+    def _remove(self, key: bytes):
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+
+    def ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def get(self, key):
+        return self._string(key)
+
+    def set(self, key, value, *options):
+        ttl = None
+        options = [option.upper() for option in options]
+        for flag, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+            if flag in options:
+                try:
+                    ttl = int(options[options.index(flag) + 1]) * scale
+                except (IndexError, ValueError):
+                    raise _Error("ERR syntax error")
+        self._remove(key)
+        self._data[key] = value
+        if ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+        return "OK"
+
+    def delete(self, *keys):
+        removed = sum(1 for key in keys if self._lookup(key) is not None)
+        for key in keys:
+            self._remove(key)
+        return removed
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if self._lookup(key) is not None)
+
+    def incr(self, key):
+        try:
+            value = int(self._string(key) or b"0") + 1
+        except ValueError:
+            raise _Error("ERR value is not an integer or out of range")
+        self._data[key] = str(value).encode()
+        return value
+
+    def expire(self, key, seconds):
+        return self._expire_at(key, time.monotonic() + int(seconds))
+
+    def pexpire(self, key, milliseconds):
+        return self._expire_at(key, time.monotonic() + int(milliseconds) / 1000)
+
+    def ttl(self, key):
+        if self._lookup(key) is None:
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else int(expires_at - time.monotonic())
+
+    def rpush(self, key, *values):
+        items = self._list(key)
+        if items is None:
+            items = self._data[key] = []
+        items.extend(values)
+        return len(items)
+
+    def rpushx(self, key, *values):
+        items = self._list(key)
+        if items is None:
+            return 0
+        items.extend(values)
+        return len(items)
+
+    def _range(self, items: list, start: int, stop: int) -> slice:
+        length = len(items)
+        start = max(start + length if start < 0 else start, 0)
+        stop = stop + length if stop < 0 else min(stop, length - 1)
+        return slice(start, stop + 1) if start <= stop else slice(0, 0)
+
+    def lrange(self, key, start, stop):
+        items = self._list(key) or []
+        return items[self._range(items, int(start), int(stop))]
+
+    def ltrim(self, key, start, stop):
+        items = self._list(key)
+        if items is not None:
+            items[:] = items[self._range(items, int(start), int(stop))]
+            if not items:
+                self._remove(key)
+        return "OK"
+
+    def llen(self, key):
+        return len(self._list(key) or [])
+
+    def keys(self, pattern):
+        pattern = pattern.decode("utf-8")
+        return [key for key in list(self._data)
+                if self._lookup(key) is not None and fnmatch.fnmatchcase(key.decode("utf-8"), pattern)]
+
+    def dbsize(self):
+        return sum(1 for key in list(self._data) if self._lookup(key) is not None)
+
+    def flushdb(self, *args):
+        self._data.clear()
+        self._expires.clear()
+        return "OK"
+
+    def select(self, db):
+        # One database; clients pick theirs by key prefix instead
+        return "OK"
+
+    def auth(self, *args):
+        return "OK"
+
+    def execute(self, command: List[bytes]):
+        """
+        Run one command.
+
+        Args:
+            command (List[bytes]): Command name and arguments
+
+        Returns:
+            The reply: str for status replies, bytes, int, list or None
+        """
+        name = command[0].decode("utf-8").lower()
+        handler = getattr(self, "delete" if name == "del" else name, None)
+        if name.startswith("_") or name == "execute" or handler is None:
+            raise _Error(f"ERR unknown command '{name}'")
+        try:
+            return handler(*command[1:])
+        except TypeError:
+            raise _Error(f"ERR wrong number of arguments for '{name}' command")
+
+
+def encode_reply(reply) -> bytes:
+    """Serialize a command reply in RESP."""
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, _Error):
+        return b"-%s\r\n" % str(reply).encode("utf-8")
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as typed into telnet or redis-cli --pipe
+        return line.split()
+    command = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readline()
+        length = int(header[1:-2])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+async def _serve_client(keyspace: Keyspace, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            command = await _read_command(reader)
+            if command is None or command[:1] in ([b"QUIT"], [b"quit"]):
+                break
+            if not command:
+                continue
+            try:
+                reply = keyspace.execute(command)
+            except _Error as e:
+                reply = e
+            writer.write(encode_reply(reply))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int):
+    """
+    Serve a fresh keyspace until cancelled.
+
+    Args:
+        host (str): Address to bind
+        port (int): Port to bind
+    """
+    keyspace = Keyspace()
+    server = await asyncio.start_server(lambda r, w: _serve_client(keyspace, r, w), host, port)
+    print_colored(f"State server listening on {host}:{port}", "green")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    url = urlparse(STATE_URL)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=url.hostname or "127.0.0.1")
+    parser.add_argument("--port", type=int, default=url.port or 6390)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Incremental response formatter for streamed LLM answers.
+
+Applies the same bold-marker and section/emoji formatting as
+response_formatter.format_response, but to a token stream: text is
+emitted as soon as its formatting is known, and only the current line (for an
+open **bold** span) or a trailing newline is ever held back.
+"""
+from typing import List
+
+SEPARATOR = "═" * 50 + "\n"
+
+# Section headers in the order the legal prompt asks the model to answer
+SECTION_HEADERS = [
+    "📌 Title",
+    "📜 Legal Section",
+    "🔍 Analysis",
+    "📝 Description",
+    "⚖️ Legal Implications",
+    "📚 References",
+    "🎯 Conclusion",
+]
+
+BOLD_MARKER = "🔹"
+
+
+class _BoldStage:
+    """Streaming equivalent of re.sub(r'\\*\\*(.*?)\\*\\*', r'🔹\\1🔹', text)"""
+
+    def __init__(self):
+        self._in_bold = False
+        self._bold_buffer: List[str] = []
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        text = self._pending + text
+        self._pending = ""
+        out: List[str] = []
+        i = 0
+        n = len(text)
+        while i < n:
+            char = text[i]
+            if char == "*":
+                if i + 1 >= n:
+                    # Could be the first half of a marker split across chunks
+                    self._pending = "*"
+                    break
+                if text[i + 1] == "*":
+                    if self._in_bold:
+                        out.append(BOLD_MARKER + "".join(self._bold_buffer) + BOLD_MARKER)
+                        self._bold_buffer = []
+                    self._in_bold = not self._in_bold
+                    i += 2
+                    continue
+            if self._in_bold:
+                if char == "\n":
+                    # The regex never matches across lines, so the marker was literal
+                    out.append("**" + "".join(self._bold_buffer) + "\n")
+                    self._bold_buffer = []
+                    self._in_bold = False
+                else:
+                    self._bold_buffer.append(char)
+            else:
+                out.append(char)
+            i += 1
+        return "".join(out)
+
+    def finish(self) -> str:
+        out = self._pending
+        if self._in_bold:
+            out = "**" + "".join(self._bold_buffer) + out
+        self._pending = ""
+        self._bold_buffer = []
+        self._in_bold = False
+        return out
+
+
+class StreamingFormatter:
+    """
+    Format a streamed answer chunk by chunk.
+
+    General answers get the "👋 Response 👋" frame. Legal answers are laid out
+    as the seven emoji sections, splitting on blank lines exactly like
+    the buffered formatter, which only uses the section layout
+    when the finished answer mentions a legal keyword; a stream has to commit
+    before the answer exists, so every legal-style question streams with the
+    section layout, which is what the legal prompt asks the model to produce.
+
+    Args:
+        style (str): Response style from determine_response_style
+    """
+
+    def __init__(self, style: str):
+        self.style = style
+        self._bold = _BoldStage()
+        self._started = False
+        self._section = 0
+        self._section_open = False
+        self._trailing_newline = False
+
+    def feed(self, text: str) -> str:
+        """
+        Format the next chunk of model output.
+
+        Args:
+            text (str): Raw text from the model
+
+        Returns:
+            str: Formatted text that is ready to send (may be empty)
+        """
+        return self._layout(self._bold.feed(text))
+
+    def finish(self) -> str:
+        """
+        Flush held-back text and close the layout.
+
+        Returns:
+            str: The remaining formatted text
+        """
+        out = [self._layout(self._bold.finish())]
+        if self._trailing_newline:
+            out.append(self._emit_content("\n"))
+            self._trailing_newline = False
+
+        if self.style == "general":
+            out.append(self._start() + "\n")
+            return "".join(out)
+
+        out.append(self._start())
+        out.append(self._close_section())
+        # Sections the model never reached still get their header
+        while self._section < len(SECTION_HEADERS):
+            out.append(f"{SECTION_HEADERS[self._section]}\n{SEPARATOR}")
+            self._section += 1
+        return "".join(out)
+
+    def _start(self) -> str:
+        if self._started:
+            return ""
+        self._started = True
+        if self.style == "general":
+            return "\n👋 Response 👋\n"
+        return "\n" + SEPARATOR
+
+    def _layout(self, text: str) -> str:
+        if not text:
+            return ""
+        if self.style == "general":
+            return self._start() + text
+
+        out = [self._start()]
+        if self._trailing_newline:
+            text = "\n" + text
+            self._trailing_newline = False
+
+        start = 0
+        while True:
+            boundary = text.find("\n\n", start)
+            if boundary == -1:
+                break
+            out.append(self._emit_content(text[start:boundary]))
+            out.append(self._close_section())
+            start = boundary + 2
+
+        rest = text[start:]
+        if rest.endswith("\n"):
+            # May be the first half of a paragraph break
+            self._trailing_newline = True
+            rest = rest[:-1]
+        out.append(self._emit_content(rest))
+        return "".join(out)
+
+    def _emit_content(self, text: str) -> str:
+        if self._section >= len(SECTION_HEADERS):
+            # Paragraphs beyond the last section are dropped, as in the buffered path
+            return ""
+        if not self._section_open:
+            if not text:
+                return ""
+            self._section_open = True
+            return f"{SECTION_HEADERS[self._section]}\n{text}"
+        return text
+
+    def _close_section(self) -> str:
+        if self._section >= len(SECTION_HEADERS):
+            return ""
+        header = "" if self._section_open else f"{SECTION_HEADERS[self._section]}\n"
+        self._section_open = False
+        self._section += 1
+        return f"{header}\n{SEPARATOR}"
@@ -0,0 +1,217 @@
+"""
+Streaming document uploads for LawGPT application.
+
+Parses a multipart/form-data request body as it arrives and writes each file
+part straight to disk, so an upload of any size holds only one network chunk
+in memory. Files are written under a temporary name and linked into place
+once complete; a failed or oversized upload leaves nothing behind. An upload
+never replaces a file already in the directory.
+"""
+import asyncio
+import os
+import re
+import shutil
+import uuid
+from typing import AsyncIterator, List, NamedTuple, Optional, Sequence
+from config.settings import MAX_UPLOAD_BYTES
+
+BOUNDARY_PATTERN = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+FILENAME_PATTERN = re.compile(r'filename="([^"]*)"', re.IGNORECASE)
+UNSAFE_NAME_CHARACTERS = re.compile(r"[^A-Za-z0-9._ -]+")
+# A part's headers are small; anything longer is not a well-formed upload
+MAX_HEADER_BYTES = 16 * 1024
+# Data is written to disk in blocks of this size, so each write is worth a trip to a thread
+WRITE_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the size limit"""
+
+
+class UploadExists(ValueError):
+    """Raised when an uploaded file has the name of one already uploaded"""
+
+
+class SavedUpload(NamedTuple):
+    """A file received in an upload"""
+    name: str
+    path: str
+    size: int
+
+
+def safe_file_name(name: str) -> str:
+    """
+    Reduce a client-supplied file name to a plain name in the upload directory.
+
+    Args:
+        name (str): File name from the request
+
+    Returns:
+        str: The base name with unusual characters replaced by "_"
+    """
+    name = os.path.basename(name.replace("\\", "/")).strip()
+    name = UNSAFE_NAME_CHARACTERS.sub("_", name).lstrip(".")
+    if not name:
+        raise ValueError("Uploaded files need a file name")
+    return name
+
+
+class _Part:
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self.tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+        self.file = open(self.tmp_path, "wb")
+        self.pending = bytearray()
+        self.size = 0
+
+    async def flush(self):
+        if self.pending:
+            data, self.pending = bytes(self.pending), bytearray()
+            # Disk writes run off the event loop, so a slow disk does not stall other requests
+            await asyncio.to_thread(self.file.write, data)
+
+    def place(self):
+        # Linking fails if the name was taken meanwhile, where a rename would replace the file
+        try:
+            os.link(self.tmp_path, self.path)
+            return
+        except FileExistsError:
+            raise
+        except OSError:
+            pass
+        # Without hard links (some network and FAT filesystems), an exclusive create refuses taken names too
+        with open(self.path, "xb") as target:
+            try:
+                with open(self.tmp_path, "rb") as source:
+                    shutil.copyfileobj(source, target, WRITE_BLOCK_BYTES)
+            except BaseException:
+                target.close()
+                os.remove(self.path)
+                raise
+
+
+async def save_uploads(chunks: AsyncIterator[bytes], content_type: str, directory: str,
+                       extensions: Sequence[str], max_bytes: int = MAX_UPLOAD_BYTES) -> List[SavedUpload]:
+    """
+    Write the files of a multipart/form-data body to a directory as the body streams in.
+
+    Parts without a file name (plain form fields) are skipped. A file with
+    the name of one already in the directory, or of another file in the same
+    upload, is rejected, and then none of the files are kept.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body, e.g. request.stream()
+        content_type (str): The request's Content-Type header, with the boundary
+        directory (str): Where to save the files
+        extensions (Sequence[str]): Accepted file extensions, lower case
+        max_bytes (int): Largest total size of the files
+
+    Returns:
+        List[SavedUpload]: The saved files, in upload order
+
+    Raises:
+        UploadTooLarge: If the files exceed max_bytes
+        UploadExists: If a file name is taken
+        ValueError: If the body is not a multipart upload of accepted files
+    """
+    content_type = content_type or ""
+    match = BOUNDARY_PATTERN.search(content_type)
+    if not content_type.lower().startswith("multipart/form-data") or match is None:
+        raise ValueError("Expected a multipart/form-data upload")
+    # With a CRLF in front, the first delimiter looks like every other one
+    delimiter = b"\r\n--" + match.group(1).encode("latin-1")
+    keep = len(delimiter) - 1
+    os.makedirs(directory, exist_ok=True)
+
+    buffer = bytearray(b"\r\n")
+    state = "preamble"
+    part: Optional[_Part] = None
+    received: List[_Part] = []
+    total = 0
+
+    async def write(data):
+        nonlocal total
+        total += len(data)
+        if total > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes // (1024 * 1024)} MB")
+        part.size += len(data)
+        part.pending += data
+        if len(part.pending) >= WRITE_BLOCK_BYTES:
+            await part.flush()
+
+    try:
+        async for chunk in chunks:
+            buffer += chunk
+            while True:
+                if state == "preamble" or state == "body":
+                    end = buffer.find(delimiter)
+                    if end < 0:
+                        # The tail may hold the start of a delimiter; the rest is data
+                        if state == "body" and part is not None and len(buffer) > keep:
+                            await write(buffer[:len(buffer) - keep])
+                        del buffer[:max(0, len(buffer) - keep)]
+                        break
+                    if state == "body" and part is not None:
+                        await write(buffer[:end])
+                        await part.flush()
+                        part.file.close()
+                        part = None
+                    del buffer[:end + len(delimiter)]
+                    state = "delimiter"
+                elif state == "delimiter":
+                    if len(buffer) < 2:
+                        break
+                    if buffer[:2] == b"--":
+                        state = "done"
+                        break
+                    if buffer[:2] != b"\r\n":
+                        raise ValueError("Malformed multipart body")
+                    del buffer[:2]
+                    state = "headers"
+                elif state == "headers":
+                    end = buffer.find(b"\r\n\r\n")
+                    if end < 0:
+                        if len(buffer) > MAX_HEADER_BYTES:
+                            raise ValueError("Malformed multipart body")
+                        break
+                    headers = buffer[:end].decode("utf-8", errors="replace")
+                    del buffer[:end + 4]
+                    filename = FILENAME_PATTERN.search(headers)
+                    if filename is not None:
+                        name = safe_file_name(filename.group(1))
+                        if not name.lower().endswith(tuple(extensions)):
+                            raise ValueError(f"Unsupported file type: {name} (accepted: {', '.join(extensions)})")
+                        # Checked here to fail before the body is read; placing the file checks again
+                        if os.path.exists(os.path.join(directory, name)) or \
+                                any(item.name == name for item in received):
+                            raise UploadExists(f"A file named {name} was already uploaded")
+                        part = _Part(directory, name)
+                        received.append(part)
+                    state = "body"
+                else:
+                    break
+            if state == "done":
+                break
+        if state != "done":
+            raise ValueError("Upload ended before the closing boundary")
+        if not received:
+            raise ValueError("The upload holds no files")
+
+        saved = []
+        try:
+            for item in received:
+                await asyncio.to_thread(item.place)
+                saved.append(SavedUpload(item.name, item.path, item.size))
+        except BaseException as error:
+            for upload in saved:
+                os.remove(upload.path)
+            if isinstance(error, FileExistsError):
+                raise UploadExists(f"A file named {item.name} was already uploaded")
+            raise
+        return saved
+    finally:
+        for item in received:
+            item.file.close()
+            if os.path.exists(item.tmp_path):
+                os.remove(item.tmp_path)
@@ -0,0 +1,436 @@
+"""
+Pluggable vector index backends for LawGPT application.
+
+Every backend produces a LangChain VectorStore, so ingestion and the answer
+path work the same whichever one is selected with VECTOR_BACKEND:
+
+- "faiss": FAISS index plus a SQLite chunk store (the default); its layout
+  (flat, IVF, PQ, SQ or HNSW) is chosen with FAISS_INDEX_TYPE
+- "chroma": Chroma persisted to disk (needs the optional chromadb package)
+- "numpy": in-process brute-force search over a NumPy matrix
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from config.settings import VECTOR_BACKEND
+from services.chunk_store import ChunkStore
+from services.vector_search import mmr_select
+from services.faiss_index import (
+    compress_index, configure_search, index_type, needs_compression, read_index, remove_positions, write_index
+)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force L2 vector store held in a NumPy matrix.
+
+    Search is one matrix-vector product over every stored vector, which is
+    exact and fast for corpora up to a few hundred thousand chunks. Scores are
+    squared L2 distances, as with the FAISS backend.
+
+    Args:
+        embedding (Embeddings): Model used to embed texts and queries
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    DOCSTORE_FILE = "docstore.json"
+
+    def __init__(self, embedding: Embeddings):
+        self._embedding = embedding
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self._positions: Dict[str, int] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The stored vectors, one row per chunk"""
+        return self._vectors[:self._size]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: Optional[List[dict]] = None,
+                    ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Add precomputed vectors with their texts.
+
+        Args:
+            vectors (np.ndarray): Matrix with one row per text
+            texts (List[str]): Chunk texts
+            metadatas (Optional[List[dict]]): Chunk metadata
+            ids (Optional[List[str]]): Chunk ids; generated if omitted
+
+        Returns:
+            List[str]: The ids of the added chunks
+        """
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(self._size + i) for i in range(len(texts))]
+        duplicates = [chunk_id for chunk_id in ids if chunk_id in self._positions]
+        if duplicates:
+            raise ValueError(f"Tried to add ids that already exist: {duplicates[:5]}")
+
+        self._reserve(self._size + len(texts), vectors.shape[1])
+        end = self._size + len(texts)
+        self._vectors[self._size:end] = vectors
+        self._norms[self._size:end] = np.einsum("ij,ij->i", vectors, vectors)
+        for offset, chunk_id in enumerate(ids):
+            self._positions[chunk_id] = self._size + offset
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._size = end
+        return ids
+
+    def _reserve(self, rows: int, dim: int):
+        if self._size and self._vectors.shape[1] != dim:
+            raise ValueError(f"Vector dimension {dim} does not match index dimension {self._vectors.shape[1]}")
+        if rows <= self._vectors.shape[0]:
+            return
+        # Grow geometrically so repeated adds stay amortized O(1)
+        capacity = max(rows, 2 * self._vectors.shape[0], 1024)
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._vectors, self._norms = vectors, norms
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        drop = {self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions}
+        if not drop:
+            return False
+        keep = np.array([i for i in range(self._size) if i not in drop], dtype=np.int64)
+
+        self._vectors[:len(keep)] = self._vectors[keep]
+        self._norms[:len(keep)] = self._norms[keep]
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._size = len(keep)
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        return True
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        return [self._document(self._positions[chunk_id]) for chunk_id in ids if chunk_id in self._positions]
+
+    def _document(self, position: int) -> Document:
+        return Document(page_content=self.texts[position], metadata=dict(self.metadatas[position]))
+
+    def _distances(self, query: np.ndarray) -> np.ndarray:
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, with ||x||^2 precomputed
+        return self._norms[:self._size] - 2.0 * (self.vectors @ query) + float(query @ query)
+
+    def _nearest(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        distances = self._distances(query)
+        k = min(k, self._size)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return top, distances[top]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        positions, distances = self._nearest(np.asarray(embedding, dtype=np.float32), k)
+        return [(self._document(int(i)), float(d)) for i, d in zip(positions, distances)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        query = np.asarray(embedding, dtype=np.float32)
+        positions, _ = self._nearest(query, fetch_k)
+        if len(positions) == 0:
+            return []
+        selected = mmr_select(query, self.vectors[positions], k, lambda_mult)
+        return [self._document(int(positions[i])) for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k, fetch_k, lambda_mult
+        )
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    def save_local(self, path: str):
+        """
+        Save the vectors and chunks to a directory.
+
+        Args:
+            path (str): Directory to write to
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, self.VECTORS_FILE), self.vectors)
+        with open(os.path.join(path, self.DOCSTORE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas}, f)
+
+    @classmethod
+    def load_local(cls, path: str, embeddings: Embeddings) -> "NumpyVectorStore":
+        """
+        Load a store saved with save_local.
+
+        Args:
+            path (str): Directory to read from
+            embeddings (Embeddings): Model used for queries and new texts
+
+        Returns:
+            NumpyVectorStore: The loaded store
+        """
+        store = cls(embeddings)
+        vectors = np.load(os.path.join(path, cls.VECTORS_FILE))
+        with open(os.path.join(path, cls.DOCSTORE_FILE), "r", encoding="utf-8") as f:
+            docstore = json.load(f)
+        store.add_vectors(vectors, docstore["texts"], docstore["metadatas"], docstore["ids"])
+        return store
+
+
+class VectorBackend:
+    """Creates, loads and saves one kind of vector store."""
+
+    name = ""
+    marker_file = ""
+
+    def exists(self, path: str) -> bool:
+        """Whether a saved index for this backend exists at `path`"""
+        return os.path.exists(os.path.join(path, self.marker_file))
+
+    def create(self, docs: List[Document], embeddings: Embeddings, ids: Optional[List[str]] = None,
+               path: Optional[str] = None) -> VectorStore:
+        """Build a new store from documents"""
+        raise NotImplementedError
+
+    def load(self, path: str, embeddings: Embeddings, read_only: bool = False) -> VectorStore:
+        """
+        Load a saved store.
+
+        Read-only stores may be memory-mapped and shared between processes,
+        but chunks cannot be added to or deleted from them.
+        """
+        raise NotImplementedError
+
+    def save(self, store: VectorStore, path: str):
+        """Persist a store to `path`"""
+        raise NotImplementedError
+
+    def count(self, store: VectorStore) -> int:
+        """Number of vectors in a store"""
+        raise NotImplementedError
+
+    def documents(self, store: VectorStore) -> Tuple[List[str], List[Document]]:
+        """Ids and documents of every chunk in a store"""
+        raise NotImplementedError
+
+    def delete(self, store: VectorStore, ids: List[str]):
+        """Remove chunks from a store"""
+        store.delete(ids)
+
+    def train(self, store: VectorStore) -> VectorStore:
+        """Move a store into its configured index layout once ingestion has added every chunk"""
+        return store
+
+    def needs_upgrade(self, path: str) -> bool:
+        """Whether the saved index at `path` is not in its configured layout or current format yet"""
+        return False
+
+
+class FaissBackend(VectorBackend):
+    """
+    FAISS index in index.faiss, chunks in a SQLite chunk store.
+
+    Indexes saved by FAISS.save_local, with a pickled docstore in index.pkl,
+    still load; the next save writes them in the current format.
+    """
+
+    name = "faiss"
+    marker_file = "index.faiss"
+    layout_file = "index_layout.json"
+    legacy_docstore_file = "index.pkl"
+
+    def create(self, docs, embeddings, ids=None, path=None):
+        # Chunks go into a flat index first; train converts it once all are added
+        from langchain_community.vectorstores import FAISS
+        return FAISS.from_documents(docs, embeddings, ids=ids)
+
+    def _layout(self, path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, self.layout_file), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, path, embeddings, read_only=False):
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        chunk_path = os.path.join(path, ChunkStore.FILE)
+        if not os.path.exists(chunk_path):
+            store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+            configure_search(store.index)
+            return store
+
+        layout = self._layout(path) or {}
+        index = read_index(os.path.join(path, self.marker_file), layout.get("index_type", "flat"), mmap=read_only)
+        chunks = ChunkStore(chunk_path)
+        if read_only:
+            return FAISS(embeddings, index, chunks, chunks.positions)
+        ids, docs = chunks.read_all()
+        chunks.close()
+        return FAISS(embeddings, index, InMemoryDocstore(dict(zip(ids, docs))), dict(enumerate(ids)))
+
+    def save(self, store, path):
+        os.makedirs(path, exist_ok=True)
+        ids, docs = self.documents(store)
+        write_index(store.index, os.path.join(path, self.marker_file))
+        ChunkStore.write(os.path.join(path, ChunkStore.FILE), ids, docs)
+        temp_path = os.path.join(path, f"{self.layout_file}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"index_type": index_type(store.index), "vectors": store.index.ntotal}, f)
+        os.replace(temp_path, os.path.join(path, self.layout_file))
+        legacy_path = os.path.join(path, self.legacy_docstore_file)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+    def delete(self, store, ids):
+        # FAISS.delete assumes removal renumbers the vectors, which only flat indexes do
+        positions = {chunk_id: position for position, chunk_id in store.index_to_docstore_id.items()}
+        drop = {positions[chunk_id] for chunk_id in ids if chunk_id in positions}
+        if not drop:
+            return
+        store.index = remove_positions(store.index, drop)
+        store.docstore.delete([chunk_id for chunk_id in ids if chunk_id in positions])
+        remaining = [store.index_to_docstore_id[position] for position in sorted(store.index_to_docstore_id)
+                     if position not in drop]
+        store.index_to_docstore_id = dict(enumerate(remaining))
+
+    def train(self, store):
+        store.index = compress_index(store.index)
+        return store
+
+    def needs_upgrade(self, path):
+        layout = self._layout(path)
+        if layout is None or not os.path.exists(os.path.join(path, ChunkStore.FILE)):
+            # Saved by FAISS.save_local: rewrite in the current format, training it if large enough
+            return True
+        return needs_compression(layout["index_type"], layout["vectors"])
+
+    def count(self, store):
+        return store.index.ntotal
+
+    def documents(self, store):
+        if isinstance(store.docstore, ChunkStore):
+            return store.docstore.read_all()
+        ids = [store.index_to_docstore_id[i] for i in range(store.index.ntotal)]
+        return ids, [store.docstore.search(chunk_id) for chunk_id in ids]
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+    marker_file = "chroma.sqlite3"
+
+    def _chroma(self):
+        try:
+            from langchain_community.vectorstores import Chroma
+            import chromadb  # noqa: F401
+        except ImportError:
+            raise ImportError("The chroma backend needs the chromadb package: pip install chromadb")
+        return Chroma
+
+    def create(self, docs, embeddings, ids=None, path=None):
+        # Chroma writes through to its directory as documents are added
+        return self._chroma().from_documents(docs, embeddings, ids=ids, persist_directory=path)
+
+    def load(self, path, embeddings, read_only=False):
+        return self._chroma()(persist_directory=path, embedding_function=embeddings)
+
+    def save(self, store, path):
+        if hasattr(store, "persist"):
+            store.persist()
+
+    def count(self, store):
+        return store._collection.count()
+
+    def documents(self, store):
+        data = store.get()
+        docs = [Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(data["documents"], data["metadatas"])]
+        return data["ids"], docs
+
+
+class NumpyBackend(VectorBackend):
+    name = "numpy"
+    marker_file = NumpyVectorStore.VECTORS_FILE
+
+    def create(self, docs, embeddings, ids=None, path=None):
+        return NumpyVectorStore.from_documents(docs, embeddings, ids=ids)
+
+    def load(self, path, embeddings, read_only=False):
+        return NumpyVectorStore.load_local(path, embeddings)
+
+    def save(self, store, path):
+        store.save_local(path)
+
+    def count(self, store):
+        return len(store)
+
+    def documents(self, store):
+        return list(store.ids), [store._document(i) for i in range(len(store))]
+
+
+BACKENDS = {backend.name: backend for backend in (FaissBackend(), ChromaBackend(), NumpyBackend())}
+
+
+def get_backend(name: Optional[str] = None) -> VectorBackend:
+    """
+    Look up a vector backend by name.
+
+    Args:
+        name (Optional[str]): Backend name; defaults to VECTOR_BACKEND
+
+    Returns:
+        VectorBackend: The backend
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = (name or VECTOR_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend '{name}'; choose one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]
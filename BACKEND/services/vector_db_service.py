@@ -1,20 +1,29 @@
 """
 Vector database service for LawGPT application.
 """
-import os
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from config.settings import DB_DIR, EMBEDDING_MODEL, RETRIEVER_SEARCH_K, RETRIEVER_FETCH_K
+from config.settings import (
+    VECTOR_INDEX_PATH, EMBEDDING_MODEL, EMBEDDING_PROVIDER, EMBEDDING_CACHE_PATH, RETRIEVER_SEARCH_K, RETRIEVER_FETCH_K,
+    RETRIEVER_LAMBDA_MULT, EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY, EMBEDDING_REQUESTS_PER_SECOND,
+    EMBEDDING_MAX_RETRIES, EMBEDDING_CHECKPOINT_SIZE
+)
+from services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from services.citation_index import CitationIndex
+from services.embedding_executor import BatchedEmbeddings
+from services.hybrid_retriever import combine_retrievers
+from services.reranker import load_reranker
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+from services.vector_search import VectorSearchRetriever
 from utils.helpers import print_colored
 
 
 def create_or_load_vector_db(docs, pdf_hash):
     """Create a new vector database or load an existing one"""
-    # Define the database file path using the PDF hash
-    db_path = os.path.join(DB_DIR, f"faiss_index")
+    db_path = VECTOR_INDEX_PATH
     
     # Check if the vector database already exists
-    if os.path.exists(db_path):
+    if get_backend().exists(db_path):
         print_colored(f"Loading existing vector database: {db_path}", "green")
         return load_vector_db(db_path)
     
@@ -23,28 +32,62 @@ def create_or_load_vector_db(docs, pdf_hash):
     return create_vector_db(docs, db_path)
 
 
+def create_document_embeddings():
+    """Create document embeddings that reuse chunks embedded by earlier builds"""
+    if EMBEDDING_PROVIDER == "local":
+        # No quota to respect; batches run on the model's own worker pool
+        from services.local_embeddings import LocalEmbeddings
+        local = LocalEmbeddings()
+        return CachedEmbeddings(
+            local,
+            EmbeddingStore(EMBEDDING_CACHE_PATH),
+            local.model_name,
+            checkpoint_size=EMBEDDING_CHECKPOINT_SIZE
+        )
+    
+    remote = BatchedEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            task_type="retrieval_document"
+        ),
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+        requests_per_second=EMBEDDING_REQUESTS_PER_SECOND,
+        max_retries=EMBEDDING_MAX_RETRIES
+    )
+    return CachedEmbeddings(
+        remote,
+        EmbeddingStore(EMBEDDING_CACHE_PATH),
+        f"{EMBEDDING_MODEL}:retrieval_document",
+        checkpoint_size=EMBEDDING_CHECKPOINT_SIZE
+    )
+
+
 def create_vector_db(docs, db_path):
     """Create a new vector database from documents"""
     try:
         # Create embeddings
         print_colored("Generating document embeddings...", "yellow")
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            task_type="retrieval_document"
-        )
+        embeddings = create_document_embeddings()
         
-        # Use FAISS for vector storage
-        vectorstore = FAISS.from_documents(
-            docs,
-            embeddings
-        )
+        # Use the configured backend for vector storage
+        backend = get_backend()
+        ids = [str(i) for i in range(len(docs))]
+        vectorstore = backend.train(backend.create(docs, embeddings, ids=ids, path=db_path))
+        embeddings.report()
+        
+        # Save the index to disk for future use
+        backend.save(vectorstore, db_path)
         
-        # Save the FAISS index to disk for future use
-        vectorstore.save_local(db_path)
+        # Keyword index over the same chunks, for hybrid retrieval
+        sparse_index = BM25Index()
+        sparse_index.add_documents(docs, ids=ids)
+        sparse_index.save(db_path)
+        CitationIndex.build(ids, [doc.metadata for doc in docs]).save(db_path)
         print_colored(f"✓ Vector database created and saved to {db_path}", "green")
         
         # Create retriever
-        retriever = create_retriever(vectorstore)
+        retriever = combine_retrievers(create_retriever(vectorstore), sparse_index)
         
         return retriever, docs
     
@@ -53,21 +96,25 @@ def create_vector_db(docs, db_path):
         return None, None
 
 
-def load_vector_db(db_path):
+def load_vector_db(db_path, embeddings=None):
     """Load an existing vector database"""
     try:
-        # Create embeddings
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            task_type="retrieval_document"
-        )
+        # Create embeddings unless the caller shares its own
+        if embeddings is None and EMBEDDING_PROVIDER == "local":
+            from services.local_embeddings import LocalEmbeddings
+            embeddings = LocalEmbeddings()
+        elif embeddings is None:
+            embeddings = GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                task_type="retrieval_document"
+            )
         
-        # Load FAISS index from disk with allow_dangerous_deserialization
-        vectorstore = FAISS.load_local(
-            db_path, 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
+        # Load the index from disk with the configured backend, memory-mapped
+        # so workers serving the same index share its pages
+        backend = get_backend()
+        if not backend.exists(db_path):
+            raise FileNotFoundError(f"No {backend.name} index found at {db_path}")
+        vectorstore = backend.load(db_path, embeddings, read_only=True)
         print_colored(f"✓ Vector database loaded from {db_path}", "green")
         
         # Create retriever
@@ -81,11 +128,14 @@ def load_vector_db(db_path):
 
 
 def create_retriever(vectorstore):
-    """Create a retriever from a vector store"""
-    return vectorstore.as_retriever(
+    """Create a retriever from a vector store, with the configured reranker if any"""
+    return VectorSearchRetriever(
+        vectorstore=vectorstore,
         search_type="mmr",
         search_kwargs={
             "k": RETRIEVER_SEARCH_K,
-            "fetch_k": RETRIEVER_FETCH_K
-        }
+            "fetch_k": RETRIEVER_FETCH_K,
+            "lambda_mult": RETRIEVER_LAMBDA_MULT
+        },
+        reranker=load_reranker()
     )
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Vector search for LawGPT application.
+
+Retrieves a question's chunks in three timed stages:
+
+- "vector_search": the index returns the fetch_k nearest chunks (or
+  RERANK_CANDIDATES with a reranker) with their vectors, read in one batch
+- "rerank": with a reranker, a cross-encoder scores the candidates and the
+  best fetch_k are kept, ranked by its score
+- "mmr": maximal marginal relevance picks k chunks from the candidates,
+  with the whole candidate matrix scored in NumPy at each step
+
+Each stage is recorded in lawgpt_stage_seconds. k, fetch_k and lambda_mult
+come from the retriever's search_kwargs and may be overridden per call, e.g.
+retriever.invoke(question, k=8, fetch_k=200).
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+from config.settings import RERANK_CANDIDATES, RETRIEVER_FETCH_K, RETRIEVER_LAMBDA_MULT, RETRIEVER_SEARCH_K
+from services.metrics import span
+
+SEARCH_PARAMS = ("k", "fetch_k", "lambda_mult")
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Zero vectors stay zero, so their similarity to anything is 0
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5,
+               relevance: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Pick k diverse, relevant candidates with maximal marginal relevance.
+
+    The first pick is the most relevant candidate; each next one maximises
+    lambda_mult * relevance - (1 - lambda_mult) * (highest cosine similarity
+    to a pick so far). The similarity to the picks is kept up to date with
+    one matrix-vector product per step, so a step costs O(fetch_k * dim)
+    instead of LangChain's O(fetch_k * k * dim) plus a Python loop. It picks
+    the same candidates, except between duplicates whose scores differ only
+    by float32 rounding.
+
+    Args:
+        query (np.ndarray): The query vector
+        candidates (np.ndarray): One candidate vector per row
+        k (int): Candidates to pick
+        lambda_mult (float): 1 for relevance only, 0 for diversity only
+        relevance (Optional[np.ndarray]): Relevance of each candidate; by
+            default its cosine similarity to the query
+
+    Returns:
+        List[int]: Row numbers of the picked candidates, in pick order
+    """
+    count = min(k, len(candidates))
+    if count <= 0:
+        return []
+    unit = _unit_rows(np.asarray(candidates, dtype=np.float32))
+    if relevance is None:
+        relevance = unit @ _unit_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = np.full(len(unit), -np.inf, dtype=np.float32)
+    weighted_relevance = lambda_mult * relevance
+    while len(selected) < count:
+        np.maximum(redundancy, unit @ unit[selected[-1]], out=redundancy)
+        scores = weighted_relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+def _is_faiss(store: Any) -> bool:
+    return hasattr(store, "index") and hasattr(store, "index_to_docstore_id")
+
+
+def _is_numpy(store: Any) -> bool:
+    return hasattr(store, "_nearest") and hasattr(store, "_document")
+
+
+def _nearest(store: Any, vectors: np.ndarray, count: int) -> List[np.ndarray]:
+    if _is_faiss(store):
+        if getattr(store, "_normalize_L2", False):
+            import faiss
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        _, positions = store.index.search(vectors, count)
+        return [row[row != -1] for row in positions]
+    return [store._nearest(row, count)[0] for row in vectors]
+
+
+def _candidate_vectors(store: Any, positions: np.ndarray) -> np.ndarray:
+    if _is_faiss(store):
+        return store.index.reconstruct_batch(positions.astype(np.int64))
+    return store.vectors[positions]
+
+
+def _documents(store: Any, positions: np.ndarray) -> List[Document]:
+    if _is_faiss(store):
+        docs = [store.docstore.search(store.index_to_docstore_id[int(position)]) for position in positions]
+        return [doc for doc in docs if isinstance(doc, Document)]
+    return [store._document(int(position)) for position in positions]
+
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def search_store(store: Any, vectors: np.ndarray, queries: Optional[List[str]] = None, search_type: str = "mmr",
+                 k: int = RETRIEVER_SEARCH_K, fetch_k: int = RETRIEVER_FETCH_K,
+                 lambda_mult: float = RETRIEVER_LAMBDA_MULT, reranker: Any = None,
+                 rerank_candidates: int = RERANK_CANDIDATES) -> List[List[Document]]:
+    """
+    Search a vector store for a matrix of query vectors.
+
+    FAISS indexes are searched once for every row, and NumpyVectorStore
+    with one matrix product per row; other stores use their own search.
+
+    Args:
+        store: The vector store
+        vectors (np.ndarray): One query vector per row
+        queries (Optional[List[str]]): The questions, needed for reranking
+        search_type (str): "mmr" or "similarity"
+        k (int): Chunks to return per question
+        fetch_k (int): Candidates MMR picks from
+        lambda_mult (float): MMR's weight of relevance against diversity
+        reranker: Scores (question, chunk) pairs, see services/reranker.py
+        rerank_candidates (int): Candidates the reranker scores per question
+
+    Returns:
+        List[List[Document]]: Chunks for each row, best first
+    """
+    mmr = search_type == "mmr"
+    fetch_k = max(k, fetch_k)
+    if not (_is_faiss(store) or _is_numpy(store)):
+        if mmr:
+            return [store.max_marginal_relevance_search_by_vector(list(row), k=k, fetch_k=fetch_k,
+                                                                  lambda_mult=lambda_mult) for row in vectors]
+        return [store.similarity_search_by_vector(list(row), k=k) for row in vectors]
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rerank = reranker is not None and queries is not None
+    keep = fetch_k if mmr else k
+    count = max(keep, rerank_candidates) if rerank else keep
+    with span("vector_search"):
+        rows = _nearest(store, vectors, count)
+        candidates = [_candidate_vectors(store, row) if mmr and len(row) else None for row in rows]
+
+    relevance: List[Optional[np.ndarray]] = [None] * len(rows)
+    docs = [None] * len(rows)
+    if rerank:
+        with span("rerank"):
+            for i, (query, row) in enumerate(zip(queries, rows)):
+                row_docs = _documents(store, row)
+                if len(row_docs) != len(row):
+                    # A chunk is missing from the docstore; keep the vector ranking
+                    order = np.arange(min(keep, len(row)))
+                    rows[i] = row[order]
+                    if candidates[i] is not None:
+                        candidates[i] = candidates[i][order]
+                    continue
+                scores = reranker.score(query, [doc.page_content for doc in row_docs])
+                order = np.argsort(-scores, kind="stable")[:keep]
+                rows[i] = row[order]
+                docs[i] = [row_docs[j] for j in order]
+                relevance[i] = _sigmoid(scores[order])
+                if candidates[i] is not None:
+                    candidates[i] = candidates[i][order]
+
+    results = []
+    with span("mmr" if mmr else "select"):
+        for i, row in enumerate(rows):
+            picked = list(range(min(k, len(row))))
+            if candidates[i] is not None:
+                picked = mmr_select(vectors[i], candidates[i], k, lambda_mult, relevance[i])
+            if docs[i] is not None:
+                results.append([docs[i][j] for j in picked])
+            else:
+                results.append(_documents(store, row[picked]))
+    return results
+
+
+class VectorSearchRetriever(VectorStoreRetriever):
+    """
+    Vector store retriever with NumPy MMR, optional reranking and per-call search parameters.
+
+    Keyword arguments k, fetch_k and lambda_mult given to invoke or ainvoke
+    override search_kwargs for that call; query_vector, the question's
+    embedding if the caller already has it, saves embedding it again.
+    """
+
+    reranker: Any = None
+    rerank_candidates: int = RERANK_CANDIDATES
+
+    def search_params(self, **overrides: Any) -> Dict[str, Any]:
+        """
+        Search parameters for one call.
+
+        Args:
+            **overrides: k, fetch_k or lambda_mult; None keeps the default
+
+        Returns:
+            Dict[str, Any]: k, fetch_k and lambda_mult
+        """
+        params = {"k": RETRIEVER_SEARCH_K, "fetch_k": RETRIEVER_FETCH_K, "lambda_mult": RETRIEVER_LAMBDA_MULT}
+        params.update((name, value) for name, value in self.search_kwargs.items() if name in SEARCH_PARAMS)
+        params.update((name, value) for name, value in overrides.items()
+                      if name in SEARCH_PARAMS and value is not None)
+        return params
+
+    def search_vectors(self, vectors: np.ndarray, queries: Optional[List[str]] = None,
+                       **overrides: Any) -> List[List[Document]]:
+        """
+        Search for a matrix of query vectors.
+
+        Args:
+            vectors (np.ndarray): One query vector per row
+            queries (Optional[List[str]]): The questions, needed for reranking
+            **overrides: k, fetch_k or lambda_mult
+
+        Returns:
+            List[List[Document]]: Chunks for each row, best first
+        """
+        return search_store(self.vectorstore, vectors, queries, self.search_type,
+                            reranker=self.reranker, rerank_candidates=self.rerank_candidates,
+                            **self.search_params(**overrides))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                **kwargs: Any) -> List[Document]:
+        if self.search_type not in ("mmr", "similarity"):
+            return super()._get_relevant_documents(query, run_manager=run_manager)
+        vector = kwargs.pop("query_vector", None)
+        if vector is None:
+            with span("embed"):
+                vector = self.vectorstore.embeddings.embed_query(query)
+        return self.search_vectors(np.asarray([vector], dtype=np.float32), [query], **kwargs)[0]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       **kwargs: Any) -> List[Document]:
+        if self.search_type not in ("mmr", "similarity"):
+            return await super()._aget_relevant_documents(query, run_manager=run_manager)
+        vector = kwargs.pop("query_vector", None)
+        if vector is None:
+            with span("embed"):
+                vector = await self.vectorstore.embeddings.aembed_query(query)
+        results = await asyncio.to_thread(self.search_vectors, np.asarray([vector], dtype=np.float32),
+                                          [query], **kwargs)
+        return results[0]
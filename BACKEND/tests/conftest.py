@@ -0,0 +1,83 @@
+"""
+Shared fixtures for the LawGPT tests.
+
+Tests run offline against the local fakes in benchmarks/fakes.py. Run them
+from BACKEND with `python -m pytest tests`.
+"""
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point every path at a scratch directory
+# before any service is imported; the real books and index are never touched
+_SCRATCH = tempfile.mkdtemp(prefix="lawgpt-tests-")
+os.environ["DB_DIR"] = os.path.join(_SCRATCH, "db")
+os.environ["BOOKS_DIR"] = os.path.join(_SCRATCH, "books")
+os.environ["INITIALIZE_APP"] = "false"
+os.environ["ADMIN_TOKEN"] = ""
+os.environ.setdefault("GOOGLE_API_KEY", "test-fake-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+from benchmarks.fakes import FakeLLM, FakeRetriever  # noqa: E402
+from services import container, llm_service  # noqa: E402
+from services.concurrency import ConcurrencyLimiter  # noqa: E402
+from services.history_store import HistoryStore  # noqa: E402
+
+
+@pytest.fixture
+def fake_services(tmp_path, monkeypatch):
+    """Serve answers from a fake LLM and retriever, with history in a scratch database"""
+    saved_instances = dict(container._instances)
+    saved_state = dict(container.index_state)
+    llm, retriever = FakeLLM(delay=0.05), FakeRetriever()
+    history = HistoryStore(str(tmp_path / "history.sqlite"), flush_interval=0.01)
+    container.override("llm", llm)
+    container.override("retriever", retriever)
+    container.override("history_store", history)
+    container.override("answer_cache", None)
+    container.override("request_coalescer", None)
+    monkeypatch.setattr(llm_service, "request_limiter", ConcurrencyLimiter(8, 64))
+    monkeypatch.setattr(llm_service, "print_colored", lambda *args, **kwargs: None)
+    yield SimpleNamespace(llm=llm, retriever=retriever, history=history)
+    history.close()
+    container._instances.clear()
+    container._instances.update(saved_instances)
+    container.index_state.clear()
+    container.index_state.update(saved_state)
+
+
+def write_pdf(path: str, pages: list):
+    """Write a minimal PDF with one page of Helvetica text per string in `pages`"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                 for line in text.split("\n")]
+        stream = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1")))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+@pytest.fixture
+def make_pdf():
+    """Return write_pdf, for tests that need a real PDF on disk"""
+    return write_pdf
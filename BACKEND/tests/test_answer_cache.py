@@ -0,0 +1,163 @@
+"""
+Tests for the semantic answer cache, offline with the hashing embeddings.
+"""
+import asyncio
+import os
+from langchain_core.documents import Document
+from benchmarks.fakes import FakeEmbeddings
+from services import answer_cache, container, llm_service
+from services.answer_cache import SemanticAnswerCache
+from services.response_formatter import FormattedAnswer
+from services.sparse_index import BM25Index
+
+QUESTION = "What is the punishment for murder under section 103?"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    embeddings = FakeEmbeddings(delay_per_text=0)
+    return SemanticAnswerCache(embeddings, **kwargs), embeddings
+
+
+def test_miss_then_exact_hit_on_normalized_question():
+    cache, _ = make_cache()
+    answer, vector = cache.lookup(QUESTION)
+    assert answer is None and vector is not None
+    cache.put(QUESTION, FormattedAnswer("Death or life imprisonment"), vector)
+
+    answer, _ = cache.lookup("  what is the PUNISHMENT for murder under section 103 ")
+    assert answer.text == "Death or life imprisonment"
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_semantic_hit_and_miss():
+    cache, _ = make_cache(similarity_threshold=0.8)
+    cache.put(QUESTION, FormattedAnswer("Death or life imprisonment"))
+
+    answer, _ = cache.lookup("What is the punishment for murder under section 103 of the BNS?")
+    assert answer.text == "Death or life imprisonment"
+    answer, _ = cache.lookup("How is a contract of sale formed?")
+    assert answer is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache, _ = make_cache(ttl_seconds=60, clock=clock)
+    cache.put(QUESTION, FormattedAnswer("answer"))
+
+    clock.now += 59
+    assert cache.lookup(QUESTION)[0] is not None
+    clock.now += 2
+    assert cache.lookup(QUESTION)[0] is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, _ = make_cache(max_entries=2)
+    cache.put("first question about bail", FormattedAnswer("1"))
+    cache.put("second question about theft", FormattedAnswer("2"))
+    assert cache.lookup("first question about bail")[0].text == "1"
+    cache.put("third question about contracts", FormattedAnswer("3"))
+
+    assert cache.lookup("first question about bail")[0].text == "1"
+    assert cache.lookup("second question about theft")[0] is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_past_the_byte_cap():
+    cache, _ = make_cache(max_bytes=4000)
+    big = FormattedAnswer("x" * 1200)
+    cache.put("first question about bail", big)
+    cache.put("second question about theft", big)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] <= 4000
+    assert cache.lookup("second question about theft")[0] is not None
+
+    # An answer larger than the cap is not stored at all
+    cache.put("third question about contracts", FormattedAnswer("x" * 5000))
+    assert cache.lookup("third question about contracts")[0] is None
+
+
+def test_changed_index_fingerprint_drops_every_entry():
+    cache, _ = make_cache()
+    cache.bind_index((1, 100))
+    cache.put(QUESTION, FormattedAnswer("answer"))
+    cache.bind_index((1, 100))
+    assert cache.lookup(QUESTION)[0] is not None
+
+    cache.bind_index((2, 120))
+    assert cache.lookup(QUESTION)[0] is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_an_unversioned_index_is_fingerprinted_once_when_loaded(fake_services, tmp_path, monkeypatch):
+    root = str(tmp_path / "index")
+    index = BM25Index()
+    index.add_documents([Document(page_content="Section 103. Murder.", metadata={"book": "b.pdf", "page": 0})],
+                        ids=["c0"])
+    index.save(root)
+    monkeypatch.setattr(container, "VECTOR_INDEX_PATH", root)
+    monkeypatch.setattr(container, "RETRIEVAL_MODE", "sparse")
+    monkeypatch.setattr(container, "print_colored", lambda *args, **kwargs: None)
+    container._instances.pop("retriever")
+    walks, walk = [], os.walk
+    monkeypatch.setattr(answer_cache.os, "walk", lambda path: walks.append(path) or walk(path))
+
+    assert container.get_retriever() is not None
+    fingerprint = container.index_status()["fingerprint"]
+    assert fingerprint is not None and walks == [root]
+
+    cache, _ = make_cache()
+    container.override("answer_cache", cache)
+    for _ in range(3):
+        llm_service.get_cached_answer(QUESTION)
+    assert walks == [root]
+    assert cache._fingerprint == fingerprint
+
+
+def test_a_miss_embeds_the_question_once(fake_services):
+    cache, embeddings = make_cache()
+    container.override("answer_cache", cache)
+    vectors = []
+
+    async def ainvoke(query, **search):
+        vectors.append(search.get("query_vector"))
+        return fake_services.retriever.docs
+
+    fake_services.retriever.ainvoke = ainvoke
+    first = asyncio.run(llm_service.aget_llm_answer(QUESTION))
+    second = asyncio.run(llm_service.aget_llm_answer(QUESTION))
+
+    # Looked up, retrieved and stored with a single embedding; then an exact hit
+    assert embeddings.texts_embedded == 1
+    assert len(vectors) == 1 and vectors[0] is not None
+    assert fake_services.llm.calls == 1
+    assert second.text == first.text
+
+
+def test_vector_retriever_uses_the_given_embedding(tmp_path):
+    from langchain_core.documents import Document
+    from services.vector_backends import get_backend
+    from services.vector_db_service import create_retriever
+
+    embeddings = FakeEmbeddings(delay_per_text=0)
+    backend = get_backend("numpy")
+    docs = [Document(page_content=text) for text in ("Punishment for murder", "Bail in bailable offences")]
+    backend.save(backend.create(docs, embeddings, ids=["a", "b"], path=str(tmp_path)), str(tmp_path))
+    retriever = create_retriever(backend.load(str(tmp_path), embeddings))
+    vector = embeddings.embed_query("murder punishment")
+    embedded = embeddings.texts_embedded
+
+    found = retriever.invoke("murder punishment", k=1, fetch_k=2, query_vector=vector)
+    assert found[0].page_content == "Punishment for murder"
+    assert embeddings.texts_embedded == embedded
@@ -0,0 +1,112 @@
+"""
+Tests for the batch question endpoint and its resumable jobs.
+"""
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from api import routes
+from services import batch_service
+from services.concurrency import ConcurrencyLimiter
+
+QUESTIONS = [{"id": "q1", "question": "What does Section 303 say about theft?"},
+             {"id": "q2", "question": "What is the capital of France?"}]
+BODY = "\n".join(json.dumps(question) for question in QUESTIONS).encode("utf-8")
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "BATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(routes, "print_colored", lambda *args, **kwargs: None)
+    monkeypatch.setattr(batch_service, "print_colored", lambda *args, **kwargs: None)
+    return tmp_path
+
+
+def make_request(body: bytes) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return Request({"type": "http", "method": "POST", "path": "/api/batch", "headers": [],
+                    "query_string": b""}, receive)
+
+
+def test_jobs_answer_every_question_and_resume(fake_services, batch_dir):
+    from main import app
+    with TestClient(app) as client:
+        response = client.post("/api/batch?job_id=job1", content=BODY)
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(result["id"] for result in results) == ["q1", "q2"]
+        assert all("answer" in result for result in results)
+        assert fake_services.llm.calls == 2
+
+        # Posting the job again replays its answers without asking the LLM
+        again = [json.loads(line) for line in client.post("/api/batch?job_id=job1", content=BODY).text.splitlines()]
+        assert [result["id"] for result in again] == ["q1", "q2"]
+        assert fake_services.llm.calls == 2
+    assert routes.running_jobs == set()
+
+
+def test_bad_banks_and_job_ids_are_rejected(fake_services, batch_dir):
+    from main import app
+    with TestClient(app) as client:
+        assert client.post("/api/batch", content=b'{"id": 1}').status_code == 400
+        assert client.post("/api/batch?job_id=../x", content=BODY).status_code == 400
+
+
+def test_job_is_reserved_until_its_response_ends(fake_services, batch_dir):
+    async def scenario():
+        response = await routes.ask_batch(make_request(BODY), job_id="job2")
+        # Reserved as soon as the endpoint returns, before the response starts
+        assert "job2" in routes.running_jobs
+        with pytest.raises(HTTPException) as conflict:
+            await routes.ask_batch(make_request(BODY), job_id="job2")
+        assert conflict.value.status_code == 409
+
+        # A client gone before the body is read never starts the result stream
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client disconnected")
+
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        assert "job2" not in routes.running_jobs
+        assert fake_services.llm.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_oversized_banks_are_refused(fake_services, batch_dir, monkeypatch):
+    from main import app
+    monkeypatch.setattr(routes, "MAX_BATCH_BYTES", len(BODY) - 1)
+    with TestClient(app) as client:
+        assert client.post("/api/batch", content=BODY).status_code == 413
+    assert fake_services.llm.calls == 0
+
+
+def test_batch_llm_calls_share_the_request_limiter(fake_services, batch_dir, monkeypatch):
+    monkeypatch.setattr(batch_service, "request_limiter", ConcurrencyLimiter(2, 64))
+    active, peak = 0, 0
+    ainvoke = fake_services.llm.ainvoke
+
+    async def tracked(messages):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await ainvoke(messages)
+        finally:
+            active -= 1
+
+    monkeypatch.setattr(fake_services.llm, "ainvoke", tracked)
+    questions = [{"id": n, "question": f"What does Section {n} say?"} for n in range(1, 9)]
+
+    async def answer_all():
+        return [result async for result in batch_service.run_batch(questions, concurrency=6)]
+
+    results = asyncio.run(answer_all())
+    assert all("answer" in result for result in results) and len(results) == 8
+    assert peak == 2
@@ -0,0 +1,79 @@
+"""
+Tests for the structural chunker and the citation lookup table.
+"""
+from langchain_core.documents import Document
+from services.citation_index import CitationIndex, CitationRetriever, parse_citations
+from services.legal_chunker import find_act_title, split_legal_text
+from services.sparse_index import BM25Index
+
+ACT = [
+    "THE BHARATIYA NYAYA SANHITA, 2023\nCHAPTER I\nPRELIMINARY\n"
+    "1. (1) This Act may be called the Bharatiya Nyaya Sanhita, 2023.\n(2) It extends to the whole of India.\n"
+    "2. In this Sanhita, unless the context otherwise requires, words have their usual meaning.",
+    "CHAPTER VI\nOF OFFENCES AFFECTING THE HUMAN BODY\n"
+    "3. Whoever causes death by doing an act with the intention of causing death commits culpable homicide.\n"
+    "4. (1) Whoever commits murder shall be punished with death or imprisonment for life.\n"
+    + "\n".join(f"({letter}) clause {letter} of the section, " + "words " * 20 for letter in "abcdefgh"),
+]
+
+
+def pages(texts, source="bns.pdf"):
+    return [Document(page_content=text, metadata={"source": source, "page": page}) for page, text in enumerate(texts)]
+
+
+def test_parse_citations():
+    assert parse_citations("What do Sections 103 and 104A say?") == ["section:103", "section:104A"]
+    assert parse_citations("Explain Art. 21 and s. 3") == ["article:21", "section:3"]
+    assert parse_citations("What is murder?") == []
+
+
+def test_chunks_follow_chapters_and_sections():
+    assert find_act_title(pages(ACT)) == "Bharatiya Nyaya Sanhita, 2023"
+    chunks = split_legal_text(pages(ACT), chunk_size=300)
+
+    by_sections = {}
+    for chunk in chunks:
+        by_sections.setdefault(chunk.metadata["sections"], []).append(chunk)
+
+    # Short sections of one chapter share a chunk; chapters never do
+    first = by_sections["1,2"][0]
+    assert first.metadata["chapter"] == "CHAPTER I PRELIMINARY"
+    assert first.page_content.startswith("Bharatiya Nyaya Sanhita, 2023 | Sections 1-2\n")
+    assert "3" in by_sections and "1,2,3" not in by_sections
+
+    # The long section is split at clause boundaries, never mid-clause
+    murder = by_sections["4"]
+    assert len(murder) > 1
+    for chunk in murder:
+        assert chunk.page_content.startswith("Bharatiya Nyaya Sanhita, 2023 | Section 4\n")
+        body = chunk.page_content.split("\n", 1)[1]
+        assert len(body) <= 300
+        assert body.startswith("4.") or body.startswith("(")
+        assert chunk.metadata["page"] == 1 and chunk.metadata["chapter"].startswith("CHAPTER VI")
+
+
+def test_lookup_answers_cited_sections_per_act():
+    chunks = split_legal_text(pages(ACT))
+    other = {"act": "Code of Civil Procedure, 1908", "sections": "3", "citation_kind": "section"}
+    ids = [f"bns:{i}" for i in range(len(chunks))] + ["cpc:0"]
+    index = CitationIndex.build(ids, [chunk.metadata for chunk in chunks] + [other])
+    bns = [chunk_id for chunk_id, chunk in zip(ids, chunks) if "3" in chunk.metadata["sections"].split(",")]
+
+    assert set(index.lookup("What does section 3 say?")) == set(bns) | {"cpc:0"}
+    assert index.lookup("What does section 3 of the BNS say?") == bns
+    assert index.lookup("Section 3 of the Civil Procedure code") == ["cpc:0"]
+    assert index.lookup("Section 999") == [] and index.lookup("What is murder?") == []
+
+
+def test_retriever_uses_the_table_then_falls_back(tmp_path):
+    chunks = split_legal_text(pages(ACT))
+    ids = [f"bns:{i}" for i in range(len(chunks))]
+    docstore = BM25Index()
+    docstore.add_documents(chunks, ids=ids)
+    CitationIndex.build(ids, [chunk.metadata for chunk in chunks]).save(str(tmp_path))
+    retriever = CitationRetriever(citation_index=CitationIndex.load(str(tmp_path)), docstore=docstore,
+                                  retriever=None)
+
+    docs = retriever.invoke("Punishment under section 4?", k=10)
+    assert docs and all("4" in doc.metadata["sections"].split(",") for doc in docs)
+    assert retriever.invoke("What is culpable homicide?") == []
@@ -0,0 +1,136 @@
+"""
+Tests for coalescing identical concurrent questions.
+"""
+import asyncio
+import pytest
+from benchmarks.fakes import FakeLLM
+from services import container, llm_service
+from services.coalescing import RequestCoalescer, SharedStream, request_key, start_stream
+
+QUESTION = "What is the punishment for murder under section 103?"
+CLIENTS = 8
+
+
+@pytest.fixture
+def coalescer(fake_services):
+    coalescer = RequestCoalescer()
+    container.override("request_coalescer", coalescer)
+    return coalescer
+
+
+def test_request_keys_normalize_the_question():
+    assert request_key("  What is BAIL? ") == request_key("what is bail?")
+    assert request_key("What is bail?", search={"k": 3}) != request_key("What is bail?")
+
+
+def test_identical_questions_make_one_llm_call(fake_services, coalescer):
+    async def ask_all():
+        return await asyncio.gather(*(llm_service.aget_llm_answer(QUESTION, session_id=f"s{i}")
+                                      for i in range(CLIENTS)))
+
+    answers = asyncio.run(ask_all())
+    assert fake_services.llm.calls == 1 and fake_services.retriever.calls == 1
+    assert len({answer.text for answer in answers}) == 1
+    fake_services.history.flush()
+    # Every request still gets its own turn in its session's history
+    assert all(fake_services.history.recent(f"s{i}") == [(QUESTION, answers[0].text)] for i in range(CLIENTS))
+
+
+def test_identical_streams_make_one_llm_call(fake_services, coalescer):
+    async def read(i):
+        fragments = llm_service.astream_llm_response(QUESTION, session_id=f"s{i}")
+        return "".join([fragment async for fragment in fragments])
+
+    async def stream_all():
+        first = asyncio.ensure_future(read(0))
+        await asyncio.sleep(0.02)
+        # Joined late, the others still get the answer from its first fragment
+        return await asyncio.gather(first, *(read(i) for i in range(1, CLIENTS)))
+
+    texts = asyncio.run(stream_all())
+    assert fake_services.llm.calls == 1
+    assert len(set(texts)) == 1 and texts[0]
+
+
+def read_some(stream: SharedStream, count: int):
+    """A subscriber that leaves after `count` fragments"""
+    async def read():
+        fragments = stream.subscribe()
+        for _ in range(count):
+            await fragments.__anext__()
+        await fragments.aclose()
+    return read()
+
+
+def test_stream_stops_when_its_only_reader_leaves():
+    async def scenario():
+        stopped = asyncio.Event()
+
+        async def produce(shared):
+            try:
+                for i in range(100):
+                    shared.publish(str(i))
+                    await asyncio.sleep(0.01)
+            finally:
+                stopped.set()
+
+        shared = start_stream(produce)
+        await read_some(shared, 3)
+        assert shared.subscribers == 0 and shared.cancelled
+        await asyncio.wait_for(stopped.wait(), 1)
+        return shared
+
+    shared = asyncio.run(scenario())
+    assert len(shared.fragments) < 10 and shared.task.cancelled()
+
+
+def test_stream_continues_while_a_reader_remains():
+    async def scenario():
+        async def produce(shared):
+            for i in range(5):
+                shared.publish(str(i))
+                await asyncio.sleep(0.01)
+            return "done"
+
+        shared = start_stream(produce)
+        staying = asyncio.ensure_future(collect(shared))
+        await asyncio.sleep(0)
+        await read_some(shared, 1)
+        assert not shared.cancelled
+        return await staying, shared.result
+
+    async def collect(shared):
+        return [fragment async for fragment in shared.subscribe()]
+
+    assert asyncio.run(scenario()) == (["0", "1", "2", "3", "4"], "done")
+
+
+def test_disconnect_of_the_only_coalesced_client_stops_the_llm(fake_services, coalescer):
+    container.override("llm", FakeLLM(delay=1.0))
+
+    async def leave_early():
+        fragments = llm_service.astream_llm_response(QUESTION)
+        await fragments.__anext__()
+        await fragments.__anext__()
+        (shared,) = coalescer._streams.values()
+        await fragments.aclose()
+        await asyncio.sleep(0.05)
+        return shared, llm_service.request_limiter.in_flight
+
+    shared, in_flight = asyncio.run(leave_early())
+    assert shared.cancelled and shared.task.cancelled()
+    assert in_flight == 0 and coalescer._streams == {}
+
+
+def test_a_request_after_every_reader_left_starts_over(fake_services, coalescer):
+    container.override("llm", FakeLLM(delay=0.2))
+
+    async def scenario():
+        fragments = llm_service.astream_llm_response(QUESTION)
+        await fragments.__anext__()
+        await fragments.aclose()
+        # Asked before the cancelled stream has wound down
+        return "".join([fragment async for fragment in llm_service.astream_llm_response(QUESTION)])
+
+    text = asyncio.run(scenario())
+    assert text.startswith("\n") and "Punishment for Murder" in text
@@ -0,0 +1,66 @@
+"""
+Tests for the lazy service container.
+"""
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.fakes import FakeRetriever
+from services import container
+
+
+@pytest.fixture
+def clean_container(monkeypatch):
+    """An empty container, restored afterwards"""
+    saved_instances = dict(container._instances)
+    saved_state = dict(container.index_state)
+    container._instances.clear()
+    container.index_state.update(status="not_loaded", mode=None, error=None, load_seconds=None, version=None)
+    monkeypatch.setattr(container, "print_colored", lambda *args, **kwargs: None)
+    yield
+    container._instances.clear()
+    container._instances.update(saved_instances)
+    container.index_state.clear()
+    container.index_state.update(saved_state)
+
+
+def test_singleton_is_built_once_under_concurrent_first_use(clean_container):
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(container._singleton("thing", factory)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+    assert container.built("thing") is results[0]
+
+
+def test_importing_the_app_builds_nothing(clean_container):
+    import main  # noqa: F401
+    assert container.built("llm") is None and container.built("retriever") is None
+
+
+def test_ready_reports_the_index_state(clean_container):
+    from main import app
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert client.get("/ready").status_code == 503
+        container.override("retriever", FakeRetriever())
+        response = client.get("/ready")
+    assert response.status_code == 200
+
+
+def test_missing_index_marks_the_retriever_failed(clean_container):
+    assert container.get_retriever() is None
+    status = container.index_status()
+    assert status["status"] == "failed" and status["error"]
+    assert status["load_seconds"] is not None
@@ -0,0 +1,45 @@
+"""
+Tests for packing retrieved chunks into the prompt context.
+"""
+from langchain_core.documents import Document
+from services.context_packer import overlap_length, pack_context
+
+SECTION = "Section 303. Whoever commits theft shall be punished with imprisonment of up to three years."
+CHAPTER = "Chapter XVII. Of offences against property.\n" + SECTION + "\nSection 304. Snatching."
+
+
+def doc(text, book="b.pdf", page=1):
+    metadata = {} if book is None else {"book": book, "page": page}
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_containing_chunk_takes_the_rank_of_the_contained_one():
+    packed = pack_context([doc(SECTION, page=1), doc("Article 21. Life and personal liberty.", page=2),
+                           doc(CHAPTER, page=1)], budget_tokens=0)
+    passages = packed.text.split("\n\n")
+    assert passages == [CHAPTER, "Article 21. Life and personal liberty."]
+    assert packed.passages == 2
+
+
+def test_identical_chunks_are_kept_once():
+    assert pack_context([doc(SECTION), doc(SECTION, page=9)], budget_tokens=0).text == SECTION
+
+
+def test_chunks_without_page_metadata_are_not_merged():
+    packed = pack_context([doc("First unplaced chunk.", book=None), doc("Article 21. Liberty.", page=2),
+                           doc("Second unplaced chunk.", book=None)], budget_tokens=0)
+    assert packed.text.split("\n\n") == ["First unplaced chunk.", "Article 21. Liberty.", "Second unplaced chunk."]
+
+
+def test_same_page_chunks_merge_their_overlap():
+    first, second = SECTION[:70], SECTION[30:]
+    assert overlap_length(first, second) == 40
+    packed = pack_context([doc(second), doc(first)], budget_tokens=0)
+    assert packed.text == SECTION and packed.passages == 1
+
+
+def test_budget_cuts_at_a_boundary():
+    long_page = "\n".join(f"Line {i} of a long section about offences against the state." for i in range(100))
+    packed = pack_context([doc(SECTION, page=1), doc(long_page, page=2)], budget_tokens=200)
+    assert packed.truncated and packed.packed_tokens <= 200
+    assert packed.text.startswith(SECTION) and packed.text.endswith("state.")
@@ -0,0 +1,53 @@
+"""
+Tests for the persistent embedding cache.
+"""
+import numpy as np
+from benchmarks.fakes import FakeEmbeddings
+from services.embedding_cache import CachedEmbeddings, EmbeddingStore, text_hash
+
+
+def test_store_round_trip_is_namespaced_by_model(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "cache.sqlite"))
+    store.put_many("a", {text_hash("x"): [1.0, 2.0], text_hash("y"): [3.0, 4.0]})
+
+    found = store.get_many("a", [text_hash("x"), text_hash("y"), text_hash("z")])
+    assert set(found) == {text_hash("x"), text_hash("y")}
+    assert found[text_hash("y")].tolist() == [3.0, 4.0]
+    assert store.get_many("b", [text_hash("x")]) == {}
+    store.close()
+
+
+def test_only_unseen_texts_are_embedded_across_builds(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    model = FakeEmbeddings(delay_per_text=0)
+    store = EmbeddingStore(path)
+    cached = CachedEmbeddings(model, store, "fake", checkpoint_size=2)
+
+    first = cached.embed_documents(["a", "b", "a", "c"])
+    assert model.texts_embedded == 3
+    assert cached.stats(seconds_per_embedding=1.0)["misses"] == 3
+    np.testing.assert_allclose(first[0], first[2])
+    store.close()
+
+    # A new process reuses every stored vector and embeds only the new text
+    model = FakeEmbeddings(delay_per_text=0)
+    store = EmbeddingStore(path)
+    cached = CachedEmbeddings(model, store, "fake")
+    second = cached.embed_documents(["c", "b", "a", "d"])
+    assert model.texts_embedded == 1
+    stats = cached.stats(seconds_per_embedding=1.0)
+    assert (stats["hits"], stats["misses"], stats["seconds_saved"]) == (3, 1, 3.0)
+    np.testing.assert_allclose(second[2], first[0], rtol=1e-6)
+    assert store.seconds_per_embedding("fake") >= 0.0
+    store.close()
+
+
+def test_queries_are_not_cached(tmp_path):
+    model = FakeEmbeddings(delay_per_text=0)
+    store = EmbeddingStore(str(tmp_path / "cache.sqlite"))
+    cached = CachedEmbeddings(model, store, "fake")
+    cached.embed_query("q")
+    cached.embed_query("q")
+    assert model.texts_embedded == 2
+    assert cached.stats(seconds_per_embedding=0)["hits"] == 0
+    store.close()
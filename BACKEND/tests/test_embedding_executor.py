@@ -0,0 +1,96 @@
+"""
+Tests for the batched, rate-limited embedding executor.
+"""
+import threading
+import time
+import pytest
+from benchmarks.fakes import FakeEmbeddings
+from services import embedding_executor
+from services.embedding_executor import BatchedEmbeddings, TokenBucket, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    """Fails the first `failures` calls with `error`, and tracks calls in flight"""
+
+    def __init__(self, failures: int = 0, error: Exception = None, delay_per_text: float = 0):
+        super().__init__(delay_per_text=delay_per_text)
+        self.failures = failures
+        self.error = error
+        self.batches = []
+        self.in_flight = self.peak = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            fail = self.failures > 0
+            self.failures -= fail
+        try:
+            if fail:
+                raise self.error
+            return super().embed_documents(texts)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(embedding_executor, "print_colored", lambda *args, **kwargs: None)
+
+
+def test_is_retryable():
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400))
+    assert is_retryable(Exception("429 Resource has been exhausted (e.g. check quota)."))
+    assert not is_retryable(ValueError("invalid argument"))
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_batches_keep_order_and_bound_concurrency():
+    model = FlakyEmbeddings(delay_per_text=0.002)
+    batched = BatchedEmbeddings(model, batch_size=3, max_concurrency=2, requests_per_second=1000)
+    texts = [f"text {i}" for i in range(20)]
+
+    vectors = batched.embed_documents(texts)
+    assert vectors == FakeEmbeddings(delay_per_text=0).embed_documents(texts)
+    assert sorted(len(batch) for batch in model.batches) == [2, 3, 3, 3, 3, 3, 3]
+    assert model.peak <= 2
+    assert batched.requests == 7 and batched.retries == 0
+
+
+def test_transient_errors_are_retried():
+    model = FlakyEmbeddings(failures=2, error=StatusError(429))
+    batched = BatchedEmbeddings(model, batch_size=10, requests_per_second=1000, backoff_base=0.001)
+    assert len(batched.embed_documents(["a", "b"])) == 2
+    assert (batched.requests, batched.retries) == (3, 2)
+
+
+def test_permanent_errors_and_exhausted_retries_raise():
+    batched = BatchedEmbeddings(FlakyEmbeddings(failures=1, error=StatusError(400)),
+                                requests_per_second=1000, backoff_base=0.001)
+    with pytest.raises(StatusError):
+        batched.embed_documents(["a"])
+    assert batched.retries == 0
+
+    batched = BatchedEmbeddings(FlakyEmbeddings(failures=5, error=StatusError(503)),
+                                requests_per_second=1000, max_retries=2, backoff_base=0.001)
+    with pytest.raises(StatusError):
+        batched.embed_documents(["a"])
+    assert (batched.requests, batched.retries) == (3, 2)
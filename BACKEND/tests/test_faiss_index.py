@@ -0,0 +1,63 @@
+"""
+Tests for the FAISS index layouts.
+"""
+import numpy as np
+import pytest
+from services import faiss_index
+from services.faiss_index import (
+    INDEX_TYPES, build_index, compress_index, factory_string, index_type, needs_compression, read_index,
+    reconstruct_all, remove_positions, write_index
+)
+
+DIM = 16
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((2000, DIM)).astype(np.float32)
+
+
+def test_factory_strings():
+    assert factory_string("flat", 768, 10) == "Flat"
+    assert factory_string("ivf_pq", 768, 1_000_000, nlist=0, pq_m=64) == "IVF4000,PQ64"
+    # PQ sub-vectors must divide the dimension; cells need 39 training points each
+    assert factory_string("ivf_pq", 100, 390, nlist=64, pq_m=64) == "IVF10,PQ50"
+    assert factory_string("hnsw_sq8", 768, 10, hnsw_m=16) == "HNSW16_SQ8"
+    with pytest.raises(ValueError):
+        factory_string("lsh", 768, 10)
+
+
+@pytest.mark.parametrize("kind", INDEX_TYPES)
+def test_every_layout_finds_stored_vectors(kind, vectors, tmp_path):
+    index = build_index(kind, vectors, nlist=8, pq_m=4, hnsw_m=8)
+    assert index_type(index) == kind and index.ntotal == len(vectors)
+    _, found = index.search(vectors[:20], 5)
+    recall = np.mean([row in hits for row, hits in enumerate(found)])
+    assert recall >= 0.9
+
+    path = str(tmp_path / "index.faiss")
+    write_index(index, path)
+    for mmap in (False, True):
+        loaded = read_index(path, kind, mmap=mmap)
+        assert index_type(loaded) == kind and loaded.ntotal == len(vectors)
+        np.testing.assert_array_equal(loaded.search(vectors[:5], 5)[1], index.search(vectors[:5], 5)[1])
+
+
+def test_small_indexes_stay_flat(vectors, monkeypatch):
+    monkeypatch.setattr(faiss_index, "print_colored", lambda *args, **kwargs: None)
+    flat = build_index("flat", vectors)
+    assert compress_index(flat, "ivf_flat", min_vectors=10_000) is flat
+    assert not needs_compression("flat", len(vectors), "ivf_flat", min_vectors=10_000)
+    assert needs_compression("flat", len(vectors), "ivf_flat", min_vectors=1000)
+    assert index_type(compress_index(flat, "hnsw", min_vectors=1000)) == "hnsw"
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf_flat", "hnsw"])
+def test_remove_positions_renumbers(kind, vectors):
+    index = build_index(kind, vectors, nlist=8, hnsw_m=8)
+    index = remove_positions(index, [0, 5, 5, 1999])
+    assert index.ntotal == len(vectors) - 3
+    expected = np.delete(vectors, [0, 5, 1999], axis=0)
+    np.testing.assert_allclose(reconstruct_all(index), expected, rtol=1e-5)
+    _, found = index.search(expected[:1], 1)
+    assert found[0][0] == 0
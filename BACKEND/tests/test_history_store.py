@@ -0,0 +1,107 @@
+"""
+Tests for the conversation history store and its endpoint.
+"""
+import pickle
+import pytest
+from fastapi.testclient import TestClient
+from api import routes
+from services import history_store
+from services.history_store import HistoryStore
+from services.state_backend import MemoryStateBackend
+
+
+def make_store(tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    return HistoryStore(str(tmp_path / "history.sqlite"), **kwargs)
+
+
+def turns(session: str, count: int, start: int = 0):
+    return [(f"{session} q{i}", f"{session} a{i}") for i in range(start, start + count)]
+
+
+def test_window_and_read_through(tmp_path):
+    store = make_store(tmp_path, window_size=3)
+    for question, answer in turns("s", 5):
+        store.append(question, answer, "s")
+    store.append("other", "other", "t")
+
+    assert store.recent("s") == turns("s", 3, start=2)
+    assert store.recent("s", limit=2) == turns("s", 2, start=3)
+    # Past the window the turns come from the database
+    assert store.recent("s", limit=10) == turns("s", 5)
+    assert store.count("s") == 5 and store.count() == 6
+    store.close()
+
+    # Windows are rebuilt from disk after a restart
+    store = make_store(tmp_path, window_size=3)
+    store.append("s q5", "s a5", "s")
+    assert store.recent("s") == turns("s", 3, start=3)
+    assert store.recent("missing") == []
+    store.close()
+
+
+def test_compaction_keeps_the_newest_turns(tmp_path):
+    store = make_store(tmp_path, window_size=2, max_turns_per_session=4, compact_every=0)
+    for question, answer in turns("s", 10):
+        store.append(question, answer, "s")
+    store.compact()
+    assert store.count("s") == 4
+    assert store.recent("s", limit=10) == turns("s", 4, start=6)
+    store.close()
+
+
+def test_shared_windows_see_other_workers_turns(tmp_path):
+    state = MemoryStateBackend()
+    first = make_store(tmp_path, window_size=3, state=state)
+    second = make_store(tmp_path, window_size=3, state=state)
+    first.append("q0", "a0", "s")
+    # No window is loaded yet, so the turn is read from the database once committed
+    first.flush()
+    assert second.recent("s") == [("q0", "a0")]
+    # The loaded window is shared, so the next turn is visible before it is committed
+    second.append("q1", "a1", "s")
+    assert first.recent("s") == [("q0", "a0"), ("q1", "a1")]
+    first.close()
+    second.close()
+
+
+def test_legacy_pickle_is_migrated_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "print_colored", lambda *args, **kwargs: None)
+    path = tmp_path / "conversation_history.pkl"
+    with open(path, "wb") as f:
+        pickle.dump(turns("old", 2), f)
+    store = make_store(tmp_path)
+    store.import_pickle(str(path))
+    store.import_pickle(str(path))
+    assert store.recent() == turns("old", 2)
+    assert (tmp_path / "conversation_history.pkl.migrated").exists()
+    store.close()
+
+
+def test_history_endpoint_requires_the_admin_token(fake_services, monkeypatch):
+    from main import app
+    fake_services.history.append("q", "a", "secret-session")
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "token")
+    with TestClient(app) as client:
+        assert client.get("/api/history/secret-session").status_code == 403
+        response = client.get("/api/history/secret-session", headers={"X-Admin-Token": "token"})
+    assert response.status_code == 200
+    assert response.json()["turns"] == [{"question": "q", "answer": "a"}]
+
+
+@pytest.mark.parametrize("limit", [0, -1, 10 ** 9])
+def test_history_endpoint_rejects_out_of_range_limits(fake_services, monkeypatch, limit):
+    from main import app
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "token")
+    with TestClient(app) as client:
+        response = client.get("/api/history/s", params={"limit": limit}, headers={"X-Admin-Token": "token"})
+    assert response.status_code == 422
+
+
+def test_history_endpoint_is_refused_until_an_admin_token_is_set(fake_services, monkeypatch):
+    from main import app
+    fake_services.history.append("q", "a", "secret-session")
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "")
+    with TestClient(app) as client:
+        for headers in ({}, {"X-Admin-Token": ""}):
+            assert client.get("/api/history/secret-session", headers=headers).status_code == 403
@@ -0,0 +1,111 @@
+"""
+Tests for the BM25 index and hybrid retrieval with reciprocal rank fusion.
+"""
+import asyncio
+from typing import List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from services import hybrid_retriever
+from services.hybrid_retriever import HybridRetriever, combine_retrievers, reciprocal_rank_fusion
+from services.sparse_index import BM25Index, tokenize
+
+CHUNKS = [
+    "Section 103. Punishment for murder. Whoever commits murder shall be punished with death.",
+    "Section 303. Theft. Whoever commits theft shall be punished with imprisonment.",
+    "Section 115. Voluntarily causing hurt. Whoever causes hurt is punished.",
+    "Article 21. No person shall be deprived of his life or personal liberty.",
+]
+IDS = ["c103", "c303", "c115", "a21"]
+
+
+def doc(text: str, page: int = 0) -> Document:
+    return Document(page_content=text, metadata={"source": "book.pdf", "page": page})
+
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.add_documents([doc(text, page) for page, text in enumerate(CHUNKS)], ids=IDS)
+    return index
+
+
+class ListRetriever(BaseRetriever):
+    """Returns a fixed list of documents, or fails"""
+
+    docs: List[Document] = []
+    fail: bool = False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                **kwargs) -> List[Document]:
+        if self.fail:
+            raise ConnectionError("embedding API unreachable")
+        return self.docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+                                       **kwargs) -> List[Document]:
+        return self._get_relevant_documents(query, run_manager=run_manager)
+
+
+def test_tokenize_drops_stopwords_and_keeps_numbers():
+    assert tokenize("What is the punishment under Section 103?") == ["punishment", "section", "103"]
+
+
+def test_bm25_ranks_exact_tokens_first():
+    index = make_index()
+    results = index.search("section 303 theft", k=2)
+    assert results[0][0].page_content == CHUNKS[1]
+    assert results[0][1] > results[1][1]
+    assert index.search("article 21")[0][0].metadata["page"] == 3
+    assert index.search("xylophone") == []
+
+
+def test_bm25_delete_and_save_load_round_trip(tmp_path):
+    index = make_index()
+    assert index.delete(["c303"])
+    assert not index.delete(["missing"])
+    assert all(d.page_content != CHUNKS[1] for d, _ in index.search("theft"))
+
+    index.save(str(tmp_path))
+    assert BM25Index.exists(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert len(loaded) == 3
+    assert [(d.page_content, round(s, 5)) for d, s in loaded.search("punished murder")] == \
+        [(d.page_content, round(s, 5)) for d, s in index.search("punished murder")]
+    assert [d.page_content for d in loaded.get_by_ids(["a21", "c103", "missing"])] == [CHUNKS[3], CHUNKS[0]]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = doc("a", 1), doc("b", 2), doc("c", 3)
+    # b is second in both lists, a and c first in only one each
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], k=3, rrf_k=1)
+    assert fused[0] is b
+    assert {d.page_content for d in fused} == {"a", "b", "c"}
+    assert reciprocal_rank_fusion([[a, b, c]], k=2) == [a, b]
+
+
+def test_hybrid_fuses_vector_and_keyword_results():
+    index = make_index()
+    vector = ListRetriever(docs=[doc(CHUNKS[3], 3), doc(CHUNKS[1], 1)])
+    retriever = HybridRetriever(vector_retriever=vector, sparse_index=index, k=2, fetch_k=4)
+    # Theft is first for BM25 and second for the vector search
+    results = retriever.invoke("theft punished")
+    assert results[0].page_content == CHUNKS[1]
+    assert len(results) == 2
+    assert [d.page_content for d in asyncio.run(retriever.ainvoke("theft punished"))] == \
+        [d.page_content for d in results]
+
+
+def test_hybrid_falls_back_to_keywords_when_vector_search_fails(monkeypatch):
+    monkeypatch.setattr(hybrid_retriever, "print_colored", lambda *args, **kwargs: None)
+    retriever = HybridRetriever(vector_retriever=ListRetriever(fail=True), sparse_index=make_index(), k=1)
+    assert retriever.invoke("murder")[0].page_content == CHUNKS[0]
+    assert asyncio.run(retriever.ainvoke("murder"))[0].page_content == CHUNKS[0]
+
+
+def test_combine_retrievers_by_mode():
+    vector, index = ListRetriever(), make_index()
+    assert combine_retrievers(vector, index, mode="vector") is vector
+    assert combine_retrievers(vector, None, mode="hybrid") is vector
+    assert combine_retrievers(vector, index, mode="sparse").vector_retriever is None
+    assert isinstance(combine_retrievers(vector, index, mode="hybrid").vector_retriever, ListRetriever)
+    assert combine_retrievers(None, None) is None
@@ -0,0 +1,98 @@
+"""
+Tests for loading saved indexes without reading them into memory.
+"""
+import json
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from benchmarks.fakes import FakeEmbeddings
+from services.chunk_store import ChunkStore, ReadOnlyStoreError
+from services.faiss_index import build_index, index_type, read_index, write_index
+from services.sparse_index import BM25Index
+from services.vector_backends import get_backend
+
+TEXTS = [
+    "Section 103. Whoever commits murder shall be punished with death.",
+    "Section 303. Whoever commits theft shall be punished with imprisonment.",
+    "Article 21. No person shall be deprived of his life or personal liberty.",
+]
+IDS = ["c103", "c303", "a21"]
+
+
+def make_docs():
+    return [Document(page_content=text, metadata={"book": "b.pdf", "page": i}) for i, text in enumerate(TEXTS)]
+
+
+def results(index, query):
+    return [(doc.page_content, doc.metadata, round(score, 5)) for doc, score in index.search(query)]
+
+
+def test_read_only_bm25_is_memory_mapped_and_matches(tmp_path):
+    index = BM25Index()
+    index.add_documents(make_docs(), ids=IDS)
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path), read_only=True)
+    assert isinstance(loaded._docs, np.memmap) and isinstance(loaded._terms, np.memmap)
+    assert loaded.texts == [] and len(loaded) == 3
+    for query in ("punished theft", "article 21 liberty", "nothing matches"):
+        assert results(loaded, query) == results(index, query)
+    assert [doc.page_content for doc in loaded.get_by_ids(["a21", "missing", "c103"])] == [TEXTS[2], TEXTS[0]]
+    with pytest.raises(ReadOnlyStoreError):
+        loaded.add_documents(make_docs())
+    with pytest.raises(ReadOnlyStoreError):
+        loaded.delete(["c103"])
+    with pytest.raises(ReadOnlyStoreError):
+        loaded._store.delete(["c103"])
+
+    # Loaded writable, the index can be changed and saved again
+    writable = BM25Index.load(str(tmp_path))
+    writable.delete(["c303"])
+    writable.save(str(tmp_path))
+    assert len(BM25Index.load(str(tmp_path), read_only=True)) == 2
+
+
+def test_legacy_bm25_files_load_and_are_replaced(tmp_path):
+    with open(tmp_path / "bm25_docs.jsonl", "w", encoding="utf-8") as f:
+        for row in zip(IDS, TEXTS, [{"page": i} for i in range(3)]):
+            f.write(json.dumps(row) + "\n")
+    np.savez(tmp_path / BM25Index.LEGACY_POSTINGS_FILE, indptr=np.zeros(1))
+    assert BM25Index.exists(str(tmp_path))
+
+    legacy = BM25Index.load(str(tmp_path), read_only=True)
+    assert legacy.search("murder")[0][0].page_content == TEXTS[0]
+    legacy.save(str(tmp_path))
+    assert not (tmp_path / "bm25_docs.jsonl").exists()
+    assert not (tmp_path / BM25Index.LEGACY_POSTINGS_FILE).exists()
+    assert BM25Index.load(str(tmp_path), read_only=True).search("murder")[0][0].page_content == TEXTS[0]
+
+
+def test_chunk_store_lookups(tmp_path):
+    path = str(tmp_path / ChunkStore.FILE)
+    ChunkStore.write(path, IDS, make_docs())
+    store = ChunkStore(path)
+    assert [doc.page_content for doc in store.documents_at([2, 7, 0])] == [TEXTS[2], TEXTS[0]]
+    assert [doc.metadata["page"] for doc in store.get_by_ids(["c303", "a21"])] == [1, 2]
+    assert len(store) == 3 and store.positions[1] == "c303"
+    store.close()
+
+
+def test_read_only_faiss_serves_from_the_chunk_store(tmp_path):
+    backend = get_backend("faiss")
+    embeddings = FakeEmbeddings(delay_per_text=0)
+    backend.save(backend.create(make_docs(), embeddings, ids=IDS), str(tmp_path))
+    store = backend.load(str(tmp_path), embeddings, read_only=True)
+    assert isinstance(store.docstore, ChunkStore)
+    assert store.similarity_search(TEXTS[1], k=1)[0].page_content == TEXTS[1]
+
+
+def test_mmap_falls_back_without_the_ifc_flag(tmp_path, monkeypatch):
+    vectors = np.random.default_rng(0).standard_normal((100, 8)).astype(np.float32)
+    path = str(tmp_path / "index.faiss")
+    write_index(build_index("flat", vectors), path)
+    # FAISS before 1.8 has no IO_FLAG_MMAP_IFC
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC", raising=False)
+    index = read_index(path, "flat", mmap=True)
+    assert index_type(index) == "flat" and index.ntotal == 100
+    assert index.search(vectors[:1], 1)[1][0][0] == 0
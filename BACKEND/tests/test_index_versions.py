@@ -0,0 +1,117 @@
+"""
+Tests for versioned index directories, hot reload and rollback.
+"""
+import os
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from api import routes
+from services import container, index_versions
+from services.index_versions import (
+    collect_garbage, create_version, current_version, discard_version, index_lock, list_versions,
+    publish_version, resolve_index_path, rollback
+)
+from services.sparse_index import BM25Index
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "print_colored", lambda *args, **kwargs: None)
+    monkeypatch.setattr(container, "print_colored", lambda *args, **kwargs: None)
+    return str(tmp_path / "index")
+
+
+def write_version(root: str, text: str, keep: int = 3) -> str:
+    """Publish a keyword-only index holding one chunk"""
+    with index_lock(root):
+        version, path = create_version(root, resolve_index_path(root))
+        index = BM25Index()
+        index.add_documents([Document(page_content=text, metadata={"book": "b.pdf", "page": 0})], ids=["c0"])
+        index.save(path)
+        publish_version(root, version, keep=keep)
+    return version
+
+
+def test_versions_are_published_collected_and_rolled_back(root):
+    assert current_version(root) is None and resolve_index_path(root) == root
+    versions = [write_version(root, f"Section {i}. Version {i}.") for i in range(4)]
+    assert versions == sorted(versions)
+    # Only the newest three are kept
+    assert list_versions(root) == versions[1:]
+    assert current_version(root) == versions[-1]
+    assert resolve_index_path(root) == os.path.join(root, "versions", versions[-1])
+
+    assert rollback(root) == versions[2]
+    assert rollback(root) == versions[1]
+    with pytest.raises(ValueError):
+        rollback(root)
+    with pytest.raises(ValueError):
+        rollback(root, versions[0])
+    assert rollback(root, versions[3]) == versions[3]
+
+
+def test_unpublished_versions_are_never_served(root):
+    served = write_version(root, "Section 1. Served.")
+    with index_lock(root):
+        version, path = create_version(root, resolve_index_path(root))
+        # The staging copy starts from the current version, but is hidden
+        assert BM25Index.exists(path)
+        assert list_versions(root) == [served]
+        discard_version(root, version)
+    assert not os.path.exists(path) and current_version(root) == served
+
+    # A staging directory left by a writer that died is removed with old versions
+    with index_lock(root):
+        _, stale = create_version(root)
+        collect_garbage(root, keep=3)
+    assert not os.path.exists(stale)
+
+
+def test_reload_and_rollback_swap_the_served_retriever(fake_services, root, monkeypatch):
+    monkeypatch.setattr(container, "VECTOR_INDEX_PATH", root)
+    monkeypatch.setattr(container, "RETRIEVAL_MODE", "sparse")
+    monkeypatch.setattr(routes, "VECTOR_INDEX_PATH", root)
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+    first = write_version(root, "Section 1. Whoever commits theft is punished.")
+    second = write_version(root, "Section 2. Whoever commits murder is punished.")
+
+    def served_text():
+        return container.get_retriever().invoke("punished")[0].page_content
+
+    from main import app
+    with TestClient(app) as client:
+        status = client.post("/api/admin/index/reload", headers=admin).json()
+        assert status == {"current": second, "served": second, "versions": [first, second]}
+        assert "murder" in served_text()
+        old = container.get_retriever()
+        # Reloading the version already served keeps the loaded retriever
+        assert client.post("/api/admin/index/reload", headers=admin).status_code == 200
+        assert container.get_retriever() is old
+
+        status = client.post("/api/admin/index/rollback", headers=admin).json()
+        assert status["current"] == status["served"] == first
+        assert "theft" in served_text()
+        assert client.post("/api/admin/index/rollback", params={"version": "nope"}, headers=admin).status_code == 400
+
+        assert client.post("/api/admin/index/reload").status_code == 403
+        assert client.get("/api/admin/index", headers=admin).json()["served"] == first
+
+
+def test_index_admin_routes_are_refused_until_an_admin_token_is_set(fake_services, root, monkeypatch):
+    monkeypatch.setattr(container, "VECTOR_INDEX_PATH", root)
+    monkeypatch.setattr(container, "RETRIEVAL_MODE", "sparse")
+    monkeypatch.setattr(routes, "VECTOR_INDEX_PATH", root)
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "")
+    first = write_version(root, "Section 1. Whoever commits theft is punished.")
+    write_version(root, "Section 2. Whoever commits murder is punished.")
+
+    from main import app
+    with TestClient(app) as client:
+        for headers in ({}, {"X-Admin-Token": ""}):
+            assert client.get("/api/admin/index", headers=headers).status_code == 403
+            assert client.post("/api/admin/index/reload", headers=headers).status_code == 403
+            assert client.post("/api/admin/index/rollback", params={"version": first},
+                               headers=headers).status_code == 403
+    assert container.index_state["version"] != first
+    assert current_version(root) != first
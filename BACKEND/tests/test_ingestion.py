@@ -0,0 +1,75 @@
+"""
+Tests for incremental ingestion, building real indexes from generated PDFs.
+"""
+import os
+import pytest
+from langchain_core.documents import Document
+from benchmarks.fakes import FakeEmbeddings
+from services import ingestion
+from services.embedding_cache import CachedEmbeddings, EmbeddingStore
+from services.index_versions import list_versions, resolve_index_path
+from services.ingestion import chunk_ids_for, load_manifest, save_manifest, sync_index
+from services.sparse_index import BM25Index
+
+BOOK = [
+    "PART I\nSection 1. Short title\nThis Act may be called the Test Act.",
+    "Section 2. Murder\nWhoever commits murder shall be punished with death.",
+]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """A books directory and an index root, embedding with the offline fake"""
+    model = FakeEmbeddings(delay_per_text=0)
+    store = EmbeddingStore(str(tmp_path / "embeddings.sqlite"))
+    monkeypatch.setattr(ingestion, "create_document_embeddings",
+                        lambda: CachedEmbeddings(model, store, "fake"))
+    monkeypatch.setattr(ingestion, "print_colored", lambda *args, **kwargs: None)
+    books = tmp_path / "books"
+    books.mkdir()
+    yield str(books), str(tmp_path / "index"), model
+    store.close()
+
+
+def test_chunk_ids_number_chunks_per_page():
+    docs = [Document(page_content=str(i), metadata={"page": page}) for i, page in enumerate([0, 0, 1, 1, 1, 2])]
+    assert chunk_ids_for("a.pdf", "h", docs) == [
+        "a.pdf:h:0:0", "a.pdf:h:0:1", "a.pdf:h:1:0", "a.pdf:h:1:1", "a.pdf:h:1:2", "a.pdf:h:2:0"]
+
+
+def test_manifest_round_trip(tmp_path):
+    assert load_manifest(str(tmp_path)) == {}
+    manifest = {"a.pdf": {"hash": "h", "chunker": "structural", "chunk_ids": ["a.pdf:h:0:0"]}}
+    save_manifest(str(tmp_path), manifest)
+    assert load_manifest(str(tmp_path)) == manifest
+    assert not os.path.exists(tmp_path / "manifest.json.tmp")
+
+
+def test_sync_only_touches_new_changed_and_removed_books(library, make_pdf):
+    books, root, model = library
+    make_pdf(os.path.join(books, "a.pdf"), BOOK)
+    make_pdf(os.path.join(books, "b.pdf"), ["Section 9. Theft\nWhoever steals shall be punished."])
+
+    assert sync_index(books, root)
+    manifest = load_manifest(resolve_index_path(root))
+    assert set(manifest) == {"a.pdf", "b.pdf"}
+    embedded = model.texts_embedded
+    versions = list_versions(root)
+
+    # Nothing changed: no new version and nothing embedded
+    assert sync_index(books, root)
+    assert list_versions(root) == versions
+    assert model.texts_embedded == embedded
+
+    # Change one book and delete the other
+    make_pdf(os.path.join(books, "a.pdf"), BOOK + ["Section 3. Hurt\nWhoever causes hurt is punished."])
+    os.remove(os.path.join(books, "b.pdf"))
+    assert sync_index(books, root)
+    path = resolve_index_path(root)
+    manifest = load_manifest(path)
+    assert set(manifest) == {"a.pdf"}
+    assert len(list_versions(root)) == len(versions) + 1
+
+    sparse = BM25Index.load(path)
+    assert sorted(sparse.ids) == sorted(manifest["a.pdf"]["chunk_ids"])
+    assert all(doc_id.startswith("a.pdf:") for doc_id in sparse.ids)
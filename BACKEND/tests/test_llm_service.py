@@ -0,0 +1,101 @@
+"""
+Tests for the async answer pipeline behind /api/ask.
+"""
+import asyncio
+import time
+import pytest
+from benchmarks.fakes import FakeLLM
+from services import container, llm_service
+from services.concurrency import ConcurrencyLimiter, QueueFullError
+
+QUESTION = "What is the punishment for murder under section 103?"
+
+
+class CountingLLM(FakeLLM):
+    """Fake LLM recording how many calls ran at the same time"""
+
+    def __init__(self, delay: float):
+        super().__init__(delay=delay)
+        self.running = 0
+        self.most_running = 0
+
+    async def ainvoke(self, messages):
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        try:
+            return await super().ainvoke(messages)
+        finally:
+            self.running -= 1
+
+
+def test_answer_is_formatted_and_recorded(fake_services):
+    answer = asyncio.run(llm_service.aget_llm_answer(QUESTION, session_id="s1"))
+
+    assert "Murder" in answer.text
+    assert answer.sections
+    assert fake_services.llm.calls == 1
+    assert fake_services.retriever.calls == 1
+    assert fake_services.history.recent("s1") == [(QUESTION, answer.text)]
+
+
+def test_questions_are_answered_concurrently_up_to_the_limit(fake_services, monkeypatch):
+    llm = CountingLLM(delay=0.2)
+    container.override("llm", llm)
+    monkeypatch.setattr(llm_service, "request_limiter", ConcurrencyLimiter(4, 64))
+
+    async def ask_all():
+        return await asyncio.gather(*(llm_service.aget_llm_answer(f"{QUESTION} {i}") for i in range(8)))
+
+    start = time.perf_counter()
+    asyncio.run(ask_all())
+    elapsed = time.perf_counter() - start
+
+    assert llm.calls == 8
+    assert llm.most_running == 4
+    # Two rounds of four, not eight calls one after another
+    assert elapsed < 0.2 * 8 / 2
+
+
+def test_full_queue_rejects_questions(fake_services, monkeypatch):
+    monkeypatch.setattr(llm_service, "request_limiter", ConcurrencyLimiter(1, 0))
+
+    async def ask_two():
+        first = asyncio.ensure_future(llm_service.aget_llm_answer(QUESTION))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError):
+            await llm_service.aget_llm_answer("What is bail?")
+        return await first
+
+    assert "Murder" in asyncio.run(ask_two()).text
+
+
+def test_errors_are_returned_as_messages(fake_services):
+    class FailingLLM(FakeLLM):
+        async def ainvoke(self, messages):
+            raise RuntimeError("model unavailable")
+
+    container.override("llm", FailingLLM())
+    answer = asyncio.run(llm_service.aget_llm_answer(QUESTION, session_id="s1"))
+
+    assert answer.text == "❌ Error: model unavailable"
+    assert fake_services.history.recent("s1") == []
+
+
+def test_blocking_wrapper_answers_outside_an_event_loop(fake_services):
+    assert "Murder" in llm_service.get_llm_response(QUESTION, session_id="s1")
+    assert fake_services.llm.calls == 1
+
+
+def test_limiter_works_on_each_new_event_loop(fake_services, monkeypatch):
+    limiter = ConcurrencyLimiter(1, 64)
+    monkeypatch.setattr(llm_service, "request_limiter", limiter)
+
+    async def contend():
+        # Questions wait for the single slot, which binds a semaphore to this loop
+        return await asyncio.gather(*(llm_service.aget_llm_answer(f"{QUESTION} {i}") for i in range(3)))
+
+    for _ in range(2):
+        assert all("Murder" in answer.text for answer in asyncio.run(contend()))
+        assert "Murder" in llm_service.get_llm_response(QUESTION, session_id="s1")
+    assert fake_services.llm.calls == 8
+    assert limiter.stats()["in_flight"] == limiter.stats()["queued"] == 0
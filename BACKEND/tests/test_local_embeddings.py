@@ -0,0 +1,71 @@
+"""
+Tests for the local CPU embedding provider.
+"""
+import asyncio
+import threading
+import numpy as np
+import pytest
+from benchmarks.bench_local_embeddings import build_static_model
+from services import local_embeddings
+from services.local_embeddings import LocalEmbeddingModel, LocalEmbeddings, WordPieceTokenizer, load_local_model
+
+TEXTS = [
+    "Section 103. Whoever commits murder shall be punished with death.",
+    "Theft",
+    "Article 21. No person shall be deprived of his life or personal liberty except by law.",
+    "Section 303. Whoever commits theft shall be punished.",
+]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_embeddings, "print_colored", lambda *args, **kwargs: None)
+    build_static_model(str(tmp_path), TEXTS, dim=32)
+    return str(tmp_path)
+
+
+def test_tokenizer_splits_words_into_vocabulary_pieces(model_dir):
+    tokenizer = WordPieceTokenizer(f"{model_dir}/vocab.txt", max_tokens=8)
+    ids = tokenizer.tokenize("Théft, zq!")
+    vocab = {i: token for token, i in tokenizer.vocab.items()}
+    # Accents are stripped, a word outside the vocabulary is spelled out in
+    # pieces and a mark without a piece is unknown
+    assert [vocab[i] for i in ids] == ["[CLS]", "theft", ",", "z", "##q", "[UNK]", "[SEP]"]
+    assert len(tokenizer.tokenize(" ".join(["theft"] * 20))) == 8
+
+    input_ids, attention_mask = tokenizer.encode_batch(["theft", "section 103 murder"])
+    assert input_ids.shape == attention_mask.shape == (2, 5)
+    assert attention_mask.sum(axis=1).tolist() == [3, 5]
+
+
+def test_documents_keep_their_order_and_match_queries(model_dir):
+    model = LocalEmbeddingModel(model_dir, threads=2, batch_size=2)
+    embeddings = LocalEmbeddings(model)
+    vectors = np.asarray(embeddings.embed_documents(TEXTS))
+    assert vectors.shape == (4, 32)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    # Sorted by length into batches, but returned in the order given
+    np.testing.assert_allclose(vectors, model.embed_batch(TEXTS), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(embeddings.embed_query(TEXTS[1]), vectors[1], rtol=1e-5, atol=1e-6)
+    assert asyncio.run(embeddings.aembed_query(TEXTS[2])) == pytest.approx(vectors[2].tolist(), abs=1e-6)
+    assert embeddings.embed_documents([]) == []
+
+
+def test_queued_questions_share_a_model_call(model_dir):
+    model = LocalEmbeddingModel(model_dir, threads=1, batch_size=32)
+    # Hold the only worker, so every question is queued before a drain runs
+    release = threading.Event()
+    model.pool.submit(release.wait)
+    futures = [model.submit_query(text) for text in TEXTS]
+    release.set()
+    vectors = np.asarray([future.result(timeout=5) for future in futures])
+    assert model.batches == 1 and model.texts == len(TEXTS)
+    np.testing.assert_allclose(vectors, model.embed_batch(TEXTS), rtol=1e-5, atol=1e-6)
+
+
+def test_models_are_shared_per_directory(model_dir, tmp_path):
+    assert load_local_model(model_dir, threads=1) is load_local_model(model_dir, threads=1)
+    with pytest.raises(FileNotFoundError):
+        (tmp_path / "empty").mkdir()
+        (tmp_path / "empty" / "vocab.txt").write_text("[UNK]\n[CLS]\n[SEP]\n")
+        LocalEmbeddingModel(str(tmp_path / "empty"))
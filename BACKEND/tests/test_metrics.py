@@ -0,0 +1,59 @@
+"""
+Tests for the request metrics and the /metrics endpoint.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from services import metrics
+from services.metrics import Counter, Histogram, Registry
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = Registry()
+    answers = registry.register(Counter("answers_total", "Answers", ["source"]))
+    latency = registry.register(Histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0)))
+    answers.inc(source="llm")
+    answers.inc(2, source="cache")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="llm")
+    registry.register_collector(lambda: [("entries", "gauge", "Entries", [("entries", {}, 7)])])
+
+    lines = registry.render().splitlines()
+    assert "# TYPE answers_total counter" in lines
+    assert 'answers_total{source="llm"} 1' in lines
+    assert 'answers_total{source="cache"} 2' in lines
+    # Buckets are cumulative and bounds are inclusive
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="llm",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{stage="llm"} 3.65' in lines
+    assert 'latency_seconds_count{stage="llm"} 4' in lines
+    assert "entries 7" in lines
+
+
+def test_labels_must_match():
+    counter = Counter("c_total", "C", ["source"])
+    with pytest.raises(ValueError):
+        counter.inc(stage="llm")
+
+
+def test_token_counts_are_reported_or_estimated():
+    before = dict(((labels["direction"], labels["counted"]), value)
+                  for _, labels, value in metrics.LLM_TOKENS.samples())
+    metrics.record_tokens({"input_tokens": 10, "output_tokens": 3}, 999, 999)
+    metrics.record_tokens(None, 400, 80)
+    after = dict(((labels["direction"], labels["counted"]), value)
+                 for _, labels, value in metrics.LLM_TOKENS.samples())
+    delta = {key: after[key] - before.get(key, 0) for key in after}
+    assert delta == {("input", "reported"): 10, ("output", "reported"): 3,
+                     ("input", "estimated"): 100, ("output", "estimated"): 20}
+
+
+def test_answers_record_stage_timings_and_http_routes(fake_services):
+    from main import app
+    with TestClient(app) as client:
+        assert client.post("/api/ask", json={"question": "What does Section 303 say about theft?",
+                                             "session_id": "m1"}).status_code == 200
+        text = client.get("/metrics").text
+    for stage in ("classify", "retrieval", "llm", "format"):
+        assert f'lawgpt_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'route="/api/ask"' in text and 'source="llm"' in text
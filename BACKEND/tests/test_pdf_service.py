@@ -0,0 +1,50 @@
+"""
+Tests for sharded PDF extraction.
+"""
+import os
+from services.pdf_service import PageShard, extract_shard, iter_pdf_chunks, plan_shards
+
+PAGES = [f"Section {page}. Heading {page}\nText of page {page}." for page in range(5)]
+
+
+def test_plan_shards_covers_every_page(tmp_path, make_pdf):
+    path = str(tmp_path / "book.pdf")
+    make_pdf(path, PAGES)
+    assert plan_shards([path], pages_per_shard=2) == [
+        PageShard(path, 0, 2), PageShard(path, 2, 4), PageShard(path, 4, 5)]
+
+
+def test_unreadable_pdf_becomes_an_error_result(tmp_path):
+    path = str(tmp_path / "broken.pdf")
+    with open(path, "wb") as f:
+        f.write(b"not a pdf")
+    shards = plan_shards([path])
+    assert shards == [PageShard(path, 0, 0)]
+    result = extract_shard(shards[0])
+    assert result.docs == [] and result.error
+
+
+def test_chunks_do_not_depend_on_sharding_or_workers(tmp_path, make_pdf):
+    path = str(tmp_path / "book.pdf")
+    make_pdf(path, PAGES)
+
+    def chunks(**kwargs):
+        results = list(iter_pdf_chunks([path], chunker="recursive", **kwargs))
+        assert all(result.error is None for result in results)
+        docs = sorted((doc for result in results for doc in result.docs), key=lambda doc: doc.metadata["page"])
+        return [(doc.metadata["page"], doc.page_content) for doc in docs]
+
+    single = chunks(workers=1, pages_per_shard=100)
+    assert [page for page, _ in single] == list(range(5))
+    assert chunks(workers=1, pages_per_shard=1) == single
+    assert chunks(workers=2, pages_per_shard=2) == single
+
+
+def test_structural_chunker_yields_each_book_whole(tmp_path, make_pdf):
+    paths = [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    for path in paths:
+        make_pdf(path, PAGES)
+    results = list(iter_pdf_chunks(paths, workers=1, pages_per_shard=2, chunker="structural"))
+    assert sorted((os.path.basename(r.shard.path), r.shard.start, r.shard.end) for r in results) == [
+        ("a.pdf", 0, 5), ("b.pdf", 0, 5)]
+    assert all(result.docs and result.error is None for result in results)
@@ -0,0 +1,39 @@
+"""
+Tests for the question classifier.
+"""
+import pytest
+from services.query_classifier import QueryClass, classify, mentions_legal_terms
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What does Section 303 say about theft?", ("legal", "definition")),
+    ("What is the meaning of a writ?", ("legal", "list")),
+    ("Summarize the judgment in this case", ("legal", "summary")),
+    ("Compare civil and criminal courts", ("legal", "comparison")),
+    ("Explain   how does the appellate court work", ("legal", "explanation")),
+    ("Which judges sat on the bench?", ("legal", "court_composition")),
+    ("Tell me about sections of the constitution", ("legal", "legal_reference")),
+    ("Who can file petitions?", ("legal", "legal_general")),
+    ("What is the capital of France?", ("general", "general")),
+])
+def test_styles_follow_precedence(question, expected):
+    legal, style = expected
+    assert classify(question) == QueryClass(legal == "legal", style)
+
+
+@pytest.mark.parametrize("question", [
+    "Tell me a fact about canvas painting",
+    "Why does my showcase window fog up?",
+    "In what orderly fashion should I read these novels?",
+])
+def test_keywords_match_whole_words_only(question):
+    assert not classify(question).legal
+    assert not mentions_legal_terms(question)
+
+
+def test_plurals_and_phrases_across_punctuation():
+    assert classify("Courts, judges; lawyers!") == QueryClass(True, "court_composition")
+    # Phrases match across any run of spaces, but not across other words
+    assert classify("WHAT\tIS the law?").style == "list"
+    assert classify("What law is this?").style == "legal_general"
+    assert mentions_legal_terms("The Constitution applies.")
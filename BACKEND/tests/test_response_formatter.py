@@ -0,0 +1,59 @@
+"""
+Tests for the one-pass response formatter and the sections it returns.
+"""
+from fastapi.testclient import TestClient
+from benchmarks.fakes import FAKE_ANSWER
+from services.response_formatter import GENERAL_HEADING, SECTION_NAMES, format_response
+from services.stream_formatter import BOLD_MARKER, SECTION_HEADERS, SEPARATOR
+
+
+def test_general_answers_have_one_section():
+    answer = format_response("Paris is the **capital**.", "general")
+    assert answer.text == f"\n{GENERAL_HEADING}\nParis is the 🔹capital🔹.\n"
+    assert answer.sections == [{"name": "response", "heading": GENERAL_HEADING,
+                                "content": "Paris is the 🔹capital🔹."}]
+
+
+def test_legal_answers_fill_the_seven_sections_in_order():
+    answer = format_response(FAKE_ANSWER, "legal_general")
+    assert [section["name"] for section in answer.sections] == list(SECTION_NAMES)
+    assert [section["heading"] for section in answer.sections] == SECTION_HEADERS
+    assert answer.sections[0]["content"] == f"{BOLD_MARKER}Punishment for Murder{BOLD_MARKER}"
+    assert answer.sections[-1]["content"].startswith("Murder carries")
+    # The text is the sections laid out between separators
+    assert answer.text == "\n" + SEPARATOR + "".join(
+        f"{section['heading']}\n{section['content']}\n{SEPARATOR}" for section in answer.sections)
+
+
+def test_short_legal_answers_leave_later_sections_empty_and_drop_extra_paragraphs():
+    short = format_response("Title\n\nSection 1 of the Act", "legal_general")
+    assert [section["content"] for section in short.sections] == ["Title", "Section 1 of the Act"] + [""] * 5
+    assert f"{SECTION_HEADERS[2]}\n{SEPARATOR}" in short.text
+
+    extra = format_response("\n\n".join(f"Paragraph {i} of the law" for i in range(9)), "legal_general")
+    assert extra.sections[-1]["content"] == "Paragraph 6 of the law"
+    assert "Paragraph 7" not in extra.text
+
+
+def test_other_styles_without_legal_terms_get_points_and_conclusion():
+    text = "Intro line\nFirst point\nSecond point. Closing remark"
+    listed = format_response(text, "list")
+    names = [section["name"] for section in listed.sections]
+    assert names == ["overview", "points", "conclusion"]
+    assert listed.sections[1]["items"] == ["First point", "Second point. Closing remark"]
+    assert listed.sections[1]["content"] == "• First point\n• Second point. Closing remark"
+    assert "📋 Legal Overview 📋" in listed.text
+
+    summary = format_response("One. Two. Three. Four. Five", "summary")
+    assert summary.sections[1]["items"] == ["One", "Two", "Three"]
+    assert summary.sections[2]["items"] == ["Three", "Four", "Five"]
+    # Unknown styles fall back to the summary headings
+    assert format_response("One. Two", "unknown").sections[0]["heading"] == "✨ Legal Summary ✨"
+
+
+def test_ask_returns_the_sections(fake_services):
+    from main import app
+    with TestClient(app) as client:
+        body = client.post("/api/ask", json={"question": "What does Section 103 say about murder?"}).json()
+    assert [section["name"] for section in body["sections"]] == list(SECTION_NAMES)
+    assert body["answer"].startswith("\n" + SEPARATOR + SECTION_HEADERS[0])
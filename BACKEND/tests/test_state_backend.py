@@ -0,0 +1,95 @@
+"""
+Tests for the shared state backends, against the bundled state server.
+"""
+import asyncio
+import socket
+import threading
+import time
+import pytest
+from benchmarks.fakes import FakeEmbeddings
+from services import state_server
+from services.answer_cache import SemanticAnswerCache
+from services.response_formatter import FormattedAnswer
+from services.state_backend import MemoryStateBackend, RedisStateBackend, get_state_backend
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    """The bundled state server, on a free port in a background thread"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    state_server.print_colored = lambda *args, **kwargs: None
+
+    async def serve():
+        try:
+            await state_server.serve("127.0.0.1", port)
+        except asyncio.CancelledError:
+            pass
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(serve())
+    thread = threading.Thread(target=loop.run_until_complete, args=(task,), daemon=True)
+    thread.start()
+    url = f"redis://127.0.0.1:{port}/0"
+    deadline = time.monotonic() + 10
+    while not RedisStateBackend(url, timeout=0.5).ping():
+        assert time.monotonic() < deadline, "state server did not start"
+        time.sleep(0.05)
+    yield url
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(timeout=5)
+
+
+@pytest.fixture(params=["memory", "local"])
+def backend(request, server_url):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    state = get_state_backend("local", server_url)
+    state.delete("k", "n", "list", "short")
+    return state
+
+
+def test_keys_counters_and_expiry(backend):
+    assert backend.ping()
+    assert backend.get("k") is None
+    backend.set("k", "v")
+    assert backend.get("k") == "v"
+    assert [backend.incr("n") for _ in range(3)] == [1, 2, 3]
+    backend.set("short", "v", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    backend.delete("k", "n")
+    assert backend.get("k") is None and backend.get("n") is None
+
+
+def test_lists_are_capped_and_only_extended_if_present(backend):
+    assert backend.tail("list", 5) is None
+    backend.push("list", ["a"], max_len=3, only_if_exists=True)
+    assert backend.tail("list", 5) is None
+    backend.push("list", ["a", "b", "c", "d"], max_len=3)
+    assert backend.tail("list", 5) == ["b", "c", "d"]
+    assert backend.tail("list", 2) == ["c", "d"]
+    backend.push("list", ["e"], max_len=3, only_if_exists=True)
+    assert backend.tail("list", 5) == ["c", "d", "e"]
+    backend.replace_list("list", ["x"])
+    assert backend.tail("list", 5) == ["x"]
+
+
+def test_answers_cached_by_one_worker_reach_another(server_url):
+    caches = [SemanticAnswerCache(FakeEmbeddings(delay_per_text=0), state=get_state_backend("local", server_url))
+              for _ in range(2)]
+    for cache in caches:
+        cache.bind_index(("shared", 1))
+
+    question = "What is the punishment for theft?"
+    _, vector = caches[0].lookup(question)
+    caches[0].put(question, FormattedAnswer("Up to three years"), vector)
+    answer, _ = caches[1].lookup(question)
+    assert answer is not None and answer.text == "Up to three years"
+    assert caches[1].stats()["synced"] == 1
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_state_backend("memcached")
@@ -0,0 +1,72 @@
+"""
+Tests for streamed answers: the incremental formatter and the SSE endpoint.
+"""
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.fakes import FAKE_ANSWER, FakeLLM
+from services import container, llm_service
+from services.response_formatter import format_response
+from services.stream_formatter import StreamingFormatter
+
+ANSWERS = [
+    FAKE_ANSWER,
+    "Plain answer without sections",
+    "**Bold** start\n\nA **split bold** marker\n\n**unclosed bold\nnext line\n\n" + "\n\n".join(
+        f"Paragraph {i}" for i in range(10)),
+    "Trailing newlines\n\n\n\nand a stray * star\n",
+    "",
+]
+
+
+def stream_format(text: str, style: str, size: int) -> str:
+    formatter = StreamingFormatter(style)
+    fragments = [formatter.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    return "".join(fragments) + formatter.finish()
+
+
+@pytest.mark.parametrize("text", ANSWERS)
+@pytest.mark.parametrize("style", ["general", "legal_general", "summary", "list"])
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_stream_matches_buffered_formatter(text, style, size):
+    # Legal styles always stream with the section layout
+    expected = format_response(text, style, legal_layout=True).text
+    assert stream_format(text, style, size) == expected
+
+
+def sse_events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        yield event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_sse_endpoint_streams_the_formatted_answer(fake_services):
+    from main import app
+    question = "What is the punishment for murder under section 103?"
+    with TestClient(app) as client:
+        response = client.post("/api/ask/stream", json={"question": question, "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = list(sse_events(response.text))
+    assert events[-1] == ("done", {})
+    text = "".join(data["text"] for event, data in events[:-1])
+    style = llm_service.classify(question).style
+    assert text == format_response(FAKE_ANSWER, style, legal_layout=True).text
+    assert fake_services.history.recent("s1") == [(question, text)]
+
+
+def test_disconnect_stops_the_llm_and_frees_the_slot(fake_services):
+    container.override("llm", FakeLLM(delay=1.0))
+
+    async def leave_early():
+        fragments = llm_service.astream_llm_response("What is bail under section 480?")
+        await fragments.__anext__()
+        assert llm_service.request_limiter.in_flight == 1
+        await fragments.__anext__()
+        await fragments.aclose()
+        await asyncio.sleep(0.05)
+        return llm_service.request_limiter.in_flight
+
+    assert asyncio.run(leave_early()) == 0
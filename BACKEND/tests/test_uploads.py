@@ -0,0 +1,168 @@
+"""
+Tests for streaming multipart uploads and the upload endpoint.
+"""
+import asyncio
+import errno
+import os
+from functools import partial
+import pytest
+from fastapi.testclient import TestClient
+from api import routes
+from services import container
+from services.uploads import UploadExists, UploadTooLarge, save_uploads
+
+BOUNDARY = "test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+EXTENSIONS = (".pdf", ".docx")
+
+
+def multipart(*parts) -> bytes:
+    """Body with (field, file name or None, data) parts"""
+    body = b""
+    for field, name, data in parts:
+        disposition = f'form-data; name="{field}"' + (f'; filename="{name}"' if name is not None else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def save(body: bytes, directory, chunk_size: int = 7, content_type: str = CONTENT_TYPE, max_bytes: int = 10000):
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+    return asyncio.run(save_uploads(chunks(), content_type, str(directory), EXTENSIONS, max_bytes))
+
+
+def files_in(directory):
+    return sorted(os.listdir(directory))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100000])
+def test_files_stream_to_disk_in_any_chunking(tmp_path, chunk_size):
+    # Data that looks like a delimiter without being one stays in the file
+    first = b"%PDF-1.4\r\n--test-boundar\r\n" + bytes(range(256)) * 3
+    body = multipart(("note", None, b"ignored field"), ("file", "../a b.pdf", first), ("file", "b.DOCX", b"docx"))
+    saved = save(body, tmp_path, chunk_size)
+    assert [(upload.name, upload.size) for upload in saved] == [("a b.pdf", len(first)), ("b.DOCX", 4)]
+    assert (tmp_path / "a b.pdf").read_bytes() == first
+    assert files_in(tmp_path) == ["a b.pdf", "b.DOCX"]
+
+
+def test_oversized_uploads_leave_nothing_behind(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        save(multipart(("file", "big.pdf", b"x" * 200)), tmp_path, max_bytes=100)
+    assert files_in(tmp_path) == []
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (multipart(("file", "a.pdf", b"data")), "application/json"),
+    (multipart(("file", "a.pdf", b"data")), "multipart/form-data"),
+    (multipart(("file", "a.pdf", b"data"))[:-12], CONTENT_TYPE),
+    (multipart(("file", "a.txt", b"data")), CONTENT_TYPE),
+    (multipart(("file", ".", b"data")), CONTENT_TYPE),
+    (multipart(("note", None, b"no files")), CONTENT_TYPE),
+    (f"--{BOUNDARY}XX".encode() + b"a" * 100, CONTENT_TYPE),
+    (f"--{BOUNDARY}\r\n".encode() + b"h" * 20000, CONTENT_TYPE),
+])
+def test_malformed_uploads_are_rejected(tmp_path, body, content_type):
+    with pytest.raises(ValueError) as error:
+        save(body, tmp_path, content_type=content_type)
+    assert not isinstance(error.value, UploadTooLarge)
+    assert files_in(tmp_path) == []
+
+
+def test_existing_names_are_refused_and_nothing_is_kept(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"original")
+    with pytest.raises(UploadExists):
+        save(multipart(("file", "new.pdf", b"new"), ("file", "a.pdf", b"replacement")), tmp_path)
+    assert (tmp_path / "a.pdf").read_bytes() == b"original"
+    assert files_in(tmp_path) == ["a.pdf"]
+
+    with pytest.raises(UploadExists):
+        save(multipart(("file", "c.pdf", b"one"), ("file", "c.pdf", b"two")), tmp_path)
+    assert files_in(tmp_path) == ["a.pdf"]
+
+
+def test_a_name_taken_while_uploading_is_not_replaced(tmp_path):
+    async def chunks():
+        body = multipart(("file", "late.pdf", b"upload"))
+        split = body.index(b"upload")
+        yield body[:split]
+        # Another upload places the same name after this one's headers were checked
+        (tmp_path / "late.pdf").write_bytes(b"first")
+        yield body[split:]
+
+    with pytest.raises(UploadExists):
+        asyncio.run(save_uploads(chunks(), CONTENT_TYPE, str(tmp_path), EXTENSIONS))
+    assert (tmp_path / "late.pdf").read_bytes() == b"first"
+    assert files_in(tmp_path) == ["late.pdf"]
+
+
+def test_files_are_copied_into_place_without_hard_links(tmp_path, monkeypatch):
+    def no_links(source, target):
+        raise PermissionError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(os, "link", no_links)
+    saved = save(multipart(("file", "a.pdf", b"first book")), tmp_path)
+    assert [upload.name for upload in saved] == ["a.pdf"]
+    assert (tmp_path / "a.pdf").read_bytes() == b"first book"
+
+    async def chunks():
+        body = multipart(("file", "b.pdf", b"one"), ("file", "late.pdf", b"upload"))
+        split = body.index(b"upload")
+        yield body[:split]
+        (tmp_path / "late.pdf").write_bytes(b"first")
+        yield body[split:]
+
+    with pytest.raises(UploadExists):
+        asyncio.run(save_uploads(chunks(), CONTENT_TYPE, str(tmp_path), EXTENSIONS))
+    assert (tmp_path / "late.pdf").read_bytes() == b"first"
+    assert files_in(tmp_path) == ["a.pdf", "late.pdf"]
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, path, size):
+        self.submitted.append((os.path.basename(path), size))
+        return {"id": f"job{len(self.submitted)}", "status": "queued"}
+
+    def shutdown(self):
+        pass
+
+
+def test_upload_endpoint(fake_services, tmp_path, monkeypatch):
+    from main import app
+    queue = RecordingQueue()
+    container.override("ingestion_queue", queue)
+    monkeypatch.setattr(routes, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret", "Content-Type": CONTENT_TYPE}
+    body = multipart(("file", "act.pdf", b"%PDF-1.4 act"))
+    with TestClient(app) as client:
+        assert client.post("/api/documents", content=body, headers={"Content-Type": CONTENT_TYPE}).status_code == 403
+        response = client.post("/api/documents", content=body, headers=admin)
+        assert response.status_code == 202
+        assert response.json() == {"jobs": [{"id": "job1", "status": "queued"}]}
+        assert client.post("/api/documents", content=body, headers=admin).status_code == 409
+        truncated = multipart(("file", "other.pdf", b"%PDF-1.4"))[:-5]
+        assert client.post("/api/documents", content=truncated, headers=admin).status_code == 400
+        monkeypatch.setattr(routes, "save_uploads", partial(save_uploads, max_bytes=4))
+        too_large = multipart(("file", "large.pdf", b"x" * 5))
+        assert client.post("/api/documents", content=too_large, headers=admin).status_code == 413
+    assert queue.submitted == [("act.pdf", 12)]
+
+
+def test_uploads_are_refused_until_an_admin_token_is_set(fake_services, tmp_path, monkeypatch):
+    from main import app
+    queue = RecordingQueue()
+    container.override("ingestion_queue", queue)
+    monkeypatch.setattr(routes, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "")
+    body = multipart(("file", "act.pdf", b"%PDF-1.4 act"))
+    with TestClient(app) as client:
+        for headers in ({}, {"X-Admin-Token": ""}, {"X-Admin-Token": "anything"}):
+            response = client.post("/api/documents", content=body, headers={**headers, "Content-Type": CONTENT_TYPE})
+            assert response.status_code == 403
+    assert queue.submitted == []
+    assert not (tmp_path / "uploads").exists()
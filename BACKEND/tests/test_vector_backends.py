@@ -0,0 +1,70 @@
+"""
+Tests for the vector backends, with the offline hashing embeddings.
+"""
+import pytest
+from langchain_core.documents import Document
+from benchmarks.fakes import FakeEmbeddings
+from services.vector_backends import get_backend
+
+TEXTS = [
+    "Whoever commits murder shall be punished with death or imprisonment for life.",
+    "Whoever commits theft shall be punished with imprisonment of up to three years.",
+    "Whoever voluntarily causes hurt shall be punished with imprisonment of up to one year.",
+    "A contract is an agreement enforceable by law.",
+    "Every person is competent to contract who is of the age of majority.",
+]
+IDS = [f"book.pdf:h:{i}:0" for i in range(len(TEXTS))]
+
+
+def backends():
+    names = ["faiss", "numpy"]
+    try:
+        import chromadb  # noqa: F401
+        names.append("chroma")
+    except ImportError:
+        pass
+    return names
+
+
+def make_docs():
+    return [Document(page_content=text, metadata={"book": "book.pdf", "page": i}) for i, text in enumerate(TEXTS)]
+
+
+@pytest.mark.parametrize("name", backends())
+def test_round_trip_search_and_delete(name, tmp_path):
+    backend = get_backend(name)
+    embeddings = FakeEmbeddings(delay_per_text=0)
+    path = str(tmp_path / "index")
+    store = backend.create(make_docs(), embeddings, ids=IDS, path=path)
+    backend.save(backend.train(store), path)
+    assert backend.exists(path)
+
+    loaded = backend.load(path, embeddings)
+    assert backend.count(loaded) == len(TEXTS)
+    ids, docs = backend.documents(loaded)
+    assert sorted(ids) == sorted(IDS)
+    assert {doc.page_content for doc in docs} == set(TEXTS)
+
+    hits = loaded.similarity_search(TEXTS[1], k=2)
+    assert hits[0].page_content == TEXTS[1]
+    assert hits[0].metadata["page"] == 1
+
+    backend.delete(loaded, [IDS[1]])
+    backend.save(loaded, path)
+    reloaded = backend.load(path, embeddings)
+    assert backend.count(reloaded) == len(TEXTS) - 1
+    assert TEXTS[1] not in [doc.page_content for doc in reloaded.similarity_search(TEXTS[1], k=4)]
+
+
+def test_numpy_and_faiss_rank_alike(tmp_path):
+    embeddings = FakeEmbeddings(delay_per_text=0)
+    rankings = []
+    for name in ("faiss", "numpy"):
+        store = get_backend(name).create(make_docs(), embeddings, ids=IDS)
+        rankings.append([doc.page_content for doc in store.similarity_search("punished with imprisonment", k=3)])
+    assert rankings[0] == rankings[1]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend("annoy")
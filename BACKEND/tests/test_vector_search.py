@@ -0,0 +1,90 @@
+"""
+Tests for the vectorized MMR, reranking and per-request search parameters.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+from benchmarks.fakes import FakeEmbeddings, FakeRetriever
+from models.question import QuestionRequest
+from services import container
+from services.vector_backends import get_backend
+from services.vector_db_service import create_retriever
+from services.vector_search import mmr_select, search_store
+
+TEXTS = [f"Section {n}. Whoever commits offence {n} shall be punished with term {n % 7}." for n in range(40)]
+
+
+@pytest.fixture
+def store():
+    docs = [Document(page_content=text, metadata={"book": "b.pdf", "page": i}) for i, text in enumerate(TEXTS)]
+    return get_backend("faiss").create(docs, FakeEmbeddings(delay_per_text=0, dim=64))
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.25, 0.5, 1.0])
+def test_mmr_picks_what_langchain_picks(lambda_mult):
+    rng = np.random.default_rng(1)
+    candidates = rng.standard_normal((200, 32)).astype(np.float32)
+    query = rng.standard_normal(32).astype(np.float32)
+    expected = maximal_marginal_relevance(query, candidates, lambda_mult=lambda_mult, k=10)
+    assert mmr_select(query, candidates, 10, lambda_mult) == expected
+
+
+def test_mmr_edge_cases():
+    candidates = np.eye(3, dtype=np.float32)
+    assert mmr_select(np.ones(3), candidates, 0) == []
+    assert sorted(mmr_select(np.ones(3), candidates, 10)) == [0, 1, 2]
+    # Given relevance replaces the similarity to the query
+    assert mmr_select(np.ones(3), candidates, 1, relevance=np.array([0.1, 0.9, 0.5])) == [1]
+
+
+class ReverseReranker:
+    """Scores later candidates higher, so the order is visibly the reranker's"""
+
+    def __init__(self):
+        self.scored = []
+
+    def score(self, query, texts):
+        self.scored.append(len(texts))
+        return np.array([float(TEXTS.index(text)) for text in texts], dtype=np.float32)
+
+
+def test_reranker_scores_the_larger_pool(store):
+    vector = np.asarray([store.embeddings.embed_query(TEXTS[3])], dtype=np.float32)
+    reranker = ReverseReranker()
+    found = search_store(store, vector, [TEXTS[3]], "similarity", k=3, reranker=reranker, rerank_candidates=20)[0]
+    assert reranker.scored == [20]
+    numbers = [TEXTS.index(doc.page_content) for doc in found]
+    assert numbers == sorted(numbers, reverse=True) and len(numbers) == 3
+
+
+def test_search_parameters_can_be_overridden_per_call(store):
+    retriever = create_retriever(store)
+    assert len(retriever.invoke(TEXTS[5])) == retriever.search_kwargs["k"]
+    assert len(retriever.invoke(TEXTS[5], k=2, fetch_k=30, lambda_mult=1.0)) == 2
+    # With relevance only, MMR returns the nearest chunk first
+    assert retriever.invoke(TEXTS[5], k=1, lambda_mult=1.0)[0].page_content == TEXTS[5]
+    assert retriever.search_params(k=None, fetch_k=30)["fetch_k"] == 30
+
+
+class RecordingRetriever(FakeRetriever):
+    def __init__(self):
+        super().__init__()
+        self.searches = []
+
+    async def ainvoke(self, query, **search):
+        self.searches.append(search)
+        return await super().ainvoke(query, **search)
+
+
+def test_requests_pass_their_search_parameters(fake_services):
+    from main import app
+    retriever = RecordingRetriever()
+    container.override("retriever", retriever)
+    question = "What does Section 103 say about murder?"
+    with TestClient(app) as client:
+        assert client.post("/api/ask", json={"question": question, "k": 3, "lambda_mult": 0.9}).status_code == 200
+        assert client.post("/api/ask", json={"question": question, "k": 0}).status_code == 422
+    assert retriever.searches == [{"k": 3, "lambda_mult": 0.9}]
+    assert QuestionRequest(question=question, fetch_k=100).search_params() == {"fetch_k": 100}
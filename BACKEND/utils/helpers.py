@@ -1,8 +1,19 @@
 """
 Helper utilities for the LawGPT application.
+
+print_colored logs through the "lawgpt" logger. Records are put on a queue
+and written to stdout by a background thread, so a request thread never
+waits on the terminal. Forked child processes write directly instead, since
+the thread does not survive the fork.
 """
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
 import sys
 from colorama import init, Fore, Style
+from config.settings import LOG_LEVEL
 
 # Initialize colorama for cross-platform colored terminal text
 init()
@@ -18,25 +29,62 @@ COLOR_MAP = {
     "white": Fore.WHITE
 }
 
+# Errors are printed in red and warnings in yellow; everything else is information
+LEVEL_MAP = {
+    "red": logging.ERROR,
+    "yellow": logging.WARNING,
+}
+
+
+class ColorFormatter(logging.Formatter):
+    """Formats records in the color and weight passed to print_colored"""
+
+    def format(self, record):
+        color_code = COLOR_MAP.get(getattr(record, "color", "white"), Fore.WHITE)
+        style = Style.BRIGHT if getattr(record, "bold", False) else ""
+        return f"{style}{color_code}{record.getMessage()}{Style.RESET_ALL}"
+
+
+logger = logging.getLogger("lawgpt")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(ColorFormatter())
+_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+_listener = logging.handlers.QueueListener(_queue_handler.queue, _stream_handler)
+logger.addHandler(_queue_handler)
+_listener.start()
+# Write out whatever is still queued when the process exits
+atexit.register(_listener.stop)
+
+
+def _log_directly():
+    logger.removeHandler(_queue_handler)
+    logger.addHandler(_stream_handler)
+
+
+os.register_at_fork(after_in_child=_log_directly)
+
+
 def print_colored(text, color="white", bold=False):
     """
-    Print colored text to terminal
+    Log colored text to the terminal without waiting for it to be written
     
     Args:
         text (str): Text to print
         color (str): Color name (red, green, yellow, blue, magenta, cyan, white)
         bold (bool): Whether to print in bold
     """
-    color_code = COLOR_MAP.get(color.lower(), Fore.WHITE)
-    style = Style.BRIGHT if bold else ""
-    print(f"{style}{color_code}{text}{Style.RESET_ALL}")
+    color = color.lower()
+    logger.log(LEVEL_MAP.get(color, logging.INFO), text, extra={"color": color, "bold": bold})
 
 def print_header():
     """Print application header"""
-    print("\n" + "="*60)
+    print_colored("\n" + "="*60)
     print_colored("LEGAL CASE RESEARCH ASSISTANT", "cyan", bold=True)
     print_colored("Helping law students find relevant case information", "cyan")
-    print("="*60 + "\n")
+    print_colored("="*60 + "\n")
 
 def check_environment(required_vars):
     """
@@ -72,5 +120,9 @@ def get_pdf_hash(pdf_path):
         str: MD5 hash of the PDF file
     """
     import hashlib
+    digest = hashlib.md5()
+    # Read in blocks so large books are never held in memory at once
     with open(pdf_path, "rb") as file:
-        return hashlib.md5(file.read()).hexdigest()
\ No newline at end of file
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
\ No newline at end of file